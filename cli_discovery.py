@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+AI CLI discovery for the installer
+Finds which delegate CLIs (gemini, aider, copilot, ...) are installed and
+their versions, fast enough to run on every install:
+
+- one scan of the PATH directories resolves every candidate binary
+  (instead of a shutil.which per name)
+- `--version` probes run concurrently, each with its own timeout
+- versions are cached per binary, keyed by resolved path, size and mtime,
+  so only new or upgraded binaries are probed again
+
+Usage:
+    python cli_discovery.py [--refresh] [--json]
+
+The cache lives in $XDG_CACHE_HOME/claude-delegation/cli-discovery.json
+(~/.cache/... by default); DELEGATE_DISCOVERY_CACHE overrides the path.
+"""
+
+import os
+import sys
+import json
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+PROBE_TIMEOUT = 5.0
+CACHE_VERSION = 1
+
+
+class Candidate(NamedTuple):
+    """A CLI to look for: binary names in preference order and how to ask its version."""
+    name: str
+    binaries: List[str]
+    version_args: List[str]
+    command: str  # Prompt command used in delegation_config.json
+
+
+CANDIDATES = [
+    Candidate("gemini", ["gemini", "gemini-cli"], ["--version"], "gemini -p"),
+    Candidate("aider", ["aider"], ["--version"], "aider --message"),
+    Candidate("copilot", ["copilot"], ["--version"], "copilot -p"),
+    Candidate("codex", ["codex"], ["--version"], "codex exec"),
+    Candidate("qwen", ["qwen"], ["--version"], "qwen -p"),
+]
+
+
+class CLIInfo(NamedTuple):
+    """Discovery result for one candidate."""
+    name: str
+    available: bool
+    path: str = ""
+    version: str = ""
+    command: str = ""
+    error: str = ""
+
+
+def default_cache_file() -> Path:
+    override = os.environ.get("DELEGATE_DISCOVERY_CACHE")
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "claude-delegation" / "cli-discovery.json"
+
+
+def _executable_names(binary: str) -> List[str]:
+    if os.name != "nt":
+        return [binary]
+    extensions = os.environ.get("PATHEXT", ".COM;.EXE;.BAT;.CMD").lower().split(";")
+    return [binary] + [binary + ext for ext in extensions if ext]
+
+
+def scan_path(wanted: List[str], path: str = None) -> Dict[str, str]:
+    """
+    Resolve binaries with one directory listing per PATH entry:
+    {binary: full path} for the first executable match of each.
+    """
+    names = {}
+    for binary in wanted:
+        for name in _executable_names(binary):
+            names[name.lower() if os.name == "nt" else name] = binary
+    found: Dict[str, str] = {}
+    path = os.environ.get("PATH", "") if path is None else path
+    for directory in path.split(os.pathsep):
+        if len(found) == len(wanted):
+            break
+        try:
+            entries = os.scandir(directory or ".")
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                key = entry.name.lower() if os.name == "nt" else entry.name
+                binary = names.get(key)
+                if binary is None or binary in found:
+                    continue
+                try:
+                    if entry.is_file() and os.access(entry.path, os.X_OK):
+                        found[binary] = entry.path
+                except OSError:
+                    continue
+    return found
+
+
+def _fingerprint(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def probe_version(path: str, args: List[str], timeout: float = PROBE_TIMEOUT) -> CLIInfo:
+    """Run `<path> --version`; the first non-empty output line is the version."""
+    try:
+        proc = subprocess.run([path] + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              stdin=subprocess.DEVNULL, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return CLIInfo("", True, path, error=f"no version after {timeout:.0f}s")
+    except OSError as e:
+        return CLIInfo("", False, path, error=e.strerror or str(e))
+    output = (proc.stdout or proc.stderr).decode("utf-8", "replace").strip()
+    version = output.splitlines()[0].strip() if output else ""
+    return CLIInfo("", True, path, version, error="" if proc.returncode == 0 else f"exit {proc.returncode}")
+
+
+def _read_cache(cache_file: Path) -> dict:
+    try:
+        data = json.loads(cache_file.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data.get("binaries", {}) if data.get("version") == CACHE_VERSION else {}
+
+
+def _write_cache(cache_file: Path, binaries: dict):
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "binaries": binaries}, indent=1))
+        os.replace(str(tmp), str(cache_file))
+    except OSError:
+        pass  # A read-only home only costs the next run its probes
+
+
+def discover_clis(candidates: List[Candidate] = None, path: str = None, cache_file: Path = None,
+                  refresh: bool = False, timeout: float = PROBE_TIMEOUT) -> Dict[str, CLIInfo]:
+    """{name: CLIInfo} for every candidate, probing only binaries not cached."""
+    candidates = CANDIDATES if candidates is None else candidates
+    cache_file = default_cache_file() if cache_file is None else cache_file
+    resolved = scan_path([binary for c in candidates for binary in c.binaries], path)
+
+    chosen = {}
+    for candidate in candidates:
+        binary = next((b for b in candidate.binaries if b in resolved), None)
+        if binary is not None:
+            chosen[candidate.name] = resolved[binary]
+
+    cached = {} if refresh else _read_cache(cache_file)
+    results: Dict[str, CLIInfo] = {}
+    to_probe = []
+    for candidate in candidates:
+        binary_path = chosen.get(candidate.name)
+        if binary_path is None:
+            results[candidate.name] = CLIInfo(candidate.name, False, command=candidate.command)
+            continue
+        entry = cached.get(binary_path)
+        if entry is not None and entry["stat"] == _fingerprint(binary_path):
+            results[candidate.name] = CLIInfo(candidate.name, True, binary_path, entry["version"],
+                                              candidate.command, entry.get("error", ""))
+        else:
+            to_probe.append(candidate)
+
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=len(to_probe)) as pool:
+            probes = {c.name: pool.submit(probe_version, chosen[c.name], c.version_args, timeout)
+                      for c in to_probe}
+        for candidate in to_probe:
+            info = probes[candidate.name].result()._replace(name=candidate.name, command=candidate.command)
+            results[candidate.name] = info
+            if info.available and not info.error.startswith("no version"):
+                # Timeouts are not cached: the next run tries again
+                cached[info.path] = {"stat": _fingerprint(info.path), "version": info.version,
+                                     "error": info.error}
+
+    in_use = set(chosen.values())
+    live = {binary: entry for binary, entry in cached.items() if binary in in_use}
+    if to_probe or len(live) != len(cached):
+        _write_cache(cache_file, live)
+    return {c.name: results[c.name] for c in candidates}
+
+
+def main():
+    refresh = '--refresh' in sys.argv
+    found = discover_clis(refresh=refresh)
+    if '--json' in sys.argv:
+        print(json.dumps({name: info._asdict() for name, info in found.items()}, indent=2))
+        return
+    for info in found.values():
+        if info.available:
+            detail = info.version or info.error or "version unknown"
+            print(f"✅ {info.name:<8} {detail}  ({info.path})")
+        else:
+            print(f"   {info.name:<8} not found")
+
+
+if __name__ == "__main__":
+    main()
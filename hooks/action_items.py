@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Single-pass action-item extraction for delegation hooks
+Finds CRITICAL/TODO/FIXME/... items with one compiled alternation, in
+document order, without duplicates and tagged with their category
+
+Each pattern marks where an item starts (case-insensitive, at a word start,
+optionally followed by ':'); the item runs to the end of that line and must
+have some text after the keyword.
+Projects can add their own categories in .claude/action_patterns.json:
+    {"SECURITY": "CVE-\\\\d{4}-\\\\d+", "DEPRECATED": "deprecated"}
+
+Usage:
+    python action_items.py [--json] [file]   # reads stdin by default
+"""
+
+import re
+import sys
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+
+DEFAULT_PATTERNS: List[Tuple[str, str]] = [
+    ("CRITICAL", r"CRITICAL"),
+    ("TODO", r"TODO"),
+    ("FIXME", r"FIXME"),
+    ("ACTION", r"Action"),
+    ("RECOMMEND", r"Recommend(?:ed)?"),
+    ("NEXT_STEP", r"Next step"),
+]
+
+
+class ActionItem(NamedTuple):
+    """One extracted item."""
+    category: str
+    text: str
+    line: int
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def _first_char(pattern: str) -> Optional[str]:
+    """
+    The letter or digit every match of pattern starts with, or None when
+    that is not certain: another first character, an optional or repeated
+    first character, or a top-level alternation.
+    """
+    if not pattern or not pattern[0].isalnum() or pattern[1:2] in ("?", "*", "{"):
+        return None
+    depth, i = 0, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 1
+        elif char == "[":
+            i += 2 if pattern[i + 1:i + 2] == "]" else 1  # "[]...]" holds a literal ]
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None
+        i += 1
+    return pattern[0]
+
+
+_LEADING_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+
+def _embeddable(pattern: str) -> str:
+    """
+    pattern as it can sit inside the combined alternation: leading inline
+    flags become a scoped group ("(?i)x" -> "(?i:x)"); numbered
+    backreferences, which the wrapping groups would renumber, raise re.error.
+    """
+    i = 0
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            if pattern[i + 1:i + 2].isdigit() and pattern[i + 1] != "0" or pattern.startswith("g<", i + 1):
+                raise re.error("numbered backreferences are not supported (use (?P<name>...) and (?P=name))")
+            i += 1
+        i += 1
+    match = _LEADING_FLAGS.match(pattern)
+    if match is None:
+        return pattern
+    if not set(match.group(1)) <= set("imsx"):
+        raise re.error(f"inline flags (?{match.group(1)}) are not supported")
+    return f"(?{match.group(1)}:{pattern[match.end():]})"
+
+
+class ActionItemExtractor:
+    """Compiles all category patterns into one alternation."""
+
+    def __init__(self, patterns: List[Tuple[str, str]] = None):
+        self._patterns: List[Tuple[str, str]] = []
+        self._regex = None
+        for category, pattern in patterns or []:
+            self.register(category, pattern)
+
+    def register(self, category: str, pattern: str):
+        """
+        Add a category; raises re.error (and leaves the extractor unchanged)
+        for a pattern that is invalid on its own or in the combined alternation.
+        """
+        re.compile(pattern)
+        patterns = self._patterns + [(category, _embeddable(pattern))]
+        self._regex = self._combined(patterns)
+        self._patterns = patterns
+
+    @property
+    def categories(self) -> List[str]:
+        return [category for category, _ in self._patterns]
+
+    @staticmethod
+    def _combined(patterns: List[Tuple[str, str]]) -> Pattern:
+        # One named group per category; the item text follows the keyword
+        alternatives = "|".join(
+            f"(?P<c{i}>{pattern})" for i, (_, pattern) in enumerate(patterns)
+        )
+        # When every pattern must start with a known letter or digit, a leading
+        # character class lets the regex engine skip most positions without trying them
+        firsts = {_first_char(pattern) for _, pattern in patterns}
+        prefilter = ""
+        if None not in firsts:
+            prefilter = "(?=[" + "".join(sorted({c for f in firsts for c in (f.lower(), f.upper())})) + "])"
+        return re.compile(
+            rf"{prefilter}(?<!\w)(?:{alternatives}):?[ \t]*[^\s:].*", re.IGNORECASE
+        )
+
+    def finditer(self, text: str, first_line: int = 1) -> Iterator[ActionItem]:
+        """Yield every item in document order (duplicates included)."""
+        if not self._patterns:
+            return
+
+        line, position = first_line, 0
+        for match in self._regex.finditer(text):
+            line += text.count("\n", position, match.start())
+            position = match.start()
+            category = self._patterns[int(match.lastgroup[1:])][0]
+            yield ActionItem(category, match.group(0).rstrip(), line)
+
+
+class ActionItemCollector:
+    """
+    Collects unique items from text fed in line-aligned pieces, so streamed
+    and whole-text extraction give the same result.
+    """
+
+    def __init__(self, extractor: ActionItemExtractor = None):
+        self.extractor = extractor or default_extractor()
+        self.items: List[ActionItem] = []
+        self._seen = set()
+        self._line = 1
+
+    def feed(self, text: str):
+        # Extraction is best effort: a failing pattern must not stop the
+        # caller (post-delegate still has to log its metrics)
+        if self.extractor is not None:
+            try:
+                found = list(self.extractor.finditer(text, self._line))
+            except Exception as e:
+                print(f"⚠️  Action-item extraction failed: {e}", file=sys.stderr)
+                self.extractor, found = None, []
+            for item in found:
+                key = " ".join(item.text.split()).casefold()
+                if key not in self._seen:
+                    self._seen.add(key)
+                    self.items.append(item)
+        self._line += text.count("\n")
+
+
+def default_extractor() -> ActionItemExtractor:
+    return ActionItemExtractor(DEFAULT_PATTERNS)
+
+
+def load_patterns(path: Path) -> Dict[str, str]:
+    """Load user patterns ({category: regex}); empty if missing or unreadable (with a warning)."""
+    if not path.exists():
+        return {}
+    try:
+        patterns = json.loads(path.read_text())
+        if not isinstance(patterns, dict):
+            raise ValueError("expected an object of {category: regex}")
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring {path}: {e}", file=sys.stderr)
+        return {}
+    return patterns
+
+
+_extractors: Dict[Path, Tuple[float, ActionItemExtractor]] = {}
+
+
+def project_extractor(claude_dir: Path) -> ActionItemExtractor:
+    """Default patterns plus the project's action_patterns.json (cached by mtime)."""
+    path = claude_dir / "action_patterns.json"
+    mtime = path.stat().st_mtime if path.exists() else 0.0
+    cached = _extractors.get(path)
+    if cached is None or cached[0] != mtime:
+        extractor = default_extractor()
+        for category, pattern in load_patterns(path).items():
+            try:
+                if not isinstance(pattern, str):
+                    raise re.error("expected a string")
+                extractor.register(category, pattern)
+            except re.error as e:
+                print(f"⚠️  Ignoring pattern {category!r} in {path}: {e}", file=sys.stderr)
+        cached = _extractors[path] = (mtime, extractor)
+    return cached[1]
+
+
+def extract(text: str, extractor: ActionItemExtractor = None) -> List[ActionItem]:
+    """Unique items in document order."""
+    collector = ActionItemCollector(extractor)
+    collector.feed(text)
+    return collector.items
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    args = [arg for arg in args if arg != "--json"]
+
+    if args:
+        text = Path(args[0]).read_text(encoding="utf-8", errors="replace")
+    else:
+        text = sys.stdin.read()
+
+    items = extract(text, project_extractor(Path.cwd() / ".claude"))
+    if as_json:
+        print(json.dumps([item.to_dict() for item in items], indent=2))
+    else:
+        for item in items:
+            print(f"{item.line:>5}  [{item.category}] {item.text}")
+
+
+if __name__ == "__main__":
+    main()
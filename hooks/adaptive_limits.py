@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Per-task max_lines learned from delegation metrics
+Replaces the fixed 5/8/10 line limits with limits fitted to each task's
+history, and switches tasks that keep running long to a stricter template
+
+`learn` scans recent rows in the metrics store and writes
+metrics/learned-limits.json. pre-delegate only reads that table (cached by
+mtime), so prompt building costs one dict lookup. Tasks are keyed by the
+name logged with their metrics (post-delegate's task_context, run/batch
+--name, or the task type when unnamed); pre-delegate looks up the name
+first, then the task type.
+
+For each key with at least MIN_SAMPLES rows:
+    max_lines  p90 of lines in responses that passed validation, capped so
+               the median tokens per line stays under the 250-token warning,
+               and kept at or above the current limit when "too brief"
+               warnings are frequent
+    template   "strict" when over MAX_FAILURE_RATE of responses ran over their
+               line limit or 250 tokens, otherwise "standard"
+
+Usage:
+    python adaptive_limits.py learn [--days N]
+    python adaptive_limits.py show
+"""
+
+import os
+import sys
+import json
+import math
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import metrics_store
+
+TABLE_FILE = "learned-limits.json"
+TABLE_VERSION = 1
+LEARN_DAYS = 30
+MIN_SAMPLES = 5
+MIN_LINES = 4
+MAX_LINES = 15
+TOKEN_LIMIT = 250
+BRIEF_LINES = 3
+MAX_FAILURE_RATE = 0.2
+MAX_BRIEF_RATE = 0.2
+
+
+class Limit(NamedTuple):
+    """Learned settings for one task."""
+    max_lines: int
+    template: str
+
+
+class TaskStats(NamedTuple):
+    samples: int
+    lines_p50: int
+    lines_p90: int
+    tokens_p50: int
+    tokens_p90: int
+    failure_rate: float
+    brief_rate: float
+
+
+def percentile(values: List[float], q: float):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(len(ordered) * q / 100)) - 1]
+
+
+def task_stats(rows: List[dict]) -> TaskStats:
+    lines = [row["lines"] for row in rows]
+    tokens = [row["tokens"] for row in rows]
+    too_long = sum(
+        row["tokens"] > TOKEN_LIMIT or (row.get("max_lines", 0) and row["lines"] > row["max_lines"])
+        for row in rows
+    )
+    brief = sum(row["lines"] < BRIEF_LINES for row in rows)
+    return TaskStats(
+        samples=len(rows),
+        lines_p50=percentile(lines, 50),
+        lines_p90=percentile(lines, 90),
+        tokens_p50=percentile(tokens, 50),
+        tokens_p90=percentile(tokens, 90),
+        failure_rate=too_long / len(rows),
+        brief_rate=brief / len(rows),
+    )
+
+
+def fit_limit(rows: List[dict]) -> Limit:
+    """Smallest max_lines that keeps good responses whole and under the token warning."""
+    stats = task_stats(rows)
+    good = [row["lines"] for row in rows
+            if BRIEF_LINES <= row["lines"] and row["tokens"] <= TOKEN_LIMIT
+            and not (row.get("max_lines", 0) and row["lines"] > row["max_lines"])]
+    limit = percentile(good, 90) if good else stats.lines_p50
+
+    per_line = percentile([row["tokens"] / row["lines"] for row in rows if row["lines"]] or [1], 50)
+    limit = min(limit, int(TOKEN_LIMIT // max(per_line, 1)))
+
+    if stats.brief_rate > MAX_BRIEF_RATE:
+        # Answers are being cut too short: never go below the limit used so far
+        limit = max(limit, max(row.get("max_lines", 0) for row in rows))
+    limit = max(MIN_LINES, min(MAX_LINES, limit))
+    template = "strict" if stats.failure_rate > MAX_FAILURE_RATE else "standard"
+    return Limit(limit, template)
+
+
+def learn(records: Iterable[dict]) -> Dict[str, dict]:
+    """Fit a limit for every task name with enough samples."""
+    groups: Dict[str, List[dict]] = {}
+    for record in records:
+        groups.setdefault(record["task"], []).append(record)
+
+    table = {}
+    for key, rows in groups.items():
+        if len(rows) < MIN_SAMPLES or key == "unknown":
+            continue
+        limit = fit_limit(rows)
+        entry = task_stats(rows)._asdict()
+        entry.update(max_lines=limit.max_lines, template=limit.template)
+        table[key] = entry
+    return table
+
+
+def recent_records(metrics_dir: Path, days: int = LEARN_DAYS, now: datetime = None) -> Iterable[dict]:
+    """Rows of the last N calendar days (an idle project does not keep learning from old data)."""
+    import metrics_rollup
+
+    first = ((now or datetime.now()) - timedelta(days=days)).strftime("%Y-%m-%d")
+    for date in metrics_rollup.data_dates(metrics_dir):
+        if date >= first:
+            yield from metrics_rollup.iter_day_rows(metrics_dir, date)
+
+
+def write_table(metrics_dir: Path, tasks: Dict[str, dict], days: int):
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    path = metrics_dir / TABLE_FILE
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({
+        "version": TABLE_VERSION, "generated": int(time.time()), "days": days, "tasks": tasks,
+    }, indent=1))
+    os.replace(str(tmp), str(path))
+
+
+_tables: Dict[Path, tuple] = {}
+
+
+def load_table(metrics_dir: Path) -> Dict[str, Limit]:
+    """The learned table as {key: Limit}, cached by file mtime (empty if none)."""
+    path = metrics_dir / TABLE_FILE
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    cached = _tables.get(path)
+    if cached is None or cached[0] != mtime:
+        try:
+            data = json.loads(path.read_text())
+            tasks = data["tasks"] if data.get("version") == TABLE_VERSION else {}
+        except (OSError, ValueError, KeyError):
+            tasks = {}
+        table = {key: Limit(entry["max_lines"], entry["template"]) for key, entry in tasks.items()}
+        cached = _tables[path] = (mtime, table)
+    return cached[1]
+
+
+def lookup(metrics_dir: Path, *keys: Optional[str]) -> Optional[Limit]:
+    """Learned limit for the first key (task name, then task type) in the table."""
+    table = load_table(metrics_dir)
+    for key in keys:
+        if key and key in table:
+            return table[key]
+    return None
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "show"
+    if command not in ("learn", "show"):
+        print(__doc__)
+        sys.exit(1)
+
+    metrics_dir = metrics_store.find_metrics_dir(Path.cwd())
+    if command == "learn":
+        days = int(args[args.index("--days") + 1]) if "--days" in args else LEARN_DAYS
+        tasks = learn(recent_records(metrics_dir, days))
+        write_table(metrics_dir, tasks, days)
+        print(f"📐 Learned limits for {len(tasks)} tasks from the last {days} days")
+
+    path = metrics_dir / TABLE_FILE
+    if not path.exists():
+        print("No learned limits yet: run 'python adaptive_limits.py learn'")
+        return
+    tasks = json.loads(path.read_text())["tasks"]
+    print(f"   {'task':<24} {'n':>5} {'lines p50/p90':>14} {'tokens p50/p90':>15} {'fail':>5} {'brief':>6}  limit")
+    for key, entry in sorted(tasks.items(), key=lambda item: -item[1]["samples"]):
+        print(f"   {key[:24]:<24} {entry['samples']:5} {entry['lines_p50']:6}/{entry['lines_p90']:<7} "
+              f"{entry['tokens_p50']:7}/{entry['tokens_p90']:<7} {entry['failure_rate']:5.0%} "
+              f"{entry['brief_rate']:6.0%}  {entry['max_lines']} ({entry['template']})")
+
+
+if __name__ == "__main__":
+    main()
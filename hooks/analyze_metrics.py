@@ -3,78 +3,284 @@
 Analyze delegation metrics to identify optimization opportunities
 
 Usage:
-    python analyze-metrics.py [--days N]
+    python analyze-metrics.py [--days N] [--rebuild] [--raw] [--json]
     
 Options:
     --days N    Analyze metrics from the last N days (default: 7)
+    --rebuild   Recompute daily rollups from raw data and verify them
+    --raw       Summarize raw rows instead of the rollups (includes unmigrated
+                CSVs; long ranges are read in parallel)
+    --json      Print the summary with p50/p95/p99 per metric, task and day as JSON
+
+Percentiles come from the quantile sketches kept in each daily rollup
+(see quantile_sketch), merged across the requested days. Latency by
+pipeline stage and by CLI comes from the timing spans (see delegation_trace).
 """ 
 
+import os
 import sys
+import json
+import mmap
 from pathlib import Path
 from datetime import datetime, timedelta
 from collections import Counter
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
 
+import metrics_rollup
+import metrics_store
+from quantile_sketch import Sketch, quantiles
 
-def parse_csv_line(line: str) -> Tuple[str, str, int, int]:
-    """Parse a single CSV line into components."""
-    parts = line.strip().split(',')
-    if len(parts) != 4:
-        return None
-    
-    timestamp, task, lines, tokens = parts
-    try:
-        return timestamp, task, int(lines), int(tokens)
-    except ValueError:
-        return None
+PARALLEL_MIN_FILES = 16
+
+# One raw delegation: (timestamp, task, lines, tokens, cache, latency_ms)
+Row = Tuple[str, str, int, int, str, int]
+
+
+def _range_start(days: int) -> int:
+    start = datetime.combine((datetime.now() - timedelta(days=days - 1)).date(), datetime.min.time())
+    return metrics_store.to_epoch(start)
+
+
+def metrics_files(metrics_dir: Path, days: int) -> List[Path]:
+    """Store files and segments in range (by footer or manifest) and unmigrated CSVs for the last N days."""
+    start_ts = _range_start(days)
+    files = metrics_store.store_files(metrics_dir, start_ts)
+    first = metrics_store.format_date(start_ts // 86400)
+    files.extend(path for path in sorted(metrics_dir.glob("delegation-*.csv"))
+                 if path.stem[len("delegation-"):] >= first)
+    return files
+
+
+def _iter_csv(path: Path) -> Iterator[Row]:
+    """Rows of a legacy CSV, split as bytes from a memory map; only the numbers go through int()."""
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = mm[:].split(b"\n")
+    tasks: Dict[bytes, str] = {}
+    for line in lines[1:]:
+        parts = line.split(b",")
+        if len(parts) != 4:
+            continue
+        try:
+            lines_count, tokens = int(parts[2]), int(parts[3])
+        except ValueError:
+            continue
+        task = tasks.get(parts[1])
+        if task is None:
+            task = tasks[parts[1]] = parts[1].decode("utf-8", "replace").strip()
+        yield parts[0].decode("ascii", "replace").strip(), task, lines_count, tokens, "", 0
+
+
+def iter_file(path: Path, start_ts: int) -> Iterator[Row]:
+    """(timestamp, task, lines, tokens, cache, latency_ms) rows of one store file or CSV."""
+    if path.suffix == ".csv":
+        yield from _iter_csv(path)
+        return
+    format_timestamp = metrics_store.format_timestamp
+    for block in metrics_store.read_blocks(path, start_ts):
+        for ts, task, lines, tokens, cache, latency_ms in zip(
+                block["timestamp"], block["task"], block["lines"], block["tokens"], block["cache"],
+                block["latency_ms"]):
+            if ts >= start_ts:
+                yield format_timestamp(ts), task, lines, tokens, cache, latency_ms
+
+
+def iter_metrics(metrics_dir: Path, days: int) -> Iterator[Row]:
+    """Stream rows from the last N days, one file at a time."""
+    start_ts = _range_start(days)
+    for path in metrics_files(metrics_dir, days):
+        yield from iter_file(path, start_ts)
 
 
-def load_metrics(metrics_dir: Path, days: int) -> List[Tuple[str, str, int, int]]:
+def load_metrics(metrics_dir: Path, days: int) -> List[Row]:
     """Load metrics from the last N days."""
-    metrics = []
+    return list(iter_metrics(metrics_dir, days))
+
+
+def empty_sketches() -> dict:
+    return {metric: Sketch() for metric in metrics_rollup.SKETCHED}
+
+
+def merge_sketches(into: dict, sketches: dict):
+    for metric, sketch in sketches.items():
+        into[metric].merge(sketch)
+
+
+def empty_summary() -> dict:
+    return {
+        "count": 0,
+        "lines_sum": 0,
+        "tokens_sum": 0,
+        "excessive": Counter(),
+        "efficient": Counter(),
+        "daily": {},
+        "cache": Counter(),
+        "sketches": empty_sketches(),
+        "task_sketches": {},
+        "daily_sketches": {},
+    }
+
+
+def summarize_rows(metrics: Iterable[Row]) -> dict:
+    """Aggregate raw metric rows (any iterable, consumed once) into a report summary."""
+    # Per row only count each (day, task)'s exact values; lines, tokens and
+    # latencies repeat a lot, so sketches and totals are built once per distinct value
+    groups: Dict[Tuple[str, str], Tuple[Dict[int, int], Dict[int, int], Dict[int, int]]] = {}
+    caches: Dict[str, int] = {}
+    for timestamp, task, lines, tokens, cache, latency_ms in metrics:
+        key = (timestamp[:10], task)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ({}, {}, {})
+        group[0][lines] = group[0].get(lines, 0) + 1
+        group[1][tokens] = group[1].get(tokens, 0) + 1
+        if latency_ms:  # 0 = not recorded, left out as in the rollups
+            group[2][latency_ms] = group[2].get(latency_ms, 0) + 1
+        if cache:
+            caches[cache] = caches.get(cache, 0) + 1
     
-    for i in range(days):
-        date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-        log_file = metrics_dir / f"delegation-{date}.csv"
+    summary = empty_summary()
+    summary["cache"].update({state: n for state, n in caches.items() if state in ("hit", "miss")})
+    for (date, task), (lines_counts, tokens_counts, latency_counts) in groups.items():
+        count = sum(lines_counts.values())
+        tokens_sum = sum(value * n for value, n in tokens_counts.items())
+        summary["count"] += count
+        summary["lines_sum"] += sum(value * n for value, n in lines_counts.items())
+        summary["tokens_sum"] += tokens_sum
+        day = summary["daily"].setdefault(date, [0, 0])
+        day[0] += count
+        day[1] += tokens_sum
         
-        if not log_file.exists():
-            continue
+        # Find tasks that consistently exceed limits
+        excessive = sum(n for value, n in tokens_counts.items() if value > 250)
+        efficient = sum(n for value, n in tokens_counts.items() if value < 100)
+        if excessive:
+            summary["excessive"][task] += excessive
+        if efficient:
+            summary["efficient"][task] += efficient
         
-        with log_file.open('r') as f:
-            # Skip header
-            next(f, None)
-            
-            for line in f:
-                parsed = parse_csv_line(line)
-                if parsed:
-                    metrics.append(parsed)
+        for sketches in (summary["sketches"],
+                         summary["task_sketches"].setdefault(task, empty_sketches()),
+                         summary["daily_sketches"].setdefault(date, empty_sketches())):
+            for value, n in lines_counts.items():
+                sketches["lines"].add(value, n)
+            for value, n in tokens_counts.items():
+                sketches["tokens"].add(value, n)
+            for value, n in latency_counts.items():
+                sketches["latency_ms"].add(value, n)
     
-    return metrics
+    return summary
+
+
+def merge_summary(into: dict, other: dict):
+    """Fold one summary into another (e.g. per-file summaries from worker processes)."""
+    for key in ("count", "lines_sum", "tokens_sum"):
+        into[key] += other[key]
+    for key in ("excessive", "efficient", "cache"):
+        into[key].update(other[key])
+    for date, (count, tokens) in other["daily"].items():
+        day = into["daily"].setdefault(date, [0, 0])
+        day[0] += count
+        day[1] += tokens
+    merge_sketches(into["sketches"], other["sketches"])
+    for key in ("task_sketches", "daily_sketches"):
+        for name, sketches in other[key].items():
+            merge_sketches(into[key].setdefault(name, empty_sketches()), sketches)
+
+
+def _summarize_file(path: Path, start_ts: int) -> dict:
+    return summarize_rows(iter_file(path, start_ts))
+
+
+def summarize_range(metrics_dir: Path, days: int, workers: int = None) -> dict:
+    """
+    Summary of the last N days straight from raw rows, one file at a time.
+    Ranges of PARALLEL_MIN_FILES or more files are summarized in a process
+    pool, each worker returning only its file's aggregates.
+    """
+    start_ts = _range_start(days)
+    files = metrics_files(metrics_dir, days)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    if workers < 2 or len(files) < PARALLEL_MIN_FILES:
+        return summarize_rows(iter_metrics(metrics_dir, days))
 
+    summary = empty_summary()
+    with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+        for partial in pool.map(_summarize_file, files, [start_ts] * len(files)):
+            merge_summary(summary, partial)
+    return summary
 
-def analyze_metrics(metrics: List[Tuple[str, str, int, int]]):
+
+def summarize_rollups(rollups: List[dict]) -> dict:
+    """Aggregate daily rollups into the same summary as summarize_rows."""
+    summary = empty_summary()
+    
+    # Percentiles for the range come from merging each day's small sketches
+    for rollup in rollups:
+        total = rollup["total"]
+        summary["count"] += total["count"]
+        summary["lines_sum"] += total["lines_sum"]
+        summary["tokens_sum"] += total["tokens_sum"]
+        summary["daily"][rollup["date"]] = [total["count"], total["tokens_sum"]]
+        summary["cache"].update(rollup["cache"])
+        merge_sketches(summary["sketches"], total["sketches"])
+        summary["daily_sketches"][rollup["date"]] = total["sketches"]
+        
+        for task, stats in rollup["tasks"].items():
+            merge_sketches(summary["task_sketches"].setdefault(task, empty_sketches()), stats["sketches"])
+            excessive = sum(stats["tokens_hist"][metrics_rollup.EXCESSIVE_BUCKETS])
+            efficient = sum(stats["tokens_hist"][metrics_rollup.EFFICIENT_BUCKETS])
+            if excessive:
+                summary["excessive"][task] += excessive
+            if efficient:
+                summary["efficient"][task] += efficient
+    
+    return summary
+
+
+STAGE_ORDER = ["prepare", "cache", "queue", "cli", "map", "reduce", "validate", "log"]
+
+
+def stage_latency(metrics_dir: Path, dates: List[str], rollups: List[dict] = None) -> dict:
+    """Millisecond sketches per stage, and per CLI and stage, merged from the daily rollups."""
+    if rollups is None:
+        rollups = metrics_rollup.load_rollups(metrics_dir, dates)
+    stages, clis = {}, {}
+    for rollup in rollups:
+        for stage, sketch in rollup["stages"].items():
+            stages.setdefault(stage, Sketch()).merge(sketch)
+        for cli, cli_stages in rollup["stage_clis"].items():
+            for stage, sketch in cli_stages.items():
+                clis.setdefault(cli, {}).setdefault(stage, Sketch()).merge(sketch)
+    return {"stages": stages, "clis": clis}
+
+
+def _stage_key(stage: str):
+    return (STAGE_ORDER.index(stage) if stage in STAGE_ORDER else len(STAGE_ORDER), stage)
+
+
+def analyze_metrics(metrics: Iterable[Row]):
     """Analyze and display metrics."""
-    if not metrics:
+    report(summarize_rows(metrics))
+
+
+def report(summary: dict):
+    """Display a metrics summary."""
+    if not summary["count"]:
         print("📊 No delegation metrics found")
         print("Make sure you're running delegations with the post-delegate hook")
         return
     
     # Calculate aggregates
-    total_delegations = len(metrics)
-    total_lines = sum(m[2] for m in metrics)
-    total_tokens = sum(m[3] for m in metrics)
-    avg_lines = total_lines / total_delegations
+    total_delegations = summary["count"]
+    total_tokens = summary["tokens_sum"]
+    avg_lines = summary["lines_sum"] / total_delegations
     avg_tokens = total_tokens / total_delegations
-    
-    # Find tasks that consistently exceed limits
-    excessive_tasks = Counter()
-    efficient_tasks = Counter()
-    
-    for _, task, _, tokens in metrics:
-        if tokens > 250:
-            excessive_tasks[task] += 1
-        elif tokens < 100:
-            efficient_tasks[task] += 1
+    excessive_tasks = summary["excessive"]
+    efficient_tasks = summary["efficient"]
     
     # Display results
     print("📊 Delegation Metrics Analysis")
@@ -106,9 +312,43 @@ def analyze_metrics(metrics: List[Tuple[str, str, int, int]]):
         for task, count in efficient_tasks.most_common(5):
             print(f"   • {task}: {count} occurrences")
     
+    # Long tail, from the merged sketches
+    sketches = summary["sketches"]
+    print(f"\n📈 Distributions (p50 / p95 / p99):")
+    for metric, label, unit in (("tokens", "Tokens", ""), ("lines", "Lines", ""), ("latency_ms", "Latency", " ms")):
+        if sketches[metric].count:
+            p = quantiles(sketches[metric])
+            print(f"   {label + ':':<9} {p['p50']:.0f} / {p['p95']:.0f} / {p['p99']:.0f}{unit}")
+    busiest = sorted(summary["task_sketches"].items(), key=lambda item: -item[1]["tokens"].count)[:5]
+    if busiest:
+        print("   Per task (tokens p95, latency p95):")
+        for task, task_sketches in busiest:
+            latency = task_sketches["latency_ms"].quantile(0.95)
+            latency_text = f"{latency:.0f} ms" if latency is not None else "-"
+            print(f"   • {task}: {task_sketches['tokens'].quantile(0.95):.0f} tokens, {latency_text}")
+    
+    # Where the time goes, from the per-delegation timing spans
+    latency = summary.get("latency")
+    if latency and latency["stages"]:
+        print(f"\n⏱️  Latency by Stage (p50 / p95 ms):")
+        for stage in sorted(latency["stages"], key=_stage_key):
+            sketch = latency["stages"][stage]
+            print(f"   {stage:<9} {sketch.quantile(0.5):9.1f} / {sketch.quantile(0.95):9.1f}  ({sketch.count} spans)")
+        print("   By CLI:")
+        for cli, stages in sorted(latency["clis"].items()):
+            parts = [f"{stage} {stages[stage].quantile(0.5):.0f}/{stages[stage].quantile(0.95):.0f}"
+                     for stage in sorted(stages, key=_stage_key)]
+            print(f"   • {cli}: " + ", ".join(parts))
+    
+    # Response cache effectiveness
+    cache = summary["cache"]
+    lookups = cache["hit"] + cache["miss"]
+    if lookups:
+        print(f"\n♻️  Response Cache:")
+        print(f"   {cache['hit']} hits / {cache['miss']} misses ({cache['hit'] / lookups:.0%} hit rate)")
+    
     # Calculate token savings estimate
-    # Assume without compression, average would be 1500 tokens
-    baseline_tokens = 1500 * total_delegations
+    baseline_tokens = metrics_rollup.BASELINE_TOKENS * total_delegations
     actual_tokens = total_tokens
     savings = baseline_tokens - actual_tokens
     savings_pct = (savings / baseline_tokens) * 100
@@ -130,31 +370,55 @@ def analyze_metrics(metrics: List[Tuple[str, str, int, int]]):
     
     # Daily breakdown
     print(f"\n📅 Daily Breakdown:")
-    daily_counts = Counter()
-    daily_tokens = {}
+    daily = summary["daily"]
     
-    for timestamp, task, lines, tokens in metrics:
-        date = timestamp.split()[0]
-        daily_counts[date] += 1
-        daily_tokens[date] = daily_tokens.get(date, 0) + tokens
-    
-    for date in sorted(daily_counts.keys(), reverse=True)[:7]:
-        count = daily_counts[date]
-        avg_tok = daily_tokens[date] / count
+    for date in sorted(daily.keys(), reverse=True)[:7]:
+        count, tokens = daily[date]
+        if not count:
+            continue
+        avg_tok = tokens / count
         print(f"   {date}: {count:3d} delegations, avg {avg_tok:.0f} tokens")
 
 
+def percentiles(sketches: dict) -> dict:
+    return {metric: dict(quantiles(sketch), count=sketch.count)
+            for metric, sketch in sketches.items() if sketch.count}
+
+
+def summary_json(summary: dict) -> dict:
+    """JSON-ready summary: totals, cache counters and percentiles overall, per task, day and stage."""
+    latency = summary.get("latency") or {"stages": {}, "clis": {}}
+    return {
+        "count": summary["count"],
+        "lines_sum": summary["lines_sum"],
+        "tokens_sum": summary["tokens_sum"],
+        "excessive": dict(summary["excessive"]),
+        "efficient": dict(summary["efficient"]),
+        "cache": {"hit": summary["cache"]["hit"], "miss": summary["cache"]["miss"]},
+        "percentiles": percentiles(summary["sketches"]),
+        "tasks": {task: percentiles(sketches) for task, sketches in sorted(summary["task_sketches"].items())},
+        "daily": {date: dict(percentiles(summary["daily_sketches"][date]), count=count, tokens_sum=tokens)
+                  for date, (count, tokens) in sorted(summary["daily"].items()) if count},
+        "stages_ms": percentiles(latency["stages"]),
+        "clis_ms": {cli: percentiles(stages) for cli, stages in sorted(latency["clis"].items())},
+    }
+
+
 def main():
     """Main execution."""
     days = 7
     
     # Parse command line arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ('-h', '--help'):
-            print(__doc__)
-            sys.exit(0)
-        if sys.argv[1] == '--days' and len(sys.argv) > 2:
-            days = int(sys.argv[2])
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print(__doc__)
+        sys.exit(0)
+    if '--days' in sys.argv:
+        index = sys.argv.index('--days')
+        if len(sys.argv) > index + 1:
+            days = int(sys.argv[index + 1])
+    rebuild = '--rebuild' in sys.argv
+    raw = '--raw' in sys.argv
+    as_json = '--json' in sys.argv
     
     # Find metrics directory
     current_dir = Path.cwd()
@@ -178,9 +442,26 @@ def main():
         print(f"   Metrics will be created at: {metrics_dir}")
         sys.exit(0)
     
-    # Load and analyze metrics
-    metrics = load_metrics(metrics_dir, days)
-    analyze_metrics(metrics)
+    dates = [(datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    
+    if rebuild:
+        mismatched = metrics_rollup.rebuild_rollups(metrics_dir, dates)
+        if mismatched:
+            print(f"⚠️  Rebuilt {len(mismatched)} rollup(s) that did not match raw data:")
+            for date in mismatched:
+                print(f"   • {date}")
+        else:
+            print("✅ Rollups verified against raw data")
+        print()
+    
+    # Analyze pre-aggregated daily rollups (one small file per day); they also hold the stage timings
+    rollups = metrics_rollup.load_rollups(metrics_dir, dates)
+    summary = summarize_range(metrics_dir, days) if raw else summarize_rollups(rollups)
+    summary["latency"] = stage_latency(metrics_dir, dates, rollups)
+    if as_json:
+        print(json.dumps(summary_json(summary), indent=2))
+    else:
+        report(summary)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Concurrent batch delegation
+Runs a file of delegations through an asyncio subprocess pool, validating
+and printing each response as soon as it completes, then reports
+throughput and latency percentiles
+
+Batch files hold one delegation per line, either tab-separated
+    task<TAB>context<TAB>max_lines
+or JSON with optional "cli" (command, default DELEGATE_CLI or gemini -p),
+"name" (metrics task name) and "priority" (low, normal or high) fields
+    {"task": "npm ls", "context": "Slow build", "max_lines": 8, "cli": "gemini -p"}
+Blank lines and lines starting with # are skipped.
+
+Prompts are built with pre-delegate, so the token budget can tighten or
+reroute them (rows are never re-queued), and answered from the response
+cache when possible (see run_delegation). At most --concurrency CLI processes run
+at once; --rate caps how often each CLI (by program name) is started, e.g.
+--rate gemini=60/min or --rate copilot=2/s.
+
+Running the token budget's queue (.claude/queue.jsonl) drains it: its rows
+are claimed atomically before the run, and every row that did not finish
+successfully (failed, or never run because of an error or Ctrl-C) is
+queued again.
+
+Usage:
+    python batch_delegate.py <file> [--concurrency N] [--rate CLI=N/s|N/min]...
+                             [--timeout SECONDS] [--no-cache] [--no-reduce]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import functools
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import response_cache
+import run_delegation
+import token_budget
+from delegate_client import load_hook
+from delegation_trace import Trace
+
+pre_delegate = load_hook("pre")
+post_delegate = load_hook("post")
+
+DEFAULT_CONCURRENCY = 4
+
+
+class BatchRow(NamedTuple):
+    """One delegation from a batch file."""
+    task: str
+    context: str = "General task"
+    max_lines: Optional[int] = None
+    cli: Optional[str] = None
+    name: Optional[str] = None
+    priority: str = "normal"
+
+
+class Answer(NamedTuple):
+    """CLI or cache answer to one prompt; seconds is CLI time (0 for cache hits)."""
+    response: str
+    error: str
+    seconds: float
+    cli: str
+    cache: str
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one delegation; seconds is CLI time (0 for cache hits)."""
+    index: int
+    row: BatchRow
+    task_type: str
+    max_lines: int
+    response: str
+    error: str
+    seconds: float
+    cli: str
+    cache: str
+    trace: Optional[Trace] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+def parse_row(line: str) -> Optional[BatchRow]:
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        data = json.loads(line)
+        max_lines = data.get("max_lines")
+        return BatchRow(
+            data["task"], data.get("context") or "General task",
+            int(max_lines) if max_lines else None, data.get("cli"), data.get("name"),
+            data.get("priority") or "normal",
+        )
+    fields = line.split("\t")
+    max_lines = fields[2].strip() if len(fields) > 2 else ""
+    return BatchRow(
+        fields[0], fields[1] if len(fields) > 1 and fields[1] else "General task",
+        int(max_lines) if max_lines else None,
+    )
+
+
+def load_rows(path: Path) -> List[BatchRow]:
+    """Rows of a batch file, in order."""
+    with path.open("r", encoding="utf-8") as f:
+        return [row for row in map(parse_row, f) if row is not None]
+
+
+def parse_rate(spec: str) -> tuple:
+    """'gemini=60/min' -> ('gemini', 1.0) starts per second."""
+    name, _, rate = spec.partition("=")
+    count, _, unit = rate.partition("/")
+    per = {"s": 1, "sec": 1, "min": 60, "h": 3600, "hour": 3600}[unit or "s"]
+    return name, float(count) / per
+
+
+class RateLimiter:
+    """Spaces process starts at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def acquire(self):
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class BatchExecutor:
+    """Runs rows through a bounded pool of CLI subprocesses."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rates: Dict[str, float] = None,
+                 timeout: float = run_delegation.CLI_TIMEOUT, use_cache: bool = True,
+                 reduce: bool = True, cwd: Path = None):
+        self.concurrency = concurrency
+        self.rates = rates or {}
+        self.timeout = timeout
+        self.use_cache = use_cache and os.environ.get("DELEGATE_NO_CACHE") != "1"
+        self.reduce = reduce
+        self.cwd = cwd or Path.cwd()
+        self.cache = response_cache.project_cache(post_delegate.find_metrics_dir(self.cwd).parent)
+        self._slots = self._limiters = None
+
+    async def _run_cli(self, argv: List[str]) -> tuple:
+        """(exit_code, stdout, stderr) of one CLI process."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, cwd=str(self.cwd), stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            return 127, "", f"{argv[0]}: command not found"
+        except OSError as e:
+            return 126, "", f"{argv[0]}: {e.strerror}"
+        try:
+            out, err = await asyncio.wait_for(proc.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return 124, "", f"{argv[0]}: no response after {self.timeout:.0f}s"
+        return proc.returncode, out.decode("utf-8", "replace"), err.decode("utf-8", "replace")
+
+    def _pool(self):
+        """Semaphore and limiters, created inside the running loop."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._limiters = {name: RateLimiter(rate) for name, rate in self.rates.items()}
+        return self._slots, self._limiters
+
+    async def answer(self, prompt: str, cli: str = None, key: str = None, label: str = "") -> Answer:
+        """
+        Answer one prompt from the cache or the CLI. key defaults to the
+        prompt's cache_key in cwd for this CLI; it is ignored when the cache is off.
+        """
+        loop = asyncio.get_event_loop()
+        argv = run_delegation.cli_argv(prompt, cli)
+        name = run_delegation.cli_name(argv)
+        if self.use_cache:
+            # Fingerprinting hashes files and runs git, so keep it off the event loop
+            key = key or await loop.run_in_executor(None, response_cache.cache_key, prompt, self.cwd,
+                                                    run_delegation.cli_command(cli))
+            cached = await loop.run_in_executor(None, self.cache.get_entry, key)
+            if cached is not None:
+                return Answer(cached["response"], "", 0.0, cached.get("cli") or name, "hit")
+
+        slots, limiters = self._pool()
+        async with slots:
+            if name in limiters:
+                await limiters[name].acquire()
+            start = time.perf_counter()
+            exit_code, response, errors = await self._run_cli(argv)
+            seconds = time.perf_counter() - start
+
+        if exit_code != 0:
+            return Answer("", errors.strip() or f"exit {exit_code}", seconds, name, "")
+        if not self.use_cache:
+            return Answer(response, "", seconds, name, "")
+        if response.strip():
+            await loop.run_in_executor(None, functools.partial(self.cache.put, key, response, task=label, cli=name))
+        return Answer(response, "", seconds, name, "miss")
+
+    async def _run_row(self, index: int, row: BatchRow) -> BatchResult:
+        loop = asyncio.get_event_loop()
+        trace = Trace()
+        # Local reductions run commands, so build prompts off the event loop
+        cli = row.cli
+        start = time.perf_counter()
+        delegation = await loop.run_in_executor(
+            None, pre_delegate.prepare, row.task, row.context, row.max_lines, self.reduce, self.cwd,
+            run_delegation.cli_name(run_delegation.cli_argv("", cli)), row.priority, row.name,
+        )
+        trace.add("prepare", (time.perf_counter() - start) * 1000)
+        # Tightening applies; queue decisions do not (a batch is often the queue being drained)
+        if delegation.decision is not None and delegation.decision.action == "reroute":
+            cli = delegation.decision.command
+        start = time.perf_counter()
+        answer = await self.answer(delegation.prompt, cli, label=row.task)
+        wall = time.perf_counter() - start
+        trace.cli = answer.cli
+        if answer.cache == "hit":
+            trace.add("cache", wall * 1000)
+        else:
+            # Time spent waiting for a concurrency slot or the rate limiter
+            trace.add("queue", (wall - answer.seconds) * 1000)
+            trace.add("cli", answer.seconds * 1000)
+        return BatchResult(index, row, delegation.task_type, delegation.max_lines, *answer, trace)
+
+    async def run(self, rows: List[BatchRow],
+                  on_result: Callable[[BatchResult], None] = None) -> List[BatchResult]:
+        """Run all rows; on_result sees each result as it completes."""
+        futures = [asyncio.ensure_future(self._run_row(i, row)) for i, row in enumerate(rows)]
+        results = []
+        for future in asyncio.as_completed(futures):
+            result = await future
+            if on_result is not None:
+                on_result(result)
+            results.append(result)
+        return sorted(results, key=lambda r: r.index)
+
+    def run_sync(self, rows: List[BatchRow],
+                 on_result: Callable[[BatchResult], None] = None) -> List[BatchResult]:
+        return self.run_until_complete(self.run(rows, on_result))
+
+    def run_until_complete(self, coroutine):
+        """Run a coroutine using this executor on a fresh event loop."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)  # Attaches the child watcher on Python < 3.8
+        self._slots = self._limiters = None
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+            asyncio.set_event_loop(None)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(results: List[BatchResult], wall_seconds: float) -> dict:
+    """Throughput, failures, cache hits and CLI latency percentiles."""
+    latencies = [r.seconds for r in results if r.ok and r.cache != "hit"]
+    summary = {
+        "count": len(results),
+        "failed": sum(not r.ok for r in results),
+        "cache_hits": sum(r.cache == "hit" for r in results),
+        "wall_seconds": wall_seconds,
+        "throughput": len(results) / wall_seconds if wall_seconds else 0.0,
+        "latency": {},
+    }
+    if latencies:
+        summary["latency"] = {
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies),
+        }
+    return summary
+
+
+def print_result(result: BatchResult, total: int, metrics_dir: Path) -> bool:
+    """Print, validate and log one completed delegation; True if valid."""
+    row = result.row
+    source = "cache hit" if result.cache == "hit" else f"{result.seconds:.2f}s"
+    print(f"── [{result.index + 1}/{total}] {row.task} · {result.cli} · {source}")
+    if not result.ok:
+        print(f"❌ Delegation failed: {result.error}\n")
+        return False
+
+    print(result.response.rstrip())
+    trace = result.trace or Trace(cli=result.cli)
+    with trace.span("validate"):
+        is_valid, warnings = post_delegate.validate_response(result.response, result.max_lines)
+    for warning in warnings:
+        print(warning)
+    print()
+
+    with trace.span("log"):
+        post_delegate.log_metrics(
+            row.name or result.task_type, post_delegate.count_lines(result.response),
+            post_delegate.estimate_tokens(result.response), metrics_dir, result.cache, result.cli,
+            result.max_lines, round(result.seconds * 1000), trace.correlation_id,
+        )
+    post_delegate.log_spans(trace, metrics_dir)
+    return is_valid
+
+
+def main():
+    """Main execution."""
+    args = sys.argv[1:]
+    if not args or args[0] in ('-h', '--help'):
+        print(__doc__)
+        sys.exit(1)
+
+    use_cache = '--no-cache' not in args
+    reduce = '--no-reduce' not in args
+    args = [arg for arg in args if arg not in ('--no-cache', '--no-reduce')]
+
+    concurrency, timeout, rates = DEFAULT_CONCURRENCY, run_delegation.CLI_TIMEOUT, {}
+    files = []
+    while args:
+        option = args.pop(0)
+        if option == '--concurrency':
+            concurrency = int(args.pop(0))
+        elif option == '--timeout':
+            timeout = float(args.pop(0))
+        elif option == '--rate':
+            name, rate = parse_rate(args.pop(0))
+            rates[name] = rate
+        else:
+            files.append(option)
+
+    if not files:
+        print(__doc__)
+        sys.exit(1)
+    path = Path(files[0])
+    queue = claimed = None
+    if path.name == token_budget.QUEUE_FILE:
+        queue, claimed = path, token_budget.claim_queue(path)
+        if claimed is None:
+            print(f"✅ Queue is empty ({path})")
+            sys.exit(0)
+        path = claimed
+    rows = None
+    finished = set()
+    valid = []
+
+    def on_result(result: BatchResult):
+        if result.ok:
+            finished.add(result.index)
+        valid.append(print_result(result, len(rows), metrics_dir))
+
+    try:
+        rows = load_rows(path)
+        cwd = Path.cwd()
+        metrics_dir = post_delegate.find_metrics_dir(cwd)
+        post_delegate.enable_group_commit(1.0)  # One locked append per second, not per row
+
+        executor = BatchExecutor(concurrency, rates, timeout, use_cache, reduce, cwd)
+        start = time.perf_counter()
+        results = executor.run_sync(rows, on_result)
+        summary = summarize(results, time.perf_counter() - start)
+
+        print(f"📊 Batch: {summary['count']} delegations in {summary['wall_seconds']:.1f}s "
+              f"({summary['throughput']:.2f}/s), {summary['failed']} failed, "
+              f"{summary['cache_hits']} from cache, concurrency {concurrency}")
+        latency = summary["latency"]
+        if latency:
+            print(f"   CLI latency: p50 {latency['p50']:.2f}s  p90 {latency['p90']:.2f}s  "
+                  f"p99 {latency['p99']:.2f}s  max {latency['max']:.2f}s")
+    finally:
+        # Even when the run is cut short, nothing claimed from the queue is lost
+        if claimed is not None:
+            unfinished = None
+            if rows is not None:
+                unfinished = [token_budget.queue_row(*row) for i, row in enumerate(rows) if i not in finished]
+            token_budget.release_queue(queue, claimed, unfinished)
+            if unfinished is None:
+                print(f"📥 Could not read the claimed queue, its rows were queued again ({queue})")
+            else:
+                print(f"📥 Queue drained, {len(unfinished)} unfinished delegations queued again")
+
+    sys.exit(0 if all(valid) else 1)
+
+
+if __name__ == "__main__":
+    main()
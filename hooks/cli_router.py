@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Runtime routing between the enabled delegate CLIs
+Picks, for each delegation, the CLI in .claude/delegation_config.json with
+the best recent record instead of a fixed one:
+
+- every attempt is stored as an "attempt" span in the metrics store (cli,
+  duration, error), and the last WINDOW_SECONDS of them give each CLI a
+  p50/p95 latency and an error rate
+- CLIs are ranked by p50 * (1 + ERROR_PENALTY * error rate); CLIs with
+  fewer than MIN_SAMPLES recent attempts go first until they have them
+- circuit breaker: a CLI whose last BREAKER_FAILURES attempts all failed is
+  skipped for COOLDOWN_SECONDS, then gets a single trial (half-open); one
+  success closes it again
+- hedging: when the chosen CLI has not answered by its p95, the next CLI
+  is started as well; the first good answer wins and the other is killed
+- a failed attempt fails over to the next CLI
+
+run-delegation routes through here when at least two CLIs are enabled and
+neither the budget nor DELEGATE_CLI picked one; DELEGATE_NO_ROUTER=1 turns
+routing off and DELEGATE_NO_HEDGE=1 keeps the failover but never hedges.
+
+Usage:
+    python cli_router.py status
+    python cli_router.py pick
+"""
+
+import os
+import sys
+import json
+import queue
+import shlex
+import threading
+import subprocess
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import metrics_store
+import metrics_writer
+
+CONFIG_FILE = "delegation_config.json"
+ATTEMPT_STAGE = "attempt"
+CANCELLED = "cancelled"
+WINDOW_SECONDS = 3600
+MAX_SAMPLES = 200
+MIN_SAMPLES = 3
+ERROR_PENALTY = 4.0
+BREAKER_FAILURES = 3
+COOLDOWN_SECONDS = 60
+MIN_HEDGE_SECONDS = 0.5
+CLI_TIMEOUT = 300.0
+
+# Prompt flags for CLIs configured by binary name only
+PROMPT_ARGS = {"aider": "--message", "codex": "exec"}
+
+
+class Route(NamedTuple):
+    """An enabled CLI: label used in metrics and the command taking the prompt."""
+    name: str
+    command: str
+
+
+class Health(NamedTuple):
+    """Recent record of one CLI."""
+    samples: int
+    failures: int
+    p50_ms: float
+    p95_ms: float
+    last_failures: int  # Consecutive failures, most recent first
+    last_attempt: int
+
+    @property
+    def error_rate(self) -> float:
+        return self.failures / self.samples if self.samples else 0.0
+
+
+NO_HEALTH = Health(0, 0, 0.0, 0.0, 0, 0)
+
+
+class Attempt(NamedTuple):
+    cli: str
+    exit_code: int
+    response: str
+    errors: str
+    seconds: float
+    start: int
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 and bool(self.response.strip())
+
+
+class Routed(NamedTuple):
+    """Outcome of a routed delegation."""
+    cli: str
+    exit_code: int
+    response: str
+    errors: str
+    hedged: bool
+    attempts: List[Attempt]
+
+
+def load_routes(claude_dir: Path) -> List[Route]:
+    """Enabled CLIs from delegation_config.json, in config order."""
+    try:
+        config = json.loads((claude_dir / CONFIG_FILE).read_text())
+    except (OSError, ValueError):
+        return []
+    routes = []
+    for name, cli in (config.get("cli_configs") or {}).items():
+        if not isinstance(cli, dict) or not cli.get("enabled", True):
+            continue
+        command = cli.get("prompt_command") or cli.get("command") or name
+        if len(shlex.split(command)) == 1:
+            command = f"{command} {PROMPT_ARGS.get(name, '-p')}"
+        routes.append(Route(name, command))
+    return routes
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def recent_attempts(metrics_dir: Path, now: int, window: int = WINDOW_SECONDS) -> Dict[str, List[dict]]:
+    """{cli: attempt spans oldest first} from the last window seconds."""
+    since = now - window
+    days = {metrics_store.format_date(since // 86400), metrics_store.format_date(now // 86400)}
+    attempts: Dict[str, List[dict]] = {}
+    for day in sorted(days):
+        path = metrics_store.span_file(metrics_dir, day)
+        for row in metrics_store.iter_rows(path, since, columns=metrics_store.SPAN_COLUMNS):
+            if row["stage"] == ATTEMPT_STAGE and row["error"] != CANCELLED:
+                attempts.setdefault(row["cli"], []).append(row)
+    for rows in attempts.values():
+        rows.sort(key=lambda row: row["timestamp"])
+        del rows[:-MAX_SAMPLES]
+    return attempts
+
+
+def health(rows: List[dict]) -> Health:
+    if not rows:
+        return NO_HEALTH
+    good = [row["micros"] / 1000 for row in rows if not row["error"]]
+    streak = 0
+    for row in reversed(rows):
+        if not row["error"]:
+            break
+        streak += 1
+    return Health(len(rows), len(rows) - len(good),
+                  _percentile(good, 0.5) if good else 0.0, _percentile(good, 0.95) if good else 0.0,
+                  streak, rows[-1]["timestamp"])
+
+
+class Router:
+    """Ranks routes by health and runs prompts with hedging and failover."""
+
+    def __init__(self, routes: List[Route], metrics_dir: Path, hedge: bool = True):
+        self.routes = routes
+        self.metrics_dir = metrics_dir
+        self.hedge = hedge
+
+    def signature(self) -> str:
+        """The routes' commands, identifying this router's answers (e.g. in cache keys)."""
+        return "router:" + ",".join(route.command for route in self.routes)
+
+    def health(self, now: int = None) -> Dict[str, Health]:
+        now = metrics_store.to_epoch(datetime.now()) if now is None else now
+        attempts = recent_attempts(self.metrics_dir, now)
+        return {route.name: health(attempts.get(route.name, [])) for route in self.routes}
+
+    @staticmethod
+    def state(stats: Health, now: int) -> str:
+        """closed, open (skipped) or half-open (one trial allowed)."""
+        if stats.last_failures < BREAKER_FAILURES:
+            return "closed"
+        return "open" if now - stats.last_attempt < COOLDOWN_SECONDS else "half-open"
+
+    def rank(self, stats: Dict[str, Health], now: int) -> List[Route]:
+        """Usable routes, best first: closed by score, then half-open ones."""
+        scores = {name: s.p50_ms * (1 + ERROR_PENALTY * s.error_rate)
+                  for name, s in stats.items() if s.samples >= MIN_SAMPLES and s.samples > s.failures}
+        order = {route.name: i for i, route in enumerate(self.routes)}
+
+        def key(route: Route):
+            s = stats[route.name]
+            score = scores.get(route.name, 0.0 if s.samples < MIN_SAMPLES else float("inf"))
+            return self.state(s, now) != "closed", score, order[route.name]
+
+        usable = [route for route in self.routes if self.state(stats[route.name], now) != "open"]
+        if not usable:
+            # Every breaker is open: try the one that failed longest ago
+            usable = [min(self.routes, key=lambda route: stats[route.name].last_attempt)]
+        return sorted(usable, key=key)
+
+    def run(self, prompt: str, cwd: Path = None, timeout: float = CLI_TIMEOUT) -> Routed:
+        """Answer prompt with the best CLI, hedging past its p95 and failing over on errors."""
+        now = metrics_store.to_epoch(datetime.now())
+        stats = self.health(now)
+        pending = self.rank(stats, now)
+        done: "queue.Queue[Attempt]" = queue.Queue()
+        running: Dict[str, subprocess.Popen] = {}
+        attempts: List[Attempt] = []
+        hedged = False
+
+        first = pending.pop(0)
+        running[first.name] = self._launch(first, prompt, cwd, timeout, done)
+        hedge_at = None
+        primary = stats[first.name]
+        if self.hedge and pending and primary.samples - primary.failures >= MIN_SAMPLES:
+            hedge_at = time.perf_counter() + max(MIN_HEDGE_SECONDS, primary.p95_ms / 1000)
+
+        winner = None
+        while running:
+            wait = None if hedge_at is None else max(0.0, hedge_at - time.perf_counter())
+            try:
+                attempt = done.get(timeout=wait)
+            except queue.Empty:
+                route = pending.pop(0)
+                running[route.name] = self._launch(route, prompt, cwd, timeout, done)
+                hedged, hedge_at = True, None
+                continue
+            del running[attempt.cli]
+            attempts.append(attempt)
+            if attempt.ok:
+                winner = attempt
+                break
+            hedge_at = None
+            if not running and pending:
+                route = pending.pop(0)
+                running[route.name] = self._launch(route, prompt, cwd, timeout, done)
+
+        for name, proc in running.items():
+            # The slower side of a hedge: its time only says it lost, so it is not a sample
+            if proc is not None:
+                proc.kill()
+            attempts.append(Attempt(name, -9, "", CANCELLED, 0.0, now))
+        self.record(attempts)
+
+        result = winner or attempts[-1]
+        return Routed(result.cli, result.exit_code, result.response, result.errors, hedged, attempts)
+
+    @staticmethod
+    def _launch(route: Route, prompt: str, cwd: Path, timeout: float,
+                done: "queue.Queue[Attempt]") -> Optional[subprocess.Popen]:
+        """Start one CLI; its Attempt is put on done when it exits."""
+        argv = shlex.split(route.command) + [prompt]
+        start = metrics_store.to_epoch(datetime.now())
+        begin = time.perf_counter()
+        try:
+            proc = subprocess.Popen(argv, cwd=str(cwd) if cwd else None, stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            done.put(Attempt(route.name, 127, "", f"{argv[0]}: {e.strerror or e}", 0.0, start))
+            return None
+
+        def wait():
+            try:
+                out, err = proc.communicate(timeout=timeout)
+                code = proc.returncode
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                code, out, err = 124, b"", f"{argv[0]}: no response after {timeout:.0f}s".encode()
+            done.put(Attempt(route.name, code, out.decode("utf-8", errors="replace"),
+                             err.decode("utf-8", errors="replace"), time.perf_counter() - begin, start))
+
+        threading.Thread(target=wait, daemon=True).start()
+        return proc
+
+    def record(self, attempts: List[Attempt]):
+        """Store attempts as spans; these are the statistics the next ranking reads."""
+        spans = []
+        for attempt in attempts:
+            if attempt.ok:
+                error = ""
+            elif attempt.errors == CANCELLED:
+                error = CANCELLED
+            else:
+                error = f"exit {attempt.exit_code}" if attempt.exit_code else "empty response"
+            spans.append({"timestamp": attempt.start, "correlation_id": "", "stage": ATTEMPT_STAGE,
+                          "cli": attempt.cli, "micros": round(attempt.seconds * 1e6), "error": error})
+        try:
+            self.metrics_dir.mkdir(parents=True, exist_ok=True)
+            metrics_writer.commit(self.metrics_dir, [], spans)
+        except OSError:
+            pass  # Routing still works; this run just does not count
+
+
+def load_router(cwd: Path) -> Optional[Router]:
+    """Router over the project's enabled CLIs, or None when there is nothing to choose."""
+    if os.environ.get("DELEGATE_NO_ROUTER") == "1":
+        return None
+    metrics_dir = metrics_store.find_metrics_dir(cwd)
+    routes = load_routes(metrics_dir.parent)
+    if len(routes) < 2:
+        return None
+    return Router(routes, metrics_dir, hedge=os.environ.get("DELEGATE_NO_HEDGE") != "1")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command not in ("status", "pick"):
+        print(__doc__)
+        sys.exit(1)
+    metrics_dir = metrics_store.find_metrics_dir(Path.cwd())
+    router = Router(load_routes(metrics_dir.parent), metrics_dir)
+    if not router.routes:
+        print(f"No enabled CLIs in {metrics_dir.parent / CONFIG_FILE}")
+        sys.exit(1)
+    now = metrics_store.to_epoch(datetime.now())
+    stats = router.health(now)
+    ranked = router.rank(stats, now)
+    if command == "pick":
+        print(ranked[0].name)
+        return
+
+    print(f"🔀 CLI routing (last {timedelta(seconds=WINDOW_SECONDS)})")
+    for route in router.routes:
+        s = stats[route.name]
+        place = f"#{ranked.index(route) + 1}" if route in ranked else "--"
+        print(f"   {place:<3} {route.name:<10} {router.state(s, now):<9} {s.samples:4d} attempts  "
+              f"{s.error_rate:5.1%} errors  p50 {s.p50_ms:7.0f}ms  p95 {s.p95_ms:7.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
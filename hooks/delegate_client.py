@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Thin client for the delegation daemon
+Forwards pre/post hook calls to a running delegate-daemon over a Unix socket,
+falling back to running the hook in-process when the daemon is unavailable
+
+Usage:
+    python delegate_client.py pre <task> [context] [max_lines]
+    python delegate_client.py post <response> [max_lines] [task_context]
+
+Environment:
+    DELEGATE_SOCKET    Socket path (default: ~/.claude/delegate.sock)
+    DELEGATE_NO_DAEMON Set to 1 to always run in-process
+All DELEGATE_* variables are forwarded, so the hook sees the same settings
+on the daemon. A post the daemon has received is never re-run in-process
+(it may have logged metrics already); a failed pre is.
+"""
+
+# Keep imports minimal: this script runs once per delegation (wrappers start it
+# with -S), so it avoids json/socket/re and speaks a length-prefixed framing.
+import os
+import sys
+
+try:
+    import _socket
+except ImportError:  # pragma: no cover - exotic builds
+    _socket = None
+
+HOOK_FILES = {
+    "pre": ("pre_delegate", "pre-delegate.py"),
+    "post": ("post_delegate", "post-delegate.py"),
+}
+
+CONNECT_TIMEOUT = 0.2
+REQUEST_TIMEOUT = 30.0
+
+
+def default_socket_path() -> str:
+    """Resolve the daemon socket path."""
+    return os.environ.get("DELEGATE_SOCKET") or os.path.join(
+        os.path.expanduser("~"), ".claude", "delegate.sock"
+    )
+
+
+def daemon_enabled() -> bool:
+    """Check whether the daemon can be used on this platform."""
+    return (
+        _socket is not None
+        and hasattr(_socket, "AF_UNIX")
+        and os.environ.get("DELEGATE_NO_DAEMON") != "1"
+    )
+
+
+def encode_fields(fields: list) -> bytes:
+    """Frame fields as: ARGV <n>\\n then <len>\\n<bytes> per field."""
+    parts = [b"ARGV %d\n" % len(fields)]
+    for field in fields:
+        data = field.encode("utf-8", "surrogateescape")
+        parts.append(b"%d\n" % len(data))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def forward(command: str, argv: list, cwd: str, socket_path: str = None):
+    """
+    Run a hook command on the daemon.
+    Returns (exit_code, stdout, stderr) or None if the daemon is unreachable
+    (or, for pre, failed) and the hook should run in-process.
+    """
+    if not daemon_enabled():
+        return None
+
+    env = "\0".join(f"{name}={value}" for name, value in os.environ.items() if name.startswith("DELEGATE_"))
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    sent = False
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path or default_socket_path())
+        sock.settimeout(REQUEST_TIMEOUT)
+        sock.sendall(encode_fields([command, cwd, env] + argv))
+        sent = True
+
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except OSError:
+        if sent and command == "post":
+            return 1, b"", "❌ Daemon did not answer; not re-running post (metrics may be logged)\n".encode("utf-8")
+        return None
+    finally:
+        sock.close()
+
+    status, _, body = b"".join(chunks).partition(b"\n")
+    exit_code, _, stderr_size = status.partition(b" ")
+    if not (exit_code.isdigit() and stderr_size.isdigit()):
+        return None
+    stderr_size = int(stderr_size)
+    return int(exit_code), body[stderr_size:], body[:stderr_size]
+
+
+def load_hook(command: str):
+    """Import a hook module from this directory (underscore or hyphen name)."""
+    module_name, file_name = HOOK_FILES[command]
+    hooks_dir = os.path.dirname(os.path.abspath(__file__))
+    if hooks_dir not in sys.path:
+        sys.path.insert(0, hooks_dir)
+
+    try:
+        return __import__(module_name)
+    except ImportError:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(
+            module_name, os.path.join(hooks_dir, file_name)
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+
+def main():
+    """Main execution."""
+    if len(sys.argv) < 2 or sys.argv[1] not in HOOK_FILES:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    # Hooks expect argv[0] to be the script name
+    argv = [HOOK_FILES[command][1]] + sys.argv[2:]
+
+    # The daemon cannot read this process's stdin, so stream it in-process
+    reply = None if "--stdin" in argv else forward(command, argv, os.getcwd())
+    if reply is None:
+        # Restore site-packages skipped by -S before running the full hook
+        import site
+        site.main()
+        load_hook(command).main(argv)
+        return
+
+    exit_code, stdout, stderr = reply
+    sys.stderr.buffer.write(stderr)
+    sys.stderr.flush()
+    sys.stdout.buffer.write(stdout)
+    sys.stdout.flush()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
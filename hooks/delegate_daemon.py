@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Persistent delegation daemon
+Keeps the pre/post hooks loaded in one long-lived process so each delegation
+skips interpreter startup and module imports
+
+Usage:
+    python delegate_daemon.py serve [--socket PATH] [--group-commit SECONDS]
+    python delegate_daemon.py status [--socket PATH]
+    python delegate_daemon.py stop [--socket PATH]
+
+The wrapper scripts call delegate_client.py, which talks to this daemon and
+falls back to in-process execution when it is not running. With
+--group-commit, metrics from many delegations are written as one locked
+append per interval (usage tips may lag by up to that interval).
+
+Requests are served concurrently, one thread each. Hook commands run with
+the caller's DELEGATE_* environment (requests with the same settings run
+side by side; a request with different settings waits for them to finish)
+and their stdout and stderr are captured per request and sent back.
+
+Protocol: one request per connection, in one of two framings.
+    Hook commands (used by delegate_client.py, no json import needed):
+        ARGV <n>\n then <len>\n<bytes> for: command, cwd, env, argv...
+        (env is the caller's DELEGATE_* variables as NUL-separated NAME=value)
+        -> <exit code> <stderr length>\n<stderr bytes><stdout bytes>
+    Function calls (one JSON object per line, used by warm Python callers):
+    {"op": "pre", "argv": [...], "env": {...}}      -> {"stdout": str, "stderr": str, "exit": int}
+    {"op": "post", "argv": [...], "cwd": str, "env": {...}}
+                                                    -> {"stdout": str, "stderr": str, "exit": int}
+    {"op": "detect_task_type", "task": str}         -> {"result": str}
+    {"op": "build_prompt", "task_type": ..., "task": ..., "context": ..., "max_lines": int}
+                                                    -> {"result": str, "tokens": int}
+    {"op": "validate_response", "response": str, "max_lines": int}
+    {"op": "log_metrics", "task": str, "lines": int, "tokens": int, "metrics_dir": str}
+    {"op": "ping"} / {"op": "shutdown"}
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import socketserver
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from delegate_client import CONNECT_TIMEOUT, REQUEST_TIMEOUT, default_socket_path, load_hook
+
+pre_delegate = load_hook("pre")
+post_delegate = load_hook("post")
+
+
+def request(payload: dict, socket_path: str = None, timeout: float = REQUEST_TIMEOUT):
+    """
+    Send one JSON request to the daemon.
+    Returns the decoded reply, or None if the daemon is unreachable.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(socket_path or default_socket_path())
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    except OSError:
+        return None
+    finally:
+        sock.close()
+
+    try:
+        return json.loads(line.decode("utf-8"))
+    except ValueError:
+        return None
+
+
+ENV_PREFIX = "DELEGATE_"
+
+_capture = threading.local()
+_routers_lock = threading.Lock()
+_routers_users = 0
+
+
+class ThreadRouter:
+    """Stands in for sys.stdout/sys.stderr: writes go to the calling thread's capture buffer, if it has one."""
+
+    def __init__(self, stream, name: str):
+        self.stream = stream
+        self.name = name
+
+    def _target(self):
+        return getattr(_capture, self.name, None) or self.stream
+
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+
+@contextmanager
+def captured() -> Iterator[Tuple[io.StringIO, io.StringIO]]:
+    """Capture this thread's stdout and stderr (other threads keep writing to the real streams)."""
+    global _routers_users
+    with _routers_lock:
+        if _routers_users == 0:
+            sys.stdout, sys.stderr = ThreadRouter(sys.stdout, "stdout"), ThreadRouter(sys.stderr, "stderr")
+        _routers_users += 1
+    _capture.stdout, _capture.stderr = io.StringIO(), io.StringIO()
+    try:
+        yield _capture.stdout, _capture.stderr
+    finally:
+        _capture.stdout = _capture.stderr = None
+        with _routers_lock:
+            _routers_users -= 1
+            if _routers_users == 0 and isinstance(sys.stdout, ThreadRouter):
+                sys.stdout, sys.stderr = sys.stdout.stream, sys.stderr.stream
+
+
+class EnvironmentGate:
+    """
+    Applies a caller's DELEGATE_* variables to os.environ for the duration of
+    a request (None: the daemon's own). Requests with the same variables share
+    the environment and run concurrently; others wait until it is free.
+    """
+
+    def __init__(self):
+        self._default = {name: value for name, value in os.environ.items() if name.startswith(ENV_PREFIX)}
+        self._cond = threading.Condition()
+        self._active = None
+        self._users = 0
+        self._saved: Dict[str, str] = {}
+
+    @contextmanager
+    def applied(self, env: Optional[Dict[str, str]]):
+        env = {name: value for name, value in (self._default if env is None else env).items()
+               if name.startswith(ENV_PREFIX)}
+        with self._cond:
+            while self._users and self._active != env:
+                self._cond.wait()
+            if not self._users:
+                self._saved = {name: value for name, value in os.environ.items() if name.startswith(ENV_PREFIX)}
+                for name in self._saved:
+                    del os.environ[name]
+                os.environ.update(env)
+                self._active = env
+            self._users += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._users -= 1
+                if not self._users:
+                    for name in self._active:
+                        os.environ.pop(name, None)
+                    os.environ.update(self._saved)
+                    self._active = None
+                    self._cond.notify_all()
+
+
+ENVIRONMENT = EnvironmentGate()
+
+
+def run_main(main: Callable, *args, env: Dict[str, str] = None) -> Tuple[str, str, int]:
+    """Run a hook main() in the caller's environment, capturing stdout, stderr and exit code."""
+    exit_code = 0
+    with ENVIRONMENT.applied(env), captured() as (stdout, stderr):
+        try:
+            main(*args)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    return stdout.getvalue(), stderr.getvalue(), exit_code
+
+
+def op_pre(req: dict) -> dict:
+    cwd = Path(req["cwd"]) if req.get("cwd") else None
+    stdout, stderr, exit_code = run_main(pre_delegate.main, req["argv"], cwd, env=req.get("env"))
+    return {"stdout": stdout, "stderr": stderr, "exit": exit_code}
+
+
+def op_post(req: dict) -> dict:
+    cwd = Path(req["cwd"]) if req.get("cwd") else None
+    stdout, stderr, exit_code = run_main(post_delegate.main, req["argv"], cwd, env=req.get("env"))
+    return {"stdout": stdout, "stderr": stderr, "exit": exit_code}
+
+
+def op_detect_task_type(req: dict) -> dict:
+    return {"result": pre_delegate.detect_task_type(req["task"])}
+
+
+def op_build_prompt(req: dict) -> dict:
+    prompt = pre_delegate.render_prompt(
+        req["task_type"], req["task"], req["context"], int(req["max_lines"])
+    )
+    return {"result": prompt.text, "tokens": prompt.tokens}
+
+
+def op_validate_response(req: dict) -> dict:
+    with captured() as (stdout, _):
+        is_valid, warnings = post_delegate.validate_response(
+            req["response"], int(req["max_lines"])
+        )
+    return {"result": [is_valid, warnings], "stdout": stdout.getvalue()}
+
+
+def op_log_metrics(req: dict) -> dict:
+    post_delegate.log_metrics(
+        req["task"], int(req["lines"]), int(req["tokens"]), Path(req["metrics_dir"])
+    )
+    return {"result": None}
+
+
+def op_ping(req: dict) -> dict:
+    return {"result": "pong", "pid": os.getpid()}
+
+
+OPERATIONS = {
+    "pre": op_pre,
+    "post": op_post,
+    "detect_task_type": op_detect_task_type,
+    "build_prompt": op_build_prompt,
+    "validate_response": op_validate_response,
+    "log_metrics": op_log_metrics,
+    "ping": op_ping,
+}
+
+
+HOOK_COMMANDS = {"pre": op_pre, "post": op_post}
+
+
+class DelegationHandler(socketserver.StreamRequestHandler):
+    """Handle a single framed hook command or JSON request."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if line.startswith(b"ARGV "):
+            self.handle_hook_command(int(line[5:]))
+            return
+
+        try:
+            req = json.loads(line.decode("utf-8"))
+            op = req.get("op")
+            if op == "shutdown":
+                reply = {"result": "bye"}
+                # shutdown() blocks until serve_forever exits, so run it elsewhere
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif op in OPERATIONS:
+                reply = OPERATIONS[op](req)
+            else:
+                reply = {"error": f"unknown op: {op}"}
+        except Exception as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+
+        self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+    def handle_hook_command(self, count: int):
+        fields = []
+        for _ in range(count):
+            size = int(self.rfile.readline())
+            fields.append(self.rfile.read(size).decode("utf-8", "surrogateescape"))
+
+        command, cwd, env, argv = fields[0], fields[1], fields[2], fields[3:]
+        env = dict(entry.split("=", 1) for entry in env.split("\0") if "=" in entry)
+        try:
+            reply = HOOK_COMMANDS[command]({"argv": argv, "cwd": cwd, "env": env})
+        except Exception as e:
+            if command == "post":
+                # post may have logged metrics already: report, never re-run in the client
+                reply = {"exit": 1, "stdout": "", "stderr": f"❌ Daemon error: {type(e).__name__}: {e}\n"}
+            else:
+                # Non-numeric status makes the client fall back to in-process
+                self.wfile.write(f"ERR\n{type(e).__name__}: {e}".encode("utf-8"))
+                return
+
+        stderr = reply["stderr"].encode("utf-8", "surrogateescape")
+        self.wfile.write(b"%d %d\n" % (reply["exit"], len(stderr)) + stderr
+                         + reply["stdout"].encode("utf-8", "surrogateescape"))
+
+
+class DelegationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded Unix socket server: each request runs in its own thread, so a
+    slow pre (e.g. a local command being reduced) does not hold up others.
+    """
+
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        Path(self.server_address).parent.mkdir(parents=True, exist_ok=True)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def serve(socket_path: str):
+    """Run the daemon in the foreground until stopped."""
+    if request({"op": "ping"}, socket_path) is not None:
+        print(f"❌ Daemon already running on {socket_path}")
+        sys.exit(1)
+
+    server = DelegationServer(socket_path, DelegationHandler)
+    print(f"✅ Delegation daemon listening on {socket_path} (pid {os.getpid()})")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    """Main execution."""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('serve', 'status', 'stop'):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    socket_path = default_socket_path()
+    if '--socket' in sys.argv:
+        socket_path = sys.argv[sys.argv.index('--socket') + 1]
+
+    if command == 'serve':
+        if '--group-commit' in sys.argv:
+            post_delegate.enable_group_commit(float(sys.argv[sys.argv.index('--group-commit') + 1]))
+        serve(socket_path)
+    elif command == 'status':
+        reply = request({"op": "ping"}, socket_path)
+        if reply is None:
+            print(f"⚠️  Daemon not running ({socket_path})")
+            sys.exit(1)
+        print(f"✅ Daemon running (pid {reply['pid']}) on {socket_path}")
+    elif command == 'stop':
+        if request({"op": "shutdown"}, socket_path) is None:
+            print(f"⚠️  Daemon not running ({socket_path})")
+            sys.exit(1)
+        print("✅ Daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
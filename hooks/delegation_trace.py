@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Timing spans for one delegation, joined by a correlation id
+A Trace collects how long each pipeline stage took (prepare, cache, cli,
+validate, log, or map/reduce for map-reduce runs). post-delegate writes the
+spans to the metrics store's spans-YYYY-MM-DD.dcol files and tags the
+delegation's metrics row with the same correlation id, so analyze-metrics
+can break latency down by stage and by CLI.
+
+Runners hand their spans to post-delegate as
+    --trace <id> --spans prepare=0.412,cli=5210.3   (milliseconds)
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, NamedTuple
+
+import metrics_store
+
+
+class Span(NamedTuple):
+    stage: str
+    start: int  # Local wall-clock epoch seconds, like metrics rows
+    micros: int
+    cli: str = ""
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class Trace:
+    """Spans of one delegation."""
+
+    def __init__(self, correlation_id: str = None, cli: str = ""):
+        self.correlation_id = correlation_id or new_id()
+        self.cli = cli
+        self.spans: List[Span] = []
+
+    @contextmanager
+    def span(self, stage: str, cli: str = None):
+        start = metrics_store.to_epoch(datetime.now())
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - begin) * 1000, cli, start)
+
+    def add(self, stage: str, ms: float, cli: str = None, start: int = None):
+        """Record a stage measured elsewhere (ms may be fractional)."""
+        if start is None:
+            start = metrics_store.to_epoch(datetime.now())
+        self.spans.append(Span(stage, start, round(ms * 1000), self.cli if cli is None else cli))
+
+    def format(self) -> str:
+        """Spans as the --spans argument: stage=ms,..."""
+        return ",".join(f"{span.stage}={span.micros / 1000:.3f}" for span in self.spans)
+
+    @classmethod
+    def parse(cls, correlation_id: str = None, spans: str = "", cli: str = "") -> "Trace":
+        trace = cls(correlation_id, cli)
+        for item in filter(None, spans.split(",")):
+            stage, _, ms = item.partition("=")
+            trace.add(stage.strip(), float(ms))
+        return trace
+
+    def records(self) -> List[dict]:
+        """Store rows (metrics_store.SPAN_COLUMNS) for every span."""
+        return [{"timestamp": span.start, "correlation_id": self.correlation_id, "stage": span.stage,
+                 "cli": span.cli, "micros": span.micros} for span in self.spans]
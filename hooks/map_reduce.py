@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Map-reduce delegation for inputs larger than one prompt
+Splits the files a task references (@src/, @app.py, ...) into size-bounded
+chunks, asks for findings on every chunk in parallel, then merges the
+partial findings in one reduce delegation within the original max_lines
+
+Chunk and reduce prompts carry their input inline, so their responses are
+cached by prompt content alone: re-running after an edit only re-sends the
+chunks whose text changed. A chunk also starts at every file whose path
+hash marks an anchor, so a file growing or shrinking moves chunk
+boundaries only up to the next anchor.
+
+Usage:
+    python map_reduce.py "<task with @paths>" [context] [max_lines]
+                         [--chunk-chars N] [--concurrency N] [--name TASK] [--no-cache]
+
+Example:
+    python map_reduce.py "Find security issues in @src/" "Pre-release audit" 10
+"""
+
+import os
+import sys
+import time
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import output_reducers
+import response_cache
+import run_delegation
+from batch_delegate import DEFAULT_CONCURRENCY, BatchExecutor
+from delegate_client import load_hook
+from delegation_trace import Trace
+
+pre_delegate = load_hook("pre")
+post_delegate = load_hook("post")
+
+CHUNK_CHARS = 24_000
+CHUNK_LINES = 6
+ANCHOR_EVERY = 8
+MAX_FILE_BYTES = 1 << 20
+
+MAP_TEMPLATE = """CONTEXT: {context}
+TASK: {task}
+SCOPE: {files} (one part of a larger input)
+OUTPUT: Only findings for this part, one per line as "path: finding".
+Reply "none" if nothing is relevant. Maximum {max_lines} lines.
+
+{text}"""
+
+MERGE_TEMPLATE = """
+
+Merge these partial findings from {parts} parts of the input: drop
+duplicates and "none" replies, keep the most important findings.
+
+{partials}"""
+
+
+class Chunk(NamedTuple):
+    """Consecutive file sections sent in one map delegation."""
+    files: List[str]
+    text: str
+
+
+class MapReduceResult(NamedTuple):
+    """Final answer with per-phase measurements."""
+    response: str
+    error: str
+    chunks: int
+    cached_chunks: int
+    map_seconds: float
+    reduce_seconds: float
+    cache: str
+
+
+def _is_text(path: Path) -> bool:
+    with path.open("rb") as f:
+        return b"\0" not in f.read(8192)
+
+
+def _walk(root: Path) -> List[Path]:
+    """Files under root in sorted order, without descending into vendor/build trees."""
+    if not root.is_dir():
+        return [root]
+    files = []
+    for directory, subdirs, names in os.walk(str(root)):
+        subdirs[:] = sorted(d for d in subdirs if d not in output_reducers.VENDOR_DIRS)
+        files.extend(Path(directory) / name for name in sorted(names))
+    return files
+
+
+def collect_files(refs: List[str], cwd: Path) -> List[Path]:
+    """Text files under the referenced paths, vendor trees skipped."""
+    files = []
+    for ref in refs:
+        root = Path(ref).expanduser()
+        for path in _walk(root if root.is_absolute() else cwd / root):
+            if path.is_file() and path.stat().st_size <= MAX_FILE_BYTES and _is_text(path):
+                files.append(path)
+    return list(dict.fromkeys(files))
+
+
+def _sections(name: str, text: str, chunk_chars: int) -> List[tuple]:
+    """(label, text) pieces of one file, split on lines to fit a chunk."""
+    header = f"=== {name} ===\n"
+    if len(header) + len(text) <= chunk_chars:
+        return [(name, header + text)]
+    sections, lines, size, first = [], [], 0, 1
+    for number, line in enumerate(text.splitlines(keepends=True), 1):
+        if lines and size + len(line) > chunk_chars - 64:
+            label = f"{name} (lines {first}-{number - 1})"
+            sections.append((label, f"=== {label} ===\n" + "".join(lines)))
+            lines, size, first = [], 0, number
+        lines.append(line[:chunk_chars - 64])
+        size += len(lines[-1])
+    if lines:
+        label = f"{name} (lines {first}-{first + len(lines) - 1})"
+        sections.append((label, f"=== {label} ===\n" + "".join(lines)))
+    return sections
+
+
+def _is_anchor(name: str) -> bool:
+    return hashlib.blake2b(name.encode("utf-8", "surrogatepass"), digest_size=1).digest()[0] % ANCHOR_EVERY == 0
+
+
+def make_chunks(files: List[Path], cwd: Path, chunk_chars: int = CHUNK_CHARS) -> List[Chunk]:
+    """Pack file sections into chunks of at most chunk_chars characters."""
+    chunks: List[Chunk] = []
+    names: List[str] = []
+    parts: List[str] = []
+    size = 0
+    for path in files:
+        name = str(path.relative_to(cwd)) if cwd in path.parents else str(path)
+        text = path.read_text(encoding="utf-8", errors="replace")
+        for label, section in _sections(name, text, chunk_chars):
+            if parts and (size + len(section) > chunk_chars or _is_anchor(label)):
+                chunks.append(Chunk(names, "\n".join(parts)))
+                names, parts, size = [], [], 0
+            names.append(label)
+            parts.append(section)
+            size += len(section) + 1
+    if parts:
+        chunks.append(Chunk(names, "\n".join(parts)))
+    return chunks
+
+
+def map_prompt(task: str, context: str, chunk: Chunk, max_lines: int = CHUNK_LINES) -> str:
+    # No part numbers: a chunk's prompt must not change when other chunks do
+    files = ", ".join(chunk.files[:8]) + (f" +{len(chunk.files) - 8} more" if len(chunk.files) > 8 else "")
+    return MAP_TEMPLATE.format(context=context, task=task, files=files,
+                               max_lines=max_lines, text=chunk.text)
+
+
+def reduce_prompt(base_prompt: str, partials: List[str]) -> str:
+    """The task's usual prompt plus the partial findings to merge."""
+    body = "\n\n".join(f"--- Part {i} ---\n{text.strip()}" for i, text in enumerate(partials, 1))
+    return base_prompt + MERGE_TEMPLATE.format(parts=len(partials), partials=body)
+
+
+def group_partials(partials: List[str], chunk_chars: int) -> List[List[str]]:
+    """Consecutive groups of partials that each fit in one prompt."""
+    groups, current, size = [], [], 0
+    for text in partials:
+        if current and size + len(text) > chunk_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text)
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def run_map_reduce(task: str, context: str, max_lines: Optional[int],
+                         executor: BatchExecutor, chunk_chars: int = CHUNK_CHARS) -> MapReduceResult:
+    cwd = executor.cwd
+    classification = pre_delegate.classify(task)
+    max_lines = max_lines or classification.max_lines
+    base = pre_delegate.build_prompt(classification.task_type, task, context, max_lines)
+
+    files = collect_files(response_cache.referenced_paths(task), cwd)
+    chunks = make_chunks(files, cwd, chunk_chars)
+    if not chunks:
+        return MapReduceResult("", "no readable files referenced (use @path)", 0, 0, 0.0, 0.0, "")
+
+    def ask(prompt: str, label: str):
+        return executor.answer(prompt, key=response_cache.content_key(prompt, run_delegation.cli_command()),
+                               label=label)
+
+    if len(chunks) == 1:
+        # Fits in one prompt: no map phase needed
+        start = time.perf_counter()
+        answer = await ask(f"{base}\n\n{chunks[0].text}", task)
+        return MapReduceResult(answer.response, answer.error, 1, int(answer.cache == "hit"),
+                               0.0, time.perf_counter() - start, answer.cache)
+
+    start = time.perf_counter()
+    answers = await asyncio.gather(*(
+        ask(map_prompt(task, context, chunk), f"{task} [part {i}]")
+        for i, chunk in enumerate(chunks, 1)
+    ))
+    map_seconds = time.perf_counter() - start
+    failed = [answer.error for answer in answers if answer.error]
+    cached = sum(answer.cache == "hit" for answer in answers)
+    if failed:
+        return MapReduceResult("", failed[0], len(chunks), cached, map_seconds, 0.0, "")
+
+    # Merge in rounds until the partial findings fit in one reduce prompt
+    start = time.perf_counter()
+    partials = [answer.response for answer in answers]
+    while True:
+        groups = group_partials(partials, chunk_chars)
+        if len(groups) == 1 or len(groups) == len(partials):  # Fits, or cannot shrink further
+            answer = await ask(reduce_prompt(base, partials), task)
+            break
+        intermediate = pre_delegate.build_prompt(classification.task_type, task, context, max_lines * 2)
+        merged = await asyncio.gather(*(ask(reduce_prompt(intermediate, group), task) for group in groups))
+        errors = [m.error for m in merged if m.error]
+        if errors:
+            answer = merged[0]._replace(error=errors[0])
+            break
+        partials = [m.response for m in merged]
+
+    return MapReduceResult(answer.response, answer.error, len(chunks), cached,
+                           map_seconds, time.perf_counter() - start, answer.cache)
+
+
+def map_reduce(task: str, context: str = "General task", max_lines: int = None,
+               concurrency: int = DEFAULT_CONCURRENCY, chunk_chars: int = CHUNK_CHARS,
+               use_cache: bool = True, cwd: Path = None) -> MapReduceResult:
+    executor = BatchExecutor(concurrency, use_cache=use_cache, cwd=cwd)
+    return executor.run_until_complete(run_map_reduce(task, context, max_lines, executor, chunk_chars))
+
+
+def main(argv: list = None, cwd: Path = None):
+    """Main execution."""
+    argv = sys.argv if argv is None else argv
+    if len(argv) < 2 or argv[1] in ('-h', '--help'):
+        print(__doc__)
+        sys.exit(1)
+
+    use_cache = '--no-cache' not in argv
+    args = [arg for arg in argv[1:] if arg != '--no-cache']
+    options = {'--chunk-chars': CHUNK_CHARS, '--concurrency': DEFAULT_CONCURRENCY, '--name': None}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+
+    task = args[0]
+    context = args[1] if len(args) > 1 else "General task"
+    max_lines = int(args[2]) if len(args) > 2 else pre_delegate.estimate_compression(task)
+
+    result = map_reduce(task, context, max_lines, int(options['--concurrency']),
+                        int(options['--chunk-chars']), use_cache, cwd)
+    if result.error:
+        print(f"❌ Delegation failed: {result.error}", file=sys.stderr)
+        sys.exit(2)
+
+    print(result.response.rstrip())
+    print()
+    print(f"🧩 {result.chunks} chunks ({result.cached_chunks} cached), "
+          f"map {result.map_seconds:.1f}s, reduce {result.reduce_seconds:.1f}s")
+
+    name = options['--name'] or pre_delegate.detect_task_type(task)
+    cli = run_delegation.cli_name(run_delegation.cli_argv(""))
+    trace = Trace(cli=cli)
+    trace.add("map", result.map_seconds * 1000)
+    trace.add("reduce", result.reduce_seconds * 1000)
+    post_argv = ["post-delegate", result.response, str(max_lines), name, "--cli", cli,
+                 "--latency", f"{result.map_seconds + result.reduce_seconds:.3f}",
+                 "--trace", trace.correlation_id, "--spans", trace.format()]
+    if result.cache:
+        post_argv += ["--cache", result.cache]
+    post_delegate.main(post_argv, cwd)
+
+
+if __name__ == "__main__":
+    main()
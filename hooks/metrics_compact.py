@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Retention and compaction for delegation metrics
+.claude/metrics gains a store file, a spans file and a rollup sidecar per
+day. This job folds every month older than --older-than days into:
+
+    delegation-YYYY-MM.dcol.gz   the month's rows, one block per day, gzip-compressed
+    spans-YYYY-MM.dcol.gz        the month's timing spans, likewise
+    rollup-YYYY-MM.json          the month's daily rollups (precomputed summaries)
+
+and records each segment in manifest.json (row count, time range, size), so
+store_files and the day readers open only segments overlapping a range.
+Months older than --retain-days are downsampled: their raw segments are
+deleted and only the rollups remain ("raw": false in the manifest), which
+still cover the default, rollup-based analyze-metrics report.
+
+Rows logged later for an already compacted month (a late or back-dated
+delegation) go to a daily file as usual and are appended to the segment on
+the next run. A run interrupted before deleting the daily files leaves their
+names and row counts under "pending"; readers skip those rows and the next
+run finishes the job. Segments are rewritten before the manifest records
+them, so the manifest also keeps each segment's committed (uncompressed)
+length: readers ignore anything past it, and a run interrupted before its
+manifest write is truncated back to it by the next run.
+
+Usage:
+    python metrics_compact.py run [--older-than DAYS] [--retain-days DAYS] [metrics_dir]
+    python metrics_compact.py status [metrics_dir]
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import metrics_rollup
+import metrics_store
+
+COMPACT_AFTER_DAYS = 31
+RETAIN_DAYS = 365
+COMPRESS_LEVEL = 6
+
+DAILY = re.compile(r"^(?:delegation|spans|rollup)-(\d{4}-\d{2})-\d{2}\.(?:dcol|json|csv)$")
+
+
+class Compacted(NamedTuple):
+    """One month folded into its segments."""
+    month: str
+    files: int  # Daily files removed
+    rows: int  # Raw rows now in the segment
+    bytes_before: int  # Daily files plus the previous segments
+    bytes_after: int  # Segments plus the month's rollup file
+
+
+class Result(NamedTuple):
+    compacted: List[Compacted]
+    downsampled: List[str]  # Months whose raw rows were dropped
+
+
+def _last_day(month: str) -> str:
+    first = datetime.strptime(month + "-01", "%Y-%m-%d")
+    return ((first + timedelta(days=32)).replace(day=1) - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _size(paths: List[Path]) -> int:
+    return sum(path.stat().st_size for path in paths if path.exists())
+
+
+def write_manifest(metrics_dir: Path, manifest: dict):
+    """Write the manifest atomically (readers never see a partial file)."""
+    path = metrics_dir / metrics_store.MANIFEST_FILE
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(str(tmp), str(path))
+
+
+def _append_segment(path: Path, rows_by_date: Dict[str, List[dict]], columns: Dict[str, str],
+                    committed: int = None) -> Tuple[Optional[metrics_store.FileInfo], int]:
+    """
+    Append one block per date to the committed part of a segment (bytes
+    past it are left over from an interrupted run and dropped), rewriting
+    it compressed; returns its summary and uncompressed length.
+    """
+    data = metrics_store.segment_data(path) if path.exists() else b""
+    full = len(data)
+    data = data[:metrics_store.valid_length(data[:committed] if committed is not None else data)]
+    parts = [data]
+    info = metrics_store.blocks_info(data) if data else None
+    for date in sorted(rows_by_date):
+        records = sorted(rows_by_date[date], key=lambda r: r["timestamp"])
+        if not records:
+            continue
+        block = metrics_store.encode_block(records, info, columns)
+        parts.append(block)
+        info = metrics_store.blocks_info(block)  # Footers carry the running totals for the whole file
+    if len(parts) > 1 or len(data) != full:
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(gzip.compress(b"".join(parts), COMPRESS_LEVEL))
+        os.replace(str(tmp), str(path))
+    return info, sum(map(len, parts))
+
+
+def _new_rows(paths: List[Path], pending: Dict[str, int], columns: Dict[str, str]) -> Dict[str, List[dict]]:
+    """Rows of daily files by date, past any already copied by an interrupted run."""
+    rows = {}
+    for path in paths:
+        date = path.name.split("-", 1)[1][:10]
+        rows[date] = list(islice(metrics_store.iter_rows(path, columns=columns), pending.get(path.name, 0), None))
+    return rows
+
+
+def compact_month(metrics_dir: Path, month: str, manifest: dict) -> Optional[Compacted]:
+    """
+    Fold a month's daily files into its segments and rollup file.
+    Caller holds the metrics lock; manifest is updated and written.
+    """
+    for csv_file in sorted(metrics_dir.glob(f"delegation-{month}-??.csv")):
+        metrics_store.migrate_csv(csv_file)
+    days = sorted(metrics_dir.glob(f"delegation-{month}-??{metrics_store.SUFFIX}"))
+    spans = sorted(metrics_dir.glob(f"spans-{month}-??{metrics_store.SUFFIX}"))
+    sidecars = sorted(metrics_dir.glob(f"rollup-{month}-??.json"))
+    entry = manifest["segments"].get(month)
+    pending = entry.get("pending", {}) if entry else {}
+    if not (days or spans or sidecars):
+        if pending:
+            entry["pending"] = {}
+            write_manifest(metrics_dir, manifest)
+        return None
+
+    segment = metrics_store.segment_file(metrics_dir, month)
+    span_segment = metrics_store.segment_file(metrics_dir, month, "spans")
+    rollup_path = metrics_rollup.month_rollup_file(metrics_dir, month)
+    bytes_before = _size(days + spans + sidecars + [segment, span_segment, rollup_path])
+
+    # Rollups first: rebuilding one reads the segment plus the daily rows not yet in it
+    rollups = metrics_rollup.read_month_rollups(metrics_dir, month)
+    for date in sorted({path.name.split("-", 1)[1][:10] for path in days + sidecars}):
+        rollup = None
+        if metrics_rollup.rollup_file(metrics_dir, date).exists():
+            rollup = metrics_rollup.read_rollup(metrics_dir, date)
+        rollups[date] = rollup or metrics_rollup.build_rollup(metrics_dir, date)
+
+    # Segments are only vouched for up to the lengths the manifest commits
+    # (none for a new month), so a run interrupted before the manifest write
+    # below leaves nothing readers count and the next run truncates it away
+    committed = entry.get("committed") if entry else {}
+    if committed is None:
+        committed = {"delegation": len(metrics_store.segment_data(segment)) if segment.exists() else 0,
+                     "spans": len(metrics_store.segment_data(span_segment)) if span_segment.exists() else 0}
+        entry["committed"] = committed
+        write_manifest(metrics_dir, manifest)
+    new_rows = _new_rows(days, pending, metrics_store.COLUMNS)
+    info, length = _append_segment(segment, new_rows, metrics_store.COLUMNS, committed.get("delegation", 0))
+    span_info, span_length = _append_segment(span_segment, _new_rows(spans, pending, metrics_store.SPAN_COLUMNS),
+                                             metrics_store.SPAN_COLUMNS, committed.get("spans", 0))
+    metrics_rollup.write_month_rollups(metrics_dir, month, rollups)
+
+    raw_days = set(entry["days"]) if entry and entry["raw"] else set()
+    raw_days.update(date for date, rows in new_rows.items() if rows)
+    entry = manifest["segments"][month] = {
+        "rows": info.rows if info else 0,
+        "min_ts": info.min_ts if info else 0,
+        "max_ts": info.max_ts if info else 0,
+        "span_rows": span_info.rows if span_info else 0,
+        "bytes": _size([segment, span_segment]),
+        "committed": {"delegation": length, "spans": span_length},
+        "raw": True,
+        "days": sorted(raw_days),
+        "count": sum(r["total"]["count"] for r in rollups.values()),
+        "tokens_sum": sum(r["total"]["tokens_sum"] for r in rollups.values()),
+        # Until the daily files are gone, their rows are in the segment twice
+        "pending": {path.name: (metrics_store.file_info(path) or metrics_store.FileInfo(0, 0, 0)).rows
+                    for path in days + spans},
+    }
+    write_manifest(metrics_dir, manifest)
+    for path in days + spans + sidecars:
+        path.unlink()
+    entry["pending"] = {}
+    write_manifest(metrics_dir, manifest)
+    return Compacted(month, len(days) + len(spans) + len(sidecars), entry["rows"], bytes_before,
+                     _size([segment, span_segment, rollup_path]))
+
+
+def downsample_month(metrics_dir: Path, month: str, manifest: dict):
+    """Drop a compacted month's raw segments, keeping its rollups."""
+    entry = manifest["segments"][month]
+    entry.update(raw=False, bytes=0, days=[])
+    write_manifest(metrics_dir, manifest)  # Readers stop opening the segments first
+    for prefix in ("delegation", "spans"):
+        path = metrics_store.segment_file(metrics_dir, month, prefix)
+        if path.exists():
+            path.unlink()
+
+
+def compact(metrics_dir: Path, older_than: int = COMPACT_AFTER_DAYS, retain_days: int = RETAIN_DAYS,
+            today: datetime = None) -> Result:
+    """Compact months entirely older than older_than days and downsample those older than retain_days."""
+    today = today or datetime.now()
+    retain_days = max(retain_days, older_than)
+    compact_before = (today - timedelta(days=older_than)).strftime("%Y-%m-%d")
+    retain_from = (today - timedelta(days=retain_days)).strftime("%Y-%m-%d")
+
+    with metrics_store.locked(metrics_dir):
+        manifest = metrics_store.read_manifest(metrics_dir)
+        months = {match.group(1) for match in map(DAILY.match, os.listdir(str(metrics_dir))) if match}
+        months.update(month for month, entry in manifest["segments"].items() if entry.get("pending"))
+
+        compacted = []
+        for month in sorted(months):
+            if _last_day(month) < compact_before or manifest["segments"].get(month, {}).get("pending"):
+                result = compact_month(metrics_dir, month, manifest)
+                if result is not None:
+                    compacted.append(result)
+
+        downsampled = []
+        for month, entry in sorted(manifest["segments"].items()):
+            if entry["raw"] and _last_day(month) < retain_from:
+                downsample_month(metrics_dir, month, manifest)
+                downsampled.append(month)
+    return Result(compacted, downsampled)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('run', 'status'):
+        print(__doc__)
+        sys.exit(1)
+    command = args.pop(0)
+    options = {'--older-than': str(COMPACT_AFTER_DAYS), '--retain-days': str(RETAIN_DAYS)}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    metrics_dir = Path(args[0]) if args else metrics_store.find_metrics_dir(Path.cwd())
+    if not metrics_dir.exists():
+        print(f"❌ Error: metrics directory not found: {metrics_dir}")
+        sys.exit(1)
+
+    if command == 'run':
+        result = compact(metrics_dir, int(options['--older-than']), int(options['--retain-days']))
+        for c in result.compacted:
+            print(f"📦 {c.month}: {c.files} daily files → {c.rows:,} rows, "
+                  f"{c.bytes_before:,} → {c.bytes_after:,} bytes")
+        for month in result.downsampled:
+            print(f"🗜️  {month}: raw rows dropped, rollups kept")
+        if not result.compacted and not result.downsampled:
+            print("✅ Nothing to compact")
+        return
+
+    segments = metrics_store.read_manifest(metrics_dir)["segments"]
+    if not segments:
+        print("📊 No compacted months")
+    for month, entry in sorted(segments.items()):
+        state = f"{entry['rows']:,} raw rows, {entry['bytes']:,} bytes" if entry["raw"] else "rollups only"
+        print(f"   {month}: {entry['count']:,} delegations, {entry['tokens_sum']:,} tokens ({state})")
+    daily = len(list(metrics_dir.glob(f"delegation-*{metrics_store.SUFFIX}")))
+    print(f"   {daily} daily store files not yet compacted")
+
+
+if __name__ == "__main__":
+    main()
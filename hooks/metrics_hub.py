@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Cross-project metrics hub
+Each project keeps its own .claude/metrics; the hub ingests rows from many
+of them (and from ~/.claude installs) into one indexed SQLite database so
+team-level questions do not need hand-merged CSVs.
+
+- sources are metrics directories registered with a project and user name
+  (`register`, or `discover` to find every .claude/metrics under a root)
+- `ingest` reads only what changed since the last run: store files resume
+  after the rows already ingested, files whose size and mtime are
+  unchanged are skipped
+- rows are deduplicated by correlation id (or, for untraced rows, by their
+  content), so a directory registered twice or copied between machines is
+  counted once
+- queries use indexes on time, task, project and user
+
+The hub lives in ~/.claude/metrics-hub/hub.sqlite3; point DELEGATE_HUB at a
+shared directory to let several users ingest into one hub (shared directory
+mode). `serve` re-ingests every --interval seconds as a local service.
+
+Usage:
+    python metrics_hub.py register PATH [--project NAME] [--user NAME]
+    python metrics_hub.py discover ROOT [--depth N]
+    python metrics_hub.py ingest
+    python metrics_hub.py serve [--interval SECONDS]
+    python metrics_hub.py top-tasks|users|repos [--days N] [--project NAME] [--user NAME] [--limit N] [--json]
+    python metrics_hub.py status
+"""
+
+import os
+import sys
+import json
+import time
+import getpass
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+import metrics_store
+from metrics_rollup import BASELINE_TOKENS
+
+HUB_FILE = "hub.sqlite3"
+SCHEMA_VERSION = 1
+EXCESSIVE_TOKENS = 250
+DISCOVER_DEPTH = 4
+BUSY_TIMEOUT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    user TEXT NOT NULL,
+    added INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    id TEXT NOT NULL UNIQUE,
+    timestamp INTEGER NOT NULL,
+    project TEXT NOT NULL,
+    user TEXT NOT NULL,
+    task TEXT NOT NULL,
+    cli TEXT NOT NULL,
+    lines INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    cache TEXT NOT NULL,
+    latency_ms INTEGER NOT NULL
+);
+-- Covers the range queries, so they never touch the table
+CREATE INDEX IF NOT EXISTS rows_time ON rows (timestamp, task, project, user, tokens, cache);
+CREATE INDEX IF NOT EXISTS rows_project ON rows (project, timestamp);
+CREATE INDEX IF NOT EXISTS rows_user ON rows (user, timestamp);
+"""
+
+
+class Source(NamedTuple):
+    path: str
+    project: str
+    user: str
+
+
+class Ingested(NamedTuple):
+    files: int  # Files read (changed since last ingest)
+    rows: int  # Rows read from them
+    added: int  # Rows new to the hub
+
+
+def default_hub_dir() -> Path:
+    override = os.environ.get("DELEGATE_HUB")
+    return Path(override) if override else Path.home() / ".claude" / "metrics-hub"
+
+
+def connect(hub_dir: Path = None) -> sqlite3.Connection:
+    hub_dir = default_hub_dir() if hub_dir is None else hub_dir
+    hub_dir.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(hub_dir / HUB_FILE), timeout=BUSY_TIMEOUT)
+    db.executescript(SCHEMA)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return db
+
+
+def project_name(metrics_dir: Path) -> str:
+    """Repository directory name, or "~" for a user-level ~/.claude install."""
+    root = metrics_dir.resolve().parent.parent
+    return "~" if root == Path.home().resolve() else root.name
+
+
+def register(db: sqlite3.Connection, metrics_dir: Path, project: str = None, user: str = None) -> Source:
+    source = Source(str(metrics_dir.resolve()), project or project_name(metrics_dir), user or getpass.getuser())
+    with db:
+        db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                   source + (metrics_store.to_epoch(datetime.now()),))
+    return source
+
+
+def discover(root: Path, depth: int = DISCOVER_DEPTH) -> List[Path]:
+    """Every .claude/metrics directory under root (not descending into dot directories)."""
+    found = []
+    pending = [(root, 0)]
+    while pending:
+        directory, level = pending.pop()
+        metrics_dir = directory / ".claude" / "metrics"
+        if metrics_dir.is_dir():
+            found.append(metrics_dir)
+        if level >= depth:
+            continue
+        try:
+            entries = list(os.scandir(str(directory)))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.name.startswith(".") and entry.name != "node_modules" and entry.is_dir(follow_symlinks=False):
+                pending.append((Path(entry.path), level + 1))
+    return sorted(found)
+
+
+def sources(db: sqlite3.Connection) -> List[Source]:
+    return [Source(*row) for row in db.execute("SELECT path, project, user FROM sources ORDER BY path")]
+
+
+def _row_ids(rows: Iterable[dict]) -> Iterator[Tuple[str, dict]]:
+    """Correlation id, or the row's content plus an occurrence count for untraced rows."""
+    seen: Dict[str, int] = {}
+    for row in rows:
+        if row.get("correlation_id"):
+            yield row["correlation_id"], row
+            continue
+        content = f"{row['timestamp']}|{row['task']}|{row['lines']}|{row['tokens']}|{row.get('cli', '')}"
+        seen[content] = seen.get(content, 0) + 1
+        yield f"{content}|{seen[content]}", row
+
+
+def _read_file(path: Path) -> List[dict]:
+    if path.suffix == ".csv":
+        with path.open("r") as f:
+            next(f, None)  # Skip header
+            return [r for r in (metrics_store.parse_csv_row(line) for line in f) if r]
+    return list(metrics_store.iter_rows(path))
+
+
+def ingest_source(db: sqlite3.Connection, source: Source) -> Ingested:
+    """Copy new rows of one metrics directory into the hub (one transaction)."""
+    metrics_dir = Path(source.path)
+    files = metrics_store.raw_files(metrics_dir) + \
+        sorted(metrics_dir.glob("delegation-*.csv"))
+    read = rows_read = added = 0
+    with db:
+        for path in files:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            known = db.execute("SELECT size, mtime_ns, rows FROM files WHERE path = ?", (str(path),)).fetchone()
+            if known is not None and known[:2] == (st.st_size, st.st_mtime_ns):
+                continue
+            # Store files are append-only: only rows past those already ingested are inserted
+            # (ids of untraced rows still count occurrences from the start of the file)
+            skip = known[2] if known is not None and path.suffix != ".csv" and st.st_size > known[0] else 0
+            rows = _read_file(path)
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+                (row_id, row["timestamp"], source.project, source.user, row["task"], row.get("cli", ""),
+                 row["lines"], row["tokens"], row.get("cache", ""), row.get("latency_ms", 0))
+                for row_id, row in islice(_row_ids(rows), skip, None)
+            ])
+            added += db.total_changes - before
+            db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                       (str(path), st.st_size, st.st_mtime_ns, len(rows)))
+            read += 1
+            rows_read += len(rows) - skip
+    return Ingested(read, rows_read, added)
+
+
+def ingest(db: sqlite3.Connection) -> Ingested:
+    total = Ingested(0, 0, 0)
+    for source in sources(db):
+        result = ingest_source(db, source)
+        total = Ingested(*(a + b for a, b in zip(total, result)))
+    return total
+
+
+def _since(days: int) -> int:
+    start = datetime.combine((datetime.now() - timedelta(days=days - 1)).date(), datetime.min.time())
+    return metrics_store.to_epoch(start)
+
+
+def _filters(days: int, project: str = None, user: str = None) -> Tuple[str, list]:
+    clauses, params = ["timestamp >= ?"], [_since(days)]
+    if project:
+        clauses.append("project = ?")
+        params.append(project)
+    if user:
+        clauses.append("user = ?")
+        params.append(user)
+    return " AND ".join(clauses), params
+
+
+def top_tasks(db: sqlite3.Connection, days: int = 7, project: str = None, user: str = None,
+              limit: int = 10) -> List[dict]:
+    """Tasks by tokens spent, with how often they ran over the token warning."""
+    where, params = _filters(days, project, user)
+    query = (f"SELECT task, COUNT(*), SUM(tokens), SUM(tokens > {EXCESSIVE_TOKENS}) FROM rows "
+             f"WHERE {where} GROUP BY task ORDER BY SUM(tokens) DESC LIMIT ?")
+    return [{"task": task, "delegations": count, "tokens": tokens, "avg_tokens": round(tokens / count),
+             "excessive": excessive}
+            for task, count, tokens, excessive in db.execute(query, params + [limit])]
+
+
+def user_burn(db: sqlite3.Connection, days: int = 7, project: str = None, limit: int = 10) -> List[dict]:
+    """Tokens per user, in total and per active day."""
+    where, params = _filters(days, project)
+    query = (f"SELECT user, COUNT(*), SUM(tokens), COUNT(DISTINCT timestamp / 86400) FROM rows "
+             f"WHERE {where} GROUP BY user ORDER BY SUM(tokens) DESC LIMIT ?")
+    return [{"user": name, "delegations": count, "tokens": tokens, "active_days": active,
+             "tokens_per_day": round(tokens / active)}
+            for name, count, tokens, active in db.execute(query, params + [limit])]
+
+
+def repo_savings(db: sqlite3.Connection, days: int = 7, user: str = None, limit: int = 10) -> List[dict]:
+    """Estimated tokens saved per project against BASELINE_TOKENS per delegation."""
+    where, params = _filters(days, user=user)
+    query = (f"SELECT project, COUNT(*), SUM(tokens), SUM(cache = 'hit') FROM rows "
+             f"WHERE {where} GROUP BY project ORDER BY COUNT(*) * {BASELINE_TOKENS} - SUM(tokens) DESC LIMIT ?")
+    results = []
+    for project, count, tokens, hits in db.execute(query, params + [limit]):
+        saved = count * BASELINE_TOKENS - tokens
+        results.append({"project": project, "delegations": count, "tokens": tokens, "saved": saved,
+                        "saved_pct": round(saved * 100 / (count * BASELINE_TOKENS)), "cache_hits": hits})
+    return results
+
+
+def _print_table(rows: List[dict], columns: List[str]):
+    if not rows:
+        print("   (no delegations in range)")
+        return
+    widths = {c: max(len(c), *(len(f"{row[c]:,}" if isinstance(row[c], int) else str(row[c])) for row in rows))
+              for c in columns}
+    print("   " + "  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        cells = [f"{row[c]:,}".rjust(widths[c]) if isinstance(row[c], int) else str(row[c]).ljust(widths[c])
+                 for c in columns]
+        print("   " + "  ".join(cells))
+
+
+def main():
+    args = sys.argv[1:]
+    commands = ('register', 'discover', 'ingest', 'serve', 'top-tasks', 'users', 'repos', 'status')
+    if not args or args[0] not in commands:
+        print(__doc__)
+        sys.exit(1)
+    command = args.pop(0)
+    as_json = '--json' in args
+    args = [arg for arg in args if arg != '--json']
+    options = {'--project': None, '--user': None, '--days': "7", '--limit': "10", '--depth': str(DISCOVER_DEPTH),
+               '--interval': "60"}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+
+    db = connect()
+    if command == 'register':
+        for path in args or [str(metrics_store.find_metrics_dir(Path.cwd()))]:
+            source = register(db, Path(path), options['--project'], options['--user'])
+            print(f"✅ {source.project} ({source.user}): {source.path}")
+    elif command == 'discover':
+        roots = [Path(arg) for arg in args] or [Path.cwd()]
+        found = [d for root in roots for d in discover(root, int(options['--depth']))]
+        home_metrics = Path.home() / ".claude" / "metrics"
+        if home_metrics.is_dir():
+            found.append(home_metrics)
+        for metrics_dir in found:
+            source = register(db, metrics_dir, user=options['--user'])
+            print(f"✅ {source.project} ({source.user}): {source.path}")
+    elif command in ('ingest', 'serve'):
+        while True:
+            start = time.perf_counter()
+            result = ingest(db)
+            print(f"📥 {result.added:,} new rows ({result.rows:,} read from {result.files} changed files) "
+                  f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+            if command == 'ingest':
+                break
+            time.sleep(float(options['--interval']))
+    elif command == 'status':
+        rows, first, last = db.execute("SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM rows").fetchone()
+        print(f"🗄️  {default_hub_dir() / HUB_FILE}: {rows:,} rows")
+        if rows:
+            print(f"   {metrics_store.format_timestamp(first)} … {metrics_store.format_timestamp(last)}")
+        for source in sources(db):
+            print(f"   • {source.project} ({source.user}): {source.path}")
+    else:
+        days, limit = int(options['--days']), int(options['--limit'])
+        if command == 'top-tasks':
+            result = top_tasks(db, days, options['--project'], options['--user'], limit)
+            columns = ["task", "delegations", "tokens", "avg_tokens", "excessive"]
+        elif command == 'users':
+            result = user_burn(db, days, options['--project'], limit)
+            columns = ["user", "delegations", "tokens", "active_days", "tokens_per_day"]
+        else:
+            result = repo_savings(db, days, options['--user'], limit)
+            columns = ["project", "delegations", "tokens", "saved", "saved_pct", "cache_hits"]
+        if as_json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(f"📊 {command} (last {days} days)")
+            _print_table(result, columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Incremental pre-aggregated rollups for delegation metrics
+Keeps a small rollup-YYYY-MM-DD.json sidecar per day, updated on every
+append, so analyze-metrics reads one file per day instead of every row
+
+Each rollup holds, for the whole day and per task:
+    count, lines_sum, lines_sumsq, tokens_sum, tokens_sumsq, tokens_hist,
+    sketches (quantile sketches of lines, tokens and latency_ms)
+plus per-hour delegation counts for the day, which drive usage hints in
+post-delegate without scanning any log, response-cache hit/miss counts, and
+millisecond sketches of the day's timing spans (see delegation_trace) per
+stage ("stages") and per CLI and stage ("stage_clis").
+
+Histogram buckets are split at TOKEN_EDGES (upper-exclusive), aligned with the
+<100 "efficient" and >250 "excessive" thresholds used by analyze-metrics.
+Rows without a recorded latency (0) are left out of the latency sketch.
+
+Compaction (see metrics_compact) moves a month's daily rollups into one
+rollup-YYYY-MM.json ({"days": {date: rollup}}); readers fall back to it for
+dates without a daily sidecar. It outlives the month's raw rows.
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import metrics_store
+from quantile_sketch import Sketch
+
+ROLLUP_VERSION = 5
+
+TOKEN_EDGES = [50, 100, 150, 200, 251, 500, 1000, 2000]
+SKETCHED = ("lines", "tokens", "latency_ms")
+EFFICIENT_BUCKETS = slice(0, TOKEN_EDGES.index(100) + 1)   # tokens < 100
+EXCESSIVE_BUCKETS = slice(TOKEN_EDGES.index(251) + 1, None)  # tokens > 250
+BASELINE_TOKENS = 1500  # Estimated tokens per delegation without compression
+
+
+class Usage(NamedTuple):
+    """Delegation counters for one day."""
+    total: int
+    tasks: Dict[str, int]
+    hours: List[int]
+
+
+def empty_stats() -> dict:
+    return {
+        "count": 0,
+        "lines_sum": 0,
+        "lines_sumsq": 0,
+        "tokens_sum": 0,
+        "tokens_sumsq": 0,
+        "tokens_hist": [0] * (len(TOKEN_EDGES) + 1),
+        "sketches": {metric: Sketch() for metric in SKETCHED},
+    }
+
+
+def token_bucket(tokens: int) -> int:
+    """Index of the histogram bucket holding tokens."""
+    for i, edge in enumerate(TOKEN_EDGES):
+        if tokens < edge:
+            return i
+    return len(TOKEN_EDGES)
+
+
+def add_to_stats(stats: dict, lines: int, tokens: int, latency_ms: int = 0):
+    stats["count"] += 1
+    stats["lines_sum"] += lines
+    stats["lines_sumsq"] += lines * lines
+    stats["tokens_sum"] += tokens
+    stats["tokens_sumsq"] += tokens * tokens
+    stats["tokens_hist"][token_bucket(tokens)] += 1
+    sketches = stats["sketches"]
+    sketches["lines"].add(lines)
+    sketches["tokens"].add(tokens)
+    if latency_ms:
+        sketches["latency_ms"].add(latency_ms)
+
+
+def empty_rollup(date: str) -> dict:
+    return {
+        "version": ROLLUP_VERSION,
+        "date": date,
+        "total": empty_stats(),
+        "tasks": {},
+        "hours": [0] * 24,
+        "cache": {"hit": 0, "miss": 0},
+        "stages": {},
+        "stage_clis": {},
+    }
+
+
+def add_to_rollup(rollup: dict, record: dict):
+    lines, tokens, latency = record["lines"], record["tokens"], record.get("latency_ms", 0)
+    add_to_stats(rollup["total"], lines, tokens, latency)
+    add_to_stats(rollup["tasks"].setdefault(record["task"], empty_stats()), lines, tokens, latency)
+    rollup["hours"][record["timestamp"] % 86400 // 3600] += 1
+    if record.get("cache") in rollup["cache"]:
+        rollup["cache"][record["cache"]] += 1
+
+
+def add_span_to_rollup(rollup: dict, span: dict):
+    ms = span["micros"] / 1000
+    rollup["stages"].setdefault(span["stage"], Sketch()).add(ms)
+    rollup["stage_clis"].setdefault(span.get("cli") or "unknown", {}).setdefault(span["stage"], Sketch()).add(ms)
+
+
+def rollup_file(metrics_dir: Path, date: str) -> Path:
+    return metrics_dir / f"rollup-{date}.json"
+
+
+def _load_sketches(rollup: dict) -> dict:
+    for stats in (rollup["total"], *rollup["tasks"].values()):
+        stats["sketches"] = {metric: Sketch.from_dict(data) for metric, data in stats["sketches"].items()}
+    for stages in (rollup["stages"], *rollup["stage_clis"].values()):
+        stages.update((stage, Sketch.from_dict(data)) for stage, data in stages.items())
+    return rollup
+
+
+def month_rollup_file(metrics_dir: Path, month: str) -> Path:
+    return metrics_dir / f"rollup-{month}.json"
+
+
+def read_month_rollups(metrics_dir: Path, month: str) -> Dict[str, dict]:
+    """Rollups of a compacted YYYY-MM month by date (empty if none)."""
+    try:
+        data = json.loads(month_rollup_file(metrics_dir, month).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    if data.get("version") != ROLLUP_VERSION:
+        return {}
+    return {date: _load_sketches(rollup) for date, rollup in data["days"].items()}
+
+
+def write_month_rollups(metrics_dir: Path, month: str, rollups: Dict[str, dict]):
+    """Write a month's rollups atomically."""
+    path = month_rollup_file(metrics_dir, month)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"version": ROLLUP_VERSION, "month": month, "days": rollups},
+                              separators=(",", ":"), default=Sketch.to_dict))
+    os.replace(str(tmp), str(path))
+
+
+def read_rollup(metrics_dir: Path, date: str, months: Dict[str, dict] = None) -> Optional[dict]:
+    """
+    A day's rollup: its sidecar, or else its entry in the compacted month.
+    Pass a dict as months to reuse month files across calls.
+    """
+    path = rollup_file(metrics_dir, date)
+    try:
+        rollup = json.loads(path.read_text())
+    except FileNotFoundError:
+        months = {} if months is None else months
+        if date[:7] not in months:
+            months[date[:7]] = read_month_rollups(metrics_dir, date[:7])
+        return months[date[:7]].get(date)
+    except ValueError:
+        return None
+    if rollup.get("version") != ROLLUP_VERSION:
+        return None
+    return _load_sketches(rollup)
+
+
+def write_rollup(metrics_dir: Path, rollup: dict):
+    """Write a rollup atomically (readers never see a partial file)."""
+    path = rollup_file(metrics_dir, rollup["date"])
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(rollup, separators=(",", ":"), default=Sketch.to_dict))
+    os.replace(str(tmp), str(path))
+
+
+def update_rollups(metrics_dir: Path, records: List[dict], spans: List[dict] = ()):
+    """Fold records and spans into their day's rollup (call after appending them)."""
+    by_date: Dict[str, tuple] = {}
+    for kind, rows in enumerate((records, spans)):
+        for row in rows:
+            date = metrics_store.format_date(row["timestamp"] // 86400)
+            by_date.setdefault(date, ([], []))[kind].append(row)
+
+    for date, (day_records, day_spans) in by_date.items():
+        rollup = read_rollup(metrics_dir, date)
+        if rollup is None:
+            # First append of the day, or a day logged before rollups existed:
+            # the raw data already contains the new records
+            rollup = build_rollup(metrics_dir, date)
+        else:
+            for record in day_records:
+                add_to_rollup(rollup, record)
+            for span in day_spans:
+                add_span_to_rollup(rollup, span)
+        write_rollup(metrics_dir, rollup)
+
+
+def iter_day_rows(metrics_dir: Path, date: str) -> Iterable[dict]:
+    """Raw rows for one day: its segment and store file plus any unmigrated legacy CSV."""
+    for block in metrics_store.day_blocks(metrics_dir, date):
+        yield from metrics_store.block_rows(block)
+
+    csv_file = metrics_dir / f"delegation-{date}.csv"
+    if csv_file.exists():
+        with csv_file.open("r") as f:
+            next(f, None)  # Skip header
+            for line in f:
+                row = metrics_store.parse_csv_row(line)
+                if row:
+                    yield row
+
+
+def build_rollup(metrics_dir: Path, date: str) -> dict:
+    """Recompute a day's rollup from raw rows and spans."""
+    rollup = empty_rollup(date)
+    for row in iter_day_rows(metrics_dir, date):
+        add_to_rollup(rollup, row)
+    for block in metrics_store.day_blocks(metrics_dir, date, "spans", metrics_store.SPAN_COLUMNS):
+        for span in metrics_store.block_rows(block):
+            add_span_to_rollup(rollup, span)
+    return rollup
+
+
+def read_usage(metrics_dir: Path, date: str) -> Usage:
+    """Today's counters from the rollup sidecar (no log scan)."""
+    rollup = read_rollup(metrics_dir, date)
+    if rollup is None:
+        return Usage(0, {}, [0] * 24)
+    return Usage(
+        total=rollup["total"]["count"],
+        tasks={task: stats["count"] for task, stats in rollup["tasks"].items()},
+        hours=rollup["hours"],
+    )
+
+
+def data_dates(metrics_dir: Path) -> List[str]:
+    """Dates that have raw data (segments, store files or legacy CSVs)."""
+    dates = set()
+    for entry in metrics_store.read_manifest(metrics_dir)["segments"].values():
+        if entry["raw"]:
+            dates.update(entry["days"])
+    for pattern, suffix in ((f"delegation-*{metrics_store.SUFFIX}", metrics_store.SUFFIX),
+                            ("delegation-*.csv", ".csv")):
+        for path in metrics_dir.glob(pattern):
+            day = path.name[len("delegation-"):-len(suffix)]
+            if len(day) == 10:
+                dates.add(day)
+    return sorted(dates)
+
+
+def load_rollups(metrics_dir: Path, dates: List[str]) -> List[dict]:
+    """
+    Read rollups for the given dates, backfilling any missing ones from raw
+    data (once) so later runs stay constant-time.
+    """
+    available = set(data_dates(metrics_dir))
+    months: Dict[str, dict] = {}
+    rollups = []
+    for date in dates:
+        rollup = read_rollup(metrics_dir, date, months)
+        if rollup is None:
+            if date not in available:
+                continue
+            rollup = build_rollup(metrics_dir, date)
+            write_rollup(metrics_dir, rollup)
+        rollups.append(rollup)
+    return rollups
+
+
+def rebuild_rollups(metrics_dir: Path, dates: List[str]) -> List[str]:
+    """
+    Recompute rollups from raw data, replace them and report every date whose
+    stored rollup did not match.
+    """
+    available = set(data_dates(metrics_dir))
+    mismatched = []
+    for date in dates:
+        if date not in available:
+            continue
+        stored = read_rollup(metrics_dir, date)
+        rebuilt = build_rollup(metrics_dir, date)
+        if stored != rebuilt:
+            mismatched.append(date)
+        write_rollup(metrics_dir, rebuilt)
+    return mismatched
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Optional SQLite backend for delegation metrics
+Mirrors a project's metrics into .claude/metrics/metrics.sqlite3 (WAL mode,
+indexed on timestamp, task and CLI). Queries beyond "last N days", such as
+filtering by task, CLI, hour or token range, then use an index instead of
+reading every day file.
+
+The columnar day files stay the source of truth; the database mirrors them:
+
+- with DELEGATE_METRICS_BACKEND=sqlite, metrics_writer inserts each commit's
+  rows in the same locked section, as one batch (a MetricsBuffer flush or a
+  single post-delegate call)
+- `sync`, which `query` runs first, imports whatever the database has not
+  seen: existing store files and legacy delegation-*.csv files on first use,
+  and later only the rows appended since. Rows of files that were removed,
+  migrated (CSV -> store) or compacted into monthly segments are dropped and
+  the segment's rows imported, so nothing is counted twice.
+
+Usage:
+    python metrics_sqlite.py sync
+    python metrics_sqlite.py query [--task T] [--cli C] [--days N | --since DATE] [--until DATE]
+                                   [--min-tokens N] [--max-tokens N]
+                                   [--group-by task|cli|hour|day|cache] [--limit N] [--json]
+"""
+
+import sys
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List
+
+import metrics_store
+
+DB_FILE = "metrics.sqlite3"
+BUSY_TIMEOUT = 30.0
+COLUMNS = list(metrics_store.COLUMNS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    file_id INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    task TEXT NOT NULL,
+    lines INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    cache TEXT NOT NULL,
+    cli TEXT NOT NULL,
+    max_lines INTEGER NOT NULL,
+    latency_ms INTEGER NOT NULL,
+    correlation_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_timestamp ON rows (timestamp);
+CREATE INDEX IF NOT EXISTS rows_task ON rows (task, timestamp);
+CREATE INDEX IF NOT EXISTS rows_cli ON rows (cli, timestamp);
+CREATE INDEX IF NOT EXISTS rows_file ON rows (file_id);
+"""
+
+GROUPS = {
+    "task": "task",
+    "cli": "cli",
+    "cache": "cache",
+    "hour": "strftime('%H', timestamp, 'unixepoch')",  # Timestamps are local wall-clock seconds
+    "day": "date(timestamp, 'unixepoch')",
+}
+
+INSERT = f"INSERT INTO rows VALUES (?, {', '.join('?' for _ in COLUMNS)})"
+
+
+def connect(metrics_dir: Path) -> sqlite3.Connection:
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(metrics_dir / DB_FILE), timeout=BUSY_TIMEOUT)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def _values(file_id: int, rows: List[dict]) -> list:
+    defaults = metrics_store.DEFAULTS
+    types = metrics_store.COLUMNS
+    return [(file_id, *(row.get(c, defaults[types[c]]) for c in COLUMNS)) for row in rows]
+
+
+def _read(path: Path, skip: int = 0) -> List[dict]:
+    if path.suffix == ".csv":
+        with path.open("r") as f:
+            next(f, None)  # Skip header
+            return [r for r in (metrics_store.parse_csv_row(line) for line in f) if r]
+    return list(islice(metrics_store.iter_rows(path), skip, None))
+
+
+def _file_entry(db: sqlite3.Connection, name: str):
+    return db.execute("SELECT id, size, mtime_ns, rows FROM files WHERE name = ?", (name,)).fetchone()
+
+
+def _sync_file(db: sqlite3.Connection, path: Path) -> int:
+    """Bring one file's rows up to date; returns rows inserted."""
+    st = path.stat()
+    entry = _file_entry(db, path.name)
+    if entry is not None and (entry[1], entry[2]) == (st.st_size, st.st_mtime_ns):
+        return 0
+    if entry is None:
+        file_id = db.execute("INSERT INTO files (name, size, mtime_ns, rows) VALUES (?, 0, 0, 0)",
+                             (path.name,)).lastrowid
+        skip = 0
+    else:
+        file_id = entry[0]
+        # Store files only grow; anything else (a CSV edit, a truncated torn tail) is re-read
+        skip = entry[3] if path.suffix != ".csv" and st.st_size > entry[1] else 0
+        if not skip:
+            db.execute("DELETE FROM rows WHERE file_id = ?", (file_id,))
+    rows = _read(path, skip)
+    db.executemany(INSERT, _values(file_id, rows))
+    db.execute("UPDATE files SET size = ?, mtime_ns = ?, rows = ? WHERE id = ?",
+               (st.st_size, st.st_mtime_ns, skip + len(rows), file_id))
+    return len(rows)
+
+
+def data_files(metrics_dir: Path) -> List[Path]:
+    return metrics_store.raw_files(metrics_dir) + \
+        sorted(metrics_dir.glob("delegation-*.csv"))
+
+
+def sync(metrics_dir: Path, db: sqlite3.Connection = None) -> int:
+    """Import rows the database has not seen yet; returns rows inserted."""
+    db = connect(metrics_dir) if db is None else db
+    inserted = 0
+    with metrics_store.locked(metrics_dir), db:
+        files = data_files(metrics_dir)
+        present = {path.name for path in files}
+        for file_id, name in db.execute("SELECT id, name FROM files").fetchall():
+            if name not in present:
+                db.execute("DELETE FROM rows WHERE file_id = ?", (file_id,))
+                db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        for path in files:
+            inserted += _sync_file(db, path)
+    return inserted
+
+
+def mirror(metrics_dir: Path, appended: Dict[Path, List[dict]]):
+    """
+    Insert rows just appended to store files, in one transaction.
+    Caller holds the metrics lock; a database that is behind on a file is
+    caught up from the file instead.
+    """
+    db = connect(metrics_dir)
+    try:
+        with db:
+            for path, records in appended.items():
+                entry = _file_entry(db, path.name)
+                info = metrics_store.file_info(path)
+                if entry is None or info is None or entry[3] != info.rows - len(records):
+                    _sync_file(db, path)
+                    continue
+                st = path.stat()
+                db.executemany(INSERT, _values(entry[0], records))
+                db.execute("UPDATE files SET size = ?, mtime_ns = ?, rows = ? WHERE id = ?",
+                           (st.st_size, st.st_mtime_ns, info.rows, entry[0]))
+    finally:
+        db.close()
+
+
+def _epoch(date: str, end: bool = False) -> int:
+    day = datetime.strptime(date, "%Y-%m-%d")
+    return metrics_store.to_epoch(day + timedelta(days=1) if end else day) - (1 if end else 0)
+
+
+def query(db: sqlite3.Connection, task: str = None, cli: str = None, since: int = None, until: int = None,
+          min_tokens: int = None, max_tokens: int = None, group_by: str = None, limit: int = 50) -> List[dict]:
+    """Aggregates of matching rows, per group_by value (or overall)."""
+    clauses, params = [], []
+    for clause, value in (("task = ?", task), ("cli = ?", cli), ("timestamp >= ?", since),
+                          ("timestamp <= ?", until), ("tokens >= ?", min_tokens), ("tokens <= ?", max_tokens)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    key = GROUPS[group_by] if group_by else "'all'"
+    sql = (f"SELECT {key} AS key, COUNT(*), SUM(tokens), AVG(tokens), MAX(tokens), AVG(lines), "
+           f"SUM(cache = 'hit'), AVG(NULLIF(latency_ms, 0)) FROM rows {where} "
+           f"GROUP BY key ORDER BY {'key' if group_by in ('hour', 'day') else 'SUM(tokens) DESC'} LIMIT ?")
+    results = []
+    for key, count, tokens, avg_tokens, max_tok, avg_lines, hits, latency in db.execute(sql, params + [limit]):
+        if not count:
+            continue
+        results.append({"key": key, "delegations": count, "tokens": tokens, "avg_tokens": round(avg_tokens),
+                        "max_tokens": max_tok, "avg_lines": round(avg_lines, 1), "cache_hits": hits,
+                        "avg_latency_ms": round(latency) if latency else 0})
+    return results
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] not in ('sync', 'query'):
+        print(__doc__)
+        sys.exit(1)
+    command = args.pop(0)
+    as_json = '--json' in args
+    args = [arg for arg in args if arg != '--json']
+    options = {'--task': None, '--cli': None, '--days': None, '--since': None, '--until': None,
+               '--min-tokens': None, '--max-tokens': None, '--group-by': None, '--limit': "50"}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if options['--group-by'] not in (None, *GROUPS):
+        print(f"❌ --group-by must be one of: {', '.join(GROUPS)}")
+        sys.exit(1)
+
+    metrics_dir = metrics_store.find_metrics_dir(Path.cwd())
+    db = connect(metrics_dir)
+    inserted = sync(metrics_dir, db)
+    if command == 'sync':
+        total = db.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+        print(f"✅ {inserted:,} rows imported ({total:,} in {metrics_dir / DB_FILE})")
+        return
+
+    since = _epoch(options['--since']) if options['--since'] else None
+    if options['--days']:
+        since = _epoch((datetime.now() - timedelta(days=int(options['--days']) - 1)).strftime("%Y-%m-%d"))
+    until = _epoch(options['--until'], end=True) if options['--until'] else None
+    number = lambda option: int(options[option]) if options[option] is not None else None  # noqa: E731
+    results = query(db, options['--task'], options['--cli'], since, until, number('--min-tokens'),
+                    number('--max-tokens'), options['--group-by'], int(options['--limit']))
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+    if not results:
+        print("📊 No matching delegations")
+        return
+    label = options['--group-by'] or ""
+    print(f"{label:<22} {'count':>7} {'tokens':>10} {'avg':>6} {'max':>6} {'lines':>6} {'hits':>5} {'latency':>8}")
+    for r in results:
+        print(f"{str(r['key'])[:22]:<22} {r['delegations']:7,} {r['tokens']:10,} {r['avg_tokens']:6} "
+              f"{r['max_tokens']:6} {r['avg_lines']:6} {r['cache_hits']:5} {r['avg_latency_ms']:7}ms")
+
+
+if __name__ == "__main__":
+    main()
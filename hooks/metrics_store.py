@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""
+Columnar binary store for delegation metrics
+Replaces the daily delegation-YYYY-MM-DD.csv files with compact .dcol files
+
+Usage:
+    python metrics_store.py migrate [metrics_dir]
+    python metrics_store.py info [metrics_dir]
+
+File layout (delegation-YYYY-MM-DD.dcol, and spans-YYYY-MM-DD.dcol for
+per-stage timings with SPAN_COLUMNS) is a sequence of append-only blocks:
+    column data     fixed-width little-endian arrays, one per column
+                    (int64 timestamps, uint32 numbers, uint32 dictionary ids)
+    dictionary      block-local strings for dictionary-encoded columns
+    schema          "name:code,..." so columns can be added later
+    footer          BLOCK_FOOTER: row counts and min/max timestamps for the
+                    block and (cumulatively) for the whole file
+
+The last footer of a file therefore gives its row count and time range in
+one small read, which lets readers skip whole files without scanning them.
+Timestamps are local wall-clock seconds (naive datetimes encoded as UTC).
+
+Old months are compacted (see metrics_compact) into gzip-compressed monthly
+segments, delegation-YYYY-MM.dcol.gz and spans-YYYY-MM.dcol.gz, holding the
+same blocks (one per day). manifest.json lists them with their row counts and
+time ranges, so readers pick the segments overlapping a range without opening
+any; segments whose raw rows passed the retention horizon are listed with
+"raw": false and only their rollups remain.
+
+Each block is written with a single os.write on an O_APPEND descriptor. A
+block torn by a crash is ignored by readers and truncated away by the next
+writer. Concurrent writers serialise on locked(metrics_dir).
+"""
+
+import os
+import sys
+import gzip
+import json
+import mmap
+import array
+import struct
+import calendar
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MAGIC = b"DCB1"
+SUFFIX = ".dcol"
+SEGMENT_SUFFIX = ".dcol.gz"
+LOCK_FILE = ".metrics.lock"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# magic, rows, file rows, schema len, dict len,
+# block min ts, block max ts, file min ts, file max ts, block len
+BLOCK_FOOTER = struct.Struct("<4sIIHIqqqqI")
+
+# Column name -> storage code ('q' int64, 'I' uint32, 'S' dictionary-encoded string)
+COLUMNS = {
+    "timestamp": "q",
+    "task": "S",
+    "lines": "I",
+    "tokens": "I",
+    "cache": "S",  # "hit" / "miss" for cached delegations, "" otherwise
+    "cli": "S",  # Program that answered ("" when not recorded)
+    "max_lines": "I",  # Line limit the response was validated against (0 = unknown)
+    "latency_ms": "I",  # Wall-clock time to get the response (0 = not recorded)
+    "correlation_id": "S",  # Joins the row to its timing spans ("" when not traced)
+}
+
+# Timing spans (spans-YYYY-MM-DD.dcol, same block format): one row per stage
+SPAN_COLUMNS = {
+    "timestamp": "q",  # Stage start
+    "correlation_id": "S",
+    "stage": "S",  # prepare, cache, cli, validate, log, ...
+    "cli": "S",
+    "micros": "I",  # Stage duration in microseconds
+    "error": "S",  # Why the stage failed ("" on success)
+}
+
+DEFAULTS = {"q": 0, "I": 0, "S": ""}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class FileInfo(NamedTuple):
+    """Summary read from a file's last footer."""
+    rows: int
+    min_ts: int
+    max_ts: int
+
+
+class Footer(NamedTuple):
+    magic: bytes
+    rows: int
+    file_rows: int
+    schema_len: int
+    dict_len: int
+    block_min: int
+    block_max: int
+    file_min: int
+    file_max: int
+    block_len: int
+
+
+def to_epoch(timestamp: datetime) -> int:
+    """Encode a naive local datetime as wall-clock seconds."""
+    return calendar.timegm(timestamp.timetuple())
+
+
+def from_epoch(seconds: int) -> datetime:
+    """Decode wall-clock seconds back to a naive datetime."""
+    return EPOCH + timedelta(seconds=seconds)
+
+
+@lru_cache(maxsize=1024)
+def format_date(day: int) -> str:
+    """Render a day number (seconds // 86400) as YYYY-MM-DD."""
+    return from_epoch(day * 86400).strftime("%Y-%m-%d")
+
+
+# Lookup tables keep per-row timestamp formatting to two divmods and a concat
+_HOURS = [f" {h:02d}:" for h in range(24)]
+_MINUTES_SECONDS = [f"{m:02d}:{s:02d}" for m in range(60) for s in range(60)]
+
+
+def format_timestamp(seconds: int) -> str:
+    """Render wall-clock seconds in the CSV timestamp format."""
+    day, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    return format_date(day) + _HOURS[hours] + _MINUTES_SECONDS[rest]
+
+
+def find_metrics_dir(start: Path) -> Path:
+    """Locate .claude/metrics by walking up from start (start/.claude if none exists)."""
+    for directory in (start, *start.parents):
+        if (directory / ".claude").exists():
+            return directory / ".claude" / "metrics"
+    return start / ".claude" / "metrics"
+
+
+def day_file(metrics_dir: Path, date: str) -> Path:
+    """Path of the store file for a YYYY-MM-DD date."""
+    return metrics_dir / f"delegation-{date}{SUFFIX}"
+
+
+def span_file(metrics_dir: Path, date: str) -> Path:
+    """Path of the timing-span file (SPAN_COLUMNS) for a YYYY-MM-DD date."""
+    return metrics_dir / f"spans-{date}{SUFFIX}"
+
+
+def segment_file(metrics_dir: Path, month: str, prefix: str = "delegation") -> Path:
+    """Path of a compacted YYYY-MM segment ("delegation" rows or "spans")."""
+    return metrics_dir / f"{prefix}-{month}{SEGMENT_SUFFIX}"
+
+
+def read_manifest(metrics_dir: Path) -> dict:
+    """The segment manifest ({"segments": {month: entry}}; empty when nothing is compacted)."""
+    try:
+        manifest = json.loads((metrics_dir / MANIFEST_FILE).read_text())
+    except (FileNotFoundError, ValueError):
+        return {"version": MANIFEST_VERSION, "segments": {}}
+    return manifest
+
+
+def _typed_array(code: str, values) -> array.array:
+    arr = array.array("q" if code == "q" else "I", values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def _decode_array(code: str, data) -> array.array:
+    arr = array.array("q" if code == "q" else "I")
+    arr.frombytes(data)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr
+
+
+def encode_block(records: List[dict], previous: Optional[FileInfo] = None,
+                 columns: Dict[str, str] = COLUMNS) -> bytes:
+    """Encode records (dicts keyed by column name) as one block."""
+    columns = list(columns.items())
+    strings: Dict[str, int] = {}
+    parts = []
+
+    for name, code in columns:
+        values = [r.get(name, DEFAULTS[code]) for r in records]
+        if code == "S":
+            ids = []
+            for value in values:
+                value = str(value).replace("\n", " ")
+                if value not in strings:
+                    strings[value] = len(strings)
+                ids.append(strings[value])
+            values = ids
+        parts.append(_typed_array(code, values).tobytes())
+
+    dictionary = "\n".join(strings).encode("utf-8")
+    schema = ",".join(f"{name}:{code}" for name, code in columns).encode("ascii")
+
+    timestamps = [r["timestamp"] for r in records]
+    block_min, block_max = min(timestamps), max(timestamps)
+    file_rows, file_min, file_max = len(records), block_min, block_max
+    if previous is not None and previous.rows:
+        file_rows += previous.rows
+        file_min = min(file_min, previous.min_ts)
+        file_max = max(file_max, previous.max_ts)
+
+    body = b"".join(parts) + dictionary + schema
+    footer = BLOCK_FOOTER.pack(
+        MAGIC, len(records), file_rows, len(schema), len(dictionary),
+        block_min, block_max, file_min, file_max, len(body) + BLOCK_FOOTER.size,
+    )
+    return body + footer
+
+
+def _read_footer(data, end: int) -> Footer:
+    footer = Footer(*BLOCK_FOOTER.unpack_from(data, end - BLOCK_FOOTER.size))
+    if footer.magic != MAGIC or not BLOCK_FOOTER.size <= footer.block_len <= end:
+        raise ValueError(f"corrupt metrics block ending at offset {end}")
+    return footer
+
+
+def _block_chain(data, end: int) -> Optional[List[tuple]]:
+    """Walk footers back from end; None unless they chain exactly to offset 0."""
+    chain = []
+    while end > 0:
+        if end < BLOCK_FOOTER.size:
+            return None
+        try:
+            footer = _read_footer(data, end)
+        except ValueError:
+            return None
+        chain.append((end, footer))
+        end -= footer.block_len
+    return chain
+
+
+def valid_length(data) -> int:
+    """Length of the longest intact prefix of blocks (drops a torn tail)."""
+    if _block_chain(data, len(data)) is not None:
+        return len(data)
+
+    # Try each earlier footer position, newest first
+    magic_at = data.rfind(MAGIC, 0, len(data) - BLOCK_FOOTER.size)
+    while magic_at >= 0:
+        end = magic_at + BLOCK_FOOTER.size
+        if _block_chain(data, end) is not None:
+            return end
+        magic_at = data.rfind(MAGIC, 0, magic_at)
+    return 0
+
+
+def _tail_info(fd: int) -> Tuple[Optional[FileInfo], int, int]:
+    """Read (last footer info, intact length, actual size) from an open file."""
+    size = os.fstat(fd).st_size
+    if size >= BLOCK_FOOTER.size:
+        os.lseek(fd, size - BLOCK_FOOTER.size, os.SEEK_SET)
+        try:
+            footer = _read_footer(os.read(fd, BLOCK_FOOTER.size), BLOCK_FOOTER.size)
+            if footer.block_len <= size:
+                return FileInfo(footer.file_rows, footer.file_min, footer.file_max), size, size
+        except ValueError:
+            pass
+    elif size == 0:
+        return None, 0, 0
+
+    # Torn tail: fall back to a full scan for the last intact block
+    os.lseek(fd, 0, os.SEEK_SET)
+    data = b""
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    length = valid_length(data)
+    if not length:
+        return None, 0, size
+    footer = _read_footer(data, length)
+    return FileInfo(footer.file_rows, footer.file_min, footer.file_max), length, size
+
+
+def blocks_info(data) -> Optional[FileInfo]:
+    """Summary from the last intact footer of blocks held in memory (e.g. a decompressed segment)."""
+    length = valid_length(data)
+    if not length:
+        return None
+    footer = _read_footer(data, length)
+    return FileInfo(footer.file_rows, footer.file_min, footer.file_max)
+
+
+def file_info(path: Path) -> Optional[FileInfo]:
+    """Row count and time range from the last footer (one small read)."""
+    try:
+        fd = os.open(str(path), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except FileNotFoundError:
+        return None
+    try:
+        return _tail_info(fd)[0]
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def locked(metrics_dir: Path):
+    """Hold an exclusive advisory lock on a metrics directory."""
+    fd = os.open(str(metrics_dir / LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+def append_records(path: Path, records: List[dict], columns: Dict[str, str] = COLUMNS):
+    """
+    Append records to a store file as a single block.
+    Concurrent callers must hold locked() on the file's directory.
+    """
+    if not records:
+        return
+    flags = os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0)
+    fd = os.open(str(path), flags, 0o644)
+    try:
+        previous, length, size = _tail_info(fd)
+        if length != size:
+            os.ftruncate(fd, length)  # Drop a block torn by an earlier crash
+
+        block = memoryview(encode_block(records, previous, columns))
+        # One write for the whole block; loop only if the OS writes short
+        while block:
+            written = os.write(fd, block)
+            block = block[written:]
+    finally:
+        os.close(fd)
+
+
+def _decode_block(data, end: int, footer: Footer, expected: Dict[str, str] = COLUMNS) -> Dict[str, list]:
+    start = end - footer.block_len
+    schema_start = end - BLOCK_FOOTER.size - footer.schema_len
+    dict_start = schema_start - footer.dict_len
+
+    schema = bytes(data[schema_start:schema_start + footer.schema_len]).decode("ascii")
+    dictionary = bytes(data[dict_start:schema_start]).decode("utf-8").split("\n")
+
+    columns = {}
+    offset = start
+    for entry in schema.split(","):
+        name, code = entry.split(":")
+        width = 8 if code == "q" else 4
+        size = width * footer.rows
+        values = _decode_array(code, data[offset:offset + size])
+        offset += size
+        columns[name] = [dictionary[i] for i in values] if code == "S" else values
+
+    # Columns added after this block was written read as defaults
+    for name, code in expected.items():
+        if name not in columns:
+            columns[name] = [DEFAULTS[code]] * footer.rows
+    return columns
+
+
+def _blocks(data, view: memoryview, start_ts: int = None, end_ts: int = None,
+            columns: Dict[str, str] = COLUMNS) -> Iterator[Dict[str, list]]:
+    footers = _block_chain(view, len(view))
+    if footers is None:
+        footers = _block_chain(view, valid_length(data))
+
+    for end, footer in reversed(footers):
+        if start_ts is not None and footer.block_max < start_ts:
+            continue
+        if end_ts is not None and footer.block_min > end_ts:
+            continue
+        yield _decode_block(view, end, footer, columns)
+
+
+@lru_cache(maxsize=2)
+def _segment_data(path: str, size: int, mtime_ns: int) -> bytes:
+    # Keyed by size and mtime so a rewritten segment is decompressed again
+    with open(path, "rb") as f:
+        return gzip.decompress(f.read())
+
+
+def segment_data(path: Path) -> bytes:
+    """Decompressed blocks of a segment (the last two read are kept in memory)."""
+    st = path.stat()
+    return _segment_data(str(path), st.st_size, st.st_mtime_ns)
+
+
+def committed_length(path: Path) -> Optional[int]:
+    """Uncompressed length of a segment its manifest entry vouches for (None: no record, all of it)."""
+    name = path.name[:-len(SEGMENT_SUFFIX)]
+    prefix, month = name[:-8], name[-7:]
+    entry = read_manifest(path.parent)["segments"].get(month)
+    if entry is None:
+        return 0
+    return entry.get("committed", {}).get(prefix)
+
+
+def read_blocks(path: Path, start_ts: int = None, end_ts: int = None,
+                columns: Dict[str, str] = COLUMNS) -> Iterator[Dict[str, list]]:
+    """
+    Yield column dicts per block, in file order, memory-mapping the file.
+    Blocks entirely outside [start_ts, end_ts] are skipped without decoding.
+    """
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    if path.name.endswith(SEGMENT_SUFFIX):
+        data = segment_data(path)
+        committed = committed_length(path)
+        if committed is not None and committed < len(data):
+            data = data[:committed]  # Left over from an interrupted compaction
+        yield from _blocks(data, memoryview(data), start_ts, end_ts, columns)
+        return
+
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            yield from _blocks(mm, view, start_ts, end_ts, columns)
+        finally:
+            view.release()
+
+
+def block_rows(block: Dict[str, list]) -> Iterator[dict]:
+    """One dict per row of a decoded block."""
+    names = list(block)
+    for values in zip(*(block[n] for n in names)):
+        yield dict(zip(names, values))
+
+
+def iter_rows(path: Path, start_ts: int = None, end_ts: int = None,
+              columns: Dict[str, str] = COLUMNS) -> Iterator[dict]:
+    """Yield one dict per row within the optional time range."""
+    for block in read_blocks(path, start_ts, end_ts, columns):
+        for row in block_rows(block):
+            if start_ts is not None and row["timestamp"] < start_ts:
+                continue
+            if end_ts is not None and row["timestamp"] > end_ts:
+                continue
+            yield row
+
+
+def _absorbed(manifest: dict) -> Dict[str, int]:
+    """Daily files whose leading rows a compaction already copied into a segment (interrupted run)."""
+    return {name: rows for entry in manifest["segments"].values()
+            for name, rows in entry.get("pending", {}).items()}
+
+
+def raw_files(metrics_dir: Path) -> List[Path]:
+    """Every store file holding raw rows: segments (oldest first), then daily files."""
+    manifest = read_manifest(metrics_dir)
+    absorbed = _absorbed(manifest)
+    segments = [segment_file(metrics_dir, month) for month, entry in sorted(manifest["segments"].items())
+                if entry["raw"]]
+    return segments + [path for path in sorted(metrics_dir.glob(f"delegation-*{SUFFIX}"))
+                       if path.name not in absorbed]
+
+
+def store_files(metrics_dir: Path, start_ts: int = None, end_ts: int = None) -> List[Path]:
+    """List store files overlapping [start_ts, end_ts] using the manifest and footers only."""
+    manifest = read_manifest(metrics_dir)
+    absorbed = _absorbed(manifest)
+    selected = []
+    for month, entry in sorted(manifest["segments"].items()):
+        if not entry["raw"]:
+            continue
+        if start_ts is not None and entry["max_ts"] < start_ts:
+            continue
+        if end_ts is not None and entry["min_ts"] > end_ts:
+            continue
+        selected.append(segment_file(metrics_dir, month))
+
+    for path in sorted(metrics_dir.glob(f"delegation-*{SUFFIX}")):
+        # Daily files only hold their own day, so most can be skipped by name
+        day = path.name[len("delegation-"):-len(SUFFIX)]
+        if start_ts is not None and len(day) == 10 and day < format_date(start_ts // 86400):
+            continue
+        if path.name in absorbed:
+            continue
+        info = file_info(path)
+        if info is None:
+            continue
+        if start_ts is not None and info.max_ts < start_ts:
+            continue
+        if end_ts is not None and info.min_ts > end_ts:
+            continue
+        selected.append(path)
+    return selected
+
+
+def day_blocks(metrics_dir: Path, date: str, prefix: str = "delegation",
+               columns: Dict[str, str] = COLUMNS) -> Iterator[Dict[str, list]]:
+    """Blocks of one day's raw rows ("delegation" or "spans"), from its segment and its daily file."""
+    manifest = read_manifest(metrics_dir)
+    entry = manifest["segments"].get(date[:7])
+    if entry is not None and entry["raw"]:
+        start = to_epoch(datetime.strptime(date, "%Y-%m-%d"))
+        # Segments hold one block per day, so the block ranges select the day exactly
+        yield from read_blocks(segment_file(metrics_dir, date[:7], prefix), start, start + 86399, columns)
+
+    path = metrics_dir / f"{prefix}-{date}{SUFFIX}"
+    skip = _absorbed(manifest).get(path.name, 0)
+    for block in read_blocks(path, columns=columns):
+        rows = len(block["timestamp"])
+        if skip >= rows:
+            skip -= rows
+            continue
+        if skip:
+            block = {name: values[skip:] for name, values in block.items()}
+            skip = 0
+        yield block
+
+
+def parse_csv_row(line: str) -> Optional[dict]:
+    """Parse a legacy CSV row (timestamp,task,lines,tokens) into a record."""
+    parts = line.strip().split(',')
+    if len(parts) != 4:
+        return None
+    timestamp, task, lines, tokens = parts
+    try:
+        return {
+            "timestamp": to_epoch(datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")),
+            "task": task,
+            "lines": int(lines),
+            "tokens": int(tokens),
+        }
+    except ValueError:
+        return None
+
+
+def migrate_csv(csv_file: Path) -> int:
+    """
+    Convert one legacy daily CSV into the store as a single block.
+    The CSV is renamed to *.csv.migrated so re-running is a no-op.
+    """
+    with csv_file.open("r") as f:
+        next(f, None)  # Skip header
+        records = [r for r in (parse_csv_row(line) for line in f) if r]
+
+    records.sort(key=lambda r: r["timestamp"])
+    date = csv_file.stem[len("delegation-"):]
+    append_records(day_file(csv_file.parent, date), records)
+    csv_file.rename(csv_file.with_name(csv_file.name + ".migrated"))
+    return len(records)
+
+
+def migrate_directory(metrics_dir: Path) -> int:
+    """Migrate every legacy CSV in a metrics directory."""
+    total = 0
+    for csv_file in sorted(metrics_dir.glob("delegation-*.csv")):
+        rows = migrate_csv(csv_file)
+        total += rows
+        print(f"✅ {csv_file.name}: {rows} rows")
+    return total
+
+
+def main():
+    """Main execution."""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('migrate', 'info'):
+        print(__doc__)
+        sys.exit(1)
+
+    metrics_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path.cwd() / ".claude" / "metrics"
+    if not metrics_dir.exists():
+        print(f"❌ Error: metrics directory not found: {metrics_dir}")
+        sys.exit(1)
+
+    if sys.argv[1] == 'migrate':
+        total = migrate_directory(metrics_dir)
+        print(f"\n📦 Migrated {total} rows into {SUFFIX} files")
+    else:
+        for month, entry in sorted(read_manifest(metrics_dir)["segments"].items()):
+            state = f"{entry['bytes']:,} bytes" if entry["raw"] else "rollups only"
+            print(f"   {segment_file(metrics_dir, month).name}: {entry['rows']:5d} rows, {state}")
+        for path in sorted(metrics_dir.glob(f"delegation-*{SUFFIX}")):
+            info = file_info(path)
+            if info is None:
+                continue
+            print(f"   {path.name}: {info.rows:5d} rows, "
+                  f"{format_timestamp(info.min_ts)} → {format_timestamp(info.max_ts)}, "
+                  f"{path.stat().st_size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Concurrency-safe metrics writes for delegation hooks
+Appends records to the columnar store and folds them into daily rollups
+under one directory lock, so parallel delegations never interleave rows or
+lose rollup updates
+
+The token-budget ledger (see token_budget) is updated in the same locked
+section, so budget checks always see every committed delegation. Timing
+spans (see delegation_trace) go to the day's spans file in that section too.
+With DELEGATE_METRICS_BACKEND=sqlite the records are also mirrored into the
+project's SQLite database (see metrics_sqlite), one transaction per commit.
+
+Long-lived callers (the daemon, batch runs) can use MetricsBuffer to group
+many records into one locked append per flush interval.
+"""
+
+import atexit
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import metrics_rollup
+import metrics_store
+import token_budget
+
+
+def _by_date(records: List[dict]) -> Dict[str, List[dict]]:
+    by_date: Dict[str, List[dict]] = {}
+    for record in records:
+        date = metrics_store.format_date(record["timestamp"] // 86400)
+        by_date.setdefault(date, []).append(record)
+    return by_date
+
+
+def commit(metrics_dir: Path, records: List[dict], spans: List[dict] = ()):
+    """Durably append records and spans (one block per day and file) and update rollups."""
+    if not records and not spans:
+        return
+    metrics_dir.mkdir(parents=True, exist_ok=True)
+
+    with metrics_store.locked(metrics_dir):
+        appended = {}
+        for date, day_records in _by_date(records).items():
+            path = metrics_store.day_file(metrics_dir, date)
+            metrics_store.append_records(path, day_records)
+            appended[path] = day_records
+        for date, day_spans in _by_date(spans).items():
+            metrics_store.append_records(metrics_store.span_file(metrics_dir, date), day_spans,
+                                         metrics_store.SPAN_COLUMNS)
+        metrics_rollup.update_rollups(metrics_dir, records, spans)
+        if records:
+            token_budget.update_ledger(metrics_dir, records)
+        if appended and os.environ.get("DELEGATE_METRICS_BACKEND") == "sqlite":
+            import metrics_sqlite  # Only loaded when the backend is enabled
+            metrics_sqlite.mirror(metrics_dir, appended)
+
+
+class MetricsBuffer:
+    """
+    Group-commit buffer: records are flushed together when max_rows is
+    reached or flush_interval seconds have passed, and on exit.
+    """
+
+    def __init__(self, metrics_dir: Path, flush_interval: float = 1.0, max_rows: int = 256):
+        self.metrics_dir = metrics_dir
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self._pending: List[dict] = []
+        self._spans: List[dict] = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, record: dict):
+        with self._lock:
+            self._pending.append(record)
+            full = len(self._pending) >= self.max_rows
+        if full:
+            self.flush()
+
+    def add_spans(self, spans: List[dict]):
+        with self._lock:
+            self._spans.extend(spans)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            spans, self._spans = self._spans, []
+        commit(self.metrics_dir, pending, spans)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        if not self._closed.is_set():
+            self._closed.set()
+            self._thread.join()
+            self.flush()
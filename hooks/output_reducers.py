@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Local pre-distillation of verbose command output
+Runs read-only commands like `npm ls`, `git log`, `pip freeze` and `find`
+locally and compacts their output, so the delegation prompt carries a small
+summary instead of asking Gemini to read thousands of lines
+
+Each reducer pulls errors/warnings to the top and then compacts the rest:
+    npm_ls      repeated dependency subtrees shown once, deduped lines dropped
+    git_log     one line per commit, identical subjects collapsed with counts
+    pip_freeze  pins packed onto a few lines, editable/VCS installs listed
+    find        paths grouped per directory, vendor/build trees counted only
+
+Reducers are picked by task_classifier (the "reducer" group), the same
+detection that flags these commands as verbose. A command is only run when
+its argv fits the reducer's allowlist (see READ_ONLY): find actions such as
+-delete/-exec/-fprint, output-file options and unknown flags are refused and
+the command is left to Gemini.
+
+Usage:
+    python output_reducers.py "<command>"   # run, reduce and print stats
+"""
+
+import re
+import sys
+import time
+import shlex
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Pattern
+
+RUN_TIMEOUT = 15.0
+MAX_LINES = 120
+MAX_ISSUES = 20
+
+# Commands are run without a shell; anything needing one is not reduced
+_SHELL_CHARS = set("|&;<>`$(){}\n")
+
+
+# Accepted argv per reducer: the fixed command, then options (with how many
+# values each takes) and whether bare operands (paths, revisions, packages)
+# may follow. Anything else, e.g. `git log --output=FILE`, is not run.
+class ReadOnly(NamedTuple):
+    """Argv shape a reducer will run locally."""
+    command: tuple
+    options: Dict[str, int]
+    prefixed: tuple = ()  # Options given as --name=value
+
+
+READ_ONLY: Dict[str, ReadOnly] = {
+    "npm_ls": ReadOnly(("npm", "ls"), {
+        "--all": 0, "-a": 0, "--depth": 1, "--long": 0, "-l": 0, "--parseable": 0, "-p": 0, "--json": 0,
+        "--prod": 0, "--production": 0, "--dev": 0, "--global": 0, "-g": 0, "--link": 0,
+    }, ("--depth=", "--omit=", "--include=")),
+    "git_log": ReadOnly(("git", "log"), {
+        "--oneline": 0, "--graph": 0, "--all": 0, "--decorate": 0, "--no-decorate": 0, "--no-merges": 0,
+        "--merges": 0, "--first-parent": 0, "--reverse": 0, "--stat": 0, "--shortstat": 0, "--name-only": 0,
+        "--name-status": 0, "--abbrev-commit": 0, "--follow": 0, "-n": 1, "--": 0,
+    }, ("--format=", "--pretty=", "--since=", "--until=", "--after=", "--before=", "--author=", "--grep=",
+        "--max-count=", "--date=", "--decorate=", "-n")),
+    "pip_freeze": ReadOnly(("pip", "freeze"), {
+        "--all": 0, "-l": 0, "--local": 0, "--user": 0, "--exclude-editable": 0, "--exclude": 1,
+    }, ("--exclude=",)),
+    "find": ReadOnly(("find",), {
+        "-L": 0, "-H": 0, "-P": 0, "-name": 1, "-iname": 1, "-path": 1, "-ipath": 1, "-wholename": 1,
+        "-regex": 1, "-iregex": 1, "-type": 1, "-maxdepth": 1, "-mindepth": 1, "-size": 1, "-mtime": 1,
+        "-mmin": 1, "-newer": 1, "-user": 1, "-group": 1, "-perm": 1, "-empty": 0, "-not": 0, "!": 0,
+        "-o": 0, "-or": 0, "-a": 0, "-and": 0, "-prune": 0, "-print": 0, "-print0": 0, "-printf": 1,
+    }),
+}
+
+
+def is_read_only(name: str, argv: List[str]) -> bool:
+    """Whether argv fits the allowlist of reducer name (anything unknown is refused)."""
+    shape = READ_ONLY.get(name)
+    if shape is None or tuple(argv[:len(shape.command)]) != shape.command:
+        return False
+    args = argv[len(shape.command):]
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in shape.options:
+            i += 1 + shape.options[arg]
+            if i > len(args):
+                return False
+            continue
+        if arg.startswith("-") or arg == "!":
+            if not any(arg.startswith(prefix) and len(arg) > len(prefix) for prefix in shape.prefixed):
+                return False
+        i += 1
+    return True
+
+
+class Reducer(NamedTuple):
+    """Compacts a command's output lines; notable lines are listed first."""
+    reduce: Callable[[List[str]], List[str]]
+    notable: Pattern
+
+
+class Reduction(NamedTuple):
+    """Reduced output of one command run, with measurements."""
+    command: str
+    text: str
+    exit_code: int
+    raw_bytes: int
+    reduced_bytes: int
+    run_seconds: float
+    reduce_seconds: float
+
+
+def collapse_repeats(entries: List[tuple]) -> List[str]:
+    """
+    Collapse (key, line) entries with identical keys into the first line,
+    annotated with the repeat count, keeping first-seen order.
+    """
+    counts: Dict[str, int] = {}
+    first: Dict[str, str] = {}
+    for key, line in entries:
+        if key not in counts:
+            counts[key] = 0
+            first[key] = line
+        counts[key] += 1
+    return [first[key] + (f"  (x{count})" if count > 1 else "") for key, count in counts.items()]
+
+
+_TREE_CHARS = set("│├└─┬┼ `|+-\\")
+
+
+def _split_tree_line(line: str) -> tuple:
+    """(indent, label) for an `npm ls` tree line."""
+    indent = 0
+    while indent < len(line) and line[indent] in _TREE_CHARS:
+        indent += 1
+    return indent, line[indent:]
+
+
+def reduce_npm_ls(lines: List[str]) -> List[str]:
+    """Show each package@version subtree once and summarize duplicates."""
+    out = []
+    seen = set()
+    versions: Dict[str, set] = {}
+    deduped = repeated = 0
+    skip_indent = None
+
+    parsed = [_split_tree_line(line.rstrip()) for line in lines if line.strip()]
+    for i, (indent, label) in enumerate(parsed):
+        if skip_indent is not None:
+            if indent > skip_indent:
+                continue
+            skip_indent = None
+        if label.endswith(" deduped"):
+            deduped += 1
+            continue
+
+        package = label.split(" ")[0]
+        name, _, version = package.rpartition("@")
+        if name and indent:
+            versions.setdefault(name, set()).add(version)
+
+        has_children = i + 1 < len(parsed) and parsed[i + 1][0] > indent
+        line = " " * indent + label
+        if has_children and package in seen:
+            out.append(f"{line}  [subtree shown above]")
+            skip_indent = indent
+            repeated += 1
+            continue
+        seen.add(package)
+        out.append(line)
+
+    conflicts = sorted(name for name, found in versions.items() if len(found) > 1)
+    summary = [f"{len(versions)} packages, {repeated} repeated subtrees collapsed, {deduped} deduped lines dropped"]
+    if conflicts:
+        summary.append("Multiple versions: " + ", ".join(
+            f"{name} ({', '.join(sorted(versions[name]))})" for name in conflicts[:15]
+        ))
+    return summary + out
+
+
+_COMMIT = re.compile(r"^commit ([0-9a-f]{7,40})")
+_ONELINE = re.compile(r"^(?:[*|/\\ ]+)?([0-9a-f]{7,40}) (.*)$")
+
+
+def reduce_git_log(lines: List[str]) -> List[str]:
+    """One line per commit; identical subjects collapsed with counts."""
+    commits = []  # (sha, author, date, subject)
+    current = None
+    for line in lines:
+        match = _COMMIT.match(line)
+        if match:
+            current = [match.group(1)[:7], "", "", ""]
+            commits.append(current)
+        elif current is None:
+            oneline = _ONELINE.match(line)
+            if oneline:
+                commits.append([oneline.group(1)[:7], "", "", oneline.group(2).strip()])
+        elif line.startswith("Author:"):
+            current[1] = line[len("Author:"):].split("<")[0].strip()
+        elif line.startswith("Date:"):
+            current[2] = line[len("Date:"):].strip()
+        elif line.strip() and not current[3] and line.startswith(" "):
+            current[3] = line.strip()
+
+    authors = {author for _, author, _, _ in commits if author}
+    summary = [f"{len(commits)} commits" + (f", {len(authors)} authors" if authors else "")]
+    if commits and commits[0][2]:
+        summary.append(f"Range: {commits[-1][2]} .. {commits[0][2]}")
+
+    entries = []
+    for sha, author, _, subject in commits:
+        line = f"{sha} {subject}" + (f" ({author})" if author else "")
+        entries.append((subject.lower(), line))
+    return summary + collapse_repeats(entries)
+
+
+def reduce_pip_freeze(lines: List[str]) -> List[str]:
+    """Pack pins onto a few lines; list editable, VCS and local installs."""
+    pins, special = [], []
+    names = set()
+    duplicates = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "==" in line and " @ " not in line and not line.startswith("-e"):
+            name = line.split("==")[0].lower()
+            if name in names:
+                duplicates.append(line)
+            names.add(name)
+            pins.append(line)
+        else:
+            special.append(line)
+
+    out = [f"{len(pins)} pinned packages, {len(special)} editable/VCS/local"]
+    if duplicates:
+        out.append("Duplicate pins: " + ", ".join(duplicates))
+    out.extend(special)
+
+    row = ""
+    for pin in sorted(pins, key=str.lower):
+        if row and len(row) + len(pin) + 1 > 100:
+            out.append(row)
+            row = ""
+        row = f"{row} {pin}" if row else pin
+    if row:
+        out.append(row)
+    return out
+
+
+VENDOR_DIRS = {"node_modules", ".git", "__pycache__", ".venv", "venv", "dist", "build", ".tox", ".mypy_cache"}
+
+
+def reduce_find(lines: List[str]) -> List[str]:
+    """Group paths by directory; count vendor/build trees without listing them."""
+    groups: Dict[str, List[str]] = {}
+    vendor: Dict[str, int] = {}
+    for line in lines:
+        path = line.strip()
+        if not path:
+            continue
+        parts = path.split("/")
+        hidden = next((i for i, part in enumerate(parts[:-1]) if part in VENDOR_DIRS), None)
+        if hidden is not None:
+            root = "/".join(parts[:hidden + 1]) + "/"
+            vendor[root] = vendor.get(root, 0) + 1
+            continue
+        directory, _, name = path.rpartition("/")
+        groups.setdefault(directory + "/" if directory else "./", []).append(name)
+
+    total = sum(len(names) for names in groups.values()) + sum(vendor.values())
+    out = [f"{total} paths in {len(groups)} directories"]
+    for directory, names in groups.items():
+        extensions: Dict[str, int] = {}
+        for name in names:
+            ext = Path(name).suffix or "(none)"
+            extensions[ext] = extensions.get(ext, 0) + 1
+        shown = ", ".join(names[:3]) + (f", +{len(names) - 3} more" if len(names) > 3 else "")
+        kinds = " ".join(f"{ext}:{count}" for ext, count in sorted(extensions.items(), key=lambda e: -e[1])[:4])
+        out.append(f"{directory} {len(names)} [{kinds}] {shown}")
+    for root, count in sorted(vendor.items()):
+        out.append(f"{root} {count} entries (not listed)")
+    return out
+
+
+REDUCERS: Dict[str, Reducer] = {
+    "npm_ls": Reducer(reduce_npm_ls, re.compile(r"ERR!|WARN|UNMET|invalid|extraneous|missing", re.IGNORECASE)),
+    "git_log": Reducer(reduce_git_log, re.compile(r"^(?:fatal|error|warning):", re.IGNORECASE)),
+    "pip_freeze": Reducer(reduce_pip_freeze, re.compile(r"^(?:WARNING|ERROR)\b")),
+    "find": Reducer(reduce_find, re.compile(r"Permission denied|No such file|^find:")),
+}
+
+
+def reduce_output(name: str, output: str, max_lines: int = MAX_LINES) -> str:
+    """Errors/warnings first, then the reducer's compacted body (capped)."""
+    reducer = REDUCERS[name]
+    lines = output.splitlines()
+
+    issues, normal = [], []
+    for line in lines:
+        (issues if reducer.notable.search(line) else normal).append(line)
+
+    out = []
+    if issues:
+        unique = list(dict.fromkeys(line.strip() for line in issues))
+        out.append(f"Errors/warnings ({len(unique)}):")
+        out.extend(f"  {line}" for line in unique[:MAX_ISSUES])
+        if len(unique) > MAX_ISSUES:
+            out.append(f"  ... {len(unique) - MAX_ISSUES} more")
+
+    # npm ls marks problems inline on tree lines, so keep those in the tree too
+    body = reducer.reduce(lines if name == "npm_ls" else normal)
+    if len(body) > max_lines:
+        body = body[:max_lines] + [f"... {len(body) - max_lines} more lines"]
+    return "\n".join(out + body)
+
+
+def run_command(command: str, cwd: Path = None, timeout: float = RUN_TIMEOUT) -> Optional[tuple]:
+    """
+    Run a command without a shell, returning (output, exit_code, seconds),
+    or None if it needs a shell, cannot start or times out.
+    """
+    if _SHELL_CHARS & set(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(
+            argv, cwd=str(cwd) if cwd else None, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    output = result.stdout.decode("utf-8", errors="replace")
+    return output, result.returncode, time.perf_counter() - start
+
+
+def run_and_reduce(name: str, command: str, cwd: Path = None,
+                   timeout: float = RUN_TIMEOUT) -> Optional[Reduction]:
+    """Run command (if it fits the reducer's read-only allowlist) and reduce its output."""
+    if name not in REDUCERS:
+        return None
+    try:
+        if not is_read_only(name, shlex.split(command)):
+            return None
+    except ValueError:
+        return None
+    ran = run_command(command, cwd, timeout)
+    if ran is None:
+        return None
+    output, exit_code, run_seconds = ran
+
+    start = time.perf_counter()
+    text = reduce_output(name, output)
+    if len(text) >= len(output):
+        text = output.rstrip()  # Already compact: ship it as is
+    reduce_seconds = time.perf_counter() - start
+    return Reduction(
+        command=command,
+        text=text,
+        exit_code=exit_code,
+        raw_bytes=len(output.encode("utf-8")),
+        reduced_bytes=len(text.encode("utf-8")),
+        run_seconds=run_seconds,
+        reduce_seconds=reduce_seconds,
+    )
+
+
+def main():
+    """Main execution."""
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print(__doc__)
+        sys.exit(1)
+
+    from task_classifier import classify, default_classifier
+
+    command = sys.argv[1]
+    name = classify(command, default_classifier()).reducer
+    if name is None:
+        print(f"No reducer for: {command}")
+        sys.exit(1)
+
+    reduction = run_and_reduce(name, command, Path.cwd())
+    if reduction is None:
+        print(f"Could not run: {command}")
+        sys.exit(1)
+
+    print(reduction.text)
+    print(
+        f"\n[{name}] {reduction.raw_bytes:,} -> {reduction.reduced_bytes:,} bytes, "
+        f"run {reduction.run_seconds * 1000:.0f} ms, reduce {reduction.reduce_seconds * 1000:.1f} ms",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
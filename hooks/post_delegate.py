@@ -5,17 +5,58 @@ Validates Gemini's response quality and logs metrics
 
 Usage:
     python post-delegate.py <response> [max_lines] [task_context]
+    python post-delegate.py --stdin [max_lines] [task_context] [--fail-fast]
+    python post-delegate.py --file <path> [max_lines] [task_context] [--fail-fast]
+    
+Add --json to any form to print one JSON report (counts, warnings, action
+items with categories and line numbers, tips) instead of text, and
+--cache hit|miss to record whether the response came from the response cache.
+--cli NAME records which CLI answered (default gemini) for the token budget,
+--latency SECONDS how long the delegation took. --trace ID and --spans
+stage=ms,... carry the runner's timing spans (see delegation_trace);
+validation and logging are timed here and stored with them.
     
 Example:
     python post-delegate.py "Response text here" 10 "dependency-analysis"
+    gemini -p "$PROMPT" | python post-delegate.py --stdin 10 "dependency-analysis"
+
+--stdin/--file validate the response in one streaming pass with bounded
+memory. --fail-fast stops reading as soon as max_lines is exceeded (the
+logged counts are then lower bounds).
 """ 
 
+import io
 import sys
-import re
+import json
 from datetime import datetime
 from pathlib import Path
 from typing import Tuple
 
+import action_items
+import metrics_rollup
+from delegation_trace import Trace
+import metrics_store
+import metrics_writer
+import token_counter
+
+# Usage tip thresholds (delegations today / this hour / same task today)
+DAILY_TIP_THRESHOLD = 20
+HOURLY_TIP_THRESHOLD = 10
+REPEAT_TIP_THRESHOLD = 5
+
+# Characters read per chunk in streaming mode
+STREAM_CHUNK = 1 << 16
+
+# Group-commit buffers per metrics directory (long-lived processes only)
+GROUP_COMMIT_INTERVAL = None
+_buffers = {}
+
+
+def enable_group_commit(interval: float):
+    """Buffer log_metrics writes and flush them every interval seconds."""
+    global GROUP_COMMIT_INTERVAL
+    GROUP_COMMIT_INTERVAL = interval
+
 
 def count_lines(text: str) -> int:
     """Count actual lines in response."""
@@ -23,8 +64,8 @@ def count_lines(text: str) -> int:
 
 
 def estimate_tokens(text: str) -> int:
-    """Estimate token count (rough: 1 token ≈ 4 characters)."""
-    return len(text) // 4
+    """Estimate token count with the configured counter (see token_counter)."""
+    return token_counter.count_tokens(text)
 
 
 def validate_response(response: str, max_lines: int) -> Tuple[bool, list]:
@@ -32,9 +73,19 @@ def validate_response(response: str, max_lines: int) -> Tuple[bool, list]:
     Validate response quality.
     Returns (is_valid, warnings)
     """
-    warnings = []
     actual_lines = count_lines(response)
     token_estimate = estimate_tokens(response)
+    is_valid, warnings = validate_counts(actual_lines, token_estimate, max_lines)
+    
+    # Success message if no warnings
+    if is_valid:
+        print(f"✅ Response quality: {actual_lines} lines, ~{token_estimate} tokens")
+    return is_valid, warnings
+
+
+def validate_counts(actual_lines: int, token_estimate: int, max_lines: int) -> Tuple[bool, list]:
+    """Validate already-measured line and token counts. Returns (is_valid, warnings)"""
+    warnings = []
     
     # Check if response is within limits
     if actual_lines > max_lines:
@@ -53,115 +104,272 @@ def validate_response(response: str, max_lines: int) -> Tuple[bool, list]:
         warnings.append(f"⚠️  WARNING: Response uses ~{token_estimate} tokens (>250)")
         warnings.append("   Suggestion: Refine prompt compression directives")
     
-    # Success message if no warnings
-    if not warnings:
-        print(f"✅ Response quality: {actual_lines} lines, ~{token_estimate} tokens")
-        return True, []
-    
-    return False, warnings
+    return not warnings, warnings
 
 
-def log_metrics(task: str, lines: int, tokens: int, metrics_dir: Path):
-    """Log metrics for analysis."""
-    metrics_dir.mkdir(parents=True, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    date = datetime.now().strftime("%Y-%m-%d")
-    log_file = metrics_dir / f"delegation-{date}.csv"
+def log_metrics(task: str, lines: int, tokens: int, metrics_dir: Path, cache: str = "",
+                cli: str = "", max_lines: int = 0, latency_ms: int = 0, correlation_id: str = ""):
+    """
+    Log metrics for analysis (cache is "hit"/"miss" for cached runs, cli the
+    answering program, max_lines the limit the response was validated against,
+    latency_ms the delegation's wall-clock time when known, correlation_id
+    the id of its timing spans).
+    """
+    record = {
+        "timestamp": metrics_store.to_epoch(datetime.now()),
+        "task": task,
+        "lines": lines,
+        "tokens": tokens,
+        "cache": cache,
+        "cli": cli,
+        "max_lines": max_lines,
+        "latency_ms": latency_ms,
+        "correlation_id": correlation_id,
+    }
     
-    # Create header if file doesn't exist
-    if not log_file.exists():
-        log_file.write_text("timestamp,task,lines,tokens\n")
+    if GROUP_COMMIT_INTERVAL is not None:
+        if metrics_dir not in _buffers:
+            _buffers[metrics_dir] = metrics_writer.MetricsBuffer(metrics_dir, GROUP_COMMIT_INTERVAL)
+        _buffers[metrics_dir].add(record)
+        return
     
-    # Append metrics
-    with log_file.open('a') as f:
-        f.write(f"{timestamp},{task},{lines},{tokens}\n")
+    # Locked single-write append plus daily rollup update
+    metrics_writer.commit(metrics_dir, [record])
 
 
-def extract_action_items(response: str) -> list:
-    """Extract actionable items from response."""
-    patterns = [
-        r'CRITICAL:?\s*(.+)',
-        r'TODO:?\s*(.+)',
-        r'FIXME:?\s*(.+)',
-        r'Action:?\s*(.+)',
-        r'Recommend(?:ed)?:?\s*(.+)',
-        r'Next step:?\s*(.+)',
-    ]
-    
-    action_items = []
-    for pattern in patterns:
-        matches = re.finditer(pattern, response, re.IGNORECASE | re.MULTILINE)
-        action_items.extend([m.group(0) for m in matches])
-    
-    return action_items
+def log_spans(trace: Trace, metrics_dir: Path):
+    """Store a delegation's timing spans (buffered like log_metrics when group commit is on)."""
+    if GROUP_COMMIT_INTERVAL is not None:
+        if metrics_dir not in _buffers:
+            _buffers[metrics_dir] = metrics_writer.MetricsBuffer(metrics_dir, GROUP_COMMIT_INTERVAL)
+        _buffers[metrics_dir].add_spans(trace.records())
+        return
+    metrics_writer.commit(metrics_dir, [], trace.records())
+
+
+def extract_action_items(response: str, extractor: action_items.ActionItemExtractor = None) -> list:
+    """Extract actionable items from response (unique, in document order)."""
+    return [item.text for item in action_items.extract(response, extractor)]
+
+
+class ResponseStream:
+    """
+    Single-pass line, token and action-item counts over response chunks.
+    Work happens on complete lines, so memory is bounded by the longest line.
+    """
+
+    def __init__(self, max_lines: int = None, extractor: action_items.ActionItemExtractor = None):
+        self.max_lines = max_lines
+        self.lines = 0
+        self.exceeded = False
+        self._tokens = token_counter.TokenTally()
+        self._items = action_items.ActionItemCollector(extractor)
+        self._pending = ""
+
+    def feed(self, chunk: str) -> bool:
+        """Add a chunk. Returns False once more than max_lines were seen."""
+        text = self._pending + chunk
+        end = text.rfind("\n") + 1
+        if end:
+            self._pending = text[end:]
+            self._scan(text[:end])
+        else:
+            self._pending = text
+        return not self.exceeded
+
+    def _scan(self, text: str):
+        lines = count_lines(text)
+        if self.max_lines is not None and self.lines + lines > self.max_lines:
+            text = self._through_line(text, self.max_lines + 1 - self.lines)
+            lines = self.max_lines + 1 - self.lines
+            self.exceeded = True
+        self.lines += lines
+        self._tokens.feed(text)
+        self._items.feed(text)
+
+    @staticmethod
+    def _through_line(text: str, count: int) -> str:
+        """Prefix of text ending with its count-th non-empty line."""
+        end = 0
+        for line in text.split('\n'):
+            end += len(line) + 1
+            if line.strip():
+                count -= 1
+                if not count:
+                    break
+        return text[:end]
+
+    def close(self):
+        if self._pending and not self.exceeded:
+            self._scan(self._pending)
+            self._pending = ""
+
+    @property
+    def tokens(self) -> int:
+        return self._tokens.total()
+
+    @property
+    def action_items(self) -> list:
+        return self._items.items
+
+
+def scan_response(chunks, max_lines: int = None,
+                  extractor: action_items.ActionItemExtractor = None) -> ResponseStream:
+    """Scan chunks, stopping early once max_lines is exceeded (if given)."""
+    stream = ResponseStream(max_lines, extractor)
+    for chunk in chunks:
+        if not stream.feed(chunk):
+            break
+    stream.close()
+    return stream
+
+
+def read_chunks(source, size: int = STREAM_CHUNK):
+    """Yield text chunks from a file object until EOF."""
+    while True:
+        chunk = source.read(size)
+        if not chunk:
+            return
+        yield chunk
 
 
 def check_daily_usage(metrics_dir: Path) -> int:
     """Check how many delegations were made today."""
     date = datetime.now().strftime("%Y-%m-%d")
-    log_file = metrics_dir / f"delegation-{date}.csv"
+    info = metrics_store.file_info(metrics_store.day_file(metrics_dir, date))
+    
+    # Row count is kept in the file's last footer
+    return info.rows if info else 0
+
+
+def usage_hints(metrics_dir: Path, task: str) -> list:
+    """Build usage tips from today's maintained counters."""
+    now = datetime.now()
+    usage = metrics_rollup.read_usage(metrics_dir, now.strftime("%Y-%m-%d"))
+    hints = []
     
-    if not log_file.exists():
-        return 0
+    if usage.total >= DAILY_TIP_THRESHOLD:
+        hints.append(f"💡 TIP: You've made {usage.total} delegations today.")
+        hints.append("   Run 'python .claude/hooks/analyze-metrics.py' to see optimization opportunities")
     
-    with log_file.open('r') as f:
-        # Subtract 1 for header row
-        return max(0, len(f.readlines()) - 1)
+    this_hour = usage.hours[now.hour]
+    if this_hour >= HOURLY_TIP_THRESHOLD:
+        hints.append(f"💡 TIP: {this_hour} delegations this hour.")
+        hints.append("   Batch related questions into a single delegation to save round-trips")
+    
+    task_count = usage.tasks.get(task, 0)
+    if task != "unknown" and task_count >= REPEAT_TIP_THRESHOLD:
+        hints.append(f"💡 TIP: '{task}' delegated {task_count} times today.")
+        hints.append("   Consider reusing the previous result or tightening max_lines for this task")
+    
+    return hints
+
+
+def find_metrics_dir(start: Path) -> Path:
+    """Locate .claude/metrics by walking up from start."""
+    return metrics_store.find_metrics_dir(start)
 
 
-def main():
+def main(argv: list = None, cwd: Path = None):
     """Main execution."""
-    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+    argv = sys.argv if argv is None else argv
+    if len(argv) < 2 or argv[1] in ('-h', '--help'):
         print(__doc__)
         sys.exit(1)
     
-    response = sys.argv[1]
-    max_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 10
-    task_context = sys.argv[3] if len(sys.argv) > 3 else "unknown"
-    
-    # Get metrics directory
-    # Try to find .claude directory
-    current_dir = Path.cwd()
-    claude_dir = current_dir / ".claude"
-    
-    # If not in project root, try to find it up the tree
-    if not claude_dir.exists():
-        for parent in current_dir.parents:
-            if (parent / ".claude").exists():
-                claude_dir = parent / ".claude"
-                break
-        else:
-            # Create in current directory if not found
-            claude_dir = current_dir / ".claude"
+    fail_fast = '--fail-fast' in argv
+    as_json = '--json' in argv
+    args = [arg for arg in argv[1:] if arg not in ('--fail-fast', '--json')]
+    options = {'--cache': "", '--cli': "", '--latency': "0", '--trace': None, '--spans': ""}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if not args or (args[0] == '--file' and len(args) < 2):
+        print(__doc__)  # Only options were given: no response to check
+        sys.exit(1)
     
-    metrics_dir = claude_dir / "metrics"
+    source = None
+    if args[0] == '--stdin':
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', errors='replace')
+        close_source = source.detach  # Leave the process's stdin open
+        args = args[1:]
+    elif args[0] == '--file':
+        path = Path(args[1])
+        if not path.is_absolute():
+            path = (cwd or Path.cwd()) / path
+        source = path.open('r', encoding='utf-8', errors='replace')
+        close_source = source.close
+        args = args[2:]
+    else:
+        response = args[0]
+        args = args[1:]
     
-    # Validate response
-    actual_lines = count_lines(response)
-    token_estimate = estimate_tokens(response)
+    max_lines = int(args[0]) if len(args) > 0 else 10
+    task_context = args[1] if len(args) > 1 else "unknown"
+    trace = Trace.parse(options['--trace'], options['--spans'], options['--cli'])
     
-    is_valid, warnings = validate_response(response, max_lines)
+    # Get metrics directory and the project's action-item patterns
+    metrics_dir = find_metrics_dir(cwd or Path.cwd())
+    extractor = action_items.project_extractor(metrics_dir.parent)
     
-    # Print warnings if any
+    # Measure the response (streamed in one pass for --stdin/--file)
+    with trace.span("validate"):
+        if source is None:
+            actual_lines = count_lines(response)
+            token_estimate = estimate_tokens(response)
+            items = action_items.extract(response, extractor)
+            stopped_early = False
+        else:
+            scan = scan_response(read_chunks(source), max_lines if fail_fast else None, extractor)
+            close_source()
+            actual_lines, token_estimate = scan.lines, scan.tokens
+            items, stopped_early = scan.action_items, scan.exceeded
+        
+        is_valid, warnings = validate_counts(actual_lines, token_estimate, max_lines)
+    if stopped_early:
+        warnings.append(f"   Stopped reading after {actual_lines} lines (--fail-fast)")
+    
+    # Log metrics, then the spans (including the log itself) under the same id
+    with trace.span("log"):
+        log_metrics(task_context, actual_lines, token_estimate, metrics_dir, options['--cache'],
+                    options['--cli'], max_lines, round(float(options['--latency']) * 1000),
+                    trace.correlation_id)
+    log_spans(trace, metrics_dir)
+    hints = usage_hints(metrics_dir, task_context)
+    
+    if as_json:
+        print(json.dumps({
+            "valid": is_valid,
+            "task": task_context,
+            "lines": actual_lines,
+            "max_lines": max_lines,
+            "tokens": token_estimate,
+            "stopped_early": stopped_early,
+            "warnings": [warning.strip() for warning in warnings],
+            "action_items": [item.to_dict() for item in items],
+            "hints": [hint.strip() for hint in hints],
+        }, indent=2))
+        sys.exit(0 if is_valid else 1)
+    
+    # Print result and warnings
+    if is_valid:
+        print(f"✅ Response quality: {actual_lines} lines, ~{token_estimate} tokens")
     for warning in warnings:
         print(warning)
     
-    # Log metrics
-    log_metrics(task_context, actual_lines, token_estimate, metrics_dir)
-    
-    # Extract and display action items
-    action_items = extract_action_items(response)
-    if action_items:
+    # Display action items
+    if items:
         print("\n📋 Action Items Found:")
-        for item in action_items:
-            print(f"   {item}")
-    
-    # Check daily usage and suggest analysis
-    daily_count = check_daily_usage(metrics_dir)
-    if daily_count >= 20:
-        print(f"\n💡 TIP: You've made {daily_count} delegations today.")
-        print("   Run 'python .claude/hooks/analyze-metrics.py' to see optimization opportunities")
+        for item in items:
+            print(f"   {item.text}")
+    
+    # Suggest analysis from usage counters
+    if hints:
+        print()
+        for hint in hints:
+            print(hint)
     
     # Exit with appropriate code
     sys.exit(0 if is_valid else 1)
@@ -5,141 +5,216 @@ Automatically formats and optimizes delegation prompts
 Zero token cost - runs locally before Claude sees anything
 
 Usage:
-    python pre-delegate.py <task> [context] [max_lines]
+    python pre-delegate.py <task> [context] [max_lines] [--no-reduce] [--tokens]
+                           [--priority low|normal|high] [--cli NAME] [--name TASK]
     
 Example:
     python pre-delegate.py "npm ls" "Debugging slow build" 8
+
+Verbose read-only commands (npm ls, git log, pip freeze, find) are run
+locally and their reduced output is attached to the prompt; --no-reduce
+(or DELEGATE_NO_REDUCE=1) leaves running them to Gemini.
+
+The token budget (see token_budget) may tighten max_lines, suggest another
+CLI (noted on stderr) or queue the delegation to .claude/queue.jsonl (exit
+code 3, no prompt printed). DELEGATE_NO_BUDGET=1 turns this off.
+
+Without an explicit max_lines, limits learned from past metrics (see
+adaptive_limits; looked up by --name, then task type) replace the fixed
+defaults, and tasks that keep running long get a stricter prompt.
+DELEGATE_NO_ADAPTIVE=1 turns this off.
+
+Prompts come from compiled, user-editable templates (see prompt_templates);
+--tokens reports the prompt's token count on stderr.
 """ 
 
+import os
 import sys
-import re
-from typing import Literal
+from pathlib import Path
+from typing import Literal, NamedTuple, Optional
+
+import adaptive_limits
+import metrics_store
+import output_reducers
+import prompt_templates
+import token_budget
+from task_classifier import Classification, classify as classify_task, default_classifier
 
 TaskType = Literal["shell", "search", "analyze", "docs", "generic"]
 
+# Compiled once per process; rules live in task_classifier.default_classifier
+CLASSIFIER = default_classifier()
+
+STRICT_STYLE = prompt_templates.STRICT_STYLE
+
+
+def classify(task: str) -> Classification:
+    """Detect task type and compression level in a single scan."""
+    return classify_task(task, CLASSIFIER)
+
 
 def detect_task_type(task: str) -> TaskType:
     """Detect task type from task description."""
-    task_lower = task.lower()
-    
-    # Shell commands
-    if re.search(r'^(git|npm|pip|ls|grep|find|cat|echo|curl|wget)\s', task_lower):
-        return "shell"
-    
-    # Search operations
-    if re.search(r'(search|find.*file|grep.*code|locate)', task_lower):
-        return "search"
-    
-    # Analysis tasks
-    if re.search(r'(analyze|review|audit|check|inspect|investigate)', task_lower):
-        return "analyze"
-    
-    # Documentation lookup
-    if re.search(r'(doc|documentation|api|how.*use|example)', task_lower):
-        return "docs"
-    
-    return "generic"
+    return classify(task).task_type
 
 
 def estimate_compression(task: str) -> int:
     """Estimate optimal compression level based on expected output."""
-    task_lower = task.lower()
-    
-    # Highly verbose commands need aggressive compression
-    if re.search(r'(npm ls|git log|find\s|pip freeze)', task_lower):
-        return 5  # Maximum 5 lines
-    
-    # Search/audit operations
-    if re.search(r'(grep|search|audit|scan)', task_lower):
-        return 8
-    
-    # Default
-    return 10
+    return classify(task).max_lines
 
 
-def build_shell_prompt(task: str, context: str, max_lines: int) -> str:
+def build_shell_prompt(task: str, context: str, max_lines: int,
+                       reduction: Optional[output_reducers.Reduction] = None) -> str:
     """Build optimized prompt for shell command distillation."""
-    return f"""CONTEXT: {context}
-TASK: Execute this command and distill the output: {task}
-OUTPUT: Extract only:
-- Key findings (max 3 bullet points)
-- Actionable next steps (1-2 items)
-- Any errors/warnings
-Total response: <{max_lines} lines"""
+    if reduction is not None:
+        return prompt_templates.load_templates().build_reduced(
+            task, context, max_lines, reduction.exit_code, reduction.raw_bytes, reduction.reduced_bytes,
+            reduction.text).text
+    return prompt_templates.load_templates().build("shell", task, context, max_lines).text
 
 
 def build_search_prompt(task: str, context: str, max_lines: int) -> str:
     """Build optimized prompt for code search."""
-    return f"""CONTEXT: {context}
-TASK: {task}
-OUTPUT: Return ONLY:
-- File paths where found (no code snippets)
-- Count of occurrences
-- 1-line assessment
-Maximum {max_lines} lines"""
+    return prompt_templates.load_templates().build("search", task, context, max_lines).text
 
 
 def build_analyze_prompt(task: str, context: str, max_lines: int) -> str:
     """Build optimized prompt for analysis tasks."""
-    return f"""CONTEXT: {context}
-TASK: {task}
-OUTPUT FORMAT:
-- Main finding (1 sentence)
-- Supporting evidence (2-3 lines)
-- Recommended action
-Maximum {max_lines} lines total"""
+    return prompt_templates.load_templates().build("analyze", task, context, max_lines).text
 
 
 def build_docs_prompt(task: str, context: str, max_lines: int) -> str:
     """Build optimized prompt for documentation lookup."""
-    return f"""CONTEXT: {context}
-TASK: {task}
-OUTPUT:
-- Code example (3-5 lines max)
-- Key parameter explanation (1 sentence)
-- Official docs link
-Total: <{max_lines} lines"""
+    return prompt_templates.load_templates().build("docs", task, context, max_lines).text
 
 
 def build_generic_prompt(task: str, context: str, max_lines: int) -> str:
     """Build generic optimized prompt."""
-    return f"""CONTEXT: {context}
-TASK: {task}
-OUTPUT: Be concise and actionable. Maximum {max_lines} lines."""
+    return prompt_templates.load_templates().build("generic", task, context, max_lines).text
+
+
+def render_prompt(task_type: TaskType, task: str, context: str, max_lines: int,
+                  reduction: Optional[output_reducers.Reduction] = None,
+                  template: str = "standard", cwd: Path = None) -> prompt_templates.Prompt:
+    """The prompt for a task type (from the compiled templates, memoized) and its token count."""
+    templates = prompt_templates.load_templates(cwd)
+    style = template if template in prompt_templates.STYLES else "standard"
+    if reduction is not None and task_type == "shell":
+        return templates.build_reduced(task, context, max_lines, reduction.exit_code, reduction.raw_bytes,
+                                       reduction.reduced_bytes, reduction.text, style)
+    return templates.build(task_type, task, context, max_lines, style)
 
 
-def build_prompt(task_type: TaskType, task: str, context: str, max_lines: int) -> str:
+def build_prompt(task_type: TaskType, task: str, context: str, max_lines: int,
+                 reduction: Optional[output_reducers.Reduction] = None,
+                 template: str = "standard") -> str:
     """Build the appropriate prompt based on task type."""
-    builders = {
-        "shell": build_shell_prompt,
-        "search": build_search_prompt,
-        "analyze": build_analyze_prompt,
-        "docs": build_docs_prompt,
-        "generic": build_generic_prompt,
-    }
+    return render_prompt(task_type, task, context, max_lines, reduction, template).text
+
+
+def reduce_locally(classification: Classification, task: str,
+                   cwd: Path = None) -> Optional[output_reducers.Reduction]:
+    """Run and reduce a verbose shell command, if it has a reducer."""
+    if classification.task_type != "shell" or classification.reducer is None:
+        return None
+    if os.environ.get("DELEGATE_NO_REDUCE") == "1":
+        return None
+    return output_reducers.run_and_reduce(classification.reducer, task, cwd or Path.cwd())
+
+
+class Delegation(NamedTuple):
+    """A prepared delegation: detected type, line budget, final prompt (and its tokens) and budget decision."""
+    task_type: TaskType
+    max_lines: int
+    prompt: str
+    decision: Optional[token_budget.Decision] = None
+    template: str = "standard"
+    prompt_tokens: int = 0
+
+
+def learned_limit(task_type: TaskType, name: str = None,
+                  cwd: Path = None) -> Optional[adaptive_limits.Limit]:
+    """Limit learned for this task name or type, unless DELEGATE_NO_ADAPTIVE=1."""
+    if os.environ.get("DELEGATE_NO_ADAPTIVE") == "1":
+        return None
+    metrics_dir = metrics_store.find_metrics_dir(cwd or Path.cwd())
+    return adaptive_limits.lookup(metrics_dir, name, task_type)
+
+
+def plan_budget(max_lines: int, cli: str = None, priority: str = "normal",
+                cwd: Path = None) -> Optional[token_budget.Decision]:
+    """Budget decision for this delegation, unless DELEGATE_NO_BUDGET=1."""
+    if os.environ.get("DELEGATE_NO_BUDGET") == "1":
+        return None
+    return token_budget.schedule(cwd or Path.cwd(), max_lines, cli, priority)
+
+
+def prepare(task: str, context: str = "General task", max_lines: int = None,
+            reduce: bool = True, cwd: Path = None, cli: str = None,
+            priority: str = "normal", name: str = None) -> Delegation:
+    """Classify the task, apply the token budget, reduce verbose output locally and build the prompt."""
+    # Detect task type and optimal compression
+    classification = classify(task)
+    template = "standard"
+    if not max_lines:
+        learned = learned_limit(classification.task_type, name, cwd)
+        if learned is not None:
+            max_lines, template = learned
+    max_lines = max_lines or classification.max_lines
+    
+    # Tighten when the 5-hour window is running low
+    decision = plan_budget(max_lines, cli, priority, cwd)
+    if decision is not None:
+        max_lines = decision.max_lines
+    
+    # Attach locally reduced output for verbose commands
+    reduction = reduce_locally(classification, task, cwd) if reduce else None
     
-    builder = builders.get(task_type, build_generic_prompt)
-    return builder(task, context, max_lines)
+    prompt = render_prompt(classification.task_type, task, context, max_lines, reduction, template, cwd)
+    return Delegation(classification.task_type, max_lines, prompt.text, decision, template, prompt.tokens)
 
 
-def main():
+def main(argv: list = None, cwd: Path = None):
     """Main execution."""
-    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+    argv = sys.argv if argv is None else argv
+    if len(argv) < 2 or argv[1] in ('-h', '--help'):
         print(__doc__)
         sys.exit(1)
     
-    task = sys.argv[1]
-    context = sys.argv[2] if len(sys.argv) > 2 else "General task"
-    max_lines = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    reduce = '--no-reduce' not in argv
+    show_tokens = '--tokens' in argv
+    argv = [arg for arg in argv if arg not in ('--no-reduce', '--tokens')]
+    options = {'--priority': "normal", '--cli': None, '--name': None}
+    for option in options:
+        if option in argv:
+            i = argv.index(option)
+            options[option] = argv[i + 1]
+            del argv[i:i + 2]
     
-    # Detect task type and optimal compression
-    task_type = detect_task_type(task)
-    optimal_lines = estimate_compression(task)
-    max_lines = max_lines or optimal_lines
+    task = argv[1]
+    context = argv[2] if len(argv) > 2 else "General task"
+    max_lines = int(argv[3]) if len(argv) > 3 else None
+    
+    delegation = prepare(task, context, max_lines, reduce, cwd, options['--cli'], options['--priority'],
+                         options['--name'])
+    decision = delegation.decision
+    if decision is not None and decision.action == "queue":
+        queue = token_budget.enqueue(cwd or Path.cwd(), token_budget.queue_row(
+            task, context, max_lines, options['--cli'], options['--name'], options['--priority'],
+        ))
+        print(f"⏳ Queued ({decision.reason}) in {queue}", file=sys.stderr)
+        print(f"   Run it later with: python batch_delegate.py {queue}", file=sys.stderr)
+        sys.exit(3)
+    if decision is not None and decision.action == "tighten":
+        print(f"🪙 max_lines tightened to {decision.max_lines} ({decision.reason})", file=sys.stderr)
+    if decision is not None and decision.action == "reroute":
+        print(f"↪️  Budget: delegate with `{decision.command}` ({decision.reason})", file=sys.stderr)
+    
+    if show_tokens:
+        print(f"🧮 Prompt: {delegation.prompt_tokens} tokens", file=sys.stderr)
     
-    # Build and output prompt
-    prompt = build_prompt(task_type, task, context, max_lines)
-    print(prompt)
+    # Output prompt
+    print(delegation.prompt)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Prompt templates for delegation hooks
+The prompts pre-delegate sends are templates with {context}, {task} and
+{max_lines} fields (the shell_reduced template, used when verbose output was
+reduced locally, also has {exit_code}, {raw_bytes}, {reduced_bytes} and
+{output}). Any of them can be overridden in a user-editable JSON file,
+{"name": "text", ...} (text may be a list of lines):
+
+    .claude/prompt_templates.json    per project (found from the working directory)
+    ~/.claude/prompt_templates.json  otherwise
+    DELEGATE_TEMPLATES=<path>        explicit file
+
+Templates are compiled once per file version: each one is split into static
+segments and fields, the "strict" style variant is derived, and the token
+count of every static segment is computed up front. Building a prompt then
+only joins strings and counts the inserted values, so the prompt-side token
+cost is known without re-tokenizing the prompt (it is exact for the default
+approx counter; see token_counter). Fully built prompts are memoized per
+(template, style, task, context, max_lines, counter).
+
+Usage:
+    python prompt_templates.py show     # compiled templates and their token counts
+    python prompt_templates.py init     # write the defaults to the project file for editing
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from string import Formatter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import token_counter
+
+TEMPLATE_FILE = "prompt_templates.json"
+MEMO_SIZE = 1024
+RECHECK_SECONDS = 1.0  # How long a located template file (and its mtime) is trusted
+
+STRICT_STYLE = "STYLE: Terse. No preamble, no restating the task, no headers.\n"
+STYLES = ("standard", "strict")
+FIELDS = ("context", "task", "max_lines", "exit_code", "raw_bytes", "reduced_bytes", "output")
+# Values of each field's type, to catch format specs that only fail when rendered
+SAMPLE_VALUES = {"context": "c", "task": "t", "max_lines": 10, "exit_code": 0, "raw_bytes": 0,
+                 "reduced_bytes": 0, "output": "o"}
+
+DEFAULT_TEMPLATES = {
+    "shell": """CONTEXT: {context}
+TASK: Execute this command and distill the output: {task}
+OUTPUT: Extract only:
+- Key findings (max 3 bullet points)
+- Actionable next steps (1-2 items)
+- Any errors/warnings
+Total response: <{max_lines} lines""",
+    "shell_reduced": """CONTEXT: {context}
+TASK: Distill this output of `{task}` (exit {exit_code}, reduced locally from {raw_bytes:,} to {reduced_bytes:,} bytes)
+OUTPUT: Extract only:
+- Key findings (max 3 bullet points)
+- Actionable next steps (1-2 items)
+- Any errors/warnings
+Total response: <{max_lines} lines
+
+{output}""",
+    "search": """CONTEXT: {context}
+TASK: {task}
+OUTPUT: Return ONLY:
+- File paths where found (no code snippets)
+- Count of occurrences
+- 1-line assessment
+Maximum {max_lines} lines""",
+    "analyze": """CONTEXT: {context}
+TASK: {task}
+OUTPUT FORMAT:
+- Main finding (1 sentence)
+- Supporting evidence (2-3 lines)
+- Recommended action
+Maximum {max_lines} lines total""",
+    "docs": """CONTEXT: {context}
+TASK: {task}
+OUTPUT:
+- Code example (3-5 lines max)
+- Key parameter explanation (1 sentence)
+- Official docs link
+Total: <{max_lines} lines""",
+    "generic": """CONTEXT: {context}
+TASK: {task}
+OUTPUT: Be concise and actionable. Maximum {max_lines} lines.""",
+}
+
+
+class Prompt(NamedTuple):
+    """A built prompt and its token count."""
+    text: str
+    tokens: int
+
+
+def _cut(char: str) -> bool:
+    """Whether a whitespace run starts at char (ASCII whitespace, as token_counter classifies it)."""
+    return char.isspace() and ord(char) < 128
+
+
+def _split(literal: str) -> Tuple[str, str, str]:
+    """
+    Split static text into (lead, core, trail) so core starts and ends where a
+    whitespace run follows a non-space character; its tokens then add up with
+    whatever is joined on either side.
+    """
+    start = next((i for i in range(1, len(literal)) if _cut(literal[i]) and not _cut(literal[i - 1])), None)
+    if start is None:
+        return literal, "", ""
+    end = next(i for i in range(len(literal) - 1, start - 1, -1) if _cut(literal[i]) and not _cut(literal[i - 1]))
+    if end == start:
+        return literal[:start], "", literal[start:]
+    return literal[:start], literal[start:end], literal[end:]
+
+
+class Template:
+    """
+    A template compiled into static segments and fields.
+    pieces alternates static text and (field, format spec) pairs; glue lists,
+    for each stretch between two precounted static cores, the pieces that
+    must be counted when the prompt is built.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.pieces: List[object] = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if literal:
+                self.pieces.append(literal)
+            if field is not None:
+                if field not in FIELDS or conversion:
+                    raise ValueError(f"template {name!r}: unknown field {{{field}}}")
+                self.pieces.append((field, spec or ""))
+        self.fields = [piece[0] for piece in self.pieces if isinstance(piece, tuple)]
+
+        # Static cores are counted now; the stretches around fields are counted per build
+        stretches: List[List[object]] = [[]]
+        cores = []
+        for piece in self.pieces:
+            if isinstance(piece, tuple):
+                stretches[-1].append(piece)
+                continue
+            lead, core, trail = _split(piece)
+            stretches[-1].append(lead)
+            if core or trail:
+                cores.append(core)
+                stretches.append([trail])
+        has_field = [any(isinstance(p, tuple) for p in stretch) for stretch in stretches]
+        cores.extend("".join(stretch) for stretch, field in zip(stretches, has_field) if not field)
+        self.glue = [stretch for stretch, field in zip(stretches, has_field) if field]
+        tokens = extra = 0
+        for core in cores:
+            core_tokens, core_extra = token_counter.approx_parts(core)
+            tokens += core_tokens
+            extra += core_extra
+        self.static_parts = (tokens, extra)
+        self.static_tokens = token_counter.count_tokens("".join(p for p in self.pieces if isinstance(p, str)))
+
+    def strict(self) -> "Template":
+        """Variant with STRICT_STYLE after the first line."""
+        first, _, rest = self.text.partition("\n")
+        return Template(self.name, f"{first}\n{STRICT_STYLE}{rest}")
+
+    @staticmethod
+    def _render(pieces: List[object], values: Dict[str, object]) -> str:
+        return "".join(piece if isinstance(piece, str) else format(values[piece[0]], piece[1])
+                       for piece in pieces)
+
+    def render(self, values: Dict[str, object]) -> str:
+        return self._render(self.pieces, values)
+
+    def build(self, values: Dict[str, object]) -> Prompt:
+        """Render the template and count its tokens (static segments are not re-counted)."""
+        text = self.render(values)
+        if token_counter.get_counter() is not token_counter.approx_tokens:
+            return Prompt(text, token_counter.count_tokens(text))  # Other counters are not additive
+        # Consecutive stretches meet where a whitespace run starts, so one count covers them all
+        tokens, extra = token_counter.approx_parts("".join(self._render(stretch, values) for stretch in self.glue))
+        return Prompt(text, tokens + self.static_parts[0] + (extra + self.static_parts[1]) // 2)
+
+
+class TemplateSet:
+    """Compiled templates of one file version, with a memo of built prompts."""
+
+    def __init__(self, texts: Dict[str, str], source: Optional[Path] = None):
+        self.source = source
+        self.templates: Dict[Tuple[str, str], Template] = {}
+        for name, text in texts.items():
+            template = Template(name, text)
+            self.templates[(name, "standard")] = template
+            self.templates[(name, "strict")] = template.strict()
+        self._memo: "OrderedDict[tuple, Prompt]" = OrderedDict()
+        self._lock = threading.Lock()  # batch_delegate and the daemon build prompts from several threads
+
+    def template(self, name: str, style: str = "standard") -> Template:
+        return self.templates.get((name, style)) or self.templates[("generic", style)]
+
+    def build(self, name: str, task: str, context: str, max_lines: int, style: str = "standard") -> Prompt:
+        # The counter is part of the key: DELEGATE_TOKENIZER may differ per call (e.g. daemon requests)
+        key = (name, style, task, context, max_lines, token_counter.get_counter())
+        with self._lock:
+            prompt = self._memo.get(key)
+            if prompt is not None:
+                self._memo.move_to_end(key)
+                return prompt
+        prompt = self.template(name, style).build({"task": task, "context": context, "max_lines": max_lines})
+        with self._lock:
+            self._memo[key] = prompt
+            if len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return prompt
+
+    def build_reduced(self, task: str, context: str, max_lines: int, exit_code: int, raw_bytes: int,
+                      reduced_bytes: int, output: str, style: str = "standard") -> Prompt:
+        """The shell_reduced prompt (not memoized: the attached output differs every run)."""
+        return self.template("shell_reduced", style).build({
+            "task": task, "context": context, "max_lines": max_lines, "exit_code": exit_code,
+            "raw_bytes": raw_bytes, "reduced_bytes": reduced_bytes, "output": output})
+
+
+def _claude_dir(cwd: Path) -> Path:
+    for directory in (cwd, *cwd.parents):
+        if (directory / ".claude").is_dir():
+            return directory / ".claude"
+    return cwd / ".claude"
+
+
+_candidates: Dict[str, Tuple[str, ...]] = {}
+_located: Dict[Tuple[str, str], Tuple[float, Optional[Tuple[Path, int]]]] = {}
+
+
+def _locate(cwd: Path = None) -> Optional[Tuple[Path, int]]:
+    """
+    (template file, mtime) in effect for cwd. The directory walk is done once
+    per cwd and the files are re-checked at most every RECHECK_SECONDS, so an
+    edit is picked up within that interval.
+    """
+    explicit = os.environ.get("DELEGATE_TEMPLATES", "")
+    key = (explicit, str(cwd) if cwd is not None else os.getcwd())
+    now = time.monotonic()
+    cached = _located.get(key)
+    if cached is not None and now - cached[0] < RECHECK_SECONDS:
+        return cached[1]
+    if explicit:
+        candidates = (explicit,)
+    else:
+        candidates = _candidates.get(key[1])
+        if candidates is None:
+            candidates = _candidates[key[1]] = (str(_claude_dir(Path(key[1])) / TEMPLATE_FILE),
+                                                str(Path.home() / ".claude" / TEMPLATE_FILE))
+    located = None
+    for path in candidates:
+        try:
+            located = Path(path), os.stat(path).st_mtime_ns
+            break
+        except OSError:
+            continue
+    _located[key] = (now, located)
+    return located
+
+
+def template_file(cwd: Path = None) -> Optional[Path]:
+    """The template file in effect: DELEGATE_TEMPLATES, the project's, then the user's (None if none exists)."""
+    located = _locate(cwd)
+    return located[0] if located else None
+
+
+def read_templates(path: Path) -> Dict[str, str]:
+    """Defaults overridden by a template file; templates that fail to compile or render keep their default."""
+    texts = dict(DEFAULT_TEMPLATES)
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring {path}: {e}", file=sys.stderr)
+        return texts
+    for name, text in data.items():
+        text = "\n".join(text) if isinstance(text, list) else text
+        try:
+            if not isinstance(text, str):
+                raise ValueError("expected a string or a list of lines")
+            Template(name, text).render(SAMPLE_VALUES)
+        except (ValueError, TypeError) as e:
+            print(f"⚠️  Ignoring template {name!r} in {path}: {e}", file=sys.stderr)
+            continue
+        texts[name] = text
+    return texts
+
+
+_defaults: Optional[TemplateSet] = None
+_loaded: Dict[Path, tuple] = {}
+
+
+def load_templates(cwd: Path = None) -> TemplateSet:
+    """Compiled templates for cwd, recompiled only when the template file changes."""
+    global _defaults
+    located = _locate(cwd)
+    if located is None:
+        if _defaults is None:
+            _defaults = TemplateSet(DEFAULT_TEMPLATES)
+        return _defaults
+    path, mtime = located
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _loaded[path] = (mtime, TemplateSet(read_templates(path), path))
+    return cached[1]
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "show"
+    if command not in ("show", "init"):
+        print(__doc__)
+        sys.exit(1)
+
+    if command == "init":
+        path = _claude_dir(Path.cwd()) / TEMPLATE_FILE
+        if path.exists():
+            print(f"❌ {path} already exists")
+            sys.exit(1)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({name: text.split("\n") for name, text in DEFAULT_TEMPLATES.items()},
+                                   indent=2) + "\n")
+        print(f"✅ Wrote {path}")
+        return
+
+    templates = load_templates()
+    print(f"📝 Templates from {templates.source or 'built-in defaults'}")
+    for (name, style), template in sorted(templates.templates.items()):
+        print(f"   {name:<14} {style:<8} {template.static_tokens:4d} static tokens, "
+              f"fields: {', '.join(template.fields)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Mergeable quantile sketches for metric distributions (DDSketch style)
+Values are counted in logarithmic buckets whose width grows with the value,
+so any quantile is within RELATIVE_ACCURACY of the true value whatever the
+distribution, and two sketches merge by adding bucket counts. Daily rollups
+keep one sketch per metric (overall and per task); p50/p95/p99 over any
+date range merge a few small sketches instead of re-reading rows.
+
+Non-positive values (e.g. an unrecorded latency) go to a separate zero
+bucket. When a sketch exceeds MAX_BINS the lowest buckets are collapsed,
+which only coarsens the bottom of the range, never the tail.
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+MAX_BINS = 1024
+
+
+def bucket(value: float) -> int:
+    """Index of the bucket holding value (> 0)."""
+    return math.ceil(math.log(value) / LOG_GAMMA)
+
+
+def bucket_value(index: int) -> float:
+    """Representative value of a bucket (within RELATIVE_ACCURACY of any member)."""
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class Sketch:
+    """Relative-error quantile sketch; merge with merge(), persist with to_dict()."""
+
+    __slots__ = ("bins", "zeros", "count", "min", "max")
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, count: int = 1):
+        if value > 0:
+            index = bucket(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > MAX_BINS:
+                self._collapse()
+        else:
+            self.zeros += count
+        self.count += count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Sketch) and self.to_dict() == other.to_dict()
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "Sketch") -> "Sketch":
+        """Add other's counts into this sketch (returns self)."""
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > MAX_BINS:
+            self._collapse()
+        self.zeros += other.zeros
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def _collapse(self):
+        indexes = sorted(self.bins)
+        excess = indexes[:len(indexes) - MAX_BINS + 1]
+        self.bins[indexes[len(excess)]] += sum(self.bins.pop(index) for index in excess)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), None for an empty sketch."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return min(self.min, 0)
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return max(self.min, min(self.max, bucket_value(index)))
+        return self.max
+
+    def to_dict(self) -> dict:
+        """Counts stored densely from the lowest bucket ("o"), which is shorter than key/count pairs."""
+        low = min(self.bins, default=0)
+        counts = [0] * (max(self.bins, default=-1) - low + 1)
+        for index, count in self.bins.items():
+            counts[index - low] = count
+        return {"n": self.count, "z": self.zeros, "min": self.min, "max": self.max, "o": low, "c": counts}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Sketch":
+        sketch = cls()
+        sketch.bins = {index: count for index, count in enumerate(data["c"], data["o"]) if count}
+        sketch.zeros, sketch.count = data["z"], data["n"]
+        sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+def quantiles(sketch: Sketch, qs=(0.5, 0.95, 0.99)) -> Dict[str, Optional[float]]:
+    """{"p50": ..., "p95": ..., "p99": ...} for a sketch."""
+    return {f"p{round(q * 100)}": sketch.quantile(q) for q in qs}
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for delegation responses
+Repeated delegations of the same prompt against an unchanged tree are
+answered from disk instead of another Gemini round-trip
+
+A cache key hashes the final prompt and the CLI that answers it (so switching
+DELEGATE_CLI or a reroute never returns another CLI's answer) together with
+fingerprints of what the answer depends on:
+    lockfiles   package-lock.json, yarn.lock, poetry.lock, requirements*.txt, ...
+                (size + mtime, plus a content digest memoized per stat)
+    git         HEAD commit, the index mtime and the working tree: paths
+                `git status` reports as changed or untracked, with their digests
+    @path       digest of every file the prompt references as @path; a
+                directory by the relative path, size and mtime of every file
+                under it (.git, .claude and __pycache__ skipped)
+Prompts that carry locally reduced command output (see output_reducers) are
+content-addressed by that output already.
+
+Entries live in .claude/cache/responses/, expire after DEFAULT_TTL seconds
+and are evicted least-recently-used once the directory grows past
+MAX_BYTES.
+
+Usage:
+    python response_cache.py stats|clear|prune
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_TTL = 6 * 3600
+MAX_BYTES = 32 << 20
+
+LOCKFILES = [
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "requirements.txt",
+    "requirements-dev.txt", "Cargo.lock", "go.sum", "Gemfile.lock", "composer.lock",
+]
+
+_AT_PATH = re.compile(r"(?<![\w@])@([\w./~-][^\s\"'`,;:()]*)")
+
+GIT_TIMEOUT = 5.0
+SKIP_DIRS = {".git", ".claude", "__pycache__"}
+
+# (path, size, mtime_ns) -> content digest, so unchanged lockfiles are hashed once
+_digests: Dict[tuple, str] = {}
+
+
+class CacheStats(NamedTuple):
+    """Entry count and bytes on disk."""
+    entries: int
+    bytes: int
+
+
+def file_digest(path: Path) -> str:
+    """Content digest of a file (memoized by size and mtime)."""
+    try:
+        st = path.stat()
+    except OSError:
+        return "missing"
+    if not path.is_file():
+        return tree_digest(path) if path.is_dir() else f"special:{st.st_mtime_ns}"
+    memo = (str(path), st.st_size, st.st_mtime_ns)
+    digest = _digests.get(memo)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = _digests[memo] = h.hexdigest()
+    return digest
+
+
+def tree_digest(directory: Path) -> str:
+    """Digest of the files under a directory: relative path, size and mtime of each."""
+    h = hashlib.blake2b(digest_size=16)
+    entries = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append(f"{os.path.relpath(path, directory)}\0{st.st_size}\0{st.st_mtime_ns}")
+    for entry in sorted(entries):
+        h.update(entry.encode("utf-8", "surrogatepass") + b"\n")
+    return "dir:" + h.hexdigest()
+
+
+def find_git_dir(start: Path) -> Optional[Path]:
+    for directory in (start, *start.parents):
+        git = directory / ".git"
+        if git.is_dir():
+            return git
+        if git.is_file():
+            # Worktrees and submodules: "gitdir: <path>"
+            text = git.read_text().strip()
+            if text.startswith("gitdir:"):
+                return (directory / text[len("gitdir:"):].strip()).resolve()
+    return None
+
+
+def git_head(git_dir: Path) -> str:
+    """Commit HEAD points at, read from .git without running git."""
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+    except OSError:
+        return ""
+    if not head.startswith("ref:"):
+        return head
+    ref = head[len("ref:"):].strip()
+    bases = [git_dir]
+    common = git_dir / "commondir"  # Linked worktrees share the main repo's refs
+    if common.exists():
+        bases.append((git_dir / common.read_text().strip()).resolve())
+    for base in bases:
+        try:
+            return (base / ref).read_text().strip()
+        except OSError:
+            pass
+        try:
+            with (base / "packed-refs").open() as f:
+                for line in f:
+                    if line.rstrip().endswith(" " + ref):
+                        return line.split(" ", 1)[0]
+        except OSError:
+            pass
+    return ref  # Unborn branch
+
+
+def worktree_state(top: Path) -> str:
+    """
+    Changed and untracked paths under the worktree top (`git status
+    --porcelain`) with the digest of each, so unstaged edits change the key;
+    "" when git cannot be run. Paths in SKIP_DIRS (e.g. this cache) are left out.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "status", "--porcelain", "-z", "--untracked-files=all"], cwd=str(top),
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=GIT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    if result.returncode != 0:
+        return ""
+    h = hashlib.blake2b(digest_size=16)
+    entries = iter(result.stdout.decode("utf-8", "surrogateescape").split("\0"))
+    for entry in entries:
+        if len(entry) < 4:
+            continue
+        status, path = entry[:2], entry[3:]
+        if status[0] in "RC":
+            next(entries, None)  # -z lists the rename source as its own entry
+        if SKIP_DIRS.intersection(path.split("/")[:-1]):
+            continue
+        h.update(f"{status}\0{path}\0{file_digest(top / path)}\n".encode("utf-8", "surrogateescape"))
+    return h.hexdigest()
+
+
+def referenced_paths(prompt: str) -> List[str]:
+    """@path references in a prompt, in order, without duplicates."""
+    return list(dict.fromkeys(match.group(1).rstrip(".") for match in _AT_PATH.finditer(prompt)))
+
+
+def fingerprints(prompt: str, cwd: Path) -> List[Tuple[str, str]]:
+    """(name, value) pairs for every input the response may depend on."""
+    parts = []
+    for name in LOCKFILES:
+        path = cwd / name
+        if path.exists():
+            parts.append((name, file_digest(path)))
+
+    git_dir = find_git_dir(cwd)
+    if git_dir is not None:
+        parts.append(("git:HEAD", git_head(git_dir)))
+        index = git_dir / "index"
+        parts.append(("git:index", str(index.stat().st_mtime_ns) if index.exists() else ""))
+        top = next(d for d in (cwd, *cwd.parents) if (d / ".git").exists())
+        parts.append(("git:worktree", worktree_state(top)))
+
+    for ref in referenced_paths(prompt):
+        path = Path(os.path.expanduser(ref))
+        parts.append(("@" + ref, file_digest(path if path.is_absolute() else cwd / path)))
+    return parts
+
+
+def _hash(prompt: str, cli: str):
+    h = hashlib.blake2b(prompt.encode("utf-8", "surrogatepass"), digest_size=20)
+    if cli:
+        h.update(f"\0cli\0{cli}".encode("utf-8", "surrogatepass"))
+    return h
+
+
+def content_key(prompt: str, cli: str = "") -> str:
+    """Hex key for a self-contained prompt (all inputs inline) answered by cli."""
+    return _hash(prompt, cli).hexdigest()
+
+
+def cache_key(prompt: str, cwd: Path, cli: str = "") -> str:
+    """Hex key for a prompt run in cwd by cli (its command, or the router's routes)."""
+    h = _hash(prompt, cli)
+    for name, value in fingerprints(prompt, cwd):
+        h.update(f"\0{name}\0{value}".encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk response store, one JSON file per key. A file's mtime is its
+    last use: hits touch it and eviction removes the oldest first.
+    """
+
+    def __init__(self, directory: Path, ttl: float = DEFAULT_TTL, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response, or None if missing or expired."""
+        entry = self.get_entry(key)
+        return None if entry is None else entry["response"]
+
+    def get_entry(self, key: str) -> Optional[dict]:
+        """Cached entry (response plus what put stored with it, e.g. cli), or None."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            return None
+        try:
+            os.utime(str(path))
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, response: str, **meta):
+        """Store a response atomically, then evict down to max_bytes."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        entry = dict(meta, created=time.time(), response=response)
+        tmp.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(str(tmp), str(path))
+        self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        if not self.directory.exists():
+            return entries
+        for path in self.directory.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # Removed by a concurrent eviction
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones over max_bytes."""
+        entries = sorted(self._entries())
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            # mtime >= created, so an entry unused for ttl has surely expired
+            if total <= self.max_bytes and now - mtime <= self.ttl:
+                continue
+            self._remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self) -> int:
+        entries = self._entries()
+        for _, _, path in entries:
+            self._remove(path)
+        return len(entries)
+
+    def stats(self) -> CacheStats:
+        entries = self._entries()
+        return CacheStats(len(entries), sum(size for _, size, _ in entries))
+
+
+def project_cache(claude_dir: Path) -> ResponseCache:
+    """The project's cache (DELEGATE_CACHE_TTL / DELEGATE_CACHE_MAX_BYTES override limits)."""
+    return ResponseCache(
+        claude_dir / "cache" / "responses",
+        ttl=float(os.environ.get("DELEGATE_CACHE_TTL", DEFAULT_TTL)),
+        max_bytes=int(os.environ.get("DELEGATE_CACHE_MAX_BYTES", MAX_BYTES)),
+    )
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command not in ("stats", "clear", "prune"):
+        print(__doc__)
+        sys.exit(1)
+
+    from delegate_client import load_hook
+
+    cache = project_cache(load_hook("post").find_metrics_dir(Path.cwd()).parent)
+    if command == "clear":
+        print(f"Removed {cache.clear()} cached responses")
+    elif command == "prune":
+        print(f"Removed {cache.evict()} expired or over-budget responses")
+    else:
+        stats = cache.stats()
+        print(f"{stats.entries} cached responses, {stats.bytes:,} bytes in {cache.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+End-to-end delegation runner
+Builds the prompt (pre-delegate), answers it from the response cache or the
+delegate CLI, then validates the response and logs metrics (post-delegate)
+
+Usage:
+    python run_delegation.py <task> [context] [max_lines] [--name TASK] [--priority low|normal|high]
+                             [--no-cache] [--no-reduce]
+
+Example:
+    python run_delegation.py "npm ls" "Debugging slow build" 8 --name dependency-analysis
+
+The CLI is `gemini -p <prompt>` unless DELEGATE_CLI names another command
+(the prompt is appended as its last argument). Responses are cached by
+prompt and project state (see response_cache); --no-cache (or
+DELEGATE_NO_CACHE=1) always calls the CLI and leaves the cache untouched.
+
+The token budget (see token_budget) can tighten max_lines, switch to another
+configured CLI, or queue the delegation to .claude/queue.jsonl (exit code 3).
+Otherwise, with two or more CLIs enabled in delegation_config.json and no
+DELEGATE_CLI, cli_router picks the CLI by recent latency and errors.
+"""
+
+import os
+import sys
+import time
+import shlex
+import subprocess
+from pathlib import Path
+from typing import List, Tuple
+
+import cli_router
+import response_cache
+import token_budget
+from delegation_trace import Trace
+from delegate_client import load_hook
+
+pre_delegate = load_hook("pre")
+post_delegate = load_hook("post")
+
+DEFAULT_CLI = "gemini -p"
+CLI_TIMEOUT = 300.0
+
+
+class Queued(RuntimeError):
+    """The token budget deferred the delegation to the queue file."""
+
+
+def cli_name(argv: List[str]) -> str:
+    """Program name a command runs (gemini for `gemini -p`)."""
+    return os.path.basename(argv[0])
+
+
+def cli_command(cli: str = None) -> str:
+    """Delegate CLI command: cli, DELEGATE_CLI or gemini -p."""
+    return cli or os.environ.get("DELEGATE_CLI") or DEFAULT_CLI
+
+
+def cli_argv(prompt: str, cli: str = None) -> List[str]:
+    """Command line running the delegate CLI (cli, DELEGATE_CLI or gemini -p) on prompt."""
+    return shlex.split(cli_command(cli)) + [prompt]
+
+
+def run_cli(prompt: str, cli: str = None, cwd: Path = None,
+            timeout: float = CLI_TIMEOUT) -> Tuple[int, str, str]:
+    """Run the delegate CLI on prompt, returning (exit_code, stdout, stderr)."""
+    argv = cli_argv(prompt, cli)
+    try:
+        result = subprocess.run(
+            argv, cwd=str(cwd) if cwd else None, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout,
+        )
+    except FileNotFoundError:
+        return 127, "", f"{argv[0]}: command not found"
+    except OSError as e:
+        # E2BIG: one argument is capped at 128 KB on Linux (see map_reduce)
+        return 126, "", f"{argv[0]}: {e.strerror}"
+    except subprocess.TimeoutExpired:
+        return 124, "", f"{argv[0]}: no response after {timeout:.0f}s"
+    return (
+        result.returncode,
+        result.stdout.decode("utf-8", errors="replace"),
+        result.stderr.decode("utf-8", errors="replace"),
+    )
+
+
+def delegate(task: str, context: str = "General task", max_lines: int = None,
+             use_cache: bool = True, reduce: bool = True, cwd: Path = None,
+             priority: str = "normal", name: str = None, trace: Trace = None) -> Tuple[str, int, str, str]:
+    """
+    Answer a task, returning (response, max_lines, cache status, cli name)
+    where the status is "hit", "miss" or "" when the cache was bypassed.
+    Raises Queued if the budget defers it, RuntimeError if the CLI fails.
+    Stage timings are added to trace when given.
+    """
+    cwd = cwd or Path.cwd()
+    trace = trace or Trace()
+    cli = router = None
+    cli_label = cli_name(cli_argv(""))
+    with trace.span("prepare"):
+        delegation = pre_delegate.prepare(task, context, max_lines, reduce, cwd, cli_label, priority, name)
+    decision = delegation.decision
+    if decision is not None and decision.action == "queue":
+        queue = token_budget.enqueue(cwd, token_budget.queue_row(
+            task, context, max_lines, os.environ.get("DELEGATE_CLI"), name, priority,
+        ))
+        raise Queued(f"{decision.reason}; queued in {queue}")
+    if decision is not None and decision.action == "reroute":
+        cli, cli_label = decision.command, decision.cli
+    elif not os.environ.get("DELEGATE_CLI"):
+        router = cli_router.load_router(cwd)
+    trace.cli = cli_label
+
+    cache = key = None
+    if use_cache and os.environ.get("DELEGATE_NO_CACHE") != "1":
+        with trace.span("cache"):
+            cache = response_cache.project_cache(post_delegate.find_metrics_dir(cwd).parent)
+            # Keyed by who answers; the router's pick is only known after the lookup
+            answered_by = cli_command(cli) if router is None else router.signature()
+            key = response_cache.cache_key(delegation.prompt, cwd, answered_by)
+            entry = cache.get_entry(key)
+        if entry is not None:
+            cli_label = trace.cli = entry.get("cli") or cli_label
+            return entry["response"], delegation.max_lines, "hit", cli_label
+
+    with trace.span("cli"):
+        if router is not None:
+            routed = router.run(delegation.prompt, cwd)
+            exit_code, response, errors = routed.exit_code, routed.response, routed.errors
+            cli_label = trace.cli = routed.cli
+        else:
+            exit_code, response, errors = run_cli(delegation.prompt, cli, cwd=cwd)
+    if exit_code != 0:
+        raise RuntimeError(errors.strip() or f"delegate CLI exited with {exit_code}")
+
+    if cache is None:
+        return response, delegation.max_lines, "", cli_label
+    if response.strip():
+        cache.put(key, response, task=task, cli=cli_label)
+    return response, delegation.max_lines, "miss", cli_label
+
+
+def main(argv: list = None, cwd: Path = None):
+    """Main execution."""
+    argv = sys.argv if argv is None else argv
+    if len(argv) < 2 or argv[1] in ('-h', '--help'):
+        print(__doc__)
+        sys.exit(1)
+
+    use_cache = '--no-cache' not in argv
+    reduce = '--no-reduce' not in argv
+    args = [arg for arg in argv[1:] if arg not in ('--no-cache', '--no-reduce')]
+    options = {'--name': None, '--priority': "normal"}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+
+    task = args[0]
+    context = args[1] if len(args) > 1 else "General task"
+    max_lines = int(args[2]) if len(args) > 2 else None
+
+    start = time.perf_counter()
+    trace = Trace()
+    try:
+        response, max_lines, status, cli = delegate(task, context, max_lines, use_cache, reduce, cwd,
+                                                    options['--priority'], options['--name'], trace)
+    except Queued as e:
+        print(f"⏳ Budget: {e}", file=sys.stderr)
+        sys.exit(3)
+    except RuntimeError as e:
+        print(f"❌ Delegation failed: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    print(response.rstrip())
+    print()
+    if status == "hit":
+        print("♻️  Cached response (unchanged prompt and project state)")
+
+    post_argv = ["post-delegate", response, str(max_lines),
+                 options['--name'] or pre_delegate.detect_task_type(task), "--cli", cli,
+                 "--latency", f"{time.perf_counter() - start:.3f}",
+                 "--trace", trace.correlation_id, "--spans", trace.format()]
+    if status:
+        post_argv += ["--cache", status]
+    post_delegate.main(post_argv, cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Single-pass task classifier for delegation hooks
+Replaces per-call regex cascades with one precompiled keyword scan
+
+Rules are written in the same regex style as the routing presets, e.g.
+    ^(git|npm|pip)\\s
+    (analyze|review|inspect).*code
+    (search|documentation|lookup|find.*docs)
+
+Patterns made of literals, groups of alternatives, `.*` gaps, a leading `^`
+and trailing `\\s` are compiled into a keyword trie that is scanned once per
+task, so adding hundreds of rules does not add per-rule regex searches. Any
+other regex syntax still works but is evaluated separately (slow path).
+
+Usage:
+    python task_classifier.py <task>
+"""
+
+import re
+import sys
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# A term is (literal, needs_trailing_whitespace, anchored_at_start)
+Term = Tuple[str, bool, bool]
+Sequence = List[Term]
+
+_META = set('\\^$.|?*+()[]{}')
+
+
+class Classification(NamedTuple):
+    """Result of classifying one task."""
+    task_type: str
+    max_lines: int
+    route: Optional[str]
+    reducer: Optional[str] = None
+
+
+class Rule(NamedTuple):
+    """A compiled classification rule."""
+    group: str
+    label: object
+    priority: int
+    sequences: Optional[List[Sequence]]
+    regex: Optional[object]
+
+
+def _parse_alternation(pattern: str, i: int) -> Tuple[Optional[List[list]], int]:
+    """Parse `a|b|...` until ')' or end. Returns token sequences (or None)."""
+    alternatives = []
+    while True:
+        seqs, i = _parse_sequence(pattern, i)
+        if seqs is None:
+            return None, i
+        alternatives.extend(seqs)
+        if i < len(pattern) and pattern[i] == '|':
+            i += 1
+            continue
+        return alternatives, i
+
+
+def _parse_sequence(pattern: str, i: int) -> Tuple[Optional[List[list]], int]:
+    """Parse concatenated items, expanding groups into alternative sequences."""
+    seqs = [[]]
+    while i < len(pattern) and pattern[i] not in '|)':
+        ch = pattern[i]
+        if ch == '(':
+            inner, i = _parse_alternation(pattern, i + 1)
+            if inner is None or i >= len(pattern) or pattern[i] != ')':
+                return None, i
+            i += 1
+            seqs = [s + alt for s in seqs for alt in inner]
+            continue
+        if pattern.startswith('.*', i):
+            tokens, i = [('gap',)], i + 2
+        elif ch == '^':
+            tokens, i = [('bol',)], i + 1
+        elif ch == '\\' and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            if nxt == 's':
+                tokens = [('ws',)]
+            elif nxt in _META or nxt in ' -/:@#%&=,\'"':
+                tokens = [('lit', nxt.lower())]
+            else:
+                return None, i
+            i += 2
+        elif ch in _META:
+            return None, i
+        else:
+            tokens, i = [('lit', ch.lower())], i + 1
+        seqs = [s + tokens for s in seqs]
+    return seqs, i
+
+
+def _to_terms(tokens: list) -> Optional[Sequence]:
+    """Convert a token sequence into ordered keyword terms."""
+    terms = []
+    literal, needs_ws, anchored = '', False, False
+    for index, token in enumerate(tokens):
+        kind = token[0]
+        if kind == 'bol':
+            if index != 0:
+                return None
+            anchored = True
+        elif kind == 'lit':
+            if needs_ws:
+                return None
+            literal += token[1]
+        elif kind == 'ws':
+            if needs_ws or not literal:
+                return None
+            needs_ws = True
+        elif kind == 'gap':
+            if literal:
+                terms.append((literal, needs_ws, anchored))
+            elif anchored:
+                return None
+            literal, needs_ws, anchored = '', False, False
+    if literal:
+        terms.append((literal, needs_ws, anchored))
+    elif anchored:
+        return None
+    return terms or None
+
+
+def compile_pattern(pattern: str) -> Optional[List[Sequence]]:
+    """
+    Compile a regex-style pattern into case-insensitive keyword sequences.
+    Returns None when the pattern needs the regex slow path.
+    """
+    alternatives, end = _parse_alternation(pattern, 0)
+    if alternatives is None or end != len(pattern):
+        return None
+
+    sequences = []
+    for tokens in alternatives:
+        terms = _to_terms(tokens)
+        if terms is None:
+            return None
+        sequences.append(terms)
+    return sequences
+
+
+def _trie_regex(node: dict) -> str:
+    """Render a trie as a prefix-factored regex (longest keyword wins)."""
+    terminal = '' in node
+    branches = [re.escape(ch) + _trie_regex(child)
+                for ch, child in sorted(node.items()) if ch != '']
+    if not branches:
+        return ''
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    body = '(?:' + '|'.join(branches) + ')'
+    return body + '?' if terminal else body
+
+
+class TaskClassifier:
+    """
+    Keyword-trie classifier returning the best rule per group in one scan.
+    Earlier rules in a group win over later ones, like an if/elif cascade.
+    """
+
+    def __init__(self):
+        self.rules: List[Rule] = []
+        self._group_sizes: Dict[str, int] = {}
+        self._scanner = None
+        self._compiled = False
+        self._prefixes: Dict[str, List[str]] = {}
+        self._by_keyword: Dict[str, List[Tuple[Rule, Sequence]]] = {}
+        self._slow_rules: List[Rule] = []
+
+    def add(self, group: str, label, pattern: str):
+        """
+        Register a rule; lower insertion order means higher priority.
+        Raises re.error for an invalid pattern.
+        """
+        sequences = compile_pattern(pattern)
+        # Case-folding the source would turn escapes like \S into \s
+        regex = None if sequences is not None else re.compile(pattern, re.IGNORECASE)
+        priority = self._group_sizes.get(group, 0)
+        self._group_sizes[group] = priority + 1
+        self.rules.append(Rule(group, label, priority, sequences, regex))
+        self._compiled = False
+
+    def add_presets(self, presets: Dict[str, dict]):
+        """
+        Register routing presets (as built by setup.py) in the route group,
+        skipping (with a warning) any whose pattern is not a valid regex.
+        """
+        for name, preset in presets.items():
+            try:
+                self.add("route", name, preset["pattern"])
+            except re.error as e:
+                print(f"⚠️  Ignoring routing preset {name!r}: {e}", file=sys.stderr)
+
+    def _compile(self):
+        keywords = set()
+        self._by_keyword = {}
+        self._slow_rules = []
+        for rule in self.rules:
+            if rule.sequences is None:
+                self._slow_rules.append(rule)
+                continue
+            for seq in rule.sequences:
+                keywords.update(term[0] for term in seq)
+                self._by_keyword.setdefault(seq[0][0], []).append((rule, seq))
+
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+
+        # A longest match implies every keyword that is a prefix of it
+        self._prefixes = {}
+        for keyword in keywords:
+            node, found = trie, []
+            for i, ch in enumerate(keyword):
+                node = node[ch]
+                if '' in node:
+                    found.append(keyword[:i + 1])
+            self._prefixes[keyword] = found
+
+        pattern = _trie_regex(trie)
+        self._scanner = re.compile(pattern) if pattern else None
+        self._compiled = True
+
+    def scan(self, text: str) -> Dict[str, List[int]]:
+        """Find start offsets of every keyword occurrence in one pass."""
+        if not self._compiled:
+            self._compile()
+        occurrences = {}
+        if self._scanner is None:
+            return occurrences
+        prefixes = self._prefixes
+        search = self._scanner.search
+        # Restart one character after each hit so overlapping keywords are seen
+        match = search(text)
+        while match:
+            start = match.start()
+            for keyword in prefixes[match.group()]:
+                if keyword in occurrences:
+                    occurrences[keyword].append(start)
+                else:
+                    occurrences[keyword] = [start]
+            match = search(text, start + 1)
+        return occurrences
+
+    @staticmethod
+    def _matches(seq: Sequence, text: str, occurrences: Dict[str, List[int]]) -> bool:
+        """Check terms occur in order (greedy earliest end is optimal)."""
+        if len(seq) == 1 and not seq[0][1] and not seq[0][2]:
+            return True  # Plain keyword: occurring at all is a match
+        pos = 0
+        for literal, needs_ws, anchored in seq:
+            for start in occurrences.get(literal, ()):
+                if start < pos:
+                    continue
+                if anchored and start != 0:
+                    return False
+                end = start + len(literal)
+                if needs_ws and not (end < len(text) and text[end].isspace()):
+                    continue
+                pos = end
+                break
+            else:
+                return False
+        return True
+
+    def match(self, text: str) -> Dict[str, object]:
+        """Return the highest-priority label per group matching text."""
+        text = text.lower()
+        occurrences = self.scan(text)
+
+        best: Dict[str, Rule] = {}
+        for keyword in occurrences:
+            for rule, seq in self._by_keyword.get(keyword, ()):
+                current = best.get(rule.group)
+                if current is not None and current.priority <= rule.priority:
+                    continue
+                if self._matches(seq, text, occurrences):
+                    best[rule.group] = rule
+
+        for rule in self._slow_rules:
+            current = best.get(rule.group)
+            if (current is None or rule.priority < current.priority) and rule.regex.search(text):
+                best[rule.group] = rule
+
+        return {group: rule.label for group, rule in best.items()}
+
+
+def default_classifier() -> TaskClassifier:
+    """Build the classifier encoding the built-in task type and compression rules."""
+    classifier = TaskClassifier()
+
+    # Task type, in cascade order
+    classifier.add("task_type", "shell", r'^(git|npm|pip|ls|find|cat|echo|curl|wget)\s')
+    classifier.add("task_type", "search", r'^grep\s')
+    classifier.add("task_type", "search", r'(search|find.*file|grep.*code|locate)')
+    classifier.add("task_type", "analyze", r'(analyze|review|audit|check|inspect|investigate)')
+    classifier.add("task_type", "docs", r'(doc|documentation|api|how.*use|example)')
+
+    # Compression: highly verbose commands need aggressive compression
+    classifier.add("max_lines", 5, r'(npm ls|git log|find\s|pip freeze)')
+    classifier.add("max_lines", 8, r'(grep|search|audit|scan)')
+
+    # Local output reducers for the verbose commands (see output_reducers)
+    classifier.add("reducer", "npm_ls", r'^npm ls')
+    classifier.add("reducer", "git_log", r'^git log')
+    classifier.add("reducer", "pip_freeze", r'^pip freeze')
+    classifier.add("reducer", "find", r'^find\s')
+
+    return classifier
+
+
+def load_presets(path: Path) -> Dict[str, dict]:
+    """Load routing presets saved by the installer (empty if missing)."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def classify(task: str, classifier: TaskClassifier) -> Classification:
+    """Classify a task into type, line budget and optional route."""
+    labels = classifier.match(task)
+    return Classification(
+        task_type=labels.get("task_type", "generic"),
+        max_lines=labels.get("max_lines", 10),
+        route=labels.get("route"),
+        reducer=labels.get("reducer"),
+    )
+
+
+def main():
+    """Main execution."""
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print(__doc__)
+        sys.exit(1)
+
+    classifier = default_classifier()
+    classifier.add_presets(load_presets(Path.cwd() / ".claude" / "routing_presets.json"))
+    result = classify(sys.argv[1], classifier)
+    print(f"type={result.task_type} max_lines={result.max_lines} route={result.route or '-'}")
+
+
+if __name__ == "__main__":
+    main()
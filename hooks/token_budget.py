@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Token budget across the 5-hour quota window
+Keeps a sliding-window ledger of response tokens brought back into Claude's
+context per CLI, predicts remaining capacity and decides, before a
+delegation, whether to run it as is, tighten max_lines, reroute it to
+another CLI or queue it until the window frees up
+
+The ledger (metrics/budget-ledger.json) holds 5-minute buckets of tokens,
+lines and delegations per CLI for the last window. metrics_writer updates
+it with every commit, under the same lock as the rollups, so reading it
+costs one small file.
+
+Budgets and policy live in .claude/budget.json (all keys optional):
+    {"total": 19000, "policy": "default",
+     "clis": {"gemini": {"budget": 15000, "command": "gemini -p"},
+              "copilot": {"budget": 8000, "command": "copilot -p"}}}
+
+Policies:
+    off      always run
+    tighten  shrink max_lines from 70% of the budget, never below 3 lines
+    default  tighten, queue low-priority delegations from 90%, and queue any
+             delegation whose predicted cost exceeds what is left
+
+Queued delegations go to .claude/queue.jsonl, a batch file for
+batch_delegate.py. Running the queue drains it: the file is renamed to a
+.processing file first (delegations queued meanwhile start a new queue),
+failed rows are queued again and the rest are removed.
+
+Usage:
+    python token_budget.py status
+    python token_budget.py simulate [--csv FILE...] [--budget N] [--low TASK,...]
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import metrics_store
+
+WINDOW_SECONDS = 5 * 3600
+BUCKET_SECONDS = 300
+BURN_SECONDS = 1800
+DEFAULT_BUDGET = 19_000
+DEFAULT_CLI = "gemini"
+DEFAULT_TOKENS_PER_LINE = 20
+MIN_LINES = 3
+
+LEDGER_FILE = "budget-ledger.json"
+LEDGER_VERSION = 1
+CONFIG_FILE = "budget.json"
+QUEUE_FILE = "queue.jsonl"
+
+
+class Policy(NamedTuple):
+    """Usage fractions at which a policy starts acting."""
+    name: str
+    tighten_at: float
+    queue_low_at: Optional[float]
+    queue_when_exhausted: bool
+
+
+POLICIES: Dict[str, Policy] = {
+    "off": Policy("off", 2.0, None, False),
+    "tighten": Policy("tighten", 0.7, None, False),
+    "default": Policy("default", 0.7, 0.9, True),
+}
+
+
+class BudgetConfig(NamedTuple):
+    total: int = DEFAULT_BUDGET
+    budgets: Dict[str, int] = {}
+    commands: Dict[str, str] = {}
+    policy: str = "default"
+
+
+class Capacity(NamedTuple):
+    """Window spend against a budget; exhausted_in is seconds at the current burn rate."""
+    budget: int
+    spent: int
+    remaining: int
+    fraction: float
+    exhausted_in: Optional[float]
+    frees_next_hour: int
+
+
+class Decision(NamedTuple):
+    """What to do with a delegation: run, tighten, reroute (to command) or queue."""
+    action: str
+    max_lines: int
+    cli: str
+    reason: str = ""
+    command: Optional[str] = None
+
+
+class Ledger:
+    """Per-CLI buckets of [tokens, lines, count] keyed by bucket start time."""
+
+    def __init__(self, buckets: Dict[str, Dict[int, list]] = None):
+        self.buckets = buckets or {}
+
+    def add(self, cli: str, timestamp: int, tokens: int, lines: int):
+        start = timestamp - timestamp % BUCKET_SECONDS
+        bucket = self.buckets.setdefault(cli or DEFAULT_CLI, {}).setdefault(start, [0, 0, 0])
+        bucket[0] += tokens
+        bucket[1] += lines
+        bucket[2] += 1
+
+    def prune(self, now: int):
+        oldest = now - WINDOW_SECONDS
+        for cli in list(self.buckets):
+            buckets = self.buckets[cli]
+            for start in [s for s in buckets if s + BUCKET_SECONDS <= oldest]:
+                del buckets[start]
+            if not buckets:
+                del self.buckets[cli]
+
+    def _window(self, now: int, cli: str = None, since: int = None) -> Iterable[tuple]:
+        oldest = now - WINDOW_SECONDS if since is None else since
+        for name, buckets in self.buckets.items():
+            if cli is not None and name != cli:
+                continue
+            for start, totals in buckets.items():
+                if start + BUCKET_SECONDS > oldest and start <= now:
+                    yield start, totals
+
+    def spent(self, now: int, cli: str = None) -> int:
+        """Tokens spent in the window ending at now."""
+        return sum(totals[0] for _, totals in self._window(now, cli))
+
+    def tokens_per_line(self, now: int) -> float:
+        tokens = lines = 0
+        for _, totals in self._window(now):
+            tokens += totals[0]
+            lines += totals[1]
+        return tokens / lines if lines else DEFAULT_TOKENS_PER_LINE
+
+    def burn_rate(self, now: int, cli: str = None) -> float:
+        """Tokens per second over the last BURN_SECONDS."""
+        recent = sum(totals[0] for _, totals in self._window(now, cli, now - BURN_SECONDS))
+        return recent / BURN_SECONDS
+
+    def expiring(self, now: int, seconds: int, cli: str = None) -> int:
+        """Tokens that leave the window within the next seconds."""
+        cutoff = now - WINDOW_SECONDS + seconds
+        return sum(totals[0] for start, totals in self._window(now, cli) if start + BUCKET_SECONDS <= cutoff)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": LEDGER_VERSION,
+            "clis": {cli: {str(start): totals for start, totals in buckets.items()}
+                     for cli, buckets in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Ledger":
+        return cls({cli: {int(start): totals for start, totals in buckets.items()}
+                    for cli, buckets in data["clis"].items()})
+
+
+def now_ts() -> int:
+    """Current time on the metrics store's clock (local time as epoch seconds)."""
+    return metrics_store.to_epoch(datetime.now())
+
+
+def build_ledger(metrics_dir: Path, now: int) -> Ledger:
+    """Rebuild the window's ledger from the store."""
+    ledger = Ledger()
+    start = now - WINDOW_SECONDS
+    for path in metrics_store.store_files(metrics_dir, start, now):
+        for row in metrics_store.iter_rows(path, start, now):
+            ledger.add(row.get("cli", ""), row["timestamp"], row["tokens"], row["lines"])
+    return ledger
+
+
+def read_ledger(metrics_dir: Path, now: int = None) -> Ledger:
+    """The current window's ledger (rebuilt from the store if missing)."""
+    now = now_ts() if now is None else now
+    try:
+        data = json.loads((metrics_dir / LEDGER_FILE).read_text())
+        if data.get("version") != LEDGER_VERSION:
+            raise ValueError(data.get("version"))
+        ledger = Ledger.from_dict(data)
+    except (FileNotFoundError, ValueError, KeyError):
+        ledger = build_ledger(metrics_dir, now)
+    ledger.prune(now)
+    return ledger
+
+
+def write_ledger(metrics_dir: Path, ledger: Ledger):
+    """Write atomically, like the rollups."""
+    path = metrics_dir / LEDGER_FILE
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(ledger.to_dict(), separators=(",", ":")))
+    os.replace(str(tmp), str(path))
+
+
+def update_ledger(metrics_dir: Path, records: List[dict]):
+    """Fold committed records into the ledger (call under the metrics lock, after appending)."""
+    now = max(now_ts(), max(record["timestamp"] for record in records))
+    path = metrics_dir / LEDGER_FILE
+    if not path.exists():
+        write_ledger(metrics_dir, build_ledger(metrics_dir, now))  # Already holds the new records
+        return
+    ledger = read_ledger(metrics_dir, now)
+    for record in records:
+        ledger.add(record.get("cli", ""), record["timestamp"], record["tokens"], record["lines"])
+    ledger.prune(now)
+    write_ledger(metrics_dir, ledger)
+
+
+def load_config(claude_dir: Path) -> BudgetConfig:
+    path = claude_dir / CONFIG_FILE
+    data = json.loads(path.read_text()) if path.exists() else {}
+    clis = data.get("clis", {})
+    return BudgetConfig(
+        total=int(data.get("total", DEFAULT_BUDGET)),
+        budgets={name: int(cli["budget"]) for name, cli in clis.items() if cli.get("budget")},
+        commands={name: cli["command"] for name, cli in clis.items() if cli.get("command")},
+        policy=data.get("policy", "default"),
+    )
+
+
+def capacity(ledger: Ledger, budget: int, now: int, cli: str = None) -> Capacity:
+    spent = ledger.spent(now, cli)
+    remaining = max(0, budget - spent)
+    rate = ledger.burn_rate(now, cli)
+    return Capacity(
+        budget=budget,
+        spent=spent,
+        remaining=remaining,
+        fraction=spent / budget if budget else 1.0,
+        exhausted_in=remaining / rate if rate else None,
+        frees_next_hour=ledger.expiring(now, 3600, cli),
+    )
+
+
+def _reroute(ledger: Ledger, config: BudgetConfig, now: int, cli: str, cost: float) -> Optional[str]:
+    """Another CLI with its own budget and room for cost, preferring the emptiest."""
+    best, best_fraction = None, 1.0
+    for name, budget in config.budgets.items():
+        if name == cli or name not in config.commands:
+            continue
+        other = capacity(ledger, budget, now, name)
+        if other.remaining >= cost and other.fraction < best_fraction:
+            best, best_fraction = name, other.fraction
+    return best
+
+
+def decide(ledger: Ledger, config: BudgetConfig, now: int, max_lines: int,
+           cli: str = None, priority: str = "normal", policy: Policy = None) -> Decision:
+    """Schedule one delegation against the window's remaining capacity."""
+    policy = policy or POLICIES.get(config.policy, POLICIES["default"])
+    cli = cli or DEFAULT_CLI
+    if policy.name == "off":
+        return Decision("run", max_lines, cli)
+
+    per_line = ledger.tokens_per_line(now)
+    cost = per_line * max_lines
+
+    # This CLI's own budget is nearly used up: move to one with room
+    if cli in config.budgets:
+        own = capacity(ledger, config.budgets[cli], now, cli)
+        if own.remaining < cost or own.fraction >= (policy.queue_low_at or 0.9):
+            other = _reroute(ledger, config, now, cli, cost)
+            if other is not None:
+                return Decision("reroute", max_lines, other, f"{cli} at {own.fraction:.0%} of its budget",
+                                config.commands[other])
+
+    total = capacity(ledger, config.total, now)
+    if policy.queue_when_exhausted and per_line * MIN_LINES > total.remaining:
+        return Decision("queue", MIN_LINES, cli, f"window budget exhausted ({total.spent:,}/{total.budget:,})")
+    if (priority == "low" and policy.queue_low_at is not None
+            and total.fraction >= policy.queue_low_at):
+        return Decision("queue", MIN_LINES, cli, f"low priority at {total.fraction:.0%} of budget")
+
+    limit = max_lines
+    if priority != "high" and total.fraction >= policy.tighten_at:
+        left = max(0.0, 1 - total.fraction) / (1 - policy.tighten_at)
+        limit = round(max_lines * left)
+    if policy.queue_when_exhausted or priority != "high":
+        limit = min(limit, int(total.remaining // per_line))
+    limit = max(MIN_LINES, min(max_lines, limit))
+    if limit < max_lines:
+        return Decision("tighten", limit, cli, f"{total.fraction:.0%} of window budget used")
+    return Decision("run", max_lines, cli)
+
+
+def _claude_dir(cwd: Path) -> Path:
+    return metrics_store.find_metrics_dir(cwd).parent
+
+
+def schedule(cwd: Path, max_lines: int, cli: str = None, priority: str = "normal") -> Decision:
+    """Decision for a delegation started in cwd, from its project's ledger and config."""
+    claude_dir = _claude_dir(cwd)
+    config = load_config(claude_dir)
+    now = now_ts()
+    return decide(read_ledger(claude_dir / "metrics", now), config, now, max_lines, cli, priority)
+
+
+def append_queue(path: Path, rows: List[dict]):
+    """Append delegations to a queue file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(row) + "\n" for row in rows))
+
+
+def queue_row(task: str, context: str = "General task", max_lines: int = None, cli: str = None,
+              name: str = None, priority: str = "normal") -> dict:
+    """A queued delegation, in the row shape batch_delegate.py reads."""
+    return {"task": task, "context": context, "max_lines": max_lines, "cli": cli,
+            "name": name, "priority": priority}
+
+
+def enqueue(cwd: Path, row: dict) -> Path:
+    """Append a delegation to the project's queue (a batch_delegate.py file)."""
+    path = _claude_dir(cwd) / QUEUE_FILE
+    append_queue(path, [row])
+    return path
+
+
+def claim_queue(path: Path) -> Optional[Path]:
+    """
+    Take a queue's rows for a batch run by renaming it to a .processing file
+    (atomic, so each row is claimed by one run); None if it is missing.
+    """
+    claimed = path.with_name(f"{path.stem}.{os.getpid()}.processing")
+    try:
+        os.rename(str(path), str(claimed))
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def release_queue(path: Path, claimed: Path, rows: List[dict] = None):
+    """
+    Give a claimed file back to its queue: append rows (every line of the
+    claimed file when rows is None), then delete the claimed file.
+    """
+    if rows is None:
+        with claimed.open("r", encoding="utf-8") as f:
+            lines = [line if line.endswith("\n") else line + "\n" for line in f if line.strip()]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.write("".join(lines))
+    else:
+        append_queue(path, rows)
+    claimed.unlink()
+
+
+class SimResult(NamedTuple):
+    """Outcome of replaying history under one policy."""
+    policy: str
+    delegations: int
+    tightened: int
+    queued: int
+    still_queued: int
+    tokens: int
+    peak_fraction: float
+    overruns: int
+
+
+def simulate(records: List[dict], config: BudgetConfig, policy: Policy,
+             low_tasks: Iterable[str] = ()) -> SimResult:
+    """
+    Replay records in time order under a policy. A tightened delegation is
+    assumed to shrink tokens and lines in proportion to max_lines (taken as
+    the logged line count); queued ones are retried at each later record.
+    """
+    low_tasks = set(low_tasks)
+    ledger = Ledger()
+    queue: List[dict] = []
+    tightened = queued = overruns = tokens = 0
+    peak = 0.0
+
+    def run(record: dict, now: int) -> bool:
+        nonlocal tightened, queued, overruns, tokens, peak
+        priority = "low" if record["task"] in low_tasks else "normal"
+        wanted = max(record["lines"], 1)
+        decision = decide(ledger, config, now, wanted, record.get("cli"), priority, policy)
+        if decision.action == "queue":
+            return False
+        scale = min(1.0, decision.max_lines / wanted)
+        if scale < 1.0:
+            tightened += 1
+        spent = round(record["tokens"] * scale)
+        ledger.add(decision.cli, now, spent, round(record["lines"] * scale))
+        tokens += spent
+        fraction = ledger.spent(now) / config.total
+        peak = max(peak, fraction)
+        overruns += fraction > 1.0
+        return True
+
+    for record in sorted(records, key=lambda r: r["timestamp"]):
+        now = record["timestamp"]
+        queue = [item for item in queue if not run(item, now)]
+        if not run(record, now):
+            queued += 1
+            queue.append(record)
+
+    return SimResult(policy.name, len(records) - len(queue), tightened, queued,
+                     len(queue), tokens, peak, overruns)
+
+
+def load_history(metrics_dir: Path, csv_files: List[Path] = None) -> List[dict]:
+    """Records from legacy CSVs, or every day in the metrics store."""
+    records = []
+    if csv_files:
+        for path in csv_files:
+            with path.open("r") as f:
+                next(f, None)  # Skip header
+                records.extend(row for row in map(metrics_store.parse_csv_row, f) if row)
+        return records
+
+    import metrics_rollup
+
+    for date in metrics_rollup.data_dates(metrics_dir):
+        records.extend(metrics_rollup.iter_day_rows(metrics_dir, date))
+    return records
+
+
+def main():
+    args = sys.argv[1:]
+    command = args.pop(0) if args else "status"
+    if command not in ("status", "simulate"):
+        print(__doc__)
+        sys.exit(1)
+
+    claude_dir = _claude_dir(Path.cwd())
+    config = load_config(claude_dir)
+
+    if command == "status":
+        now = now_ts()
+        ledger = read_ledger(claude_dir / "metrics", now)
+        total = capacity(ledger, config.total, now)
+        print(f"🪙 Window budget: {total.spent:,}/{total.budget:,} tokens ({total.fraction:.0%}), "
+              f"{total.remaining:,} left, {total.frees_next_hour:,} freed within the hour")
+        if total.exhausted_in is not None:
+            print(f"   At the current burn rate the budget runs out in {total.exhausted_in / 60:.0f} min")
+        for cli in sorted(ledger.buckets):
+            budget = config.budgets.get(cli)
+            spent = ledger.spent(now, cli)
+            print(f"   {cli}: {spent:,} tokens" + (f" of {budget:,}" if budget else ""))
+        return
+
+    csv_files, low_tasks = [], []
+    while args:
+        option = args.pop(0)
+        if option == "--csv":
+            while args and not args[0].startswith("--"):
+                csv_files.append(Path(args.pop(0)))
+        elif option == "--budget":
+            config = config._replace(total=int(args.pop(0)))
+        elif option == "--low":
+            low_tasks = args.pop(0).split(",")
+
+    records = load_history(claude_dir / "metrics", csv_files)
+    print(f"📊 Replaying {len(records):,} delegations against {config.total:,} tokens / 5h")
+    print(f"   {'policy':<8} {'ran':>6} {'tightened':>9} {'queued':>7} {'left':>5} "
+          f"{'tokens':>9} {'peak':>6} {'overruns':>8}")
+    for policy in POLICIES.values():
+        result = simulate(records, config, policy, low_tasks)
+        print(f"   {result.policy:<8} {result.delegations:6,} {result.tightened:9,} {result.queued:7,} "
+              f"{result.still_queued:5,} {result.tokens:9,} {result.peak_fraction:6.0%} {result.overruns:8,}")
+
+
+if __name__ == "__main__":
+    main()
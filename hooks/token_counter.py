@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Token counting for delegation hooks
+Replaces the chars/4 rule with a BPE-style approximation that tracks how
+real tokenizers split code, JSON and non-English text
+
+Counters are pluggable by name:
+    approx    bundled offline approximator (default)
+    chars     legacy 1 token per 4 characters
+    tiktoken  cl100k_base via tiktoken, when it is installed
+
+Select one with DELEGATE_TOKENIZER=<name> or register your own with
+register_counter(). Results for large texts are cached by content hash, so
+validating the same response twice costs one hash.
+
+Usage:
+    python token_counter.py [--counter NAME] [file]   # reads stdin by default
+"""
+
+import os
+import re
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+Counter = Callable[[str], int]
+
+CHUNK_CHARS = 1 << 20
+CACHE_SIZE = 256
+CACHE_MIN_CHARS = 1024
+
+_cache: "OrderedDict[tuple, int]" = OrderedDict()
+_cache_lock = threading.Lock()  # count_tokens runs in worker threads (batch_delegate, the daemon)
+
+
+def _byte_class(byte: int) -> bytes:
+    """a letter, d digit, p punctuation, s whitespace, u non-ASCII byte."""
+    if byte >= 128:
+        return b"u"
+    char = chr(byte)
+    if char.isspace():
+        return b"s"
+    if char.isalpha():
+        return b"a"
+    if char.isdigit():
+        return b"d"
+    return b"p"
+
+
+def _table(classify) -> bytes:
+    return bytes.maketrans(bytes(range(256)), b"".join(classify(b) for b in range(256)))
+
+
+# Byte -> class tables. Counting happens on the translated bytes with
+# bytes.count / big-int XOR, so no per-character Python code runs.
+_RUNS = _table(_byte_class)
+_SPACES = _table(lambda b: b" " if b == 32 else b"n" if _byte_class(b) == b"s" else b"w")
+_LETTERS = _table(lambda b: b"a" if _byte_class(b) == b"a" else b".")
+
+
+def _transitions(classes: bytes) -> int:
+    """Number of adjacent byte pairs whose classes differ."""
+    if len(classes) < 2:
+        return 0
+    diff = int.from_bytes(classes[1:], "little") ^ int.from_bytes(classes[:-1], "little")
+    return len(classes) - 1 - diff.to_bytes(len(classes) - 1, "little").count(0)
+
+
+def _run_extras(classes: bytes, cls: bytes, per_token: int) -> int:
+    """Sum of (len - 1) // per_token over runs of cls longer than per_token."""
+    extras = 0
+    needle = cls * (per_token + 1)
+    start = classes.find(needle)
+    while start >= 0:
+        end = start + len(needle)
+        while end < len(classes) and classes[end] == cls[0]:
+            end += 1
+        extras += (end - start - 1) // per_token
+        start = classes.find(needle, end)
+    return extras
+
+
+def _count_chunk(text: str) -> tuple:
+    """(tokens, extra UTF-8 bytes) for one chunk."""
+    if not text:
+        return 0, 0
+    data = text.encode("utf-8", "surrogatepass")
+    runs = data.translate(_RUNS)
+    tokens = 1 + _transitions(runs)
+
+    # A single space before a word is part of that word's token; whitespace
+    # ending in a newline before a word splits into two tokens
+    spaces = data.translate(_SPACES)
+    tokens -= spaces.count(b" w") - spaces.count(b"  w") - spaces.count(b"n w")
+    tokens += spaces.count(b" nw") + spaces.count(b"nnw")
+
+    # Long words: sum of len // 4, minus one per word of 4+ letters
+    letters = data.translate(_LETTERS)
+    tokens += letters.count(b"aaaa") - letters.count(b".aaaa") - letters.startswith(b"aaaa")
+
+    # Digit groups of 3, punctuation runs of 4
+    tokens += _run_extras(runs, b"d", 3) + _run_extras(runs, b"p", 4)
+    return tokens, len(data) - len(text)
+
+
+def _chunks(text: str, size: int):
+    """Split text into ~size pieces, cutting before a space that starts a word."""
+    start = 0
+    while len(text) - start > size:
+        end = start + size
+        cut = text.rfind(" ", start + 1, end)
+        while 0 < cut < len(text) - 1 and text[cut + 1].isspace():
+            cut += 1
+        if cut <= start:
+            cut = end
+        yield text[start:cut]
+        start = cut
+    yield text[start:]
+
+
+def approx_parts(text: str, chunk_chars: int = CHUNK_CHARS) -> Tuple[int, int]:
+    """
+    (tokens, extra UTF-8 bytes) behind approx_tokens, which is
+    tokens + extra // 2. For texts cut between a non-space character and a
+    whitespace run, the parts of the pieces add up to the parts of the whole.
+    """
+    tokens = extra_bytes = 0
+    for chunk in _chunks(text, chunk_chars):
+        chunk_tokens, chunk_bytes = _count_chunk(chunk)
+        tokens += chunk_tokens
+        extra_bytes += chunk_bytes
+    return tokens, extra_bytes
+
+
+def approx_tokens(text: str, chunk_chars: int = CHUNK_CHARS) -> int:
+    """
+    Approximate BPE token count.
+
+    Follows GPT-style pre-tokenization: every run of letters, punctuation,
+    whitespace or non-ASCII text is one token, with a single leading space
+    folded into the following word. On top of that, words longer than 7
+    letters cost one more token per 4 letters, digits group in threes,
+    punctuation merges in fours and non-ASCII text costs one token per two
+    extra UTF-8 bytes (roughly one per CJK character). Large texts are
+    counted in chunks so memory stays bounded.
+    """
+    tokens, extra_bytes = approx_parts(text, chunk_chars)
+    return tokens + extra_bytes // 2
+
+
+class TokenTally:
+    """
+    Running token count over text fed in pieces (e.g. a streamed response).
+    Pieces are cut where a whitespace run starts, which gives the same
+    count as counting the whole text at once.
+    """
+
+    def __init__(self, counter: str = None):
+        self._count = get_counter(counter)
+        self._tokens = 0
+        self._extra_bytes = 0
+        self._pending = ""
+
+    def feed(self, text: str):
+        text = self._pending + text
+        cut = len(text.rstrip())
+        if cut == len(text):
+            cut = max(text.rfind(" "), text.rfind("\n"))
+            while cut > 0 and text[cut - 1].isspace():
+                cut -= 1
+        if cut <= 0:
+            if len(text) < CHUNK_CHARS:
+                self._pending = text
+                return
+            cut = len(text)  # No word boundary at all: count what we have
+        self._add(text[:cut])
+        self._pending = text[cut:]
+
+    def _add(self, text: str):
+        if self._count is approx_tokens:
+            tokens, extra_bytes = _count_chunk(text)
+            self._tokens += tokens
+            self._extra_bytes += extra_bytes
+        else:
+            self._tokens += self._count(text)
+
+    def total(self) -> int:
+        tokens, extra_bytes = self._tokens, self._extra_bytes
+        if self._count is approx_tokens:
+            pending_tokens, pending_bytes = _count_chunk(self._pending)
+            return tokens + pending_tokens + (extra_bytes + pending_bytes) // 2
+        return tokens + (self._count(self._pending) if self._pending else 0)
+
+
+def char_tokens(text: str) -> int:
+    """Legacy estimate (1 token ≈ 4 characters)."""
+    return len(text) // 4
+
+
+def _tiktoken_counter() -> Optional[Counter]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+COUNTERS: Dict[str, Counter] = {
+    "approx": approx_tokens,
+    "chars": char_tokens,
+}
+DEFAULT_COUNTER = "approx"
+
+
+def register_counter(name: str, counter: Counter):
+    """Make a counter selectable by name."""
+    COUNTERS[name] = counter
+    clear_cache()
+
+
+def get_counter(name: str = None) -> Counter:
+    """Counter by name (default: DELEGATE_TOKENIZER, else approx)."""
+    name = name or os.environ.get("DELEGATE_TOKENIZER") or DEFAULT_COUNTER
+    if name == "tiktoken" and name not in COUNTERS:
+        counter = _tiktoken_counter()
+        if counter is None:
+            # Optional dependency missing: fall back to the bundled approximation
+            return COUNTERS[DEFAULT_COUNTER]
+        COUNTERS[name] = counter
+    return COUNTERS.get(name, COUNTERS[DEFAULT_COUNTER])
+
+
+def count_tokens(text: str, counter: str = None) -> int:
+    """Count tokens, caching results for large texts by content hash."""
+    count = get_counter(counter)
+    if len(text) < CACHE_MIN_CHARS:
+        return count(text)
+
+    key = (count, hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest())
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    tokens = count(text)
+    with _cache_lock:
+        _cache[key] = tokens
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return tokens
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def main():
+    args = sys.argv[1:]
+    counter = None
+    if "--counter" in args:
+        i = args.index("--counter")
+        counter = args[i + 1]
+        del args[i:i + 2]
+
+    if args:
+        with open(args[0], encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+    print(count_tokens(text, counter))
+
+
+if __name__ == "__main__":
+    main()
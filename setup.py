@@ -61,7 +61,29 @@ def copy_hook_files(dest_dir: Path):
     hooks_to_copy = [
         "pre-delegate.py",
         "post-delegate.py",
-        "analyze-metrics.py"
+        "analyze-metrics.py",
+        "delegate_client.py",
+        "delegate_daemon.py",
+        "task_classifier.py",
+        "metrics_store.py",
+        "metrics_rollup.py",
+        "metrics_writer.py",
+        "token_counter.py",
+        "action_items.py",
+        "output_reducers.py",
+        "response_cache.py",
+        "run_delegation.py",
+        "batch_delegate.py",
+        "map_reduce.py",
+        "token_budget.py",
+        "adaptive_limits.py",
+        "quantile_sketch.py",
+        "delegation_trace.py",
+        "cli_router.py",
+        "metrics_hub.py",
+        "metrics_sqlite.py",
+        "metrics_compact.py",
+        "prompt_templates.py",
     ]
     
     copied_count = 0
@@ -103,7 +125,7 @@ def create_wrapper_scripts(hooks_dir: Path, platform: str = None):
         wrapper.write_text("""#!/bin/bash
 # Delegation wrapper script
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-python3 "$SCRIPT_DIR/pre-delegate.py" "$@"
+python3 -S "$SCRIPT_DIR/delegate_client.py" pre "$@"
 """)
         wrapper.chmod(wrapper.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
         print_success("Created Unix wrapper: delegate")
@@ -112,7 +134,7 @@ python3 "$SCRIPT_DIR/pre-delegate.py" "$@"
     wrapper_bat = hooks_dir / "delegate.bat"
     wrapper_bat.write_text("""@echo off
 REM Delegation wrapper script
-python "%~dp0pre-delegate.py" %*
+python -S "%~dp0delegate_client.py" pre %*
 """)
     print_success("Created Windows wrapper: delegate.bat")
     
@@ -120,7 +142,7 @@ python "%~dp0pre-delegate.py" %*
     wrapper_ps1 = hooks_dir / "delegate.ps1"
     wrapper_ps1.write_text("""# Delegation wrapper script
 $ScriptDir = Split-Path -Parent $MyInvocation.MyCommand.Path
-python "$ScriptDir/pre-delegate.py" $args
+python -S "$ScriptDir/delegate_client.py" pre $args
 """)
     print_success("Created PowerShell wrapper: delegate.ps1")
 
@@ -166,6 +188,13 @@ def build_routing_presets(config: Dict) -> Dict:
     return presets
 
 
+def save_routing_presets(presets: Dict, base_dir: Path):
+    """Save routing presets where the task classifier can load them."""
+    presets_file = base_dir / "routing_presets.json"
+    presets_file.write_text(json.dumps(presets, indent=2))
+    print_success(f"Saved {len(presets)} routing presets to {presets_file.name}")
+
+
 def create_enhanced_claude_md(config: Dict, presets: Dict, base_dir: Path):
     """Create enhanced CLAUDE.md with routing presets."""
     claude_md = base_dir / "CLAUDE.md"
@@ -398,9 +427,9 @@ def show_next_steps(config: Dict):
 def main():
     """Enhanced installation flow."""
     # Import from basic installer
+    from cli_discovery import discover_clis
     from install import (
         check_python_version,
-        discover_clis,
         interactive_selection,
         setup_hooks,
         generate_delegation_config,
@@ -446,6 +475,7 @@ def main():
     
     # Build routing presets
     presets = build_routing_presets(config)
+    save_routing_presets(presets, base_dir)
     
     # Create enhanced CLAUDE.md
     create_enhanced_claude_md(config, presets, base_dir)
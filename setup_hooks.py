@@ -60,9 +60,10 @@ def create_wrapper_scripts(hooks_dir: Path):
     unix_wrapper.write_text("""#!/bin/bash
 # Wrapper script for delegation hooks
 # Usage: ./delegate <task> [context] [max_lines]
+# Uses the delegation daemon when running, otherwise runs the hook in-process
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
-python3 "$SCRIPT_DIR/pre-delegate.py" "$@"
+python3 -S "$SCRIPT_DIR/delegate_client.py" pre "$@"
 """)
     make_executable(unix_wrapper)
     
@@ -72,7 +73,7 @@ python3 "$SCRIPT_DIR/pre-delegate.py" "$@"
 REM Wrapper script for delegation hooks
 REM Usage: delegate.bat <task> [context] [max_lines]
 
-python "%~dp0pre-delegate.py" %*
+python -S "%~dp0delegate_client.py" pre %*
 """)
     
     # PowerShell wrapper
@@ -81,7 +82,7 @@ python "%~dp0pre-delegate.py" %*
 # Usage: ./delegate.ps1 <task> [context] [max_lines]
 
 $ScriptDir = Split-Path -Parent $MyInvocation.MyCommand.Path
-python "$ScriptDir/pre-delegate.py" $args
+python -S "$ScriptDir/delegate_client.py" pre $args
 """)
     
     print("✅ Created wrapper scripts:")
@@ -162,17 +163,192 @@ python pre-delegate.py "npm ls" "Debugging build" 8
 python pre-delegate.py "npm ls" "Debugging build" 8
 ```
 
+`npm ls`, `git log`, `pip freeze` and `find` are run locally and only their
+reduced output (errors first, repeated subtrees/lines collapsed) is put in
+the prompt. Use `--no-reduce` or `DELEGATE_NO_REDUCE=1` to skip this, and
+`python output_reducers.py "git log -200"` to see what gets shipped.
+
+### One-step delegation with response cache
+
+```bash
+python run_delegation.py "git log --oneline -50" "Release notes" 8 --name release-notes
+```
+
+Builds the prompt, runs `gemini -p` (or `$DELEGATE_CLI`) and validates the
+response. Identical prompts against an unchanged project (same lockfiles,
+git HEAD and `@path` files) are answered from `.claude/cache/responses/`.
+Entries expire after 6 hours (`DELEGATE_CACHE_TTL`) and the oldest are
+evicted past 32 MB (`DELEGATE_CACHE_MAX_BYTES`). Use `--no-cache` or
+`DELEGATE_NO_CACHE=1` to force a fresh answer; `python response_cache.py
+stats|clear|prune` manages the cache. Hit rates show in analyze-metrics.
+
+### Batches
+
+```bash
+python batch_delegate.py tasks.tsv --concurrency 4 --rate gemini=60/min
+```
+
+Runs one delegation per line (`task<TAB>context<TAB>max_lines`, or JSON
+with optional `cli` and `name`) concurrently, prints each validated
+response as it completes and ends with throughput and p50/p90/p99 latency.
+
+### Large inputs (map-reduce)
+
+```bash
+python map_reduce.py "Find security issues in @src/" "Pre-release audit" 10
+```
+
+Splits the referenced files into ~24 KB chunks, asks for findings on each in
+parallel and merges them in one final delegation within `max_lines`. Chunk
+answers are cached by content, so re-runs only re-send changed chunks.
+
+### Token budget (5-hour window)
+
+Every logged delegation is added to a sliding 5-hour ledger of tokens per
+CLI. Before building a prompt, pre-delegate checks it against the budget
+(19,000 tokens by default; set `total` and per-CLI `clis` budgets/commands
+in `.claude/budget.json`). It tightens `max_lines` from 70% use, suggests a
+CLI with room when one runs out, and queues `--priority low` delegations
+(from 90%) or any that no longer fit to `.claude/queue.jsonl` (exit code
+3). Run the queue later with `python batch_delegate.py ../queue.jsonl`; each run
+drains it and queues only the failed delegations again.
+
+```bash
+python token_budget.py status
+python token_budget.py simulate --csv old-metrics/*.csv --low docs   # compare policies
+```
+
+`DELEGATE_NO_BUDGET=1` turns budget checks off.
+
+### Learned limits
+
+```bash
+python adaptive_limits.py learn   # refit from the last 30 days of metrics
+python adaptive_limits.py show
+```
+
+Fits a `max_lines` per task (by `--name`, then task type) from past
+responses: large enough for the p90 of valid answers, small enough to stay
+under 250 tokens. Tasks that often run long get a terser prompt. Used when
+no `max_lines` is given; `DELEGATE_NO_ADAPTIVE=1` turns it off.
+
+### CLI routing
+
+With two or more CLIs enabled in `.claude/delegation_config.json`,
+`run_delegation.py` picks the one with the best recent latency and error
+rate. A CLI slower than its usual p95 gets a second CLI started alongside
+it (first answer wins), failures fail over to the next CLI, and a CLI that
+failed 3 times in a row is skipped for a minute.
+
+```bash
+python cli_router.py status
+```
+
+`DELEGATE_CLI` still forces one CLI; `DELEGATE_NO_HEDGE=1` stops the second
+requests and `DELEGATE_NO_ROUTER=1` turns routing off.
+
 ### Post-delegation (validate responses)
 
 ```bash
 python post-delegate.py "Response text..." 10 "task-name"
 ```
 
+### Delegation daemon (optional, Unix)
+
+Keeps the hooks loaded in one process so wrapper calls skip Python startup:
+
+```bash
+python delegate_daemon.py serve &   # start
+python delegate_daemon.py status
+python delegate_daemon.py stop
+python delegate_daemon.py serve --group-commit 1 &   # batch metrics writes per second
+```
+
+The wrappers call `delegate_client.py`, which uses the daemon when it is
+running and falls back to running the hook in-process otherwise. Validate
+responses through the daemon the same way:
+
+```bash
+python delegate_client.py post "$RESPONSE" 10 "task-name"
+```
+
+Large responses can be streamed instead of passed as an argument:
+
+```bash
+gemini -p "$PROMPT" | python post-delegate.py --stdin 10 "task-name"
+python post-delegate.py --file response.txt 10 "task-name" --fail-fast
+```
+
+Add `--json` for a machine-readable report. Action items are tagged with a
+category (CRITICAL, TODO, FIXME, ...); add your own in
+`.claude/action_patterns.json`, e.g. `{"SECURITY": "CVE-\\\\d{4}-\\\\d+"}`.
+
+Token counts use a bundled BPE-style approximation. Set
+`DELEGATE_TOKENIZER=tiktoken` to use tiktoken when it is installed, or
+`DELEGATE_TOKENIZER=chars` for the old 4-characters-per-token rule.
+
 ### Analyze metrics
 
 ```bash
 python analyze-metrics.py
 python analyze-metrics.py --days 14  # Last 14 days
+python analyze-metrics.py --rebuild  # Recompute and verify daily rollups
+python analyze-metrics.py --json     # Summary with p50/p95/p99 per task and day
+python analyze-metrics.py --raw --days 90  # From raw rows, streamed (parallel for long ranges)
+```
+
+p50/p95/p99 of tokens, lines and latency come from small quantile sketches
+kept in each day's rollup, so any date range costs one merge per day.
+Delegations run through `run_delegation.py`, `batch_delegate.py` or
+`map_reduce.py` also record timing spans (prepare, cache, cli, validate,
+log) under a correlation id; the report breaks latency down by stage and CLI.
+
+To see several projects (and other users) together, register their
+metrics directories with the hub and ingest them into one indexed
+SQLite database (`~/.claude/metrics-hub`, or `DELEGATE_HUB` for a shared
+directory). Rows are deduplicated by correlation id.
+
+```bash
+python metrics_hub.py discover ~/code    # register every .claude/metrics below
+python metrics_hub.py ingest             # or: serve --interval 60
+python metrics_hub.py top-tasks --days 30
+python metrics_hub.py users
+python metrics_hub.py repos
+```
+
+For ad-hoc filters within one project (by task, CLI, hour or token range),
+set `DELEGATE_METRICS_BACKEND=sqlite` to mirror every delegation into an
+indexed `metrics.sqlite3` next to the day files. `query` imports existing
+files (including old CSVs) before answering:
+
+```bash
+python metrics_sqlite.py query --task security-audit --days 30 --group-by cli
+python metrics_sqlite.py query --min-tokens 300 --group-by hour --json
+```
+
+Metrics are stored in compact `delegation-YYYY-MM-DD.dcol` files. Convert
+older `delegation-*.csv` logs once with:
+
+```bash
+python metrics_store.py migrate ../metrics
+```
+
+Months older than 31 days can be folded into compressed monthly segments
+(raw rows past `--retain-days` are dropped, their rollups kept); run it from
+cron or by hand:
+
+```bash
+python metrics_compact.py run --retain-days 365
+python metrics_compact.py status
+```
+
+Prompts are built from templates you can edit. `init` writes the defaults to
+`.claude/prompt_templates.json`; `pre-delegate.py --tokens` prints the
+prompt's token count:
+
+```bash
+python prompt_templates.py init
+python prompt_templates.py show
 ```
 
 ## Wrapper Scripts
@@ -211,16 +387,21 @@ All scripts use standard library only and work identically across:
 
 
 def create_gitignore(claude_dir: Path):
-    """Create .gitignore for metrics."""
+    """Create .gitignore for metrics and the response cache."""
     gitignore = claude_dir / ".gitignore"
     
     if gitignore.exists():
         content = gitignore.read_text()
-        if "metrics/" not in content:
-            gitignore.write_text(content + "\n# Delegation metrics\nmetrics/\n")
+        missing = "".join(
+            f"\n# {label}\n{entry}\n"
+            for label, entry in (("Delegation metrics", "metrics/"), ("Response cache", "cache/"))
+            if entry not in content
+        )
+        if missing:
+            gitignore.write_text(content + missing)
             print("✅ Updated .gitignore")
     else:
-        gitignore.write_text("# Delegation metrics\nmetrics/\n")
+        gitignore.write_text("# Delegation metrics\nmetrics/\n\n# Response cache\ncache/\n")
         print("✅ Created .gitignore")
 
 
@@ -306,7 +487,15 @@ def main():
     
     # Make Python scripts executable on Unix
     if platform.system() != 'Windows':
-        for script in ['pre-delegate.py', 'post-delegate.py', 'analyze-metrics.py']:
+        for script in ['pre-delegate.py', 'post-delegate.py', 'analyze-metrics.py',
+                       'delegate_client.py', 'delegate_daemon.py', 'task_classifier.py',
+                       'metrics_store.py', 'metrics_rollup.py', 'metrics_writer.py',
+                       'token_counter.py', 'action_items.py', 'output_reducers.py',
+                       'response_cache.py', 'run_delegation.py', 'batch_delegate.py',
+                       'map_reduce.py', 'token_budget.py', 'adaptive_limits.py',
+                       'quantile_sketch.py', 'delegation_trace.py', 'cli_router.py',
+                       'metrics_hub.py', 'metrics_sqlite.py', 'metrics_compact.py',
+                       'prompt_templates.py']:
             script_path = hooks_dir / script
             if script_path.exists():
                 make_executable(script_path)
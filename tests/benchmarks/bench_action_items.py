@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: six regex passes vs one combined alternation for action items
+
+Usage:
+    python tests/benchmarks/bench_action_items.py [megabytes]
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import action_items  # noqa: E402
+
+# The per-pattern extractor post-delegate used before
+LEGACY_PATTERNS = [
+    r'CRITICAL:?\s*(.+)',
+    r'TODO:?\s*(.+)',
+    r'FIXME:?\s*(.+)',
+    r'Action:?\s*(.+)',
+    r'Recommend(?:ed)?:?\s*(.+)',
+    r'Next step:?\s*(.+)',
+]
+
+LINES = [
+    "dependency lodash@4.17.20 is outdated, latest is 4.17.21\n",
+    "commit 4f2a9c1e Fix race in scheduler (#1234)\n",
+    "  src/auth/session.ts:42 uses a deprecated API\n",
+]
+ITEMS = ["TODO: pin lodash {}\n", "CRITICAL: leak in pool {}\n", "Next step: rerun audit {}\n"]
+
+
+def legacy(text: str) -> list:
+    items = []
+    for pattern in LEGACY_PATTERNS:
+        items.extend(m.group(0) for m in re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE))
+    return items
+
+
+def make_text(megabytes: float) -> str:
+    rng = random.Random(9)
+    parts, size = [], 0
+    while size < megabytes * 1_000_000:
+        line = rng.choice(ITEMS).format(rng.randrange(500)) if rng.random() < 0.01 else rng.choice(LINES)
+        parts.append(line)
+        size += len(line)
+    return "".join(parts)
+
+
+def timed(label: str, fn, text: str):
+    start = time.perf_counter()
+    items = fn(text)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<12} {len(items):8,} items   {elapsed * 1000:9.1f} ms")
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    text = make_text(megabytes)
+    print(f"📊 {len(text):,} characters")
+    timed("six passes", legacy, text)
+    timed("one pass", action_items.extract, text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of learned limits at prompt-build time, and of learning them
+
+Usage:
+    python tests/benchmarks/bench_adaptive_limits.py [--rows N] [--tasks N]
+
+Writes N metric rows spread over T task names, then times:
+    learn      fitting the table from the store (offline, `adaptive_limits learn`)
+    prepare    pre_delegate.prepare without a table, and with a T-entry table
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_writer  # noqa: E402
+import pre_delegate  # noqa: E402
+from adaptive_limits import learn, recent_records, write_table  # noqa: E402
+from token_budget import now_ts  # noqa: E402
+
+PREPARES = 2000
+
+
+def time_prepare(cwd: Path, names: list) -> float:
+    start = time.perf_counter()
+    for i in range(PREPARES):
+        pre_delegate.prepare("Search for deprecated API calls", cwd=cwd, name=names[i % len(names)])
+    return (time.perf_counter() - start) / PREPARES * 1e6
+
+
+def main():
+    rows, tasks = 100_000, 200
+    if "--rows" in sys.argv:
+        rows = int(sys.argv[sys.argv.index("--rows") + 1])
+    if "--tasks" in sys.argv:
+        tasks = int(sys.argv[sys.argv.index("--tasks") + 1])
+
+    os.environ["DELEGATE_NO_BUDGET"] = "1"
+    rng = random.Random(7)
+    names = [f"task-{i}" for i in range(tasks)]
+    now = now_ts()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        metrics = root / ".claude" / "metrics"
+        records = []
+        for i in range(rows):
+            lines = rng.randint(2, 14)
+            records.append({"timestamp": now - rows + i, "task": names[i % tasks], "lines": lines,
+                            "tokens": lines * rng.randint(12, 30), "max_lines": 8})
+        metrics_writer.commit(metrics, records)
+
+        baseline = time_prepare(root, names)
+        start = time.perf_counter()
+        table = learn(recent_records(metrics))
+        learn_s = time.perf_counter() - start
+        write_table(metrics, table, 30)
+        adaptive = time_prepare(root, names)
+
+    print(f"📊 Adaptive limits ({rows:,} rows, {tasks} tasks)")
+    print(f"   learn                 {learn_s:8.2f}s  ({len(table)} tasks fitted)")
+    print(f"   prepare, no table     {baseline:8.1f}µs")
+    print(f"   prepare, with table   {adaptive:8.1f}µs  ({adaptive - baseline:+.1f}µs per prompt)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: batch delegation throughput and tail latency vs concurrency
+
+Usage:
+    python tests/benchmarks/bench_batch_delegate.py [--rows N] [--cli-delay SECONDS]
+
+Runs N delegations through a fake CLI that sleeps --cli-delay seconds
+(jittered +-50%) at concurrency 1, 4 and 16, with the response cache off,
+and prints throughput and CLI latency percentiles for each.
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+from batch_delegate import BatchExecutor, BatchRow, summarize  # noqa: E402
+
+FAKE_CLI = """\
+import random, sys, time
+time.sleep({delay} * random.uniform(0.5, 1.5))
+print("Key finding: ok\\nNext step: none\\nDone")
+"""
+
+
+def main():
+    rows, delay = 32, 0.5
+    if "--rows" in sys.argv:
+        rows = int(sys.argv[sys.argv.index("--rows") + 1])
+    if "--cli-delay" in sys.argv:
+        delay = float(sys.argv[sys.argv.index("--cli-delay") + 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / ".claude").mkdir()
+        script = root / "fake_cli.py"
+        script.write_text(FAKE_CLI.format(delay=delay))
+        os.environ["DELEGATE_CLI"] = f"{sys.executable} {script}"
+        batch = [BatchRow(f"Summarize module {i}", "Benchmark", 5) for i in range(rows)]
+
+        print(f"📊 Batch delegation ({rows} rows, ~{delay}s fake CLI)")
+        print(f"   {'concurrency':>11} {'wall':>7} {'rows/s':>7} {'p50':>6} {'p90':>6} {'p99':>6}")
+        for concurrency in (1, 4, 16):
+            executor = BatchExecutor(concurrency, use_cache=False, cwd=root)
+            start = time.perf_counter()
+            results = executor.run_sync(batch)
+            summary = summarize(results, time.perf_counter() - start)
+            latency = summary["latency"]
+            print(f"   {concurrency:>11} {summary['wall_seconds']:6.1f}s {summary['throughput']:7.2f} "
+                  f"{latency['p50']:5.2f}s {latency['p90']:5.2f}s {latency['p99']:5.2f}s")
+
+
+if __name__ == "__main__":
+    main()
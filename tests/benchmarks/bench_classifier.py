@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy regex cascade vs single-pass task classifier
+
+Usage:
+    python tests/benchmarks/bench_classifier.py [tasks] [routes]
+
+Builds a corpus of realistic delegation tasks (the commands and phrasings
+used throughout the docs, with varied arguments) and times:
+    legacy      detect_task_type + estimate_compression as two regex cascades
+    classifier  one classify() call
+and the same with N user routing presets (legacy: one re.search per preset).
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+from task_classifier import classify, default_classifier  # noqa: E402
+
+COMMANDS = [
+    "npm ls", "npm ls --depth=0", "npm audit", "git log --oneline", "git log --since=1.week",
+    "git status", "git diff HEAD~3", "pip freeze", "pip list --outdated", "ls -la",
+    "find . -name '*.{ext}'", "grep -r '{word}' {path}", "cat {path}package.json",
+    "curl -s https://api.example.com/{word}",
+]
+PHRASES = [
+    "search for {word} in {path}", "find all files importing {word}",
+    "analyze {path} for performance issues", "review {word} error handling",
+    "audit {path} for hardcoded secrets", "scan auth.py for vulnerabilities",
+    "check why {word} tests are flaky", "investigate memory growth in {word}",
+    "how to use {word} with asyncio", "documentation for {word} api",
+    "show an example of {word}", "summarize the {word} discussion",
+    "locate the {word} config loader", "inspect @{path} for dead code",
+]
+WORDS = ["password", "api_key", "useEffect", "redis", "session", "TODO", "jwt", "cache", "retry"]
+PATHS = ["src/", "lib/", "app/", "tests/", "packages/core/", ""]
+EXTS = ["py", "ts", "js", "go", "md"]
+
+
+def build_corpus(size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    templates = COMMANDS + PHRASES
+    return [
+        rng.choice(templates).format(word=rng.choice(WORDS), path=rng.choice(PATHS), ext=rng.choice(EXTS))
+        for _ in range(size)
+    ]
+
+
+def build_routes(count: int, seed: int = 11) -> dict:
+    rng = random.Random(seed)
+    verbs = ["deploy", "migrate", "profile", "lint", "bundle", "trace", "bench", "fuzz"]
+    return {
+        f"route_{i}": {"cli": "gemini", "pattern": f"({rng.choice(verbs)}{i}|svc{i}).*{rng.choice(WORDS).lower()}"}
+        for i in range(count)
+    }
+
+
+def legacy_detect(task: str) -> str:
+    task_lower = task.lower()
+    if re.search(r'^(git|npm|pip|ls|grep|find|cat|echo|curl|wget)\s', task_lower):
+        return "shell"
+    if re.search(r'(search|find.*file|grep.*code|locate)', task_lower):
+        return "search"
+    if re.search(r'(analyze|review|audit|check|inspect|investigate)', task_lower):
+        return "analyze"
+    if re.search(r'(doc|documentation|api|how.*use|example)', task_lower):
+        return "docs"
+    return "generic"
+
+
+def legacy_compression(task: str) -> int:
+    task_lower = task.lower()
+    if re.search(r'(npm ls|git log|find\s|pip freeze)', task_lower):
+        return 5
+    if re.search(r'(grep|search|audit|scan)', task_lower):
+        return 8
+    return 10
+
+
+def legacy_route(task: str, routes: dict):
+    task_lower = task.lower()
+    for name, preset in routes.items():
+        if re.search(preset["pattern"], task_lower):
+            return name
+    return None
+
+
+def timed(label: str, fn, corpus: list, baseline: float = None) -> float:
+    start = time.perf_counter()
+    for task in corpus:
+        fn(task)
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / len(corpus) * 1e6
+    speedup = f"   ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"   {label:<28} {elapsed:7.3f} s   {per_call:6.2f} µs/task{speedup}")
+    return elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    route_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    corpus = build_corpus(size)
+
+    print(f"📊 Task classification over {size:,} tasks")
+    classifier = default_classifier()
+    base = timed("legacy cascade", lambda t: (legacy_detect(t), legacy_compression(t)), corpus)
+    timed("classifier", lambda t: classify(t, classifier), corpus, base)
+
+    routes = build_routes(route_count)
+    routed = default_classifier()
+    routed.add_presets(routes)
+    print(f"\n📊 With {route_count} routing presets")
+    base = timed("legacy cascade + routes",
+                 lambda t: (legacy_detect(t), legacy_compression(t), legacy_route(t, routes)), corpus)
+    timed("classifier + routes", lambda t: classify(t, routed), corpus, base)
+
+
+if __name__ == "__main__":
+    main()
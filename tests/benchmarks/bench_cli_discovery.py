@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: installer CLI discovery, serial vs concurrent vs cached
+
+Usage:
+    python tests/benchmarks/bench_cli_discovery.py [--startup SECONDS] [--path-dirs N]
+
+Puts fake gemini/aider/copilot/codex/qwen binaries (each taking --startup
+seconds to print a version, like a Node CLI booting) at the end of a PATH
+with N other directories, then times:
+    serial     shutil.which + `--version` one after another (the old way)
+    cold       discover_clis with an empty cache
+    cached     discover_clis again (what re-running the installer costs)
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from cli_discovery import CANDIDATES, discover_clis  # noqa: E402
+
+
+def serial(path: str):
+    for candidate in CANDIDATES:
+        for binary in candidate.binaries:
+            found = shutil.which(binary, path=path)
+            if found:
+                subprocess.run([found] + candidate.version_args, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, timeout=30)
+                break
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    startup, path_dirs = 0.4, 30
+    if "--startup" in sys.argv:
+        startup = float(sys.argv[sys.argv.index("--startup") + 1])
+    if "--path-dirs" in sys.argv:
+        path_dirs = int(sys.argv[sys.argv.index("--path-dirs") + 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        dirs = []
+        for i in range(path_dirs):
+            directory = root / f"dir{i}"
+            directory.mkdir()
+            for j in range(50):
+                (directory / f"tool{j}").write_text("")
+            dirs.append(str(directory))
+        bin_dir = root / "bin"
+        bin_dir.mkdir()
+        for candidate in CANDIDATES:
+            script = bin_dir / candidate.binaries[0]
+            script.write_text(f"#!/bin/sh\nsleep {startup}\necho '{candidate.name} 1.0.0'\n")
+            script.chmod(0o755)
+        path = os.pathsep.join(dirs + [str(bin_dir)])
+        cache = root / "cache.json"
+
+        serial_s = timed(lambda: serial(path))
+        cold_s = timed(lambda: discover_clis(path=path, cache_file=cache))
+        cached_s = timed(lambda: discover_clis(path=path, cache_file=cache))
+
+    print(f"📊 CLI discovery ({len(CANDIDATES)} CLIs, {startup:.1f}s startup, {path_dirs + 1} PATH dirs)")
+    print(f"   serial     {serial_s * 1000:8.1f}ms")
+    print(f"   cold       {cold_s * 1000:8.1f}ms")
+    print(f"   cached     {cached_s * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: static CLI choice vs latency-based routing vs routing with hedging
+
+Usage:
+    python tests/benchmarks/bench_cli_router.py [--delegations N] [--scale X]
+
+Three fake CLIs stand in for real ones (times multiplied by --scale):
+    tail      0.15s, but 4% of calls take 2s      (the static default)
+    steady    0.30s +/- 20%
+    failing   0.10s, exits 1 on 30% of calls
+and N delegations are run one after another with:
+    static    always `tail`, like a fixed DELEGATE_CLI
+    routed    cli_router without hedging (ranking, breaker, failover)
+    hedged    cli_router with hedging past the chosen CLI's p95
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+from cli_router import Route, Router  # noqa: E402
+from run_delegation import run_cli  # noqa: E402
+
+FAKE_CLI = """\
+import random, sys, time
+base, slow_rate, slow, error_rate = map(float, sys.argv[1:5])
+delay = slow if random.random() < slow_rate else base * random.uniform(0.8, 1.2)
+time.sleep(delay)
+if random.random() < error_rate:
+    sys.exit(1)
+print("answer")
+"""
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(run, delegations: int):
+    times, errors = [], 0
+    for _ in range(delegations):
+        start = time.perf_counter()
+        if not run():
+            errors += 1
+        times.append(time.perf_counter() - start)
+    return times, errors
+
+
+def main():
+    delegations, scale = 100, 1.0
+    if "--delegations" in sys.argv:
+        delegations = int(sys.argv[sys.argv.index("--delegations") + 1])
+    if "--scale" in sys.argv:
+        scale = float(sys.argv[sys.argv.index("--scale") + 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        script = root / "fake_cli.py"
+        script.write_text(FAKE_CLI)
+
+        def route(name, base, slow_rate, slow, error_rate):
+            return Route(name, f"{sys.executable} {script} {base * scale} {slow_rate} {slow * scale} {error_rate}")
+
+        routes = [route("tail", 0.15, 0.04, 2.0, 0), route("steady", 0.3, 0, 0, 0),
+                  route("failing", 0.1, 0, 0, 0.3)]
+
+        results = {"static": measure(lambda: run_cli("prompt", routes[0].command)[0] == 0, delegations)}
+        for label, hedge in (("routed", False), ("hedged", True)):
+            router = Router(routes, root / label, hedge=hedge)
+            picks = {}
+
+            def run():
+                routed = router.run("prompt")
+                picks[routed.cli] = picks.get(routed.cli, 0) + 1
+                return routed.exit_code == 0
+            results[label] = measure(run, delegations)
+            results[label] += (picks,)
+
+    print(f"📊 CLI routing ({delegations} delegations, scale {scale})")
+    for label, result in results.items():
+        times, errors = result[0], result[1]
+        picks = ", ".join(f"{cli} {n}" for cli, n in sorted(result[2].items())) if len(result) > 2 else "tail"
+        print(f"   {label:<7} p50 {percentile(times, 0.5) * 1000:6.0f}ms  p95 {percentile(times, 0.95) * 1000:6.0f}ms  "
+              f"p99 {percentile(times, 0.99) * 1000:6.0f}ms  errors {errors:3d}  ({picks})")
+
+
+if __name__ == "__main__":
+    main()
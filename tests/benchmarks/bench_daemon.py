@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-call latency of the delegation hooks with and without the daemon
+
+Usage:
+    python tests/benchmarks/bench_daemon.py [calls]
+
+Compares:
+    cold     python3 pre_delegate.py ...        (one interpreter per call)
+    client   python3 -S delegate_client.py pre ... (bare interpreter + socket round-trip)
+    socket   raw request from a warm process    (daemon cost only)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parent.parent.parent / "hooks"
+sys.path.insert(0, str(HOOKS_DIR))
+
+from delegate_daemon import request  # noqa: E402
+
+TASK = ["npm ls", "Investigating build slowdown", "8"]
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label: str, samples: list):
+    ms = [s * 1000 for s in samples]
+    print(f"   {label:<8} mean {sum(ms) / len(ms):7.2f} ms   "
+          f"p50 {percentile(ms, 50):7.2f} ms   p95 {percentile(ms, 95):7.2f} ms")
+
+
+def time_command(cmd: list, env: dict, calls: int) -> list:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "delegate.sock")
+        env = dict(os.environ, DELEGATE_SOCKET=socket_path)
+
+        daemon = subprocess.Popen(
+            [sys.executable, str(HOOKS_DIR / "delegate_daemon.py"), "serve", "--socket", socket_path],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            while request({"op": "ping"}, socket_path) is None:
+                time.sleep(0.05)
+
+            cold = time_command([sys.executable, str(HOOKS_DIR / "pre_delegate.py")] + TASK, env, calls)
+            client = time_command(
+                [sys.executable, "-S", str(HOOKS_DIR / "delegate_client.py"), "pre"] + TASK, env, calls
+            )
+
+            warm = []
+            payload = {"op": "pre", "argv": ["pre-delegate.py"] + TASK}
+            for _ in range(calls):
+                start = time.perf_counter()
+                request(payload, socket_path)
+                warm.append(time.perf_counter() - start)
+        finally:
+            request({"op": "shutdown"}, socket_path)
+            daemon.wait(timeout=5)
+
+    print(f"📊 Delegation hook latency ({calls} calls)")
+    report("cold", cold)
+    report("client", client)
+    report("socket", warm)
+
+
+if __name__ == "__main__":
+    main()
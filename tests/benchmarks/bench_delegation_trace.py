@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: overhead of timing spans per delegation
+
+Usage:
+    python tests/benchmarks/bench_delegation_trace.py [--delegations N]
+
+Times, per delegation:
+    span        one Trace.span() around an empty block
+    row only    committing the metrics row (what post-delegate did before)
+    row+spans   committing the row, then its five spans (what it does now)
+and how long analyze-metrics takes to break N delegations down by stage.
+"""
+
+import sys
+import time
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_writer  # noqa: E402
+from analyze_metrics import stage_latency  # noqa: E402
+from delegation_trace import Trace  # noqa: E402
+from token_budget import now_ts  # noqa: E402
+
+
+def record(trace: Trace) -> dict:
+    return {"timestamp": now_ts(), "task": "bench", "lines": 5, "tokens": 90,
+            "correlation_id": trace.correlation_id}
+
+
+def main():
+    delegations = 500
+    if "--delegations" in sys.argv:
+        delegations = int(sys.argv[sys.argv.index("--delegations") + 1])
+
+    trace = Trace()
+    start = time.perf_counter()
+    for _ in range(10_000):
+        with trace.span("prepare"):
+            pass
+    span_us = (time.perf_counter() - start) / 10_000 * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics = Path(tmp)
+        start = time.perf_counter()
+        for _ in range(delegations):
+            metrics_writer.commit(metrics, [record(Trace())])
+        row_ms = (time.perf_counter() - start) / delegations * 1000
+
+        start = time.perf_counter()
+        for _ in range(delegations):
+            trace = Trace(cli="gemini")
+            for stage, ms in (("prepare", 1), ("cache", 0.5), ("cli", 900), ("validate", 0.5)):
+                trace.add(stage, ms)
+            with trace.span("log"):
+                metrics_writer.commit(metrics, [record(trace)])
+            metrics_writer.commit(metrics, [], trace.records())
+        traced_ms = (time.perf_counter() - start) / delegations * 1000
+
+        start = time.perf_counter()
+        stage_latency(metrics, [datetime.now().strftime("%Y-%m-%d")])
+        analyze_ms = (time.perf_counter() - start) * 1000
+
+    print(f"📊 Timing spans ({delegations} delegations)")
+    print(f"   span             {span_us:8.2f}µs")
+    print(f"   row only         {row_ms:8.2f}ms per delegation")
+    print(f"   row+spans        {traced_ms:8.2f}ms per delegation")
+    print(f"   stage breakdown  {analyze_ms:8.1f}ms for {delegations * 5:,} spans")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one big prompt vs map-reduce, cold and after a one-file edit
+
+Usage:
+    python tests/benchmarks/bench_map_reduce.py [--files N] [--concurrency N]
+
+Generates N source files (~4 KB each) and a fake CLI whose latency grows
+with prompt size (0.1 s + 0.5 s per 100 KB), then times:
+    single     everything in one prompt
+    cold       map-reduce with an empty cache
+    edited     map-reduce again after editing one file (only changed chunks re-sent)
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+from map_reduce import map_reduce  # noqa: E402
+from run_delegation import run_cli  # noqa: E402
+
+FAKE_CLI = """\
+import sys, time
+time.sleep(0.1 + len(sys.argv[-1]) / 100_000 * 0.5)
+print("Main finding: ok\\nEvidence: none\\nAction: none")
+"""
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    files, concurrency = 200, 8
+    if "--files" in sys.argv:
+        files = int(sys.argv[sys.argv.index("--files") + 1])
+    if "--concurrency" in sys.argv:
+        concurrency = int(sys.argv[sys.argv.index("--concurrency") + 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / ".claude").mkdir()
+        src = root / "src"
+        src.mkdir()
+        for i in range(files):
+            (src / f"mod{i:03d}.py").write_text(f"# module {i}\n" + f"def f{i}(x):\n    return x + {i}\n" * 130)
+        script = root / "fake_cli.py"
+        script.write_text(FAKE_CLI)
+        os.environ["DELEGATE_CLI"] = f"{sys.executable} {script}"
+
+        payload = "\n".join(path.read_text() for path in sorted(src.iterdir()))
+        task = "Find dead code in @src/"
+        (exit_code, _, errors), single = timed(lambda: run_cli(f"TASK: {task}\n\n{payload}", cwd=root))
+        cold, cold_s = timed(lambda: map_reduce(task, "Bench", 8, concurrency, cwd=root))
+        (src / "mod007.py").write_text("# module 7\nprint('edited')\n")
+        edited, edited_s = timed(lambda: map_reduce(task, "Bench", 8, concurrency, cwd=root))
+
+    print(f"📊 Map-reduce ({files} files, {len(payload) / 1000:.0f} KB, concurrency {concurrency})")
+    if exit_code == 0:
+        print(f"   single prompt        {single:6.2f}s")
+    else:
+        print(f"   single prompt        failed: {errors}")
+    print(f"   map-reduce cold      {cold_s:6.2f}s  ({cold.chunks} chunks)")
+    print(f"   after 1-file edit    {edited_s:6.2f}s  "
+          f"({edited.chunks - edited.cached_chunks} of {edited.chunks} chunks re-sent)")
+
+
+if __name__ == "__main__":
+    main()
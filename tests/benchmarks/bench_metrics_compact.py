@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a year of daily metrics files vs compacted monthly segments
+
+Usage:
+    python tests/benchmarks/bench_metrics_compact.py [--days D] [--rows-per-day R]
+
+Writes D days (365 by default) of R delegations (with two timing spans each)
+and their rollups, then reports file count and bytes, and times, before and
+after metrics_compact.compact (31-day threshold, everything kept raw):
+    rollups Nd        load_rollups + summarize_rollups (the default report)
+    raw Nd            summarize_range over raw rows, one process
+    files Nd          store_files selection alone
+    spans Nd          stage_latency (span sketches merged from the same rollups)
+then the same rollup report once months past a 90-day horizon are downsampled.
+"""
+
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_compact  # noqa: E402
+import metrics_rollup  # noqa: E402
+import metrics_store  # noqa: E402
+from analyze_metrics import _range_start, stage_latency, summarize_range, summarize_rollups  # noqa: E402
+
+TASKS = ["dependency-analysis", "security-audit", "git-history", "code-search", "docs-lookup"]
+
+
+def build(metrics_dir: Path, days: int, rows_per_day: int):
+    rng = random.Random(3)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(days):
+        day = today - timedelta(days=i)
+        date = day.strftime("%Y-%m-%d")
+        base = metrics_store.to_epoch(day)
+        records = [{"timestamp": ts, "task": rng.choice(TASKS), "lines": rng.randint(2, 15),
+                    "tokens": rng.randint(40, 400), "latency_ms": rng.randint(300, 4000), "cli": "gemini",
+                    "correlation_id": f"{ts:x}{n:04x}"}
+                   for n, ts in enumerate(sorted(base + rng.randrange(86400) for _ in range(rows_per_day)))]
+        metrics_store.append_records(metrics_store.day_file(metrics_dir, date), records)
+        metrics_store.append_records(metrics_store.span_file(metrics_dir, date), [
+            {"timestamp": r["timestamp"], "correlation_id": r["correlation_id"], "stage": stage, "cli": "gemini",
+             "micros": rng.randint(100, 4_000_000)} for r in records for stage in ("prepare", "cli")],
+            metrics_store.SPAN_COLUMNS)
+        metrics_rollup.write_rollup(metrics_dir, metrics_rollup.build_rollup(metrics_dir, date))
+
+
+def footprint(metrics_dir: Path) -> str:
+    files = [p for p in metrics_dir.iterdir() if p.is_file() and p.name != metrics_store.LOCK_FILE]
+    return f"{len(files):5d} files  {sum(p.stat().st_size for p in files) / 2 ** 20:8.1f} MiB"
+
+
+def timed(label: str, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"   {label:<14} {(time.perf_counter() - start) * 1000:9.1f}ms")
+    return result
+
+
+def queries(metrics_dir: Path, windows):
+    for days in windows:
+        dates = [(datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+        timed(f"rollups {days}d", lambda: summarize_rollups(metrics_rollup.load_rollups(metrics_dir, dates)))
+        timed(f"raw {days}d", lambda: summarize_range(metrics_dir, days, workers=1))
+        timed(f"files {days}d", lambda: metrics_store.store_files(metrics_dir, _range_start(days)))
+        timed(f"spans {days}d", lambda: stage_latency(metrics_dir, dates))
+
+
+def main():
+    days, rows_per_day = 365, 500
+    if "--days" in sys.argv:
+        days = int(sys.argv[sys.argv.index("--days") + 1])
+    if "--rows-per-day" in sys.argv:
+        rows_per_day = int(sys.argv[sys.argv.index("--rows-per-day") + 1])
+    windows = [7, 90, days]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_dir = Path(tmp)
+        build(metrics_dir, days, rows_per_day)
+        print(f"📊 Compaction ({days} days × {rows_per_day} delegations)")
+        print(f"   daily          {footprint(metrics_dir)}")
+        queries(metrics_dir, windows)
+
+        result = timed("compact", lambda: metrics_compact.compact(metrics_dir, retain_days=days + 31))
+        print(f"   monthly        {footprint(metrics_dir)}  ({len(result.compacted)} months)")
+        queries(metrics_dir, windows)
+
+        metrics_compact.compact(metrics_dir, retain_days=90)
+        print(f"   retain 90d     {footprint(metrics_dir)}")
+        dates = [(datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+        summary = timed(f"rollups {days}d", lambda: summarize_rollups(metrics_rollup.load_rollups(metrics_dir,
+                                                                                                   dates)))
+        print(f"   {'':<14} {summary['count']:,} delegations still summarized")
+
+
+if __name__ == "__main__":
+    main()
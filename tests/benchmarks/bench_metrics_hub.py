@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cross-project queries from the hub vs scanning every project
+
+Usage:
+    python tests/benchmarks/bench_metrics_hub.py [--projects N] [--days D] [--rows-per-day R]
+
+Builds N project metrics directories with D days of R rows each, then times:
+    ingest cold        first ingest of every project
+    ingest unchanged   re-ingest with nothing new (stat only)
+    ingest +1 block    re-ingest after one delegation per project
+    top-tasks scan     summing tokens per task by reading every store file
+    top-tasks hub      metrics_hub.top_tasks over the same range
+    users / repos hub  the other two hub queries
+"""
+
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_hub  # noqa: E402
+import metrics_store  # noqa: E402
+import metrics_writer  # noqa: E402
+from delegation_trace import new_id  # noqa: E402
+
+TASKS = ["dependency-analysis", "security-audit", "git-history", "code-search", "docs-lookup"]
+
+
+def build(root: Path, projects: int, days: int, rows_per_day: int):
+    rng = random.Random(11)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    dirs = []
+    for p in range(projects):
+        metrics_dir = root / f"repo{p}" / ".claude" / "metrics"
+        metrics_dir.mkdir(parents=True)
+        for i in range(days):
+            day = today - timedelta(days=i)
+            base = metrics_store.to_epoch(day)
+            metrics_store.append_records(metrics_store.day_file(metrics_dir, day.strftime("%Y-%m-%d")), [
+                {"timestamp": base + rng.randrange(86400), "task": rng.choice(TASKS), "lines": rng.randint(2, 15),
+                 "tokens": rng.randint(40, 400), "correlation_id": new_id()} for _ in range(rows_per_day)])
+        dirs.append(metrics_dir)
+    return dirs
+
+
+def scan_top_tasks(dirs, days: int) -> dict:
+    since = metrics_store.to_epoch(datetime.combine((datetime.now() - timedelta(days=days - 1)).date(),
+                                                    datetime.min.time()))
+    tokens = {}
+    for metrics_dir in dirs:
+        for path in metrics_store.store_files(metrics_dir, since):
+            for row in metrics_store.iter_rows(path, since):
+                tokens[row["task"]] = tokens.get(row["task"], 0) + row["tokens"]
+    return tokens
+
+
+def timed(label: str, fn, rows: int = None):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<18} {elapsed * 1000:9.1f}ms")
+    return elapsed
+
+
+def main():
+    projects, days, rows_per_day = 20, 30, 200
+    for option in ("--projects", "--days", "--rows-per-day"):
+        if option in sys.argv:
+            value = int(sys.argv[sys.argv.index(option) + 1])
+            projects, days, rows_per_day = {"--projects": (value, days, rows_per_day),
+                                            "--days": (projects, value, rows_per_day),
+                                            "--rows-per-day": (projects, days, value)}[option]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        dirs = build(root, projects, days, rows_per_day)
+        db = metrics_hub.connect(root / "hub")
+        for n, metrics_dir in enumerate(dirs):
+            metrics_hub.register(db, metrics_dir, user=f"user{n % 5}")
+
+        print(f"📊 Metrics hub ({projects} projects × {days} days × {rows_per_day} rows = "
+              f"{projects * days * rows_per_day:,} rows)")
+        timed("ingest cold", lambda: metrics_hub.ingest(db))
+        timed("ingest unchanged", lambda: metrics_hub.ingest(db))
+        for metrics_dir in dirs:
+            metrics_writer.commit(metrics_dir, [{"timestamp": metrics_store.to_epoch(datetime.now()),
+                                                 "task": "git-history", "lines": 3, "tokens": 90,
+                                                 "correlation_id": new_id()}])
+        timed("ingest +1 block", lambda: metrics_hub.ingest(db))
+        for window in (7, days):
+            print(f"   --days {window}")
+            timed("top-tasks scan", lambda: scan_top_tasks(dirs, window))
+            timed("top-tasks hub", lambda: metrics_hub.top_tasks(db, window))
+            timed("users hub", lambda: metrics_hub.user_burn(db, window))
+            timed("repos hub", lambda: metrics_hub.repo_savings(db, window))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: raw-row summaries over long histories, list vs stream vs process pool
+
+Usage:
+    python tests/benchmarks/bench_metrics_loader.py [--rows N] [--days D] [--workers W]
+
+Writes N synthetic rows spread over D days (1,000,000 over 90 by default)
+as legacy CSVs and as store files, then summarizes each history with:
+    list       the old loader: text I/O per CSV line into one list, then summarize_rows
+    stream     summarize_rows(iter_metrics(...)): bytes parsing, rows never held
+    pool       summarize_range(...) with W worker processes
+Peak Python memory of list and stream is measured in a second pass with
+tracemalloc (which slows both down, so it is reported separately).
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_store  # noqa: E402
+from analyze_metrics import iter_metrics, summarize_range, summarize_rows  # noqa: E402
+
+TASKS = ["dependency-analysis", "security-audit", "git-history", "code-search", "docs-lookup"]
+
+
+def write_history(csv_dir: Path, store_dir: Path, rows: int, days: int):
+    rng = random.Random(7)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    per_day = rows // days
+    for i in range(days):
+        day = today - timedelta(days=i)
+        date = day.strftime("%Y-%m-%d")
+        base = metrics_store.to_epoch(day)
+        stamps = sorted(base + rng.randrange(86400) for _ in range(per_day))
+        records = [{"timestamp": ts, "task": rng.choice(TASKS), "lines": rng.randint(2, 15),
+                    "tokens": rng.randint(40, 400)} for ts in stamps]
+        with (csv_dir / f"delegation-{date}.csv").open("w") as f:
+            f.write("timestamp,task,lines,tokens\n")
+            f.writelines(f"{metrics_store.format_timestamp(r['timestamp'])},{r['task']},{r['lines']},{r['tokens']}\n"
+                         for r in records)
+        metrics_store.append_records(metrics_store.day_file(store_dir, date), records)
+
+
+def legacy_load(metrics_dir: Path, days: int) -> list:
+    """The previous CSV path: text I/O, strip/split/int per line, everything in one list."""
+    metrics = []
+    for i in range(days):
+        date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
+        log_file = metrics_dir / f"delegation-{date}.csv"
+        if not log_file.exists():
+            continue
+        with log_file.open('r') as f:
+            next(f, None)
+            for line in f:
+                parts = line.strip().split(',')
+                if len(parts) != 4:
+                    continue
+                timestamp, task, lines, tokens = parts
+                try:
+                    metrics.append((timestamp, task, int(lines), int(tokens), "", 0))
+                except ValueError:
+                    continue
+    return metrics
+
+
+def measure(fn, memory: bool = False):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    summary = fn()
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return summary["count"], elapsed, peak
+
+
+def main():
+    rows, days, workers = 1_000_000, 90, os.cpu_count() or 1
+    if "--rows" in sys.argv:
+        rows = int(sys.argv[sys.argv.index("--rows") + 1])
+    if "--days" in sys.argv:
+        days = int(sys.argv[sys.argv.index("--days") + 1])
+    if "--workers" in sys.argv:
+        workers = int(sys.argv[sys.argv.index("--workers") + 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_dir, store_dir = Path(tmp) / "csv", Path(tmp) / "store"
+        csv_dir.mkdir()
+        store_dir.mkdir()
+        write_history(csv_dir, store_dir, rows, days)
+
+        print(f"📊 Raw-row summary ({rows:,} rows over {days} days, {workers} workers)")
+        cases = [
+            ("csv   list", csv_dir, lambda d: summarize_rows(legacy_load(d, days))),
+            ("csv   stream", csv_dir, lambda d: summarize_rows(iter_metrics(d, days))),
+            ("csv   pool", csv_dir, lambda d: summarize_range(d, days, workers=max(workers, 2))),
+            ("store stream", store_dir, lambda d: summarize_rows(iter_metrics(d, days))),
+            ("store pool", store_dir, lambda d: summarize_range(d, days, workers=max(workers, 2))),
+        ]
+        for label, directory, fn in cases:
+            count, elapsed, _ = measure(lambda: fn(directory))
+            print(f"   {label:<13} {count:9,} rows  {elapsed:7.2f}s  {count / elapsed:10,.0f} rows/s")
+
+        print("   peak memory (tracemalloc)")
+        for label, directory, fn in cases[:2]:
+            _, _, peak = measure(lambda: fn(directory), memory=True)
+            print(f"   {label:<13} {peak / 2 ** 20:9.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
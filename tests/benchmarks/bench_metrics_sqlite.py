@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: filtered queries from SQLite vs scanning CSVs or store files
+
+Usage:
+    python tests/benchmarks/bench_metrics_sqlite.py [--sizes 10000,100000,1000000] [--days D]
+
+For each size, writes that many rows over D days (90 by default) as legacy
+CSVs and as store files, imports the store into SQLite, then times:
+    insert per-row     one transaction per row (a post-delegate call each), rows/s
+    insert batched     metrics_sqlite.sync: one executemany per file
+    <query> csv        reading every CSV line and filtering in Python
+    <query> store      iter_rows over store files in range, filtering in Python
+    <query> sqlite     metrics_sqlite.query with the same filter
+Queries: one task over the last 7 days, one CLI by hour over all days, and
+rows above a token threshold over all days.
+"""
+
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_sqlite  # noqa: E402
+import metrics_store  # noqa: E402
+
+TASKS = ["dependency-analysis", "security-audit", "git-history", "code-search", "docs-lookup"]
+CLIS = ["gemini", "qwen", "codex"]
+PER_ROW_SAMPLE = 5000
+
+
+def write_history(csv_dir: Path, store_dir: Path, rows: int, days: int):
+    rng = random.Random(5)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    per_day = rows // days
+    for i in range(days):
+        day = today - timedelta(days=i)
+        date = day.strftime("%Y-%m-%d")
+        base = metrics_store.to_epoch(day)
+        records = [{"timestamp": ts, "task": rng.choice(TASKS), "lines": rng.randint(2, 15),
+                    "tokens": rng.randint(40, 400), "cli": rng.choice(CLIS)}
+                   for ts in sorted(base + rng.randrange(86400) for _ in range(per_day))]
+        with (csv_dir / f"delegation-{date}.csv").open("w") as f:
+            f.write("timestamp,task,lines,tokens,cli\n")
+            f.writelines(f"{metrics_store.format_timestamp(r['timestamp'])},{r['task']},{r['lines']},"
+                         f"{r['tokens']},{r['cli']}\n" for r in records)
+        metrics_store.append_records(metrics_store.day_file(store_dir, date), records)
+
+
+def since(days: int) -> int:
+    return metrics_sqlite._epoch((datetime.now() - timedelta(days=days - 1)).strftime("%Y-%m-%d"))
+
+
+def csv_scan(csv_dir: Path, keep, start: int = None) -> int:
+    matched = 0
+    for path in sorted(csv_dir.glob("delegation-*.csv")):
+        with path.open("r") as f:
+            next(f, None)
+            for line in f:
+                timestamp, task, lines, tokens, cli = line.rstrip("\n").split(",")
+                row = {"timestamp": metrics_store.to_epoch(datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")),
+                       "task": task, "tokens": int(tokens), "cli": cli}
+                if (start is None or row["timestamp"] >= start) and keep(row):
+                    matched += 1
+    return matched
+
+
+def store_scan(store_dir: Path, keep, start: int = None) -> int:
+    return sum(1 for path in metrics_store.store_files(store_dir, start)
+               for row in metrics_store.iter_rows(path, start) if keep(row))
+
+
+def timed(label: str, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<22} {elapsed * 1000:10.1f}ms")
+    return elapsed
+
+
+def per_row_insert(store_dir: Path) -> float:
+    """Rows/s when every delegation commits its own row."""
+    db = metrics_sqlite.connect(store_dir / "per-row")
+    rows = list(metrics_store.iter_rows(metrics_store.store_files(store_dir)[0]))[:PER_ROW_SAMPLE]
+    start = time.perf_counter()
+    for row in rows:
+        with db:
+            db.executemany(metrics_sqlite.INSERT, metrics_sqlite._values(1, [row]))
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    sizes, days = [10_000, 100_000, 1_000_000], 90
+    if "--sizes" in sys.argv:
+        sizes = [int(s) for s in sys.argv[sys.argv.index("--sizes") + 1].split(",")]
+    if "--days" in sys.argv:
+        days = int(sys.argv[sys.argv.index("--days") + 1])
+
+    queries = [
+        ("task, 7 days", lambda r: r["task"] == "security-audit", 7,
+         dict(task="security-audit")),
+        ("cli by hour", lambda r: r["cli"] == "qwen", None, dict(cli="qwen", group_by="hour")),
+        ("tokens >= 390", lambda r: r["tokens"] >= 390, None, dict(min_tokens=390, group_by="task")),
+    ]
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_dir, store_dir = Path(tmp) / "csv", Path(tmp) / "store"
+            csv_dir.mkdir()
+            store_dir.mkdir()
+            write_history(csv_dir, store_dir, rows, days)
+            print(f"📊 SQLite backend ({rows:,} rows over {days} days)")
+            print(f"   {'insert per-row':<22} {per_row_insert(store_dir):10,.0f} rows/s")
+            db = metrics_sqlite.connect(store_dir)
+            elapsed = timed("insert batched", lambda: metrics_sqlite.sync(store_dir, db))
+            print(f"   {'':<22} {rows / elapsed:10,.0f} rows/s")
+            timed("sync unchanged", lambda: metrics_sqlite.sync(store_dir, db))
+            for label, keep, window, filters in queries:
+                start = since(window) if window else None
+                timed(f"{label} csv", lambda: csv_scan(csv_dir, keep, start))
+                timed(f"{label} store", lambda: store_scan(store_dir, keep, start))
+                timed(f"{label} sqlite", lambda: metrics_sqlite.query(db, since=start, **filters))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading metrics from daily CSVs vs the columnar store
+
+Usage:
+    python tests/benchmarks/bench_metrics_store.py [days] [rows_per_day]
+
+Writes the same synthetic history in both formats (the store as one block
+per day, as produced by the migrator) and times analyze_metrics.load_metrics
+over the full range and over the last 7 days.
+"""
+
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_store  # noqa: E402
+from analyze_metrics import load_metrics  # noqa: E402
+
+TASKS = ["dependency-analysis", "security-audit", "git-history", "code-search", "docs-lookup"]
+
+
+def write_history(csv_dir: Path, store_dir: Path, days: int, rows_per_day: int):
+    rng = random.Random(3)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    for i in range(days):
+        day = today - timedelta(days=i)
+        date = day.strftime("%Y-%m-%d")
+        stamps = sorted(day + timedelta(seconds=rng.randrange(86400)) for _ in range(rows_per_day))
+        rows = [(ts, rng.choice(TASKS), rng.randint(2, 15), rng.randint(40, 400)) for ts in stamps]
+
+        with (csv_dir / f"delegation-{date}.csv").open("w") as f:
+            f.write("timestamp,task,lines,tokens\n")
+            for ts, task, lines, tokens in rows:
+                f.write(f"{ts:%Y-%m-%d %H:%M:%S},{task},{lines},{tokens}\n")
+
+        metrics_store.append_records(metrics_store.day_file(store_dir, date), [
+            {"timestamp": metrics_store.to_epoch(ts), "task": task, "lines": lines, "tokens": tokens}
+            for ts, task, lines, tokens in rows
+        ])
+
+
+def dir_size(path: Path, pattern: str) -> int:
+    return sum(p.stat().st_size for p in path.glob(pattern))
+
+
+def timed(label: str, metrics_dir: Path, days: int) -> float:
+    start = time.perf_counter()
+    rows = len(load_metrics(metrics_dir, days))
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<22} {rows:9,} rows   {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 180
+    rows_per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_dir, store_dir = Path(tmp) / "csv", Path(tmp) / "store"
+        csv_dir.mkdir()
+        store_dir.mkdir()
+        write_history(csv_dir, store_dir, days, rows_per_day)
+
+        print(f"📊 {days} days × {rows_per_day} rows")
+        print(f"   CSV size:   {dir_size(csv_dir, '*.csv'):12,} bytes")
+        print(f"   store size: {dir_size(store_dir, '*.dcol'):12,} bytes\n")
+        for window in (days, 7):
+            timed(f"csv   --days {window}", csv_dir, window)
+            timed(f"store --days {window}", store_dir, window)
+
+
+if __name__ == "__main__":
+    main()
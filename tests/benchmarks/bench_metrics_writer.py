@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: metrics write throughput, per-row commits vs group commit
+
+Usage:
+    python tests/benchmarks/bench_metrics_writer.py [rows] [writers]
+
+Each writer process logs rows either one locked append at a time (what
+post-delegate does) or through MetricsBuffer (what the daemon does with
+--group-commit). Reports rows/second and verifies no row was lost.
+"""
+
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_store  # noqa: E402
+import metrics_writer  # noqa: E402
+
+DAY_START = 1735689600  # 2025-01-01
+
+
+def make_record(i: int) -> dict:
+    return {"timestamp": DAY_START + i % 86400, "task": f"task-{i % 7}", "lines": 5, "tokens": 120}
+
+
+def per_row(metrics_dir: str, rows: int):
+    for i in range(rows):
+        metrics_writer.commit(Path(metrics_dir), [make_record(i)])
+
+
+def buffered(metrics_dir: str, rows: int):
+    buffer = metrics_writer.MetricsBuffer(Path(metrics_dir), flush_interval=0.05)
+    for i in range(rows):
+        buffer.add(make_record(i))
+    buffer.close()
+
+
+def run(label: str, target, rows: int, writers: int):
+    ctx = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as tmp:
+        per_writer = rows // writers
+        start = time.perf_counter()
+        procs = [ctx.Process(target=target, args=(tmp, per_writer)) for _ in range(writers)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+
+        stored = metrics_store.file_info(metrics_store.day_file(Path(tmp), "2025-01-01")).rows
+        status = "ok" if stored == per_writer * writers else f"LOST {per_writer * writers - stored}"
+        print(f"   {label:<12} {stored:8,} rows   {stored / elapsed:10,.0f} rows/s   {status}")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    print(f"📊 {rows} rows from {writers} concurrent writers")
+    run("per-row", per_row, rows, writers)
+    run("buffered", buffered, rows, writers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes shipped and latency with local output reduction
+
+Usage:
+    python tests/benchmarks/bench_output_reducers.py [--live]
+
+For each supported command, reduces a synthetic capture typical of a
+medium project and reports raw vs reduced bytes and tokens plus reducer
+time. With --live, also runs the real commands in the current directory
+(where installed) and times the whole pre-delegate step: run, reduce and
+build the prompt.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import output_reducers  # noqa: E402
+import token_counter  # noqa: E402
+from pre_delegate import build_prompt, classify, reduce_locally  # noqa: E402
+
+rng = random.Random(4)
+NAMES = [f"pkg-{i}" for i in range(300)]
+
+
+def npm_ls() -> str:
+    lines = ["app@1.0.0 /app"]
+
+    def subtree(name: str, depth: int, prefix: str):
+        children = rng.sample(NAMES, 3) if depth < 4 else []
+        lines.append(f"{prefix}{'├─┬' if children else '├──'} {name}@1.{rng.randrange(3)}.0")
+        for child in children:
+            subtree(child, depth + 1, prefix + "│ ")
+
+    for top in rng.sample(NAMES, 40):
+        subtree(top, 1, "")
+    lines += [f"├── {name}@1.0.0 deduped" for name in rng.sample(NAMES, 200)]
+    lines.append("npm ERR! peer dep missing: react@^18, required by pkg-3@1.0.0")
+    return "\n".join(lines)
+
+
+def git_log() -> str:
+    subjects = ["Bump version", "Merge branch 'main'", "Fix flaky test", "Update deps"]
+    out = []
+    for i in range(2000):
+        subject = rng.choice(subjects) if rng.random() < 0.6 else f"Implement feature {i}"
+        out.append(f"commit {i:040x}\nAuthor: Dev {i % 7} <dev{i % 7}@example.com>\n"
+                   f"Date:   Mon Jan 1 10:00:00 2024 +0000\n\n    {subject}\n\n    Details line\n")
+    return "\n".join(out)
+
+
+def pip_freeze() -> str:
+    return "\n".join(f"{name}=={rng.randrange(9)}.{rng.randrange(20)}.{rng.randrange(9)}" for name in NAMES)
+
+
+def find() -> str:
+    paths = [f"./src/mod{i // 20}/file{i}.py" for i in range(600)]
+    paths += [f"./node_modules/{name}/index.js" for name in NAMES for _ in range(20)]
+    return "\n".join(paths)
+
+
+FIXTURES = {"npm_ls": npm_ls, "git_log": git_log, "pip_freeze": pip_freeze, "find": find}
+LIVE = ["npm ls --all", "git log -500", "pip freeze", "find ."]
+
+
+def synthetic():
+    print("📊 Synthetic captures")
+    print(f"   {'reducer':<11} {'raw bytes':>10} {'reduced':>9} {'raw tok':>9} {'red tok':>8} {'reduce':>9}")
+    for name, make in FIXTURES.items():
+        raw = make()
+        start = time.perf_counter()
+        reduced = output_reducers.reduce_output(name, raw)
+        elapsed = time.perf_counter() - start
+        print(f"   {name:<11} {len(raw.encode()):10,} {len(reduced.encode()):9,} "
+              f"{token_counter.approx_tokens(raw):9,} {token_counter.approx_tokens(reduced):8,} "
+              f"{elapsed * 1000:7.1f} ms")
+
+
+def live():
+    print("\n📊 Live commands (run + reduce + build prompt)")
+    for command in LIVE:
+        classification = classify(command)
+        start = time.perf_counter()
+        reduction = reduce_locally(classification, command, Path.cwd())
+        prompt = build_prompt(classification.task_type, command, "bench", classification.max_lines, reduction)
+        elapsed = time.perf_counter() - start
+        if reduction is None:
+            print(f"   {command:<14} unavailable")
+            continue
+        print(f"   {command:<14} {reduction.raw_bytes:10,} -> {len(prompt.encode()):8,} prompt bytes   "
+              f"run {reduction.run_seconds * 1000:6.0f} ms   reduce {reduction.reduce_seconds * 1000:6.1f} ms   "
+              f"total {elapsed * 1000:6.0f} ms")
+
+
+def main():
+    synthetic()
+    if "--live" in sys.argv:
+        live()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: validating a huge response in memory vs streaming
+
+Usage:
+    python tests/benchmarks/bench_post_stream.py [megabytes]
+
+Writes a synthetic response (default 100 MB) and validates it in a fresh
+process per mode, reporting wall time and peak RSS:
+    argv        pass the response as an argument (as the hook did before)
+    in-memory   read the file, then count_lines/estimate_tokens/extract_action_items
+    --file      single streaming pass
+    --fail-fast streaming pass that stops once max_lines is exceeded
+"""
+
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+HOOKS = Path(__file__).resolve().parent.parent.parent / "hooks"
+
+LINES = [
+    "dependency lodash@4.17.20 is outdated, latest is 4.17.21\n",
+    '  {"name": "left-pad", "version": "1.3.0", "integrity": "sha512-abc"}\n',
+    "\n",
+    "commit 4f2a9c1e Fix race in scheduler (#1234)\n",
+]
+
+DRIVER = """
+import resource, sys, time
+sys.path.insert(0, {hooks!r})
+import post_delegate
+mode, path, cwd = sys.argv[1:4]
+start = time.perf_counter()
+if mode == "in-memory":
+    text = open(path, encoding="utf-8").read()
+    post_delegate.count_lines(text)
+    post_delegate.estimate_tokens(text)
+    post_delegate.extract_action_items(text)
+else:
+    argv = ["post-delegate.py", "--file", path, "10", "bench"]
+    if mode == "--fail-fast":
+        argv.append("--fail-fast")
+    try:
+        post_delegate.main(argv, cwd=__import__("pathlib").Path(cwd))
+    except SystemExit:
+        pass
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+sys.stderr.write(f"{{elapsed}} {{peak}}\\n")
+"""
+
+
+def write_response(path: Path, megabytes: int):
+    with path.open("w") as f:
+        size = i = 0
+        while size < megabytes * 1_000_000:
+            line = "TODO: pin transitive versions\n" if i % 100_000 == 0 else LINES[i % len(LINES)]
+            f.write(line)
+            size += len(line)
+            i += 1
+
+
+def run(mode: str, path: Path, cwd: str):
+    result = subprocess.run(
+        [sys.executable, "-c", DRIVER.format(hooks=str(HOOKS)), mode, str(path), cwd],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    elapsed, peak_kb = result.stderr.split()[-2:]
+    print(f"   {mode:<12} {float(elapsed) * 1000:10.0f} ms   peak RSS {int(peak_kb) / 1024:8.0f} MB")
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "response.txt"
+        write_response(path, megabytes)
+        print(f"📊 {path.stat().st_size:,} byte response")
+
+        # Linux carries peak RSS across fork/exec, so keep this process small
+        # until the measured runs are done
+        for mode in ("in-memory", "--file", "--fail-fast"):
+            run(mode, path, tmp)
+
+        try:
+            subprocess.run([sys.executable, "-c", "pass", path.read_text()], check=True)
+            print("   argv         accepted")
+        except OSError as e:
+            print(f"   argv         fails: {e.strerror}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: building prompts (and their token counts) for batch delegation
+
+Usage:
+    python tests/benchmarks/bench_prompt_templates.py [--prompts N] [--distinct D]
+
+Builds N prompts drawn from D distinct (task type, task, context, max_lines)
+tuples, the pattern of a large batch run, and reports prompts/s for:
+    f-string + count    the previous builders (dict rebuilt per call, f-string
+                        per prompt) followed by count_tokens on each prompt
+    compiled, no memo   compiled templates with precounted static segments,
+                        memo cleared before every build
+    compiled + memo     build_prompt as pre_delegate now calls it
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import pre_delegate  # noqa: E402
+import prompt_templates  # noqa: E402
+import token_counter  # noqa: E402
+
+TYPES = ["shell", "search", "analyze", "docs", "generic"]
+
+
+def legacy_build(task_type: str, task: str, context: str, max_lines: int) -> str:
+    """The previous build_prompt: builders dict per call, one f-string per type (search layout shared)."""
+    def search(task, context, max_lines):
+        return f"""CONTEXT: {context}
+TASK: {task}
+OUTPUT: Return ONLY:
+- File paths where found (no code snippets)
+- Count of occurrences
+- 1-line assessment
+Maximum {max_lines} lines"""
+
+    def generic(task, context, max_lines):
+        return f"""CONTEXT: {context}
+TASK: {task}
+OUTPUT: Be concise and actionable. Maximum {max_lines} lines."""
+
+    builders = {"shell": search, "search": search, "analyze": search, "docs": search, "generic": generic}
+    return builders.get(task_type, generic)(task, context, max_lines)
+
+
+def workload(prompts: int, distinct: int) -> list:
+    rng = random.Random(9)
+    tuples = [(rng.choice(TYPES), f"find usages of handler_{i} in src/ and summarize callers",
+               f"Refactoring batch {i % 7}: keep the public API stable", rng.randint(3, 15))
+              for i in range(distinct)]
+    return [rng.choice(tuples) for _ in range(prompts)]
+
+
+def timed(label: str, fn, jobs: list):
+    start = time.perf_counter()
+    tokens = 0
+    for job in jobs:
+        tokens += fn(*job)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<20} {len(jobs) / elapsed:10,.0f} prompts/s  ({tokens:,} prompt tokens)")
+
+
+def main():
+    prompts, distinct = 200_000, 500
+    if "--prompts" in sys.argv:
+        prompts = int(sys.argv[sys.argv.index("--prompts") + 1])
+    if "--distinct" in sys.argv:
+        distinct = int(sys.argv[sys.argv.index("--distinct") + 1])
+    jobs = workload(prompts, distinct)
+    templates = prompt_templates.load_templates()
+
+    def uncached(task_type, task, context, max_lines):
+        templates._memo.clear()
+        return pre_delegate.render_prompt(task_type, task, context, max_lines).tokens
+
+    print(f"📊 Prompt building ({prompts:,} prompts, {distinct:,} distinct)")
+    timed("f-string + count", lambda *job: token_counter.count_tokens(legacy_build(*job)), jobs)
+    timed("compiled, no memo", uncached, jobs)
+    timed("compiled + memo", lambda *job: pre_delegate.render_prompt(*job).tokens, jobs)
+
+
+if __name__ == "__main__":
+    main()
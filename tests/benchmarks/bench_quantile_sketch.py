@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: range percentiles from merged daily sketches vs re-reading rows
+
+Usage:
+    python tests/benchmarks/bench_quantile_sketch.py [--days N] [--rows-per-day N]
+
+Writes N days of metrics (with latencies) and computes p50/p95/p99 of tokens
+and latency over the whole range two ways:
+    rows       read every row, sort, pick ranks (exact)
+    sketches   merge the sketches kept in each day's rollup
+and reports time, worst relative error and rollup size per day.
+"""
+
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import metrics_rollup  # noqa: E402
+import metrics_store  # noqa: E402
+import metrics_writer  # noqa: E402
+from analyze_metrics import summarize_rollups  # noqa: E402
+from quantile_sketch import quantiles  # noqa: E402
+
+QS = (0.5, 0.95, 0.99)
+
+
+def main():
+    days, per_day = 30, 5000
+    if "--days" in sys.argv:
+        days = int(sys.argv[sys.argv.index("--days") + 1])
+    if "--rows-per-day" in sys.argv:
+        per_day = int(sys.argv[sys.argv.index("--rows-per-day") + 1])
+
+    rng = random.Random(11)
+    first = datetime(2025, 1, 1)
+    dates = [(first + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days)]
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_dir = Path(tmp)
+        for d in range(days):
+            start = metrics_store.to_epoch(first + timedelta(days=d))
+            metrics_writer.commit(metrics_dir, [
+                {"timestamp": start + i * 86400 // per_day, "task": f"task-{i % 20}",
+                 "lines": rng.randint(2, 14), "tokens": int(rng.lognormvariate(4.8, 0.6)),
+                 "latency_ms": int(rng.lognormvariate(8, 0.9))}
+                for i in range(per_day)
+            ])
+        rollup_bytes = sum(metrics_rollup.rollup_file(metrics_dir, date).stat().st_size for date in dates) / days
+
+        begin = time.perf_counter()
+        tokens, latency = [], []
+        for date in dates:
+            for row in metrics_rollup.iter_day_rows(metrics_dir, date):
+                tokens.append(row["tokens"])
+                latency.append(row["latency_ms"])
+        exact = {}
+        for name, values in (("tokens", tokens), ("latency_ms", latency)):
+            values.sort()
+            exact[name] = [values[int(q * (len(values) - 1))] for q in QS]
+        rows_s = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        summary = summarize_rollups(metrics_rollup.load_rollups(metrics_dir, dates))
+        approx = {name: list(quantiles(summary["sketches"][name], QS).values()) for name in exact}
+        sketch_s = time.perf_counter() - begin
+
+    error = max(abs(a - e) / e for name in exact for a, e in zip(approx[name], exact[name]))
+    print(f"📊 Percentiles over {days} days × {per_day:,} rows")
+    print(f"   rows       {rows_s * 1000:8.1f}ms")
+    print(f"   sketches   {sketch_s * 1000:8.1f}ms  (worst relative error {error:.2%}, "
+          f"{rollup_bytes / 1024:.1f} KB rollup per day)")
+    for name in exact:
+        print(f"   {name:<10} exact {exact[name]}  sketch {[round(v) for v in approx[name]]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cached vs uncached delegation latency
+
+Usage:
+    python tests/benchmarks/bench_response_cache.py [--cli-delay SECONDS]
+
+Builds a throwaway project with a 5 MB package-lock.json, a git HEAD and an
+@path reference, then times:
+    key        cache_key cold (lockfile hashed) and warm (digest memoized)
+    hit        full runner path answered from the cache
+    miss       full runner path through a fake CLI that sleeps --cli-delay
+    eviction   put() into a cache holding 2,000 entries at its byte limit
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import response_cache  # noqa: E402
+from run_delegation import delegate  # noqa: E402
+
+RUNS = 50
+
+
+def timed(fn, runs: int = RUNS) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def make_project(root: Path, delay: float):
+    (root / ".claude").mkdir()
+    (root / "src").mkdir()
+    (root / "src" / "app.py").write_text("def main():\n    pass\n" * 200)
+    lock = "\n".join(f'    "node_modules/pkg-{i}": {{"version": "1.{i % 9}.0"}},' for i in range(120_000))
+    (root / "package-lock.json").write_text("{\n" + lock + "\n}\n")
+    git = root / ".git"
+    (git / "refs" / "heads").mkdir(parents=True)
+    (git / "HEAD").write_text("ref: refs/heads/main\n")
+    (git / "refs" / "heads" / "main").write_text("0" * 40 + "\n")
+
+    script = root / "fake_cli.py"
+    script.write_text(f"import time\ntime.sleep({delay})\nprint('Key finding: all good')\n")
+    os.environ["DELEGATE_CLI"] = f"{sys.executable} {script}"
+
+
+def main():
+    delay = 1.0
+    if "--cli-delay" in sys.argv:
+        delay = float(sys.argv[sys.argv.index("--cli-delay") + 1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_project(root, delay)
+        prompt = "Review @src/app.py against the installed dependencies"
+        lock_mb = (root / "package-lock.json").stat().st_size / 1e6
+
+        start = time.perf_counter()
+        response_cache.cache_key(prompt, root)
+        cold = (time.perf_counter() - start) * 1000
+        warm = timed(lambda: response_cache.cache_key(prompt, root))
+
+        start = time.perf_counter()
+        delegate(prompt, cwd=root)
+        miss = (time.perf_counter() - start) * 1000
+        hit = timed(lambda: delegate(prompt, cwd=root))
+
+        cache = response_cache.ResponseCache(root / "evict", max_bytes=2000 * 600)
+        cache.directory.mkdir()
+        for i in range(2000):
+            (cache.directory / f"seed{i}.json").write_text('{"created": 0, "response": "' + "x" * 570 + '"}')
+        counter = iter(range(10 ** 6))
+        evict = timed(lambda: cache.put(f"new{next(counter)}", "x" * 500), runs=20)
+
+    print("📊 Response cache")
+    print(f"   key (cold, {lock_mb:.1f} MB lockfile)  {cold:8.2f} ms")
+    print(f"   key (warm, memoized)         {warm:8.2f} ms")
+    print(f"   miss (fake CLI, {delay:.1f}s delay)   {miss:8.1f} ms")
+    print(f"   hit                          {hit:8.2f} ms")
+    print(f"   put + evict (2,000 entries)  {evict:8.2f} ms")
+    print(f"\n   Speedup on a hit: {miss / hit:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: token counting on large responses
+
+Usage:
+    python tests/benchmarks/bench_token_counter.py [megabytes]
+
+Times the chars/4 rule, the bundled approximation (single pass and
+uncached), a cached repeat, and tiktoken when it is installed. With
+tiktoken present it also reports each estimator's error against it.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "hooks"))
+
+import token_counter  # noqa: E402
+
+SAMPLES = [
+    "The dependency tree contains 3 outdated packages; upgrade lodash first.\n",
+    '{"name": "left-pad", "version": "1.3.0", "resolved": "https://registry.npmjs.org/"}\n',
+    "    for (const item of items) { if (!item.ok) throw new Error(`bad ${item.id}`); }\n",
+    "commit 4f2a9c1e Fix race in scheduler (#1234)\n",
+    "依存関係のツリーには古いパッケージが含まれています。\n",
+]
+
+
+def make_text(megabytes: float) -> str:
+    rng = random.Random(5)
+    parts, size = [], 0
+    while size < megabytes * 1_000_000:
+        line = rng.choice(SAMPLES)
+        parts.append(line)
+        size += len(line)
+    return "".join(parts)
+
+
+def timed(label: str, fn, text: str) -> int:
+    start = time.perf_counter()
+    tokens = fn(text)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<18} {tokens:12,} tokens   {elapsed * 1000:9.1f} ms")
+    return tokens
+
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    text = make_text(megabytes)
+    print(f"📊 {len(text):,} characters")
+
+    chars = timed("chars/4", token_counter.char_tokens, text)
+    approx = timed("approx", token_counter.approx_tokens, text)
+    token_counter.count_tokens(text, "approx")
+    timed("approx (cached)", lambda t: token_counter.count_tokens(t, "approx"), text)
+
+    tiktoken = token_counter._tiktoken_counter()
+    if tiktoken is None:
+        print("   tiktoken not installed; skipping accuracy comparison")
+        return
+    exact = timed("tiktoken", tiktoken, text)
+    for label, estimate in (("chars/4", chars), ("approx", approx)):
+        print(f"   {label:<18} error {abs(estimate - exact) / exact:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
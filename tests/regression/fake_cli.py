@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the gemini, aider and copilot CLIs
+Answers prompts the way the real CLIs are called by the hooks
+(`gemini -p PROMPT`, `copilot -p PROMPT`, `aider --message PROMPT`) with
+scripted responses, after a sampled latency, failing at a configured rate.
+
+Usage:
+    python fake_cli.py install DIR [--config FILE]   # write gemini/aider/copilot shims to DIR
+    python fake_cli.py --as gemini -p "prompt"
+    python fake_cli.py --as aider --version
+
+Behaviour per CLI comes from the JSON file in FAKE_CLI_CONFIG (or --config
+at install time), merged over DEFAULTS:
+
+    {"gemini": {
+        "latency": {"median": 0.8, "sigma": 0.4},  // lognormal seconds; or
+                                                   // {"fixed": s}, {"uniform": [lo, hi]}
+        "spike_rate": 0.02, "spike": 6.0,          // occasional stalls
+        "error_rate": 0.05, "exit_code": 1,        // injected failures
+        "empty_rate": 0.0,                         // exit 0 with no output
+        "responses": [{"match": "git", "text": "..."}]  // first regex match on the TASK line wins
+    }}
+
+FAKE_CLI_SCALE multiplies every latency (0 answers at once) and
+FAKE_CLI_LOG appends `cli<TAB>milliseconds<TAB>exit code` per call.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+from pathlib import Path
+
+CLIS = ("gemini", "aider", "copilot")
+PROMPT_FLAGS = ("-p", "--prompt", "--message", "-m")
+
+DEFAULTS = {
+    "gemini": {"latency": {"median": 0.8, "sigma": 0.4}, "spike_rate": 0.02, "spike": 6.0,
+               "error_rate": 0.01},
+    "aider": {"latency": {"median": 1.5, "sigma": 0.3}, "spike_rate": 0.01, "spike": 8.0,
+              "error_rate": 0.02},
+    "copilot": {"latency": {"median": 1.0, "sigma": 0.6}, "spike_rate": 0.03, "spike": 5.0,
+                "error_rate": 0.02},
+}
+
+DEFAULT_RESPONSE = """- {name}: checked "{task}"
+- No errors or warnings found
+Next step: none"""
+
+
+def load_config(path: str = None) -> dict:
+    config = {name: dict(settings) for name, settings in DEFAULTS.items()}
+    path = path or os.environ.get("FAKE_CLI_CONFIG")
+    if path:
+        for name, settings in json.loads(Path(path).read_text()).items():
+            config.setdefault(name, {}).update(settings)
+    return config
+
+
+def sample_latency(settings: dict, rng: random.Random) -> float:
+    latency = settings.get("latency", {})
+    if "fixed" in latency:
+        seconds = latency["fixed"]
+    elif "uniform" in latency:
+        seconds = rng.uniform(*latency["uniform"])
+    else:
+        seconds = rng.lognormvariate(0, latency.get("sigma", 0.0)) * latency.get("median", 0.0)
+    if rng.random() < settings.get("spike_rate", 0.0):
+        seconds += settings.get("spike", 0.0)
+    return seconds * float(os.environ.get("FAKE_CLI_SCALE", "1"))
+
+
+def task_line(prompt: str) -> str:
+    match = re.search(r"^TASK: (.*)$", prompt, re.MULTILINE)
+    return (match.group(1) if match else prompt.strip().splitlines()[0] if prompt.strip() else "").strip()
+
+
+def respond(name: str, settings: dict, prompt: str) -> str:
+    task = task_line(prompt)
+    for scripted in settings.get("responses", []):
+        if re.search(scripted["match"], task, re.IGNORECASE):
+            return scripted["text"].format(name=name, task=task)
+    return DEFAULT_RESPONSE.format(name=name, task=task[:80])
+
+
+def parse_args(args: list) -> tuple:
+    """(cli name, prompt or None, --version) from a fake CLI command line."""
+    name = "gemini"
+    if "--as" in args:
+        i = args.index("--as")
+        name = args[i + 1]
+        args = args[:i] + args[i + 2:]
+    if "--version" in args:
+        return name, None, True
+    for flag in PROMPT_FLAGS:
+        if flag in args and args.index(flag) + 1 < len(args):
+            return name, args[args.index(flag) + 1], False
+    return name, args[-1] if args else None, False
+
+
+def install(directory: Path, config: str = None):
+    """Write executable gemini/aider/copilot shims that run this script."""
+    directory.mkdir(parents=True, exist_ok=True)
+    env = f'FAKE_CLI_CONFIG="{Path(config).resolve()}" ' if config else ""
+    for name in CLIS:
+        shim = directory / name
+        shim.write_text(f'#!/bin/sh\n{env}exec "{sys.executable}" "{Path(__file__).resolve()}" --as {name} "$@"\n')
+        shim.chmod(0o755)
+
+
+def main(argv: list = None) -> int:
+    argv = sys.argv if argv is None else argv
+    if len(argv) > 2 and argv[1] == "install":
+        config = argv[argv.index("--config") + 1] if "--config" in argv else None
+        install(Path(argv[2]), config)
+        return 0
+
+    name, prompt, version = parse_args(argv[1:])
+    if version:
+        print(f"{name} 0.0.0-fake")
+        return 0
+    if prompt is None:
+        print(__doc__, file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    settings = load_config().get(name, {})
+    rng = random.Random()
+    time.sleep(sample_latency(settings, rng))
+    if rng.random() < settings.get("error_rate", 0.0):
+        print(f"{name}: injected error (fake CLI)", file=sys.stderr)
+        code = settings.get("exit_code", 1)
+    else:
+        if rng.random() >= settings.get("empty_rate", 0.0):
+            print(respond(name, settings, prompt))
+        code = 0
+
+    log = os.environ.get("FAKE_CLI_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write(f"{name}\t{(time.perf_counter() - start) * 1000:.1f}\t{code}\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
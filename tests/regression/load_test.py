@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Offline load test: N concurrent delegations through the hooks against fake CLIs
+
+Usage:
+    python tests/regression/load_test.py [--delegations N] [--concurrency C] [--cli gemini|aider|copilot]
+                                         [--route] [--config FILE] [--scale X] [--keep DIR]
+
+Installs fake_cli.py shims in a scratch project and runs run_delegation.py
+(pre-delegate, CLI, post-delegate with metrics logging) C at a time, each
+in its own process like real wrapper calls. --route enables all three fake
+CLIs in delegation_config.json so cli_router picks between them instead of
+a fixed DELEGATE_CLI; --config and --scale are passed to the fake CLIs
+(see fake_cli.py). Budget checks are off so nothing is queued.
+
+Reports throughput, latency percentiles and outcomes, then checks the
+metrics store: every file intact, one row per logged delegation, unique
+correlation ids each joined to spans, and rollups matching the raw rows.
+Exits 1 when any integrity check fails.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO / "hooks"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_cli  # noqa: E402
+import metrics_rollup  # noqa: E402
+import metrics_store  # noqa: E402
+
+RUNNER = REPO / "hooks" / "run_delegation.py"
+TASKS = [
+    "git log --oneline -20",
+    "Search for TODO comments in src",
+    "Analyze the error handling in the parser",
+    "Summarize the README",
+    "Find documentation for asyncio.gather",
+]
+OUTCOMES = {0: "ok", 1: "invalid response", 2: "CLI failed", 3: "queued"}
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def run_one(i: int, project: Path, env: dict) -> tuple:
+    task = f"{TASKS[i % len(TASKS)]} (run {i})"
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, str(RUNNER), task, "Load test", "5", "--no-cache",
+                           "--name", "load-test"], cwd=str(project), env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return proc.returncode, time.perf_counter() - start
+
+
+def check_store(metrics_dir: Path, logged: int) -> list:
+    """Integrity problems found in the metrics store (empty when sound)."""
+    problems = []
+    rows, span_ids = [], set()
+    for path in sorted(metrics_dir.glob(f"*{metrics_store.SUFFIX}")):
+        data = path.read_bytes()
+        if metrics_store.valid_length(data) != len(data):
+            problems.append(f"{path.name}: torn or corrupt tail")
+        if path.name.startswith("spans-"):
+            span_ids.update(row["correlation_id"] for row in
+                            metrics_store.iter_rows(path, columns=metrics_store.SPAN_COLUMNS))
+        else:
+            rows += [row for row in metrics_store.iter_rows(path) if row["task"] == "load-test"]
+
+    if len(rows) != logged:
+        problems.append(f"{len(rows)} metrics rows for {logged} logged delegations")
+    ids = Counter(row["correlation_id"] for row in rows)
+    duplicated = [cid for cid, n in ids.items() if n > 1 or not cid]
+    if duplicated:
+        problems.append(f"{len(duplicated)} missing or duplicated correlation ids")
+    unjoined = [cid for cid in ids if cid and cid not in span_ids]
+    if unjoined:
+        problems.append(f"{len(unjoined)} rows without timing spans")
+    mismatched = metrics_rollup.rebuild_rollups(metrics_dir, metrics_rollup.data_dates(metrics_dir))
+    if mismatched:
+        problems.append(f"rollups out of date for {', '.join(mismatched)}")
+    return problems
+
+
+def main():
+    options = {'--delegations': "200", '--concurrency': "16", '--cli': "gemini", '--config': None,
+               '--scale': "0.05", '--keep': None}
+    args = sys.argv[1:]
+    route = '--route' in args
+    for option in options:
+        if option in args:
+            options[option] = args[args.index(option) + 1]
+    delegations, concurrency = int(options['--delegations']), int(options['--concurrency'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = Path(options['--keep'] or tmp)
+        claude = project / ".claude"
+        claude.mkdir(parents=True, exist_ok=True)
+        bin_dir = project / "fake-bin"
+        fake_cli.install(bin_dir, options['--config'])
+        calls = project / "fake-calls.tsv"
+
+        env = dict(os.environ, DELEGATE_NO_BUDGET="1", DELEGATE_NO_CACHE="1",
+                   FAKE_CLI_SCALE=options['--scale'], FAKE_CLI_LOG=str(calls),
+                   PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+        env.pop("DELEGATE_CLI", None)
+        if route:
+            (claude / "delegation_config.json").write_text(json.dumps({"cli_configs": {
+                name: {"command": str(bin_dir / name), "prompt_command":
+                       f"{bin_dir / name} {'--message' if name == 'aider' else '-p'}"}
+                for name in fake_cli.CLIS}}))
+        else:
+            flag = "--message" if options['--cli'] == "aider" else "-p"
+            env["DELEGATE_CLI"] = f"{bin_dir / options['--cli']} {flag}"
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda i: run_one(i, project, env), range(delegations)))
+        elapsed = time.perf_counter() - start
+
+        outcomes = Counter(code for code, _ in results)
+        latencies = [seconds for _, seconds in results]
+        cli_calls = Counter(line.split("\t")[0] for line in calls.read_text().splitlines()) \
+            if calls.exists() else Counter()
+        logged = outcomes[0] + outcomes[1]
+        problems = check_store(claude / "metrics", logged)
+
+    mode = "routed between " + ", ".join(fake_cli.CLIS) if route else f"fake {options['--cli']}"
+    print(f"📊 Load test ({delegations} delegations, {concurrency} concurrent, {mode}, "
+          f"latency x{options['--scale']})")
+    print(f"   throughput   {delegations / elapsed:8.1f} delegations/s ({elapsed:.1f}s)")
+    print(f"   latency      p50 {percentile(latencies, 0.5) * 1000:7.0f}ms  "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.0f}ms  p99 {percentile(latencies, 0.99) * 1000:7.0f}ms  "
+          f"max {max(latencies) * 1000:7.0f}ms")
+    print("   outcomes     " + ", ".join(f"{OUTCOMES.get(code, f'exit {code}')} {n}"
+                                          for code, n in sorted(outcomes.items())))
+    print("   CLI calls    " + ", ".join(f"{cli} {n}" for cli, n in sorted(cli_calls.items())))
+    if problems:
+        print("❌ Metrics integrity:")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+    print(f"✅ Metrics integrity: {logged} rows, spans and rollups consistent")
+
+
+if __name__ == "__main__":
+    main()
@@ -35,9 +35,23 @@ echo -n "- gemini CLI: "
 if command -v gemini &> /dev/null; then
   echo -e "${GREEN}OK${NC}"
 else
-  echo -e "${RED}MISSING${NC}"
-  echo "Please install gemini CLI: npm install -g @google/gemini-cli"
-  exit 1
+  # Offline: answer with the fake gemini/aider/copilot stand-ins (see fake_cli.py)
+  FAKE_BIN=$(mktemp -d)
+  trap 'rm -rf "$FAKE_BIN"' EXIT
+  python3 "$SCRIPT_DIR/fake_cli.py" install "$FAKE_BIN" || exit 1
+  export PATH="$FAKE_BIN:$PATH"
+  export FAKE_CLI_SCALE="${FAKE_CLI_SCALE:-0.05}"
+  echo -e "${YELLOW}MISSING${NC} (using fake CLI stand-in)"
+  echo "  Install the real one for live runs: npm install -g @google/gemini-cli"
+fi
+
+echo -n "- claude CLI: "
+if command -v claude &> /dev/null; then
+  HAVE_CLAUDE=true
+  echo -e "${GREEN}OK${NC}"
+else
+  HAVE_CLAUDE=false
+  echo -e "${YELLOW}MISSING${NC} (delegation decision tests skipped; load test still runs)"
 fi
 
 echo -n "- jq (JSON processor): "
@@ -75,6 +89,10 @@ echo ""
 TEST_RESULTS=()
 for test_script in "${TEST_SCRIPTS[@]}"; do
   test_name=$(basename "$test_script" .sh)
+  if [ "$HAVE_CLAUDE" = false ]; then
+    TEST_RESULTS+=("$test_name:SKIP")
+    continue
+  fi
   TOTAL_TESTS=$((TOTAL_TESTS + 1))
 
   echo -e "${BLUE}Running: $test_name${NC}"
@@ -95,6 +113,19 @@ for test_script in "${TEST_SCRIPTS[@]}"; do
   echo ""
 done
 
+# Offline load test: concurrent delegations through the hooks, metrics integrity
+TOTAL_TESTS=$((TOTAL_TESTS + 1))
+echo -e "${BLUE}Running: load_test${NC}"
+echo ""
+if python3 "$SCRIPT_DIR/load_test.py" --delegations 50 --concurrency 8 --scale "${FAKE_CLI_SCALE:-0.05}"; then
+  PASSED_TESTS=$((PASSED_TESTS + 1))
+  TEST_RESULTS+=("load_test:PASS")
+else
+  FAILED_TESTS=$((FAILED_TESTS + 1))
+  TEST_RESULTS+=("load_test:FAIL")
+fi
+echo ""
+
 # Summary report
 echo ""
 echo -e "${CYAN}=========================================${NC}"
@@ -108,6 +139,8 @@ for result in "${TEST_RESULTS[@]}"; do
 
   if [ "$test_status" = "PASS" ]; then
     echo -e "  $test_name: ${GREEN}PASS${NC}"
+  elif [ "$test_status" = "SKIP" ]; then
+    echo -e "  $test_name: ${YELLOW}SKIP${NC}"
   else
     echo -e "  $test_name: ${RED}FAIL${NC}"
   fi
@@ -0,0 +1,128 @@
+"""
+Unit tests for action-item extraction
+Run with: pytest tests/
+"""
+
+import json
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import action_items
+import metrics_rollup
+from post_delegate import extract_action_items, main
+
+RESPONSE = """Findings:
+Next step: run npm audit fix
+todo: pin lodash
+CRITICAL: prototype pollution in merge()
+Recommended: enable lockfile checks
+TODO:   pin lodash
+"""
+
+
+class TestExtractor:
+    """Test the single-pass extractor."""
+
+    def test_document_order_with_categories_and_lines(self):
+        items = action_items.extract(RESPONSE, action_items.default_extractor())
+        assert [(i.category, i.line) for i in items] == [
+            ("NEXT_STEP", 2), ("TODO", 3), ("CRITICAL", 4), ("RECOMMEND", 5),
+        ]
+        assert items[2].text == "CRITICAL: prototype pollution in merge()"
+
+    def test_duplicates_and_mid_word_matches_are_skipped(self):
+        texts = extract_action_items("TODO: a\nTODO:  a\nNOTODO: b\nFIXME: c")
+        assert texts == ["TODO: a", "FIXME: c"]
+
+    def test_items_do_not_span_lines(self):
+        assert extract_action_items("TODO:\nnot an item") == []
+
+    def test_user_patterns(self, tmp_path):
+        (tmp_path / "action_patterns.json").write_text(json.dumps({"SECURITY": r"CVE-\d{4}-\d+"}))
+        extractor = action_items.project_extractor(tmp_path)
+        items = action_items.extract("Fix CVE-2021-23337 in lodash\nTODO: bump", extractor)
+        assert [(i.category, i.text) for i in items] == [
+            ("SECURITY", "CVE-2021-23337 in lodash"), ("TODO", "TODO: bump"),
+        ]
+
+    def test_alternation_and_optional_first_char(self):
+        extractor = action_items.default_extractor()
+        extractor.register("DEP", r"CVE-\d+|deprecated")
+        extractor.register("OPT", r"(?:pre)?release")
+        items = action_items.extract("this api is deprecated now\nrelease notes pending", extractor)
+        assert [i.category for i in items] == ["DEP", "OPT"]
+
+    def test_invalid_user_patterns_are_skipped(self, tmp_path, capsys):
+        path = tmp_path / "action_patterns.json"
+        path.write_text(json.dumps({"BAD": "(unclosed", "SECURITY": r"CVE-\d+"}))
+        items = action_items.extract("Fix CVE-2021 in lodash", action_items.project_extractor(tmp_path))
+        assert [i.category for i in items] == ["SECURITY"]
+        assert "BAD" in capsys.readouterr().err
+
+        other = tmp_path / "broken"
+        other.mkdir()
+        (other / "action_patterns.json").write_text("{not json")
+        assert action_items.project_extractor(other).categories == action_items.default_extractor().categories
+
+    def test_leading_inline_flags_are_scoped(self):
+        extractor = action_items.default_extractor()
+        extractor.register("SECURITY", r"(?i)cve-\d+")
+        items = action_items.extract("Fix CVE-2021 in lodash\nTODO: pin it", extractor)
+        assert [(i.category, i.text) for i in items] == [("SECURITY", "CVE-2021 in lodash"), ("TODO", "TODO: pin it")]
+        with pytest.raises(re.error):
+            extractor.register("ASCII", r"(?a)\w+:")
+
+    def test_numbered_backreferences_are_rejected(self):
+        extractor = action_items.default_extractor()
+        with pytest.raises(re.error):
+            extractor.register("REPEAT", r"(ab)\1")
+        extractor.register("ESCAPED", r"path\\1")
+        extractor.register("NAMED", r"(?P<w>ab)(?P=w)")
+        assert action_items.extract("see abab: twice", extractor)[0].category == "NAMED"
+
+    def test_patterns_failing_the_combined_regex_are_skipped(self, tmp_path, capsys):
+        (tmp_path / "action_patterns.json").write_text(json.dumps({"CLASH": "(?P<c0>x)", "SECURITY": r"CVE-\d+"}))
+        extractor = action_items.project_extractor(tmp_path)
+        assert extractor.categories[-1] == "SECURITY" and "CLASH" not in extractor.categories
+        assert "CLASH" in capsys.readouterr().err
+
+    def test_streamed_matches_whole_text(self):
+        collector = action_items.ActionItemCollector()
+        for line in RESPONSE.splitlines(keepends=True):
+            collector.feed(line)
+        assert collector.items == action_items.extract(RESPONSE)
+
+
+class TestJsonReport:
+    """Test post-delegate --json output."""
+
+    def test_json_report(self, tmp_path, capsys):
+        with pytest.raises(SystemExit) as exit_info:
+            main(["post-delegate.py", RESPONSE, "10", "npm-audit", "--json"], cwd=tmp_path)
+
+        report = json.loads(capsys.readouterr().out)
+        assert exit_info.value.code == 0 and report["valid"] is True
+        assert report["lines"] == 6 and report["task"] == "npm-audit"
+        assert report["action_items"][0] == {"category": "NEXT_STEP", "text": "Next step: run npm audit fix", "line": 2}
+
+    def test_extraction_failure_still_logs_metrics(self, tmp_path, capsys, monkeypatch):
+        def fail(self, text, line=1):
+            raise re.error("boom")
+            yield
+
+        monkeypatch.setattr(action_items.ActionItemExtractor, "finditer", fail)
+        with pytest.raises(SystemExit) as exit_info:
+            main(["post-delegate.py", RESPONSE, "10", "npm-audit", "--json"], cwd=tmp_path)
+
+        captured = capsys.readouterr()
+        assert exit_info.value.code == 0 and json.loads(captured.out)["action_items"] == []
+        assert "boom" in captured.err
+        today = datetime.now().strftime("%Y-%m-%d")
+        assert metrics_rollup.read_rollup(tmp_path / ".claude" / "metrics", today)["total"]["count"] == 1
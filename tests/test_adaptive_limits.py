@@ -0,0 +1,97 @@
+"""
+Unit tests for learned per-task limits
+Run with: pytest tests/
+"""
+
+import sys
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_writer
+import pre_delegate
+from adaptive_limits import (
+    MAX_LINES, MIN_SAMPLES, fit_limit, learn, load_table, lookup, recent_records, write_table,
+)
+from token_budget import now_ts
+
+
+def rows(*pairs, max_lines=10, task="audit"):
+    return [{"task": task, "lines": lines, "tokens": tokens, "max_lines": max_lines}
+            for lines, tokens in pairs]
+
+
+class TestFit:
+    """Fitting a limit to one task's history."""
+
+    def test_p90_of_good_responses(self):
+        limit = fit_limit(rows(*[(4, 60)] * 8, (6, 90), (7, 100)))
+        assert limit == (6, "standard")
+
+    def test_token_heavy_lines_cap_limit(self):
+        # Typically ~44 tokens per line: 250 tokens allow 5 lines
+        limit = fit_limit(rows(*[(9, 400)] * 6, *[(8, 248)] * 4))
+        assert limit.max_lines == 5
+        assert limit.template == "strict"
+
+    def test_frequent_brief_keeps_current_limit(self):
+        limit = fit_limit(rows(*[(2, 20)] * 5, *[(4, 50)] * 5, max_lines=8))
+        assert limit.max_lines == 8
+
+    def test_clamped(self):
+        assert fit_limit(rows(*[(40, 200)] * 10, max_lines=0)).max_lines == MAX_LINES
+
+
+class TestTable:
+    """Learning from the store and looking up at prompt-build time."""
+
+    def test_learn_skips_sparse_tasks(self):
+        table = learn(rows(*[(5, 80)] * MIN_SAMPLES) + rows((5, 80), task="rare"))
+        assert set(table) == {"audit"}
+        assert table["audit"]["lines_p90"] == 5 and table["audit"]["samples"] == MIN_SAMPLES
+
+    def test_round_trip_and_reload(self, tmp_path):
+        assert load_table(tmp_path) == {}
+        write_table(tmp_path, learn(rows(*[(5, 80)] * 6)), 30)
+        assert lookup(tmp_path, "missing", "audit") == (5, "standard")
+        assert lookup(tmp_path, None, "missing") is None
+
+    def test_learns_from_store(self, tmp_path):
+        now = now_ts()
+        metrics_writer.commit(tmp_path, [
+            {"timestamp": now - i, "task": "deps", "lines": 6, "tokens": 90, "max_lines": 8} for i in range(6)
+        ])
+        assert learn(recent_records(tmp_path))["deps"]["max_lines"] == 6
+
+    def test_window_is_calendar_days(self, tmp_path):
+        old = now_ts() - 45 * 86400
+        metrics_writer.commit(tmp_path, [
+            {"timestamp": old - i, "task": "deps", "lines": 6, "tokens": 90, "max_lines": 8} for i in range(6)
+        ])
+        assert list(recent_records(tmp_path, 30)) == []
+        assert learn(recent_records(tmp_path, 60))["deps"]["max_lines"] == 6
+
+
+class TestPreDelegate:
+    """Learned limits replace the defaults only when max_lines is not given."""
+
+    def test_prepare_uses_learned_limit(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DELEGATE_NO_BUDGET", "1")
+        monkeypatch.delenv("DELEGATE_NO_ADAPTIVE", raising=False)
+        metrics = tmp_path / ".claude" / "metrics"
+        write_table(metrics, {
+            "search": {"max_lines": 4, "template": "standard"},
+            "audit": {"max_lines": 7, "template": "strict"},
+        }, 30)
+
+        by_type = pre_delegate.prepare("Search for TODO comments", cwd=tmp_path)
+        assert (by_type.task_type, by_type.max_lines) == ("search", 4)
+
+        by_name = pre_delegate.prepare("Search for TODO comments", cwd=tmp_path, name="audit")
+        assert (by_name.max_lines, by_name.template) == (7, "strict")
+        assert by_name.prompt.splitlines()[1].startswith("STYLE: Terse")
+
+        assert pre_delegate.prepare("Search for TODO comments", max_lines=9, cwd=tmp_path).max_lines == 9
+        monkeypatch.setenv("DELEGATE_NO_ADAPTIVE", "1")
+        assert pre_delegate.prepare("Search for TODO comments", cwd=tmp_path).max_lines != 4
@@ -0,0 +1,173 @@
+"""
+Unit tests for concurrent batch delegation
+Run with: pytest tests/
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import batch_delegate
+from batch_delegate import (
+    BatchExecutor, BatchRow, load_rows, main, parse_rate, percentile, summarize,
+)
+
+SLEEPY_CLI = """\
+import sys, time
+time.sleep(0.3)
+print("Finding for: " + sys.argv[-1].splitlines()[1])
+print("Next step: none")
+print("Done")
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    (tmp_path / ".claude").mkdir()
+    script = tmp_path / "sleepy_cli.py"
+    script.write_text(SLEEPY_CLI)
+    monkeypatch.setenv("DELEGATE_CLI", f"{sys.executable} {script}")
+    monkeypatch.delenv("DELEGATE_NO_CACHE", raising=False)
+    return tmp_path
+
+
+def rows(n: int) -> list:
+    return [BatchRow(f"Summarize module {i}", "Batch test", 5) for i in range(n)]
+
+
+class TestBatchFile:
+    """Parse tab-separated and JSON rows."""
+
+    def test_load_rows(self, tmp_path):
+        path = tmp_path / "batch.tsv"
+        path.write_text(
+            "# task\tcontext\tmax_lines\n"
+            "npm ls\tSlow build\t8\n"
+            "\n"
+            "Summarize README\n"
+            '{"task": "git log -20", "max_lines": 6, "cli": "copilot -p", "name": "history"}\n'
+        )
+        assert load_rows(path) == [
+            BatchRow("npm ls", "Slow build", 8),
+            BatchRow("Summarize README", "General task", None),
+            BatchRow("git log -20", "General task", 6, "copilot -p", "history"),
+        ]
+
+    def test_parse_rate(self):
+        assert parse_rate("gemini=60/min") == ("gemini", 1.0)
+        assert parse_rate("copilot=2/s") == ("copilot", 2.0)
+        assert parse_rate("gemini=3") == ("gemini", 3.0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([4.0], 90) == 4.0
+
+
+class TestBatchExecutor:
+    """Concurrency cap, rate limits, streaming and cache reuse."""
+
+    def test_runs_concurrently(self, project):
+        executor = BatchExecutor(concurrency=4, cwd=project)
+        seen = []
+        start = time.perf_counter()
+        results = executor.run_sync(rows(8), lambda r: seen.append(r.index))
+        elapsed = time.perf_counter() - start
+
+        assert [r.index for r in results] == list(range(8))
+        assert sorted(seen) == list(range(8))
+        assert all(r.ok and r.cache == "miss" for r in results)
+        assert "Summarize module 3" in results[3].response
+        assert elapsed < 8 * 0.3  # Two waves of four, not eight in a row
+
+        summary = summarize(results, elapsed)
+        assert summary["count"] == 8 and summary["failed"] == 0
+        assert summary["latency"]["p50"] >= 0.3
+
+    def test_second_batch_served_from_cache(self, project):
+        BatchExecutor(cwd=project).run_sync(rows(3))
+        results = BatchExecutor(cwd=project).run_sync(rows(3))
+        assert [r.cache for r in results] == ["hit"] * 3
+        assert summarize(results, 1.0)["latency"] == {}
+
+        other = [row._replace(cli=f"{sys.executable} -c 'print(1)'") for row in rows(3)]
+        assert [r.cache for r in BatchExecutor(cwd=project).run_sync(other)] == ["miss"] * 3
+
+    def test_rate_limit_spaces_starts(self, project):
+        executor = BatchExecutor(concurrency=8, rates={Path(sys.executable).name: 10.0},
+                                 use_cache=False, cwd=project)
+        start = time.perf_counter()
+        executor.run_sync(rows(5))
+        assert time.perf_counter() - start >= 0.4 + 0.3
+
+    def test_failures_are_reported(self, project):
+        executor = BatchExecutor(use_cache=False, cwd=project)
+        results = executor.run_sync([
+            BatchRow("Summarize README", cli="no-such-delegate-cli -p"),
+            BatchRow("Summarize README", cli=f"{sys.executable} -c 'import sys; sys.exit(2)'"),
+        ])
+        assert [r.ok for r in results] == [False, False]
+        assert "not found" in results[0].error
+        assert summarize(results, 1.0)["failed"] == 2
+
+
+class TestQueue:
+    """Running the token budget's queue drains it."""
+
+    def test_missing_file_prints_usage(self, monkeypatch, capsys):
+        monkeypatch.setattr(sys, "argv", ["batch_delegate.py", "--concurrency", "2"])
+        with pytest.raises(SystemExit) as exit_info:
+            main()
+        assert exit_info.value.code == 1 and "Usage" in capsys.readouterr().out
+
+    def test_queue_is_drained_and_failures_requeued(self, project, monkeypatch, capsys):
+        queue = project / ".claude" / "queue.jsonl"
+        queue.write_text(json.dumps({"task": "Summarize README", "context": "Docs", "max_lines": 5}) + "\n"
+                         + json.dumps({"task": "Summarize CHANGES", "cli": "no-such-delegate-cli -p"}) + "\n")
+        monkeypatch.chdir(project)
+        monkeypatch.setattr(batch_delegate.post_delegate, "GROUP_COMMIT_INTERVAL", None)  # main() enables it
+        monkeypatch.setattr(batch_delegate.post_delegate, "_buffers", {})
+        monkeypatch.setattr(sys, "argv", ["batch_delegate.py", str(queue), "--no-cache"])
+        with pytest.raises(SystemExit):
+            main()
+        assert "1 unfinished delegations queued again" in capsys.readouterr().out
+        assert [json.loads(line)["task"] for line in queue.read_text().splitlines()] == ["Summarize CHANGES"]
+        assert not list((project / ".claude").glob("*.processing"))
+
+    def test_interrupted_run_requeues_unfinished_rows(self, project, monkeypatch, capsys):
+        queue = project / ".claude" / "queue.jsonl"
+        queue.write_text("".join(json.dumps({"task": f"Summarize module {i}", "name": "docs", "priority": "low",
+                                             "cli": "gemini -p"}) + "\n" for i in range(3)))
+
+        def interrupted(self, rows, on_result=None):
+            on_result(batch_delegate.BatchResult(0, rows[0], "generic", 5, "Done", "", 0.1, "gemini", ""))
+            raise KeyboardInterrupt
+
+        monkeypatch.chdir(project)
+        monkeypatch.setattr(batch_delegate.post_delegate, "GROUP_COMMIT_INTERVAL", None)
+        monkeypatch.setattr(batch_delegate.post_delegate, "_buffers", {})
+        monkeypatch.setattr(BatchExecutor, "run_sync", interrupted)
+        monkeypatch.setattr(sys, "argv", ["batch_delegate.py", str(queue)])
+        with pytest.raises(KeyboardInterrupt):
+            main()
+        requeued = [json.loads(line) for line in queue.read_text().splitlines()]
+        assert [row["task"] for row in requeued] == ["Summarize module 1", "Summarize module 2"]
+        assert requeued[0]["name"] == "docs" and requeued[0]["priority"] == "low" and requeued[0]["cli"] == "gemini -p"
+        assert not list((project / ".claude").glob("*.processing"))
+
+    def test_unreadable_queue_is_restored(self, project, monkeypatch):
+        queue = project / ".claude" / "queue.jsonl"
+        queue.write_text(json.dumps({"task": "Summarize README"}) + "\n{broken\n")
+        monkeypatch.chdir(project)
+        monkeypatch.setattr(sys, "argv", ["batch_delegate.py", str(queue)])
+        with pytest.raises(json.JSONDecodeError):
+            main()
+        assert queue.read_text() == json.dumps({"task": "Summarize README"}) + "\n{broken\n"
+        assert not list((project / ".claude").glob("*.processing"))
@@ -0,0 +1,88 @@
+"""
+Unit tests for installer CLI discovery
+Run with: pytest tests/
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add the project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cli_discovery import Candidate, discover_clis, scan_path
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="fake CLIs are shell scripts")
+
+
+def fake_cli(directory: Path, name: str, version: str = "1.0.0", sleep: float = 0.0) -> Path:
+    """Executable that logs each call and prints a version."""
+    script = directory / name
+    log = directory / f"{name}.calls"
+    script.write_text(f"#!/bin/sh\nprintf x >> '{log}'\nsleep {sleep}\necho '{name} {version}'\n")
+    script.chmod(0o755)
+    return script
+
+
+def calls(directory: Path, name: str) -> int:
+    log = directory / f"{name}.calls"
+    return log.stat().st_size if log.exists() else 0
+
+
+CANDIDATES = [
+    Candidate("gemini", ["gemini", "gemini-cli"], ["--version"], "gemini -p"),
+    Candidate("aider", ["aider"], ["--version"], "aider --message"),
+    Candidate("copilot", ["copilot"], ["--version"], "copilot -p"),
+]
+
+
+class TestScan:
+    """One PATH scan resolves every binary."""
+
+    def test_first_executable_wins(self, tmp_path):
+        first, second = tmp_path / "a", tmp_path / "b"
+        first.mkdir()
+        second.mkdir()
+        (first / "aider").write_text("not executable")
+        fake_cli(second, "aider")
+        fake_cli(first, "gemini-cli")
+        fake_cli(second, "gemini-cli")
+        found = scan_path(["aider", "gemini-cli", "copilot"], f"{first}{os.pathsep}{second}")
+        assert found == {"aider": str(second / "aider"), "gemini-cli": str(first / "gemini-cli")}
+
+
+class TestDiscover:
+    """Concurrent probes and the per-binary cache."""
+
+    def test_probes_concurrently(self, tmp_path):
+        fake_cli(tmp_path, "gemini-cli", sleep=0.5)
+        fake_cli(tmp_path, "aider", sleep=0.5)
+        start = time.perf_counter()
+        found = discover_clis(CANDIDATES, str(tmp_path), tmp_path / "cache.json")
+        assert time.perf_counter() - start < 0.9
+        assert found["gemini"].version == "gemini-cli 1.0.0"
+        assert found["aider"].available and not found["copilot"].available
+
+    def test_cache_reprobes_only_changed_binaries(self, tmp_path):
+        cache = tmp_path / "cache.json"
+        fake_cli(tmp_path, "gemini")
+        fake_cli(tmp_path, "aider")
+        discover_clis(CANDIDATES, str(tmp_path), cache)
+        discover_clis(CANDIDATES, str(tmp_path), cache)
+        assert (calls(tmp_path, "gemini"), calls(tmp_path, "aider")) == (1, 1)
+
+        upgraded = fake_cli(tmp_path, "aider", version="2.0.0")
+        os.utime(str(upgraded), ns=(0, upgraded.stat().st_mtime_ns + 10 ** 9))
+        found = discover_clis(CANDIDATES, str(tmp_path), cache)
+        assert found["aider"].version == "aider 2.0.0"
+        assert (calls(tmp_path, "gemini"), calls(tmp_path, "aider")) == (1, 2)
+
+    def test_timeout_is_not_cached(self, tmp_path):
+        cache = tmp_path / "cache.json"
+        fake_cli(tmp_path, "gemini", sleep=2)
+        found = discover_clis(CANDIDATES, str(tmp_path), cache, timeout=0.2)
+        assert found["gemini"].available and "no version" in found["gemini"].error
+        assert not cache.exists() or str(tmp_path / "gemini") not in cache.read_text()
@@ -0,0 +1,129 @@
+"""
+Unit tests for the multi-CLI router
+Run with: pytest tests/
+"""
+
+import sys
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_store
+import metrics_writer
+import run_delegation
+from cli_router import Route, Router, load_router, load_routes
+
+FAKE_CLI = """\
+import sys, time
+delay, exit_code = float(sys.argv[1]), int(sys.argv[2])
+time.sleep(delay)
+print("answer from " + sys.argv[3])
+sys.exit(exit_code)
+"""
+
+
+@pytest.fixture
+def fake(tmp_path):
+    script = tmp_path / "fake_cli.py"
+    script.write_text(FAKE_CLI)
+
+    def command(name: str, delay: float = 0.0, exit_code: int = 0) -> Route:
+        return Route(name, f"{sys.executable} {script} {delay} {exit_code} {name}")
+    return command
+
+
+def now() -> int:
+    return metrics_store.to_epoch(datetime.now())
+
+
+def history(metrics: Path, cli: str, ms: float, n: int, error: str = "", ago: int = 0):
+    spans = [{"timestamp": now() - ago - n + i, "stage": "attempt", "cli": cli, "micros": int(ms * 1000),
+              "error": error} for i in range(n)]
+    metrics_writer.commit(metrics, [], spans)
+
+
+class TestConfig:
+    """Enabled CLIs come from delegation_config.json."""
+
+    def test_load_routes(self, tmp_path):
+        (tmp_path / "delegation_config.json").write_text(json.dumps({"cli_configs": {
+            "gemini": {"command": "gemini"},
+            "aider": {"command": "aider"},
+            "copilot": {"command": "copilot", "enabled": False},
+            "qwen": {"command": "qwen", "prompt_command": "qwen --yolo -p"},
+        }}))
+        assert load_routes(tmp_path) == [Route("gemini", "gemini -p"), Route("aider", "aider --message"),
+                                         Route("qwen", "qwen --yolo -p")]
+
+    def test_needs_two_clis(self, tmp_path, monkeypatch):
+        claude = tmp_path / ".claude"
+        claude.mkdir()
+        (claude / "delegation_config.json").write_text(json.dumps({"cli_configs": {"gemini": {}}}))
+        assert load_router(tmp_path) is None
+        (claude / "delegation_config.json").write_text(json.dumps({"cli_configs": {"gemini": {}, "aider": {}}}))
+        assert load_router(tmp_path) is not None
+        monkeypatch.setenv("DELEGATE_NO_ROUTER", "1")
+        assert load_router(tmp_path) is None
+
+
+class TestSelection:
+    """Ranking by latency, errors and circuit state."""
+
+    def test_prefers_fast_reliable_cli(self, tmp_path, fake):
+        router = Router([fake("slow"), fake("fast"), fake("flaky"), fake("new")], tmp_path)
+        history(tmp_path, "slow", 3000, 10)
+        history(tmp_path, "fast", 800, 10)
+        history(tmp_path, "flaky", 500, 6)
+        history(tmp_path, "flaky", 500, 4, error="exit 1")
+        ranked = [route.name for route in router.rank(router.health(), now())]
+        # Unmeasured CLIs are tried first, then the fastest after its error rate
+        assert ranked == ["new", "fast", "flaky", "slow"]
+
+    def test_breaker_opens_then_half_opens(self, tmp_path, fake):
+        router = Router([fake("a"), fake("b")], tmp_path)
+        history(tmp_path, "a", 100, 5, ago=10)
+        history(tmp_path, "a", 100, 3, error="exit 1")
+        stats = router.health()
+        assert router.state(stats["a"], now()) == "open"
+        assert [route.name for route in router.rank(stats, now())] == ["b"]
+        assert router.state(stats["a"], now() + 120) == "half-open"
+
+
+class TestRun:
+    """Hedging and failover."""
+
+    def test_fails_over_and_records(self, tmp_path, fake):
+        router = Router([fake("broken", exit_code=1), fake("good")], tmp_path)
+        routed = router.run("prompt")
+        assert (routed.cli, routed.exit_code) == ("good", 0)
+        assert routed.response.strip() == "answer from good"
+        stats = router.health()
+        assert (stats["broken"].failures, stats["good"].samples) == (1, 1)
+
+    def test_hedges_past_p95(self, tmp_path, fake):
+        router = Router([fake("stuck", delay=5), fake("spare", delay=0.1)], tmp_path)
+        history(tmp_path, "stuck", 200, 10)
+        history(tmp_path, "spare", 1000, 10)
+        start = time.perf_counter()
+        routed = router.run("prompt")
+        assert time.perf_counter() - start < 3
+        assert (routed.cli, routed.hedged) == ("spare", True)
+        # The loser is killed and does not count as a sample
+        assert router.health()["stuck"].samples == 10
+
+    def test_run_delegation_uses_router(self, tmp_path, fake, monkeypatch):
+        claude = tmp_path / ".claude"
+        claude.mkdir()
+        configs = {route.name: {"prompt_command": route.command}
+                   for route in (fake("broken", exit_code=1), fake("good"))}
+        (claude / "delegation_config.json").write_text(json.dumps({"cli_configs": configs}))
+        monkeypatch.delenv("DELEGATE_CLI", raising=False)
+        monkeypatch.setenv("DELEGATE_NO_BUDGET", "1")
+        response, _, status, cli = run_delegation.delegate("Summarize README", use_cache=False, cwd=tmp_path)
+        assert (response.strip(), cli) == ("answer from good", "good")
@@ -0,0 +1,107 @@
+"""
+Unit tests for the delegation daemon and client shim
+Run with: pytest tests/
+"""
+
+import socket
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import delegate_daemon
+from delegate_client import forward
+from delegate_daemon import DelegationHandler, DelegationServer, request
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+
+
+@pytest.fixture
+def daemon():
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = str(Path(tmp) / "delegate.sock")
+        server = DelegationServer(socket_path, DelegationHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield socket_path
+        server.shutdown()
+        server.server_close()
+
+
+class TestDelegationDaemon:
+    """Test daemon request handling."""
+
+    def test_pre_matches_in_process(self, daemon):
+        reply = request({"op": "pre", "argv": ["pre-delegate.py", "npm ls", "Build analysis"]}, daemon)
+        assert reply["exit"] == 0
+        assert "CONTEXT: Build analysis" in reply["stdout"]
+        assert "<5 lines" in reply["stdout"]
+
+    def test_function_ops(self, daemon):
+        assert request({"op": "detect_task_type", "task": "git log"}, daemon)["result"] == "shell"
+        reply = request({"op": "validate_response", "response": "Short", "max_lines": 10}, daemon)
+        is_valid, warnings = reply["result"]
+        assert is_valid is False
+        assert any("brief" in w.lower() for w in warnings)
+
+    def test_post_logs_metrics_in_client_cwd(self, daemon, tmp_path):
+        (tmp_path / ".claude").mkdir()
+        response = "Line 1\nLine 2\nLine 3"
+        reply = request({"op": "post", "argv": ["post-delegate.py", response, "10", "t"],
+                         "cwd": str(tmp_path)}, daemon)
+        assert reply["exit"] == 0
+        assert list((tmp_path / ".claude" / "metrics").iterdir())
+
+    def test_unknown_op_reports_error(self, daemon):
+        assert "error" in request({"op": "nope"}, daemon)
+
+    def test_framed_hook_command(self, daemon):
+        exit_code, stdout, stderr = forward("pre", ["pre-delegate.py", "git status", "Status", "--tokens"], "/", daemon)
+        assert exit_code == 0
+        assert b"TASK: Execute this command and distill the output: git status" in stdout
+        assert stderr.startswith("🧮 Prompt:".encode("utf-8"))
+
+    def test_hooks_run_with_the_callers_environment(self, daemon):
+        argv = ["pre-delegate.py", "git diff --stat", "Review", "--tokens", "--no-reduce"]
+        reply = request({"op": "pre", "argv": argv, "env": {"DELEGATE_TOKENIZER": "chars",
+                                                            "DELEGATE_NO_BUDGET": "1"}}, daemon)
+        assert reply["stderr"] == f"🧮 Prompt: {len(reply['stdout'].rstrip()) // 4} tokens\n"
+
+    def test_requests_are_served_concurrently(self, daemon, monkeypatch):
+        barrier = threading.Barrier(3, timeout=10)
+
+        def slow_main(argv, cwd=None):
+            barrier.wait()  # Only passes if all three requests are in flight at once
+            print(argv[1])
+
+        monkeypatch.setattr(delegate_daemon.pre_delegate, "main", slow_main)
+        replies = {}
+        threads = [threading.Thread(target=lambda n=n: replies.__setitem__(
+            n, forward("pre", ["pre-delegate.py", f"task {n}"], "/", daemon))) for n in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert {n: reply[:2] for n, reply in replies.items()} == {n: (0, b"task %d\n" % n) for n in range(3)}
+
+    def test_failed_post_is_not_rerun_in_process(self, daemon, monkeypatch):
+        def broken_main(argv, cwd=None):
+            raise RuntimeError("disk full")
+
+        monkeypatch.setattr(delegate_daemon.post_delegate, "main", broken_main)
+        exit_code, stdout, stderr = forward("post", ["post-delegate.py", "answer"], "/", daemon)
+        assert exit_code == 1 and b"disk full" in stderr
+
+
+class TestDelegationClient:
+    """Test client fallback behaviour."""
+
+    def test_unreachable_daemon_returns_none(self, tmp_path):
+        missing = str(tmp_path / "missing.sock")
+        assert forward("pre", ["pre-delegate.py", "npm ls"], "/", missing) is None
+        assert request({"op": "ping"}, missing) is None
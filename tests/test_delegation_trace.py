@@ -0,0 +1,104 @@
+"""
+Unit tests for per-stage timing spans
+Run with: pytest tests/
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_rollup
+import metrics_store
+import metrics_writer
+import post_delegate
+from analyze_metrics import stage_latency, summary_json, summarize_rollups
+from delegation_trace import Trace
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+
+
+class TestTrace:
+    """Collecting and passing spans between processes."""
+
+    def test_span_and_round_trip(self):
+        trace = Trace(cli="gemini")
+        with trace.span("prepare"):
+            pass
+        trace.add("cli", 1234.5678)
+        assert [span.stage for span in trace.spans] == ["prepare", "cli"]
+        assert trace.spans[1].micros == 1234568
+
+        copy = Trace.parse(trace.correlation_id, trace.format(), "gemini")
+        assert copy.correlation_id == trace.correlation_id
+        assert [(s.stage, s.micros, s.cli) for s in copy.spans][1] == ("cli", 1234568, "gemini")
+        assert Trace().correlation_id != Trace().correlation_id
+
+
+class TestStorage:
+    """post-delegate stores spans joined to the metrics row."""
+
+    def test_post_delegate_records_spans(self, tmp_path):
+        (tmp_path / ".claude").mkdir()
+        with pytest.raises(SystemExit):
+            post_delegate.main(["post", "a\nb\nc", "5", "t", "--cli", "copilot",
+                                "--trace", "abc123", "--spans", "prepare=1.5,cli=800"], tmp_path)
+        metrics = tmp_path / ".claude" / "metrics"
+
+        row, = metrics_store.iter_rows(metrics_store.day_file(metrics, TODAY))
+        assert row["correlation_id"] == "abc123"
+        spans = list(metrics_store.iter_rows(metrics_store.span_file(metrics, TODAY),
+                                             columns=metrics_store.SPAN_COLUMNS))
+        assert {span["stage"] for span in spans} == {"prepare", "cli", "validate", "log"}
+        assert {span["correlation_id"] for span in spans} == {"abc123"}
+        assert next(s for s in spans if s["stage"] == "cli")["micros"] == 800000
+
+    def test_buffered_spans(self, tmp_path):
+        buffer = metrics_writer.MetricsBuffer(tmp_path, flush_interval=60)
+        trace = Trace(cli="gemini")
+        trace.add("cli", 5)
+        buffer.add_spans(trace.records())
+        assert not metrics_store.span_file(tmp_path, TODAY).exists()
+        buffer.close()
+        assert len(list(metrics_store.iter_rows(metrics_store.span_file(tmp_path, TODAY),
+                                                columns=metrics_store.SPAN_COLUMNS))) == 1
+
+
+class TestAnalyze:
+    """Latency broken down by stage and CLI."""
+
+    def test_stage_latency(self, tmp_path):
+        spans = []
+        for i in range(20):
+            trace = Trace(cli="gemini" if i % 2 else "copilot")
+            trace.add("prepare", 2)
+            trace.add("cli", 1000 if i % 2 else 3000)
+            spans += trace.records()
+        metrics_writer.commit(tmp_path, [], spans)
+
+        latency = stage_latency(tmp_path, [TODAY])
+        assert latency["stages"]["prepare"].count == 20
+        assert abs(latency["clis"]["copilot"]["cli"].quantile(0.5) - 3000) <= 30
+
+        summary = summarize_rollups([])
+        summary["latency"] = latency
+        data = summary_json(summary)
+        assert abs(data["clis_ms"]["gemini"]["cli"]["p95"] - 1000) <= 10
+        assert data["stages_ms"]["cli"]["count"] == 20
+
+    def test_stage_latency_comes_from_rollups(self, tmp_path):
+        records = [{"timestamp": int(datetime.now().timestamp()), "task": "t", "lines": 3, "tokens": 40}]
+        for batch in range(3):
+            trace = Trace(cli="gemini")
+            trace.add("cli", 1000 * (batch + 1))
+            metrics_writer.commit(tmp_path, records, trace.records())
+        assert metrics_rollup.rebuild_rollups(tmp_path, [TODAY]) == []  # Incremental == rebuilt
+
+        metrics_store.span_file(tmp_path, TODAY).unlink()  # Reports never re-read raw spans
+        latency = stage_latency(tmp_path, [TODAY])
+        assert latency["stages"]["cli"].count == 3
+        assert latency["clis"]["gemini"]["cli"].max == 3000
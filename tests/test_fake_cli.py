@@ -0,0 +1,68 @@
+"""
+Unit tests for the offline fake CLI used by the regression load test
+Run with: pytest tests/
+"""
+
+import os
+import sys
+import json
+import random
+import subprocess
+from pathlib import Path
+
+import pytest
+
+# Add the regression harness to path
+sys.path.insert(0, str(Path(__file__).parent / "regression"))
+
+import fake_cli
+
+
+class TestArguments:
+    """Prompts are found where each real CLI takes them."""
+
+    def test_parse_args(self):
+        assert fake_cli.parse_args(["--as", "aider", "--message", "hi"]) == ("aider", "hi", False)
+        assert fake_cli.parse_args(["-p", "hi"]) == ("gemini", "hi", False)
+        assert fake_cli.parse_args(["--as", "copilot", "--version"]) == ("copilot", None, True)
+
+
+class TestBehaviour:
+    """Scripted responses and sampled latency."""
+
+    def test_scripted_response_matches_task_line(self):
+        settings = {"responses": [{"match": "^git", "text": "{name} saw: {task}"}]}
+        prompt = "CONTEXT: x\nTASK: git status\nOUTPUT: short"
+        assert fake_cli.respond("gemini", settings, prompt) == "gemini saw: git status"
+        assert "checked" in fake_cli.respond("gemini", settings, "TASK: npm ls")
+
+    def test_latency_distributions(self, monkeypatch):
+        monkeypatch.setenv("FAKE_CLI_SCALE", "2")
+        rng = random.Random(1)
+        assert fake_cli.sample_latency({"latency": {"fixed": 0.5}}, rng) == 1.0
+        assert all(0.2 <= fake_cli.sample_latency({"latency": {"uniform": [0.1, 0.2]}}, rng) <= 0.4
+                   for _ in range(50))
+        spiky = {"latency": {"fixed": 0}, "spike_rate": 1.0, "spike": 3}
+        assert fake_cli.sample_latency(spiky, rng) == 6
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shims are shell scripts")
+class TestShims:
+    """Installed shims behave like the CLIs, including injected errors."""
+
+    def test_install_and_inject_errors(self, tmp_path):
+        config = tmp_path / "fake.json"
+        config.write_text(json.dumps({"copilot": {"latency": {"fixed": 0}, "error_rate": 1.0,
+                                                  "exit_code": 7},
+                                      "aider": {"latency": {"fixed": 0}, "error_rate": 0}}))
+        fake_cli.install(tmp_path / "bin", str(config))
+        log = tmp_path / "calls.tsv"
+        env = dict(os.environ, FAKE_CLI_LOG=str(log))
+
+        ok = subprocess.run([str(tmp_path / "bin" / "aider"), "--message", "TASK: npm ls"],
+                            stdout=subprocess.PIPE, env=env)
+        failed = subprocess.run([str(tmp_path / "bin" / "copilot"), "-p", "TASK: npm ls"],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        assert ok.returncode == 0 and b"npm ls" in ok.stdout
+        assert failed.returncode == 7 and b"injected error" in failed.stderr
+        assert [line.split("\t")[0] for line in log.read_text().splitlines()] == ["aider", "copilot"]
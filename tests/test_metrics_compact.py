@@ -0,0 +1,134 @@
+"""
+Unit tests for metrics retention and compaction
+Run with: pytest tests/
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_compact
+import metrics_rollup
+import metrics_sqlite
+import metrics_store
+import metrics_writer
+from analyze_metrics import stage_latency, summarize_range, summarize_rollups, summary_json
+
+TODAY = datetime(2026, 6, 15)
+
+
+def log_days(metrics_dir: Path, first: datetime, days: int, per_day: int = 3):
+    for i in range(days):
+        base = metrics_store.to_epoch(first + timedelta(days=i))
+        metrics_writer.commit(metrics_dir, [
+            {"timestamp": base + 3600 * (n + 1), "task": "git-log" if n % 2 else "security-audit",
+             "lines": 4 + n, "tokens": 80 + 100 * n, "latency_ms": 900} for n in range(per_day)],
+            spans=[{"timestamp": base + 3600, "correlation_id": f"c{i}", "stage": "cli", "micros": 9000}])
+
+
+def dates(first: datetime, days: int) -> list:
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+
+def rollup_report(metrics_dir: Path, days: list) -> dict:
+    return summary_json(summarize_rollups(metrics_rollup.load_rollups(metrics_dir, days)))
+
+
+class TestCompaction:
+    """Monthly segments, manifest and the readers that use them."""
+
+    def test_compacts_old_months_only(self, tmp_path):
+        log_days(tmp_path, datetime(2026, 3, 30), 70)  # 2026-03-30 … 2026-06-07
+        span = dates(datetime(2026, 3, 30), 70)
+        before = rollup_report(tmp_path, span)
+        rows_before = sorted(r["timestamp"] for p in metrics_store.store_files(tmp_path)
+                             for r in metrics_store.iter_rows(p))
+
+        result = metrics_compact.compact(tmp_path, older_than=31, today=TODAY)
+        assert [c.month for c in result.compacted] == ["2026-03", "2026-04"]
+        assert result.downsampled == []
+        assert not list(tmp_path.glob("delegation-2026-04-??.dcol"))
+        assert not list(tmp_path.glob("rollup-2026-04-??.json"))
+        assert len(list(tmp_path.glob("delegation-2026-05-??.dcol"))) == 31
+
+        manifest = metrics_store.read_manifest(tmp_path)
+        assert manifest["segments"]["2026-04"]["rows"] == 30 * 3
+        assert manifest["segments"]["2026-04"]["pending"] == {}
+        assert rollup_report(tmp_path, span) == before
+        assert sorted(r["timestamp"] for p in metrics_store.store_files(tmp_path)
+                      for r in metrics_store.iter_rows(p)) == rows_before
+        assert metrics_rollup.data_dates(tmp_path) == span
+        assert list(metrics_rollup.iter_day_rows(tmp_path, "2026-04-10"))[0]["tokens"] == 80
+        assert stage_latency(tmp_path, span)["stages"]["cli"].count == 70
+
+        # Only segments overlapping the range are selected
+        start = metrics_store.to_epoch(datetime(2026, 4, 20))
+        names = [p.name for p in metrics_store.store_files(tmp_path, start, start + 86400)]
+        assert names == ["delegation-2026-04.dcol.gz"]
+
+    def test_late_rows_and_interrupted_run(self, tmp_path):
+        log_days(tmp_path, datetime(2026, 4, 1), 3)
+        metrics_compact.compact(tmp_path, today=TODAY)
+        log_days(tmp_path, datetime(2026, 4, 2), 1, per_day=1)  # Back-dated delegation
+        assert metrics_rollup.read_rollup(tmp_path, "2026-04-02")["total"]["count"] == 4
+
+        # Simulate a crash after the manifest write: the daily file is still there
+        manifest = metrics_store.read_manifest(tmp_path)
+        entry = manifest["segments"]["2026-04"]
+        _, entry["committed"]["delegation"] = metrics_compact._append_segment(
+            metrics_store.segment_file(tmp_path, "2026-04"),
+            {"2026-04-02": list(metrics_store.iter_rows(metrics_store.day_file(tmp_path, "2026-04-02")))},
+            metrics_store.COLUMNS, entry["committed"]["delegation"])
+        entry["pending"] = {"delegation-2026-04-02.dcol": 1}
+        metrics_compact.write_manifest(tmp_path, manifest)
+        assert sum(1 for p in metrics_store.store_files(tmp_path) for _ in metrics_store.iter_rows(p)) == 10
+        assert len(list(metrics_rollup.iter_day_rows(tmp_path, "2026-04-02"))) == 4
+
+        metrics_compact.compact(tmp_path, today=TODAY)
+        assert not metrics_store.day_file(tmp_path, "2026-04-02").exists()
+        assert metrics_store.read_manifest(tmp_path)["segments"]["2026-04"]["rows"] == 10
+        assert rollup_report(tmp_path, dates(datetime(2026, 4, 1), 3))["count"] == 10
+
+    def test_run_interrupted_before_manifest_write(self, tmp_path, monkeypatch):
+        log_days(tmp_path, datetime(2026, 4, 1), 3)
+        metrics_compact.compact(tmp_path, today=TODAY)
+        log_days(tmp_path, datetime(2026, 4, 5), 3)
+
+        def crash(metrics_dir, manifest):
+            raise OSError("disk full")
+        monkeypatch.setattr(metrics_compact, "write_manifest", crash)
+        try:
+            metrics_compact.compact(tmp_path, today=TODAY)
+        except OSError:
+            pass
+        monkeypatch.undo()
+        assert sum(1 for p in metrics_store.store_files(tmp_path) for _ in metrics_store.iter_rows(p)) == 18
+
+        metrics_compact.compact(tmp_path, today=TODAY)
+        assert metrics_store.read_manifest(tmp_path)["segments"]["2026-04"]["rows"] == 18
+        assert sum(1 for p in metrics_store.store_files(tmp_path) for _ in metrics_store.iter_rows(p)) == 18
+
+    def test_retention_keeps_rollups(self, tmp_path):
+        log_days(tmp_path, datetime(2025, 5, 1), 3)
+        span = dates(datetime(2025, 5, 1), 3)
+        before = rollup_report(tmp_path, span)
+
+        result = metrics_compact.compact(tmp_path, retain_days=365, today=TODAY)
+        assert result.downsampled == ["2025-05"]
+        assert not metrics_store.segment_file(tmp_path, "2025-05").exists()
+        assert metrics_store.store_files(tmp_path) == []
+        assert metrics_rollup.data_dates(tmp_path) == []
+        assert rollup_report(tmp_path, span) == before
+        assert summarize_range(tmp_path, 800, workers=1)["count"] == 0
+
+    def test_sqlite_mirror_follows_compaction(self, tmp_path):
+        log_days(tmp_path, datetime(2026, 4, 1), 5)
+        db = metrics_sqlite.connect(tmp_path)
+        metrics_sqlite.sync(tmp_path, db)
+        metrics_compact.compact(tmp_path, today=TODAY)
+        metrics_sqlite.sync(tmp_path, db)
+        assert db.execute("SELECT COUNT(*) FROM rows").fetchone()[0] == 15
+        assert db.execute("SELECT name FROM files").fetchall() == [("delegation-2026-04.dcol.gz",)]
@@ -0,0 +1,90 @@
+"""
+Concurrency and crash-safety tests for metrics writes
+Run with: pytest tests/
+"""
+
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_rollup
+import metrics_store
+import metrics_writer
+
+DAY_START = 1735689600  # 2025-01-01 00:00:00
+DATE = "2025-01-01"
+WRITERS = 32
+ROWS_PER_WRITER = 20
+
+
+def write_rows(metrics_dir: str, writer: int):
+    for i in range(ROWS_PER_WRITER):
+        metrics_writer.commit(Path(metrics_dir), [{
+            "timestamp": DAY_START + writer * ROWS_PER_WRITER + i,
+            "task": f"writer-{writer}",
+            "lines": 1,
+            "tokens": writer * 1000 + i,
+        }])
+
+
+class TestConcurrentWrites:
+    """Parallel writers must not lose, interleave or double-count rows."""
+
+    @pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                        reason="needs fork start method")
+    def test_parallel_processes_lose_no_rows(self, tmp_path):
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=write_rows, args=(str(tmp_path), n)) for n in range(WRITERS)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        assert all(proc.exitcode == 0 for proc in procs)
+
+        total = WRITERS * ROWS_PER_WRITER
+        path = metrics_store.day_file(tmp_path, DATE)
+        rows = list(metrics_store.iter_rows(path))
+        assert sorted(r["tokens"] for r in rows) == sorted(
+            n * 1000 + i for n in range(WRITERS) for i in range(ROWS_PER_WRITER)
+        )
+        assert all(r["task"] == f"writer-{r['tokens'] // 1000}" for r in rows)
+        assert metrics_store.file_info(path).rows == total
+        assert metrics_rollup.read_rollup(tmp_path, DATE)["total"]["count"] == total
+        assert metrics_rollup.rebuild_rollups(tmp_path, [DATE]) == []
+
+    def test_buffer_flushes_on_close(self, tmp_path):
+        buffer = metrics_writer.MetricsBuffer(tmp_path, flush_interval=60)
+        for i in range(10):
+            buffer.add({"timestamp": DAY_START + i, "task": "t", "lines": 1, "tokens": i})
+        assert not metrics_store.day_file(tmp_path, DATE).exists()
+
+        buffer.close()
+        assert metrics_store.file_info(metrics_store.day_file(tmp_path, DATE)).rows == 10
+        assert metrics_rollup.read_rollup(tmp_path, DATE)["total"]["count"] == 10
+
+
+class TestTornWrites:
+    """A crash mid-append must not corrupt earlier rows."""
+
+    def test_torn_tail_is_ignored_then_truncated(self, tmp_path):
+        path = metrics_store.day_file(tmp_path, DATE)
+        metrics_writer.commit(tmp_path, [{"timestamp": DAY_START, "task": "a", "lines": 1, "tokens": 1}])
+        intact = path.stat().st_size
+
+        # Simulate a writer killed halfway through a block
+        with path.open("ab") as f:
+            f.write(os.urandom(37))
+
+        assert [r["task"] for r in metrics_store.iter_rows(path)] == ["a"]
+        assert metrics_store.file_info(path).rows == 1
+
+        metrics_writer.commit(tmp_path, [{"timestamp": DAY_START + 1, "task": "b", "lines": 1, "tokens": 2}])
+        assert [r["task"] for r in metrics_store.iter_rows(path)] == ["a", "b"]
+        data = path.read_bytes()
+        assert metrics_store.valid_length(data) == len(data) > intact
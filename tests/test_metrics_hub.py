@@ -0,0 +1,86 @@
+"""
+Unit tests for the cross-project metrics hub
+Run with: pytest tests/
+"""
+
+import sys
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_hub
+import metrics_store
+import metrics_writer
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+
+
+def project(root: Path, name: str) -> Path:
+    metrics_dir = root / name / ".claude" / "metrics"
+    metrics_dir.mkdir(parents=True)
+    return metrics_dir
+
+
+def log(metrics_dir: Path, task: str, tokens: int, cid: str = "", cache: str = ""):
+    metrics_writer.commit(metrics_dir, [{"timestamp": metrics_store.to_epoch(datetime.now()), "task": task,
+                                         "lines": 4, "tokens": tokens, "correlation_id": cid, "cache": cache}])
+
+
+class TestIngest:
+    """Incremental, deduplicated ingestion."""
+
+    def test_incremental_and_deduplicated(self, tmp_path):
+        db = metrics_hub.connect(tmp_path / "hub")
+        api = project(tmp_path, "api")
+        log(api, "git-log", 100, "a1")
+        log(api, "git-log", 100)
+        metrics_hub.register(db, api, user="ann")
+        assert metrics_hub.ingest(db).added == 2
+        assert metrics_hub.ingest(db).files == 0
+
+        log(api, "git-log", 100)  # Same content as an untraced row already ingested
+        result = metrics_hub.ingest(db)
+        assert (result.rows, result.added) == (1, 1)
+
+        # A copy of the same directory adds nothing
+        copy = project(tmp_path, "api-copy")
+        shutil.copy(str(metrics_store.day_file(api, TODAY)), str(metrics_store.day_file(copy, TODAY)))
+        metrics_hub.register(db, copy, user="bob")
+        assert metrics_hub.ingest(db).added == 0
+        assert db.execute("SELECT COUNT(*) FROM rows").fetchone()[0] == 3
+
+    def test_discover(self, tmp_path):
+        project(tmp_path, "a")
+        project(tmp_path / "nested", "b")
+        project(tmp_path / "node_modules", "c")
+        found = metrics_hub.discover(tmp_path)
+        assert [d.parent.parent.name for d in found] == ["a", "b"]
+
+
+class TestQueries:
+    """Cross-project summaries."""
+
+    def test_top_tasks_users_and_savings(self, tmp_path):
+        db = metrics_hub.connect(tmp_path / "hub")
+        api, web = project(tmp_path, "api"), project(tmp_path, "web")
+        log(api, "security-audit", 400, "s1")
+        log(api, "git-log", 100, "g1", cache="hit")
+        log(web, "security-audit", 300, "s2")
+        metrics_hub.register(db, api, user="ann")
+        metrics_hub.register(db, web, user="bob")
+        metrics_hub.ingest(db)
+
+        tasks = metrics_hub.top_tasks(db)
+        assert [(t["task"], t["tokens"], t["excessive"]) for t in tasks] == [
+            ("security-audit", 700, 2), ("git-log", 100, 0)]
+        assert metrics_hub.top_tasks(db, user="bob")[0]["delegations"] == 1
+
+        users = {u["user"]: u["tokens"] for u in metrics_hub.user_burn(db)}
+        assert users == {"ann": 500, "bob": 300}
+
+        repos = {r["project"]: r for r in metrics_hub.repo_savings(db)}
+        assert repos["api"]["saved"] == 2 * 1500 - 500
+        assert repos["api"]["cache_hits"] == 1
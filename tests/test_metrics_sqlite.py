@@ -0,0 +1,91 @@
+"""
+Unit tests for the optional SQLite metrics backend
+Run with: pytest tests/
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_sqlite
+import metrics_store
+import metrics_writer
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+
+
+def record(task: str, tokens: int, cli: str = "gemini", hour: int = 10) -> dict:
+    ts = datetime.now().replace(hour=hour, minute=0, second=0, microsecond=0)
+    return {"timestamp": metrics_store.to_epoch(ts), "task": task, "lines": 5, "tokens": tokens, "cli": cli}
+
+
+def count(db) -> int:
+    return db.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+
+class TestSync:
+    """Incremental import of store files and legacy CSVs."""
+
+    def test_imports_csv_then_drops_it_after_migration(self, tmp_path):
+        csv_file = tmp_path / f"delegation-{TODAY}.csv"
+        csv_file.write_text(f"timestamp,task,lines,tokens\n{TODAY} 09:00:00,git-log,3,80\n"
+                            f"{TODAY} 09:05:00,git-log,4,90\n")
+        db = metrics_sqlite.connect(tmp_path)
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert metrics_sqlite.sync(tmp_path, db) == 2
+        assert metrics_sqlite.sync(tmp_path, db) == 0
+
+        metrics_store.migrate_csv(csv_file)
+        metrics_sqlite.sync(tmp_path, db)
+        assert count(db) == 2
+        assert db.execute("SELECT name FROM files").fetchall() == [(f"delegation-{TODAY}.dcol",)]
+
+    def test_appends_only_new_rows(self, tmp_path):
+        metrics_writer.commit(tmp_path, [record("git-log", 80), record("git-log", 90)])
+        db = metrics_sqlite.connect(tmp_path)
+        metrics_sqlite.sync(tmp_path, db)
+        metrics_writer.commit(tmp_path, [record("security-audit", 300)])
+        assert metrics_sqlite.sync(tmp_path, db) == 1
+        assert count(db) == 3
+
+
+class TestMirror:
+    """Writer-side batched inserts."""
+
+    def test_commit_mirrors_when_enabled(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DELEGATE_METRICS_BACKEND", "sqlite")
+        metrics_writer.commit(tmp_path, [record("git-log", 80)])
+        metrics_writer.commit(tmp_path, [record("git-log", 90), record("code-search", 120)])
+        db = metrics_sqlite.connect(tmp_path)
+        assert count(db) == 3
+        assert metrics_sqlite.sync(tmp_path, db) == 0
+
+    def test_catches_up_when_behind(self, tmp_path, monkeypatch):
+        metrics_writer.commit(tmp_path, [record("git-log", 80)])
+        monkeypatch.setenv("DELEGATE_METRICS_BACKEND", "sqlite")
+        metrics_writer.commit(tmp_path, [record("git-log", 90)])
+        assert count(metrics_sqlite.connect(tmp_path)) == 2
+
+
+class TestQuery:
+    """Filters and group-bys."""
+
+    def test_filters_and_groups(self, tmp_path):
+        metrics_writer.commit(tmp_path, [record("git-log", 80, hour=9), record("git-log", 120, "qwen", hour=9),
+                                         record("security-audit", 400, hour=14)])
+        db = metrics_sqlite.connect(tmp_path)
+        metrics_sqlite.sync(tmp_path, db)
+
+        by_task = metrics_sqlite.query(db, group_by="task")
+        assert [(r["key"], r["delegations"], r["tokens"]) for r in by_task] == [
+            ("security-audit", 1, 400), ("git-log", 2, 200)]
+        assert [r["key"] for r in metrics_sqlite.query(db, group_by="hour")] == ["09", "14"]
+        assert metrics_sqlite.query(db, cli="qwen")[0]["tokens"] == 120
+        assert metrics_sqlite.query(db, task="git-log", min_tokens=100)[0]["delegations"] == 1
+        since = metrics_sqlite._epoch(TODAY)
+        assert metrics_sqlite.query(db, since=since, until=metrics_sqlite._epoch(TODAY, end=True),
+                                    group_by="day")[0]["key"] == TODAY
+        assert metrics_sqlite.query(db, task="missing") == []
@@ -0,0 +1,160 @@
+"""
+Unit tests for the columnar metrics store
+Run with: pytest tests/
+"""
+
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_rollup
+import metrics_store
+import analyze_metrics
+from analyze_metrics import iter_metrics, load_metrics, summarize_range, summarize_rollups, summarize_rows
+from post_delegate import check_daily_usage, log_metrics, usage_hints
+
+
+def record(ts: int, task: str = "npm-audit", lines: int = 5, tokens: int = 120) -> dict:
+    return {"timestamp": ts, "task": task, "lines": lines, "tokens": tokens}
+
+
+class TestMetricsStore:
+    """Test block encoding and reading."""
+
+    def test_round_trip_across_blocks(self, tmp_path):
+        path = tmp_path / "delegation-2025-01-01.dcol"
+        metrics_store.append_records(path, [record(100), record(200, "git-log", 3, 80)])
+        metrics_store.append_records(path, [record(50, "git-log")])
+
+        rows = list(metrics_store.iter_rows(path))
+        assert [r["timestamp"] for r in rows] == [100, 200, 50]
+        assert [r["task"] for r in rows] == ["npm-audit", "git-log", "git-log"]
+        assert rows[1]["tokens"] == 80
+        assert metrics_store.file_info(path) == (3, 50, 200)
+
+    def test_range_skips_blocks_and_files(self, tmp_path):
+        early = tmp_path / "delegation-2025-01-01.dcol"
+        late = tmp_path / "delegation-2025-01-02.dcol"
+        metrics_store.append_records(early, [record(10), record(20)])
+        metrics_store.append_records(late, [record(1000)])
+        metrics_store.append_records(late, [record(2000)])
+
+        assert metrics_store.store_files(tmp_path, start_ts=500) == [late]
+        blocks = list(metrics_store.read_blocks(late, start_ts=1500))
+        assert len(blocks) == 1 and list(blocks[0]["timestamp"]) == [2000]
+
+    def test_older_blocks_read_new_columns_as_defaults(self, tmp_path, monkeypatch):
+        path = tmp_path / "delegation-2025-01-01.dcol"
+        metrics_store.append_records(path, [record(1)])
+        monkeypatch.setitem(metrics_store.COLUMNS, "cli", "S")
+        metrics_store.append_records(path, [dict(record(2), cli="gemini")])
+
+        rows = list(metrics_store.iter_rows(path))
+        assert [r["cli"] for r in rows] == ["", "gemini"]
+
+    def test_migrate_csv(self, tmp_path):
+        csv_file = tmp_path / "delegation-2025-01-01.csv"
+        csv_file.write_text(
+            "timestamp,task,lines,tokens\n"
+            "2025-01-01 09:00:00,npm-audit,5,120\n"
+            "garbage\n"
+            "2025-01-01 08:00:00,git-log,3,80\n"
+        )
+        assert metrics_store.migrate_directory(tmp_path) == 2
+        assert not csv_file.exists()
+
+        rows = list(metrics_store.iter_rows(tmp_path / "delegation-2025-01-01.dcol"))
+        assert [metrics_store.format_timestamp(r["timestamp"]) for r in rows] == [
+            "2025-01-01 08:00:00", "2025-01-01 09:00:00",
+        ]
+
+
+class TestMetricsIntegration:
+    """Test hooks reading and writing through the store."""
+
+    def test_log_then_load(self, tmp_path):
+        log_metrics("dependency-analysis", 4, 90, tmp_path)
+        log_metrics("dependency-analysis", 6, 300, tmp_path)
+
+        # Legacy CSV for today is still read until migrated
+        today = datetime.now().strftime("%Y-%m-%d")
+        (tmp_path / f"delegation-{today}.csv").write_text(
+            f"timestamp,task,lines,tokens\n{today} 00:00:01,legacy,2,50\n"
+        )
+
+        metrics = load_metrics(tmp_path, 1)
+        assert sorted(m[1] for m in metrics) == ["dependency-analysis", "dependency-analysis", "legacy"]
+        assert check_daily_usage(tmp_path) == 2
+
+
+class TestLoader:
+    """Streaming raw rows from store files and legacy CSVs."""
+
+    def test_csv_rows_parsed_as_bytes(self, tmp_path):
+        today = datetime.now().strftime("%Y-%m-%d")
+        (tmp_path / f"delegation-{today}.csv").write_bytes(
+            f"timestamp,task,lines,tokens\n{today} 09:00:00,a,3,50\r\n"
+            f"garbage\n{today} 09:00:01,b,x,1\n{today} 09:00:02,b,4,260".encode()
+        )
+        rows = iter_metrics(tmp_path, 1)
+        assert next(rows) == (f"{today} 09:00:00", "a", 3, 50, "", 0)
+        assert list(rows) == [(f"{today} 09:00:02", "b", 4, 260, "", 0)]
+
+    def test_parallel_summary_matches_serial(self, tmp_path, monkeypatch):
+        for i in range(4):
+            day = datetime.now() - timedelta(days=i)
+            metrics_store.append_records(metrics_store.day_file(tmp_path, day.strftime("%Y-%m-%d")), [
+                record(metrics_store.to_epoch(day.replace(hour=0, minute=i)), f"task-{n % 3}", n % 9, n * 7)
+                for n in range(50)
+            ])
+        monkeypatch.setattr(analyze_metrics, "PARALLEL_MIN_FILES", 2)
+        serial = summarize_rows(load_metrics(tmp_path, 4))
+        assert summarize_range(tmp_path, 4, workers=2) == serial
+        assert serial["count"] == 200 and len(serial["daily"]) == 4
+
+
+class TestMetricsRollup:
+    """Test incremental daily rollups."""
+
+    def test_rollup_summary_matches_raw_rows(self, tmp_path):
+        for task, lines, tokens, cache, latency in [("a", 3, 50, "hit", 0), ("a", 9, 400, "miss", 1200),
+                                                    ("b", 5, 120, "", 800), ("b", 2, 251, "", 0)]:
+            log_metrics(task, lines, tokens, tmp_path, cache=cache, latency_ms=latency)
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        rollups = metrics_rollup.load_rollups(tmp_path, [today])
+        from_rollups = summarize_rollups(rollups)
+        from_rows = summarize_rows(load_metrics(tmp_path, 1))
+        assert from_rollups == from_rows
+        assert rollups[0]["tasks"]["a"]["tokens_sumsq"] == 50 ** 2 + 400 ** 2
+
+    def test_backfill_and_rebuild(self, tmp_path):
+        date = "2025-01-01"
+        metrics_store.append_records(metrics_store.day_file(tmp_path, date), [
+            record(metrics_store.to_epoch(datetime(2025, 1, 1, 9)), "a", 4, 300),
+        ])
+        assert metrics_rollup.load_rollups(tmp_path, [date])[0]["total"]["count"] == 1
+        assert metrics_rollup.rebuild_rollups(tmp_path, [date]) == []
+
+        stale = metrics_rollup.read_rollup(tmp_path, date)
+        stale["total"]["count"] = 99
+        metrics_rollup.write_rollup(tmp_path, stale)
+        assert metrics_rollup.rebuild_rollups(tmp_path, [date]) == [date]
+        assert metrics_rollup.read_rollup(tmp_path, date)["total"]["count"] == 1
+
+    def test_usage_counters_drive_hints(self, tmp_path):
+        for _ in range(5):
+            log_metrics("npm-audit", 4, 90, tmp_path)
+        log_metrics("git-log", 4, 90, tmp_path)
+
+        now = datetime.now()
+        usage = metrics_rollup.read_usage(tmp_path, now.strftime("%Y-%m-%d"))
+        assert usage.total == check_daily_usage(tmp_path) == 6
+        assert usage.tasks == {"npm-audit": 5, "git-log": 1}
+        assert sum(usage.hours) == 6
+
+        assert any("'npm-audit' delegated 5 times" in h for h in usage_hints(tmp_path, "npm-audit"))
+        assert usage_hints(tmp_path, "git-log") == []
@@ -0,0 +1,102 @@
+"""
+Unit tests for local output reducers
+Run with: pytest tests/
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import output_reducers
+from pre_delegate import main
+
+NPM_LS = """app@1.0.0 /app
+├─┬ a@1.0.0
+│ └─┬ shared@2.0.0
+│   └── leaf@1.0.0
+├─┬ b@1.0.0
+│ ├─┬ shared@2.0.0
+│ │ └── leaf@1.0.0
+│ └── lodash@4.17.20
+├── lodash@4.17.21
+└── shared@2.0.0 deduped
+npm ERR! missing: left-pad@1.3.0, required by app@1.0.0
+"""
+
+GIT_LOG = "".join(
+    f"commit {sha * 40}\nAuthor: Dev <dev@example.com>\nDate:   Mon Jan {day} 10:00:00 2025 +0000\n\n    {subject}\n\n"
+    for sha, day, subject in [("c", 3, "Bump version"), ("b", 2, "Fix parser"), ("a", 1, "bump version")]
+)
+
+
+class TestReducers:
+    """Test each reducer on captured output."""
+
+    def test_npm_ls_collapses_repeated_subtrees(self):
+        text = output_reducers.reduce_output("npm_ls", NPM_LS)
+        lines = text.splitlines()
+        assert lines[0] == "Errors/warnings (1):"
+        assert "shared@2.0.0  [subtree shown above]" in text
+        assert text.count("leaf@1.0.0") == 1
+        assert "Multiple versions: lodash (4.17.20, 4.17.21)" in text
+        assert "shared@2.0.0 deduped" not in text
+
+    def test_git_log_collapses_identical_subjects(self):
+        text = output_reducers.reduce_output("git_log", GIT_LOG)
+        assert text.splitlines() == [
+            "3 commits, 1 authors",
+            "Range: Mon Jan 1 10:00:00 2025 +0000 .. Mon Jan 3 10:00:00 2025 +0000",
+            "ccccccc Bump version (Dev)  (x2)",
+            "bbbbbbb Fix parser (Dev)",
+        ]
+
+    def test_find_counts_vendor_trees(self):
+        paths = ["./src/a.py", "./src/b.py", "./README.md"] + [f"./node_modules/x/{i}.js" for i in range(50)]
+        text = output_reducers.reduce_output("find", "\n".join(paths))
+        assert "./node_modules/ 50 entries (not listed)" in text
+        assert "./src/ 2 [.py:2] a.py, b.py" in text
+
+    def test_pip_freeze_lists_special_installs(self):
+        text = output_reducers.reduce_output("pip_freeze", "Django==4.2\n-e git+https://x/y.git#egg=y\nrequests==2.31.0\n")
+        assert text.splitlines() == [
+            "2 pinned packages, 1 editable/VCS/local",
+            "-e git+https://x/y.git#egg=y",
+            "Django==4.2 requests==2.31.0",
+        ]
+
+
+class TestRunAndReduce:
+    """Test running commands locally."""
+
+    def test_commands_needing_a_shell_are_not_run(self):
+        assert output_reducers.run_command("git log | head") is None
+        assert output_reducers.run_command("find . -exec rm {} ;") is None
+
+    def test_only_allowlisted_argv_is_run(self, tmp_path):
+        (tmp_path / "a.pyc").write_text("")
+        for command in ("find . -name *.pyc -delete", "find . -fprint out", "find . -ok rm"):
+            assert output_reducers.run_and_reduce("find", command, tmp_path) is None
+        assert (tmp_path / "a.pyc").exists() and not (tmp_path / "out").exists()
+        assert not output_reducers.is_read_only("git_log", ["git", "log", "--output=x"])
+        assert not output_reducers.is_read_only("pip_freeze", ["pip", "freeze", "--log", "x"])
+        assert output_reducers.is_read_only("git_log", ["git", "log", "--oneline", "-n", "20", "--", "src"])
+        assert output_reducers.is_read_only("find", ["find", "src", "-type", "f", "-name", "*.py"])
+
+    @pytest.mark.skipif(shutil.which("find") is None, reason="needs find")
+    def test_prompt_carries_reduced_output(self, tmp_path, capsys):
+        (tmp_path / "src").mkdir()
+        for i in range(30):
+            (tmp_path / "src" / f"m{i}.py").write_text("")
+
+        main(["pre-delegate.py", "find . -name *.py", "List modules"], cwd=tmp_path)
+        prompt = capsys.readouterr().out
+        assert "reduced locally" in prompt
+        assert "./src/ 30 [.py:30]" in prompt
+
+        main(["pre-delegate.py", "find . -name *.py", "List modules", "--no-reduce"], cwd=tmp_path)
+        assert "Execute this command" in capsys.readouterr().out
@@ -0,0 +1,84 @@
+"""
+Unit tests for streaming response validation
+Run with: pytest tests/
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+from post_delegate import (
+    count_lines, estimate_tokens, extract_action_items, main, scan_response,
+)
+
+RESPONSE = (
+    "Summary of findings:\n\n"
+    "- lodash 4.17.20 is outdated  \n"
+    "TODO: upgrade lodash\n"
+    "  {\"name\": \"left-pad\", \"version\": \"1.3.0\"}\n"
+    "CRITICAL: prototype pollution in merge()\n"
+    "Next step: run npm audit fix"
+)
+
+
+def chunked(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestResponseStream:
+    """Streaming counts must match whole-text counts."""
+
+    @pytest.mark.parametrize("size", [1, 7, 64, 10_000])
+    def test_matches_whole_text(self, size):
+        scan = scan_response(chunked(RESPONSE, size))
+        assert scan.lines == count_lines(RESPONSE)
+        assert scan.tokens == estimate_tokens(RESPONSE)
+        assert [item.text for item in scan.action_items] == extract_action_items(RESPONSE)
+        assert not scan.exceeded
+
+    def test_stops_reading_past_max_lines(self):
+        consumed = []
+
+        def chunks():
+            for i in range(1000):
+                consumed.append(i)
+                yield f"line {i}\n"
+
+        scan = scan_response(chunks(), max_lines=10)
+        assert scan.exceeded and scan.lines == 11
+        assert len(consumed) == 11
+
+
+class TestStreamingMain:
+    """Test --file and --fail-fast end to end."""
+
+    def test_file_mode(self, tmp_path, capsys):
+        (tmp_path / "response.txt").write_text(RESPONSE)
+        with pytest.raises(SystemExit) as exit_info:
+            main(["post-delegate.py", "--file", "response.txt", "10", "npm-audit"], cwd=tmp_path)
+
+        out = capsys.readouterr().out
+        assert exit_info.value.code == 0
+        assert "Response quality: 6 lines" in out
+        assert "TODO: upgrade lodash" in out
+
+    def test_fail_fast(self, tmp_path, capsys):
+        (tmp_path / "response.txt").write_text("".join(f"line {i}\n" for i in range(500)))
+        with pytest.raises(SystemExit) as exit_info:
+            main(["post-delegate.py", "--file", "response.txt", "5", "--fail-fast"], cwd=tmp_path)
+
+        out = capsys.readouterr().out
+        assert exit_info.value.code == 1
+        assert "(6 lines > 5 expected)" in out
+        assert "Stopped reading after 6 lines" in out
+
+    def test_options_without_a_response_print_usage(self, tmp_path, capsys):
+        for argv in (["post-delegate.py", "--json"], ["post-delegate.py", "--cli", "gemini", "--file"]):
+            with pytest.raises(SystemExit) as exit_info:
+                main(argv, cwd=tmp_path)
+            assert exit_info.value.code == 1
+            assert "Usage" in capsys.readouterr().out
@@ -0,0 +1,110 @@
+"""
+Unit tests for compiled prompt templates
+Run with: pytest tests/
+"""
+
+import os
+import sys
+import json
+import random
+import threading
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import pre_delegate
+import prompt_templates
+import token_counter
+
+
+class TestCompiledTemplates:
+    """Rendering and precomputed token counts."""
+
+    def test_token_counts_match_full_count(self):
+        templates = prompt_templates.TemplateSet(prompt_templates.DEFAULT_TEMPLATES)
+        rng = random.Random(5)
+        alphabet = "ab cd\n\n  xy12,.;:`é漢\t-"
+        for _ in range(2000):
+            text = lambda: "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 25)))  # noqa: E731
+            name = rng.choice(list(prompt_templates.DEFAULT_TEMPLATES))
+            style = rng.choice(prompt_templates.STYLES)
+            if name == "shell_reduced":
+                prompt = templates.build_reduced(text(), text(), 7, 1, 123456, 99, text(), style)
+            else:
+                prompt = templates.build(name, text(), text(), rng.randint(1, 500), style)
+            assert prompt.tokens == token_counter.approx_tokens(prompt.text)
+
+    def test_other_counters_count_the_whole_prompt(self, monkeypatch):
+        monkeypatch.setenv("DELEGATE_TOKENIZER", "chars")
+        prompt = prompt_templates.TemplateSet(prompt_templates.DEFAULT_TEMPLATES).build("docs", "x", "y", 5)
+        assert prompt.tokens == len(prompt.text) // 4
+
+    def test_strict_style_and_memo(self):
+        templates = prompt_templates.TemplateSet(prompt_templates.DEFAULT_TEMPLATES)
+        strict = templates.build("search", "grep TODO", "Cleanup", 6, "strict")
+        assert strict.text.split("\n")[:2] == ["CONTEXT: Cleanup", prompt_templates.STRICT_STYLE.strip()]
+        assert templates.build("search", "grep TODO", "Cleanup", 6, "strict") is strict
+        assert templates.build("unknown", "t", "c", 3).text.endswith("Maximum 3 lines.")
+
+    def test_memo_is_per_counter_and_thread_safe(self, monkeypatch):
+        templates = prompt_templates.TemplateSet(prompt_templates.DEFAULT_TEMPLATES)
+        approx = templates.build("docs", "x", "y", 5)
+        monkeypatch.setenv("DELEGATE_TOKENIZER", "chars")
+        assert templates.build("docs", "x", "y", 5).tokens == len(approx.text) // 4
+        monkeypatch.delenv("DELEGATE_TOKENIZER")
+
+        monkeypatch.setattr(prompt_templates, "MEMO_SIZE", 4)
+        errors = []
+
+        def worker():
+            try:
+                for n in range(300):
+                    assert templates.build("search", f"task {n % 9}", "ctx", 5).text.startswith("CONTEXT: ctx")
+            except Exception as e:  # noqa: BLE001 - surfaced below
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+
+    def test_unknown_field_is_rejected(self):
+        try:
+            prompt_templates.Template("bad", "TASK: {task} {secret}")
+        except ValueError as e:
+            assert "secret" in str(e)
+        else:
+            raise AssertionError("expected ValueError")
+
+
+class TestTemplateFile:
+    """User-editable overrides."""
+
+    def test_overrides_reload_and_fallback(self, tmp_path, monkeypatch, capsys):
+        path = tmp_path / "templates.json"
+        path.write_text(json.dumps({"generic": ["DO: {task}", "AT MOST {max_lines} LINES"],
+                                    "search": "{nope}", "docs": "TASK: {task:d}"}))
+        monkeypatch.setenv("DELEGATE_TEMPLATES", str(path))
+        prompt = pre_delegate.render_prompt("generic", "say hi", "ctx", 2)
+        assert prompt.text == "DO: say hi\nAT MOST 2 LINES"
+        assert prompt.tokens == token_counter.approx_tokens(prompt.text)
+        errors = capsys.readouterr().err
+        assert "nope" in errors and "'docs'" in errors
+        assert pre_delegate.build_prompt("search", "x", "y", 4).startswith("CONTEXT: y")
+        assert pre_delegate.build_prompt("docs", "x", "y", 4) == prompt_templates.DEFAULT_TEMPLATES["docs"].format(
+            task="x", context="y", max_lines=4)
+
+        monkeypatch.setattr(prompt_templates, "RECHECK_SECONDS", 0)
+        path.write_text(json.dumps({"generic": "NOW: {task}"}))
+        os.utime(str(path), ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10 ** 9))
+        assert pre_delegate.build_prompt("generic", "say hi", "ctx", 2) == "NOW: say hi"
+
+    def test_prepare_reports_prompt_tokens(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DELEGATE_NO_BUDGET", "1")
+        monkeypatch.setenv("DELEGATE_NO_ADAPTIVE", "1")
+        monkeypatch.delenv("DELEGATE_TEMPLATES", raising=False)
+        delegation = pre_delegate.prepare("analyze the auth flow", "Review", 6, reduce=False, cwd=tmp_path)
+        assert delegation.prompt_tokens == token_counter.count_tokens(delegation.prompt) > 0
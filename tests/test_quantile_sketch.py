@@ -0,0 +1,85 @@
+"""
+Unit tests for mergeable quantile sketches and the percentiles built on them
+Run with: pytest tests/
+"""
+
+import sys
+import json
+import random
+from datetime import datetime
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import analyze_metrics
+import metrics_rollup
+import metrics_store
+from post_delegate import log_metrics
+from quantile_sketch import MAX_BINS, RELATIVE_ACCURACY, Sketch
+
+
+def exact(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+class TestSketch:
+    """Accuracy, merging and persistence."""
+
+    def test_relative_accuracy(self):
+        rng = random.Random(3)
+        values = [rng.lognormvariate(5, 1.2) for _ in range(20000)]
+        sketch = Sketch()
+        sketch.update(values)
+        for q in (0.5, 0.95, 0.99):
+            assert abs(sketch.quantile(q) - exact(values, q)) <= RELATIVE_ACCURACY * exact(values, q) * 1.01
+
+    def test_merge_matches_single_sketch(self):
+        values = list(range(1, 5001))
+        whole, left, right = Sketch(), Sketch(), Sketch()
+        whole.update(values)
+        left.update(values[::2])
+        right.update(values[1::2])
+        assert left.merge(right) == whole
+
+    def test_zeros_round_trip_and_empty(self):
+        sketch = Sketch()
+        assert sketch.quantile(0.5) is None
+        sketch.update([0, 0, 0, 10])
+        assert sketch.quantile(0.5) == 0 and sketch.quantile(1) == 10
+        assert Sketch.from_dict(json.loads(json.dumps(sketch.to_dict()))) == sketch
+
+    def test_bins_bounded(self):
+        sketch = Sketch()
+        sketch.update(1.05 ** i for i in range(3 * MAX_BINS))
+        assert len(sketch.bins) <= MAX_BINS
+        assert sketch.quantile(1) == sketch.max
+
+
+class TestPercentiles:
+    """Daily rollups carry sketches; analyze-metrics merges them."""
+
+    def test_merged_across_days(self, tmp_path):
+        for day, tokens in ((1, 100), (2, 200), (3, 900)):
+            metrics_store.append_records(metrics_store.day_file(tmp_path, f"2025-01-0{day}"), [
+                {"timestamp": metrics_store.to_epoch(datetime(2025, 1, day, 9)), "task": "t",
+                 "lines": 5, "tokens": tokens, "latency_ms": 1000 * day},
+            ] * 10)
+        dates = ["2025-01-01", "2025-01-02", "2025-01-03"]
+        summary = analyze_metrics.summarize_rollups(metrics_rollup.load_rollups(tmp_path, dates))
+        data = analyze_metrics.summary_json(summary)
+
+        assert data["count"] == 30
+        assert abs(data["percentiles"]["tokens"]["p50"] - 200) <= 2
+        assert abs(data["percentiles"]["latency_ms"]["p99"] - 3000) <= 30
+        assert data["tasks"]["t"]["tokens"]["count"] == 30
+        assert abs(data["daily"]["2025-01-03"]["tokens"]["p95"] - 900) <= 9
+
+    def test_unrecorded_latency_left_out(self, tmp_path):
+        log_metrics("a", 5, 80, tmp_path)
+        log_metrics("a", 5, 80, tmp_path, latency_ms=1500)
+        today = datetime.now().strftime("%Y-%m-%d")
+        stats = metrics_rollup.read_rollup(tmp_path, today)["tasks"]["a"]
+        assert stats["sketches"]["latency_ms"].count == 1
+        assert stats["sketches"]["tokens"].count == 2
@@ -0,0 +1,197 @@
+"""
+Unit tests for the delegation response cache
+Run with: pytest tests/
+"""
+
+import os
+import sys
+import time
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_rollup
+from response_cache import ResponseCache, cache_key, git_head, referenced_paths
+import run_delegation
+from cli_router import Routed
+from run_delegation import delegate, main
+
+FAKE_CLI = """\
+import sys
+from pathlib import Path
+calls = Path(__file__).with_name("calls")
+calls.write_text(str(int(calls.read_text()) + 1) if calls.exists() else "1")
+print("Key finding: lodash is outdated")
+print("TODO: upgrade lodash")
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A project dir whose delegate CLI is a script counting its calls."""
+    (tmp_path / ".claude").mkdir()
+    script = tmp_path / "fake_cli.py"
+    script.write_text(FAKE_CLI)
+    monkeypatch.setenv("DELEGATE_CLI", f"{sys.executable} {script}")
+    monkeypatch.delenv("DELEGATE_NO_CACHE", raising=False)
+    return tmp_path
+
+
+def calls(project: Path) -> int:
+    path = project / "calls"
+    return int(path.read_text()) if path.exists() else 0
+
+
+class TestCacheKey:
+    """Keys change exactly when the prompt or its inputs change."""
+
+    def test_lockfile_changes_key(self, tmp_path):
+        lock = tmp_path / "package-lock.json"
+        lock.write_text('{"lockfileVersion": 3}')
+        key = cache_key("npm ls", tmp_path)
+        assert cache_key("npm ls", tmp_path) == key
+
+        lock.write_text('{"lockfileVersion": 2}')
+        assert cache_key("npm ls", tmp_path) != key
+        assert cache_key("npm ls --all", tmp_path) != cache_key("npm ls", tmp_path)
+
+    def test_cli_changes_key(self, tmp_path):
+        assert cache_key("npm ls", tmp_path, "gemini -p") != cache_key("npm ls", tmp_path, "copilot -p")
+
+    def test_referenced_file_changes_key(self, tmp_path):
+        (tmp_path / "src").mkdir()
+        source = tmp_path / "src" / "app.py"
+        source.write_text("x = 1\n")
+        prompt = "Review @src/app.py for bugs"
+        assert referenced_paths(prompt) == ["src/app.py"]
+        assert referenced_paths("mail me@example.com about @a.py.") == ["a.py"]
+
+        key = cache_key(prompt, tmp_path)
+        source.write_text("x = 2\n")
+        assert cache_key(prompt, tmp_path) != key
+
+    def test_referenced_directory_changes_key(self, tmp_path):
+        (tmp_path / "src").mkdir()
+        source = tmp_path / "src" / "a.py"
+        source.write_text("x = 1\n")
+        prompt = "Analyze @src/ for bugs"
+        key = cache_key(prompt, tmp_path)
+        source.write_text("x = 22\n")
+        assert cache_key(prompt, tmp_path) != key
+
+    @pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+    def test_unstaged_edit_changes_key(self, tmp_path):
+        source = tmp_path / "a.py"
+        source.write_text("x = 1\n")
+        subprocess.run(["git", "init", "-q"], cwd=str(tmp_path), check=True)
+        key = cache_key("Analyze the project", tmp_path)
+        (tmp_path / ".claude" / "cache").mkdir(parents=True)
+        (tmp_path / ".claude" / "cache" / "entry.json").write_text("{}")
+        assert cache_key("Analyze the project", tmp_path) == key
+
+        source.write_text("x = 22\n")
+        assert cache_key("Analyze the project", tmp_path) != key
+
+    def test_git_head(self, tmp_path):
+        git = tmp_path / ".git"
+        (git / "refs" / "heads").mkdir(parents=True)
+        (git / "HEAD").write_text("ref: refs/heads/main\n")
+        (git / "packed-refs").write_text("# pack-refs with: peeled\n" + "a" * 40 + " refs/heads/main\n")
+        assert git_head(git) == "a" * 40
+        key = cache_key("git log", tmp_path)
+
+        (git / "refs" / "heads" / "main").write_text("b" * 40 + "\n")
+        assert git_head(git) == "b" * 40
+        assert cache_key("git log", tmp_path) != key
+
+
+class TestResponseCache:
+    """TTL expiry and size-bounded LRU eviction."""
+
+    def test_ttl(self, tmp_path):
+        cache = ResponseCache(tmp_path, ttl=60)
+        cache.put("k", "answer")
+        assert cache.get("k") == "answer"
+
+        cache.ttl = 0
+        time.sleep(0.01)
+        assert cache.get("k") is None
+        assert cache.stats().entries == 0
+
+    def test_lru_eviction(self, tmp_path):
+        cache = ResponseCache(tmp_path, max_bytes=10_000)
+        for i in range(3):
+            cache.put(f"k{i}", "x" * 3000)
+            old = time.time() - 100 + i
+            os.utime(str(tmp_path / f"k{i}.json"), (old, old))
+        cache.get("k0")  # Most recently used now
+
+        cache.put("k3", "x" * 3000)
+        assert cache.get("k1") is None
+        assert [cache.get(k) is not None for k in ("k0", "k2", "k3")] == [True, True, True]
+        assert cache.stats().bytes <= 10_000
+
+
+class TestRunDelegation:
+    """Second identical delegation is served from the cache."""
+
+    def test_hit_after_miss(self, project):
+        first = delegate("Summarize README", cwd=project)
+        second = delegate("Summarize README", cwd=project)
+        assert first[2] == "miss" and second[2] == "hit"
+        assert first[0] == second[0]
+        assert calls(project) == 1
+
+        (project / "requirements.txt").write_text("requests==2.31.0\n")
+        assert delegate("Summarize README", cwd=project)[2] == "miss"
+        assert calls(project) == 2
+
+    def test_no_cache(self, project, monkeypatch):
+        delegate("Summarize README", cwd=project)
+        assert delegate("Summarize README", use_cache=False, cwd=project)[2] == ""
+        monkeypatch.setenv("DELEGATE_NO_CACHE", "1")
+        assert delegate("Summarize README", cwd=project)[2] == ""
+        assert calls(project) == 3
+
+    def test_counters_logged(self, project, capsys):
+        for argv in (["run"], ["run"], ["run", "--no-cache"]):
+            with pytest.raises(SystemExit):
+                main(argv + ["Summarize README", "ctx", "5", "--name", "readme"], cwd=project)
+        assert "Cached response" in capsys.readouterr().out
+
+        (rollup_path,) = (project / ".claude" / "metrics").glob("rollup-*.json")
+        date = rollup_path.stem[len("rollup-"):]
+        rollup = metrics_rollup.read_rollup(project / ".claude" / "metrics", date)
+        assert rollup["cache"] == {"hit": 1, "miss": 1}
+        assert rollup["tasks"]["readme"]["count"] == 3
+
+    def test_switching_cli_misses(self, project, monkeypatch):
+        response, _, status, cli = delegate("Summarize README", cwd=project)
+        assert status == "miss"
+        monkeypatch.setenv("DELEGATE_CLI", f"{sys.executable} -c 'print(\"other\")'")
+        assert delegate("Summarize README", cwd=project)[::2] == ("other\n", "miss")
+        assert calls(project) == 1
+
+    def test_hit_reports_the_producing_cli(self, project, monkeypatch):
+        class FakeRouter:
+            def signature(self):
+                return "router:gemini -p,copilot -p"
+
+            def run(self, prompt, cwd=None):
+                return Routed("copilot", 0, "Key finding: routed\n", "", False, [])
+
+        monkeypatch.delenv("DELEGATE_CLI")
+        monkeypatch.setattr(run_delegation.cli_router, "load_router", lambda cwd: FakeRouter())
+        assert delegate("Summarize README", cwd=project)[2:] == ("miss", "copilot")
+        assert delegate("Summarize README", cwd=project)[2:] == ("hit", "copilot")
+
+    def test_failing_cli_is_not_cached(self, project, monkeypatch):
+        monkeypatch.setenv("DELEGATE_CLI", f"{sys.executable} -c 'import sys; sys.exit(3)'")
+        with pytest.raises(RuntimeError):
+            delegate("Summarize README", cwd=project)
+        assert ResponseCache(project / ".claude" / "cache" / "responses").stats().entries == 0
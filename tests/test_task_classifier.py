@@ -0,0 +1,102 @@
+"""
+Unit tests for the single-pass task classifier
+Run with: pytest tests/
+"""
+
+import re
+import sys
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+from task_classifier import TaskClassifier, classify, compile_pattern, default_classifier
+
+SAMPLE_TASKS = [
+    "npm ls", "npm ls --depth=0", "git log --oneline -20", "pip freeze",
+    "find . -name '*.py'", "find all files using requests", "cat package.json",
+    "curl https://example.com", "search for TODO in code", "locate config loader",
+    "grep.*code", "scan auth.py for vulnerabilities", "audit dependencies",
+    "analyze @src/ for performance issues", "review the login flow",
+    "how do I use asyncio.gather", "api docs for fetch", "show an example of useEffect",
+    "summarize this thread", "", "docker compose up", "Investigate flaky CI",
+]
+
+
+def legacy_compression(task: str) -> int:
+    task_lower = task.lower()
+    if re.search(r'(npm ls|git log|find\s|pip freeze)', task_lower):
+        return 5
+    if re.search(r'(grep|search|audit|scan)', task_lower):
+        return 8
+    return 10
+
+
+class TestCompilePattern:
+    """Test pattern compilation into keyword sequences."""
+
+    def test_gap_and_alternatives(self):
+        assert compile_pattern("(analyze|review).*code") == [
+            [("analyze", False, False), ("code", False, False)],
+            [("review", False, False), ("code", False, False)],
+        ]
+
+    def test_anchor_and_whitespace(self):
+        assert compile_pattern(r"^(git|npm)\s") == [[("git", True, True)], [("npm", True, True)]]
+
+    def test_unsupported_syntax_uses_regex(self):
+        assert compile_pattern(r"v\d+\.\d+") is None
+
+
+class TestTaskClassifier:
+    """Test classification results."""
+
+    def test_compression_matches_legacy_cascade(self):
+        classifier = default_classifier()
+        for task in SAMPLE_TASKS:
+            assert classify(task, classifier).max_lines == legacy_compression(task), task
+
+    def test_cascade_priority(self):
+        classifier = default_classifier()
+        assert classify("git log", classifier).task_type == "shell"
+        assert classify("grep -r 'password' src/", classifier).task_type == "search"
+        assert classify("please find the file with docs", classifier).task_type == "search"
+        assert classify("review api usage", classifier).task_type == "analyze"
+        assert classify("hello", classifier) == ("generic", 10, None, None)
+        assert classify("git log -5", classifier).reducer == "git_log"
+
+    def test_presets_route(self):
+        classifier = default_classifier()
+        classifier.add_presets({
+            "security_audit": {"cli": "gemini", "pattern": "(security|vulnerability|xss)"},
+            "code_analysis": {"cli": "gemini", "pattern": "(analyze|review|inspect).*code"},
+        })
+        assert classify("Review the code for XSS", classifier).route == "security_audit"
+        assert classify("inspect this code", classifier).route == "code_analysis"
+        assert classify("inspect logs", classifier).route is None
+
+    def test_many_rules_and_slow_path(self):
+        classifier = TaskClassifier()
+        for i in range(500):
+            classifier.add("route", f"r{i}", f"(tool{i}x|util{i}y).*run")
+        classifier.add("route", "version", r"v\d+")
+        assert classifier.match("please tool250x then run it") == {"route": "r250"}
+        assert classifier.match("upgrade to v12") == {"route": "version"}
+        assert classifier.match("tool250x only") == {}
+
+    def test_uppercase_escapes_and_literals(self):
+        classifier = TaskClassifier()
+        classifier.add("route", "deploy", r"deploy\S+prod")
+        classifier.add("route", "upper", r"(NPM|Yarn).*Audit")
+        assert classifier.match("deployXprod") == {"route": "deploy"}
+        assert classifier.match("deploy prod") == {}
+        assert classifier.match("run yarn audit") == {"route": "upper"}
+
+    def test_invalid_presets_are_skipped(self, capsys):
+        classifier = default_classifier()
+        classifier.add_presets({
+            "broken": {"cli": "gemini", "pattern": "(foo"},
+            "security_audit": {"cli": "gemini", "pattern": "(security|xss)"},
+        })
+        assert classify("check for xss", classifier).route == "security_audit"
+        assert "broken" in capsys.readouterr().err
@@ -0,0 +1,133 @@
+"""
+Unit tests for the token budget scheduler
+Run with: pytest tests/
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import metrics_writer
+import pre_delegate
+import run_delegation
+from token_budget import (
+    POLICIES, BudgetConfig, Ledger, WINDOW_SECONDS, capacity, decide, now_ts, read_ledger, simulate,
+)
+
+NOW = 1735700000
+
+
+def ledger_with(spent: int, cli: str = "gemini", lines_per_100: int = 5) -> Ledger:
+    ledger = Ledger()
+    for i in range(spent // 100):
+        ledger.add(cli, NOW - 60 * i, 100, lines_per_100)
+    return ledger
+
+
+class TestLedger:
+    """Sliding-window accounting."""
+
+    def test_window_and_expiry(self):
+        ledger = Ledger()
+        ledger.add("gemini", NOW - WINDOW_SECONDS - 600, 500, 10)  # Outside the window
+        ledger.add("gemini", NOW - WINDOW_SECONDS + 1200, 300, 10)  # Leaves within the hour
+        ledger.add("copilot", NOW - 60, 200, 10)
+
+        assert ledger.spent(NOW) == 500
+        assert ledger.spent(NOW, "copilot") == 200
+        assert ledger.expiring(NOW, 3600) == 300
+        ledger.prune(NOW)
+        assert sum(len(b) for b in ledger.buckets.values()) == 2
+
+    def test_capacity(self):
+        cap = capacity(ledger_with(9500), 19000, NOW)
+        assert (cap.spent, cap.remaining, cap.fraction) == (9500, 9500, 0.5)
+        assert cap.exhausted_in is not None and cap.exhausted_in > 0
+
+
+class TestDecide:
+    """Policy decisions as the window fills."""
+
+    def test_runs_with_room(self):
+        assert decide(ledger_with(1000), BudgetConfig(), NOW, 10).action == "run"
+
+    def test_tightens_then_queues(self):
+        config = BudgetConfig()
+        tightened = decide(ledger_with(15200), config, NOW, 10)
+        assert tightened.action == "tighten" and 3 <= tightened.max_lines < 10
+
+        assert decide(ledger_with(17500), config, NOW, 10, priority="low").action == "queue"
+        assert decide(ledger_with(17500), config, NOW, 10).action == "tighten"
+        assert decide(ledger_with(19000), config, NOW, 10, priority="high").action == "queue"
+        assert decide(ledger_with(19000), config, NOW, 10, policy=POLICIES["off"]).action == "run"
+
+    def test_reroutes_to_cli_with_room(self):
+        config = BudgetConfig(budgets={"gemini": 1000, "copilot": 5000},
+                              commands={"gemini": "gemini -p", "copilot": "copilot -p"})
+        decision = decide(ledger_with(1000), config, NOW, 8, cli="gemini")
+        assert (decision.action, decision.cli, decision.command) == ("reroute", "copilot", "copilot -p")
+
+
+class TestIntegration:
+    """Ledger fed by metrics commits, decisions applied by pre-delegate."""
+
+    def test_commit_updates_ledger(self, tmp_path):
+        now = now_ts()
+        metrics_writer.commit(tmp_path, [
+            {"timestamp": now - 10, "task": "t", "lines": 5, "tokens": 120, "cli": "copilot"},
+            {"timestamp": now - 5, "task": "t", "lines": 5, "tokens": 80},
+        ])
+        ledger = read_ledger(tmp_path, now)
+        assert (ledger.spent(now), ledger.spent(now, "copilot"), ledger.spent(now, "gemini")) == (200, 120, 80)
+
+        (tmp_path / "budget-ledger.json").unlink()
+        assert read_ledger(tmp_path, now).spent(now) == 200  # Rebuilt from the store
+
+    def test_pre_delegate_queues_when_exhausted(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.delenv("DELEGATE_NO_BUDGET", raising=False)
+        claude = tmp_path / ".claude"
+        claude.mkdir()
+        (claude / "budget.json").write_text(json.dumps({"total": 1000}))
+        now = now_ts()
+        metrics_writer.commit(claude / "metrics", [
+            {"timestamp": now - i, "task": "t", "lines": 5, "tokens": 100} for i in range(10)
+        ])
+
+        with pytest.raises(SystemExit) as exit_info:
+            pre_delegate.main(["pre", "Summarize README", "ctx", "8", "--priority", "low", "--name", "docs"],
+                              cwd=tmp_path)
+        assert exit_info.value.code == 3
+        assert capsys.readouterr().out == ""
+        queued = json.loads((claude / "queue.jsonl").read_text())
+        assert queued["task"] == "Summarize README" and queued["max_lines"] == 8
+        assert queued["name"] == "docs" and queued["priority"] == "low"
+
+        monkeypatch.setenv("DELEGATE_CLI", "copilot -p")
+        with pytest.raises(run_delegation.Queued):
+            run_delegation.delegate("Summarize CHANGES", "ctx", 8, cwd=tmp_path, priority="low", name="docs")
+        queued = json.loads((claude / "queue.jsonl").read_text().splitlines()[1])
+        assert (queued["cli"], queued["name"], queued["priority"]) == ("copilot -p", "docs", "low")
+
+        monkeypatch.setenv("DELEGATE_NO_BUDGET", "1")
+        assert pre_delegate.prepare("Summarize README", "ctx", 8, cwd=tmp_path).max_lines == 8
+
+
+class TestSimulate:
+    """Replaying history compares policies."""
+
+    def test_policies(self):
+        records = [{"timestamp": NOW + 60 * i, "task": "audit" if i % 3 else "deps",
+                    "lines": 10, "tokens": 300} for i in range(120)]
+        config = BudgetConfig(total=19000)
+        off = simulate(records, config, POLICIES["off"])
+        default = simulate(records, config, POLICIES["default"], low_tasks=["deps"])
+
+        assert off.overruns > 0 and off.queued == 0
+        assert default.overruns == 0 and default.queued > 0
+        assert default.peak_fraction <= 1.0 < off.peak_fraction
+        assert default.tightened > 0
@@ -0,0 +1,96 @@
+"""
+Unit tests for token counting
+Run with: pytest tests/
+"""
+
+import random
+import re
+import sys
+import threading
+from pathlib import Path
+
+# Add hooks to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
+
+import token_counter
+from post_delegate import estimate_tokens
+
+# Reference definition of the approximation for ASCII text, as regexes
+PIECES = re.compile(r" ?[^\W\d_]+| ?\d{1,3}| ?(?:[^\s\w]|_)+|\s+(?!\S)|\s+")
+LONG_WORDS = re.compile(r"[A-Za-z]{8,}")
+LONG_PUNCT = re.compile(r"(?:[^\s\w]|_){5,}")
+
+
+def reference_tokens(text: str) -> int:
+    return (len(PIECES.findall(text))
+            + sum((len(word) - 4) // 4 for word in LONG_WORDS.findall(text))
+            + sum((len(run) - 1) // 4 for run in LONG_PUNCT.findall(text)))
+
+
+class TestApproxTokens:
+    """Test the bundled BPE-style approximation."""
+
+    def test_prose_counts_words(self):
+        assert token_counter.approx_tokens("Hello world, this is a test.") == 8
+
+    def test_json_and_code_cost_more_than_chars(self):
+        text = '{"name": "foo", "version": "1.2.3", "deps": []}'
+        assert token_counter.approx_tokens(text) > token_counter.char_tokens(text)
+
+    def test_cjk_is_about_one_token_per_character(self):
+        text = "这是一个中文句子"
+        assert len(text) <= token_counter.approx_tokens(text) <= 2 * len(text)
+
+    def test_byte_classes_match_reference_pretokenizer(self):
+        rng = random.Random(7)
+        alphabet = "aZq  \n\t_-{}();12345.\x0b'"
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            assert token_counter.approx_tokens(text) == reference_tokens(text), repr(text)
+
+    def test_chunked_matches_single_pass(self):
+        text = ("def f(x):\n    return {'k': [1, 2, 3]}  # naïve\n" * 500) + "tail"
+        assert token_counter.approx_tokens(text, chunk_chars=997) == token_counter.approx_tokens(text)
+
+
+class TestCountTokens:
+    """Test counter selection and caching."""
+
+    def test_env_selects_counter(self, monkeypatch):
+        monkeypatch.setenv("DELEGATE_TOKENIZER", "chars")
+        assert estimate_tokens("abcd" * 10) == 10
+
+    def test_missing_tiktoken_falls_back(self, monkeypatch):
+        monkeypatch.setattr(token_counter, "_tiktoken_counter", lambda: None)
+        monkeypatch.delitem(token_counter.COUNTERS, "tiktoken", raising=False)
+        assert token_counter.get_counter("tiktoken") is token_counter.approx_tokens
+
+    def test_large_texts_are_cached(self, monkeypatch):
+        calls = []
+        monkeypatch.setitem(token_counter.COUNTERS, "spy", lambda text: calls.append(text) or 7)
+        text = "x " * token_counter.CACHE_MIN_CHARS
+
+        assert token_counter.count_tokens(text, "spy") == 7
+        assert token_counter.count_tokens(text, "spy") == 7
+        assert len(calls) == 1
+
+    def test_cache_is_thread_safe(self, monkeypatch):
+        monkeypatch.setattr(token_counter, "CACHE_SIZE", 4)
+        monkeypatch.setitem(token_counter.COUNTERS, "len", len)
+        texts = ["y" * (token_counter.CACHE_MIN_CHARS + i) for i in range(8)]
+        errors = []
+
+        def worker():
+            try:
+                for n in range(400):
+                    text = texts[n % len(texts)]
+                    assert token_counter.count_tokens(text, "len") == len(text)
+            except Exception as e:  # noqa: BLE001 - surfaced below
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []